@@ -5,6 +5,15 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Async-эндпоинты company/api/async/* (company/views/api_async.py) работают
+через AsyncMongoClient и не занимают поток на время запроса к MongoDB.
+Запуск рядом с WSGI-приложением:
+
+    COMPANY_ASYNC_API=true uvicorn WWS1.asgi:application --workers 2
+
+Синхронные views при этом продолжают работать (Django выполняет их в
+пуле потоков).
 """
 
 import os
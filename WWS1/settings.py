@@ -1,5 +1,6 @@
 
 import os
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -37,11 +38,16 @@ INSTALLED_APPS = [
     'mongodb',
     'users',
     'company',
+    'monitoring',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.MetricsMiddleware',
+    'monitoring.middleware.ProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'mongodb.audit_context.AuditActorMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -51,6 +57,15 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'WWS1.urls'
 
+# Профиль загрузчика шаблонов:
+#   production  - явный cached.Loader: шаблон компилируется один раз на процесс
+#                 (с preload_app - еще до fork, см. mongodb/warmup.py) и не
+#                 проверяется на изменения;
+#   development - загрузчики Django по умолчанию (кеш сбрасывается runserver
+#                 при изменении файлов шаблонов).
+# По умолчанию production, если DEBUG выключен.
+TEMPLATE_LOADER_PROFILE = os.environ.get('TEMPLATE_LOADER_PROFILE', 'development' if DEBUG else 'production')
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -69,12 +84,23 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 #
                 'home.context_processors.company_name',
+                'home.context_processors.fragment_cache',
                 'users.context_processors.auth_context',
             ],
         },
     },
 ]
 
+if TEMPLATE_LOADER_PROFILE == 'production':
+    # Явный список загрузчиков несовместим с APP_DIRS
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'WWS1.wsgi.application'
 
 # Database
@@ -103,6 +129,116 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Бэкенд MongoDB (mongodb/backends.py): 'pymongo' - сервер MongoDB,
+# 'memory' - данные в памяти процесса (runserver, тесты, бенчмарки без
+# сервера; конфигурация подключения тоже не сохраняется на диск)
+MONGO_BACKEND = os.environ.get('WWS_MONGO_BACKEND', 'pymongo').lower()
+
+# Async API компании (company/views/api_async.py): включать при запуске под
+# ASGI-сервером (uvicorn WWS1.asgi:application), под WSGI выигрыша нет
+COMPANY_ASYNC_API = os.environ.get('COMPANY_ASYNC_API', 'False').lower() == 'true'
+
+# Шина инвалидации кешей между воркерами (mongodb/cache_bus.py): интервал
+# опроса коллекции {db}_cache_versions, если change streams недоступны
+CACHE_BUS_POLL_INTERVAL = float(os.environ.get('CACHE_BUS_POLL_INTERVAL', 2.0))
+CACHE_BUS_CHANGE_STREAMS = os.environ.get('CACHE_BUS_CHANGE_STREAMS', 'True').lower() == 'true'
+
+# Снимок справочников для mmap (mongodb/reference_snapshot.py)
+REFERENCE_SNAPSHOT_DIR = Path(os.environ.get('REFERENCE_SNAPSHOT_DIR', BASE_DIR / 'var' / 'reference'))
+REFERENCE_SNAPSHOT_ENABLED = os.environ.get('REFERENCE_SNAPSHOT_ENABLED', 'True').lower() == 'true'
+
+# Прогрев воркера в MongodbConfig.ready() (runserver/uvicorn).
+# Под gunicorn прогрев выполняет post_worker_init - оставьте False
+WARMUP_ON_STARTUP = os.environ.get('WARMUP_ON_STARTUP', 'False').lower() == 'true'
+
+# Отложенная запись last_login/last_activity (users/login_telemetry.py):
+# воркер копит обновления и пишет их одним bulk_write раз в
+# LOGIN_TELEMETRY_FLUSH_MS или по LOGIN_TELEMETRY_FLUSH_ITEMS пользователей.
+# False - каждое обновление сразу (блокировка входа пишется синхронно всегда)
+LOGIN_TELEMETRY_BUFFER = os.environ.get('LOGIN_TELEMETRY_BUFFER', 'True').lower() == 'true'
+LOGIN_TELEMETRY_FLUSH_MS = int(os.environ.get('LOGIN_TELEMETRY_FLUSH_MS', 500))
+LOGIN_TELEMETRY_FLUSH_ITEMS = int(os.environ.get('LOGIN_TELEMETRY_FLUSH_ITEMS', 100))
+LOGIN_TELEMETRY_MAX_PENDING = int(os.environ.get('LOGIN_TELEMETRY_MAX_PENDING', 10000))
+
+# Массовый импорт пользователей (users/user_import.py): процессов для
+# хеширования паролей; 0 - хешировать в текущем процессе
+USER_IMPORT_WORKERS = int(os.environ.get('USER_IMPORT_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Журнал событий (mongodb/audit.py): входы и изменения пользователей/компании.
+# События хранятся AUDIT_EVENT_RETENTION_DAYS (TTL), часовые и дневные
+# счетчики для статистики - AUDIT_HOURLY/DAILY_RETENTION_DAYS
+AUDIT_ENABLED = os.environ.get('AUDIT_ENABLED', 'True').lower() == 'true'
+AUDIT_EVENT_RETENTION_DAYS = int(os.environ.get('AUDIT_EVENT_RETENTION_DAYS', 90))
+AUDIT_HOURLY_RETENTION_DAYS = int(os.environ.get('AUDIT_HOURLY_RETENTION_DAYS', 14))
+AUDIT_DAILY_RETENTION_DAYS = int(os.environ.get('AUDIT_DAILY_RETENTION_DAYS', 400))
+
+# Метрики Prometheus (monitoring/): /metrics доступен с METRICS_ALLOWED_IPS
+# или с заголовком Authorization: Bearer <METRICS_TOKEN>.
+# METRICS_DIR - общий каталог воркеров gunicorn (задается в gunicorn.conf.py);
+# пусто - метрики только текущего процесса
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1.0))
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Выборочный профилировщик запросов (monitoring/profiler.py): сохраняет
+# профили PROFILER_SAMPLE_RATE доли запросов и всех запросов дольше
+# PROFILER_SLOW_MS. Формат: speedscope или collapsed (flamegraph)
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'False').lower() == 'true'
+PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0.0))
+PROFILER_SLOW_MS = int(os.environ.get('PROFILER_SLOW_MS', 1000))
+PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', 5))
+# Например: home,company:company_info
+PROFILER_VIEWS = [view for view in os.environ.get('PROFILER_VIEWS', '').split(',') if view]
+PROFILER_FORMAT = os.environ.get('PROFILER_FORMAT', 'speedscope')
+PROFILER_DIR = Path(os.environ.get('PROFILER_DIR', BASE_DIR / 'var' / 'profiles'))
+PROFILER_MAX_FILES = int(os.environ.get('PROFILER_MAX_FILES', 200))
+
+# Диагностика памяти воркера (monitoring/memory.py, /monitoring/memory/)
+MEMORY_SNAPSHOT_DIR = Path(os.environ.get('MEMORY_SNAPSHOT_DIR', BASE_DIR / 'var' / 'memory'))
+MEMORY_TRACE_FRAMES = int(os.environ.get('MEMORY_TRACE_FRAMES', 10))
+MEMORY_MAX_SNAPSHOTS = int(os.environ.get('MEMORY_MAX_SNAPSHOTS', 20))
+
+# Нагрузочные тесты и бенчмарки (benchmarks/): baseline-файлы и отчеты
+BENCHMARK_DIR = Path(os.environ.get('BENCHMARK_DIR', BASE_DIR / 'var' / 'benchmarks'))
+
+# HTTP-кеширование (utils/http_cache.py): ETag строится из версий cache_bus
+# и HTTP_CACHE_BUILD_ID - после деплоя браузеры не получат 304 на страницы
+# старой версии. По умолчанию - время запуска (с preload_app одно на все
+# воркеры); для нескольких серверов задайте одинаковое значение (коммит).
+# REFERENCE_HTTP_MAX_AGE - сколько секунд браузер и прокси используют
+# ответы справочников PLZ без повторной проверки
+HTTP_CACHE_BUILD_ID = os.environ.get('HTTP_CACHE_BUILD_ID') or str(int(time.time()))
+REFERENCE_HTTP_MAX_AGE = int(os.environ.get('REFERENCE_HTTP_MAX_AGE', 3600))
+
+# Кеш фрагментов шаблонов (utils/fragment_cache.py): ключи включают версии
+# cache_bus, поэтому устаревшие фрагменты не отдаются и без таймаута;
+# TEMPLATE_FRAGMENT_TIMEOUT лишь ограничивает жизнь старых версий.
+# По умолчанию - память процесса; REDIS_URL - общий кеш всех воркеров
+TEMPLATE_FRAGMENT_TIMEOUT = int(os.environ.get('TEMPLATE_FRAGMENT_TIMEOUT', 3600))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'wws-default',
+    },
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'wws-template-fragments',
+        'TIMEOUT': TEMPLATE_FRAGMENT_TIMEOUT,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['template_fragments'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+        'TIMEOUT': TEMPLATE_FRAGMENT_TIMEOUT,
+        'KEY_PREFIX': 'wws',
+    }
+
 # Internationalization
 LANGUAGE_CODE = 'de-de'
 TIME_ZONE = 'Europe/Berlin'
@@ -120,6 +256,26 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'  # Для продакшена
 
+# Сборка статики (home/assets.py): python manage.py build_assets склеивает
+# бандлы страниц в ASSET_BUILD_DIR, собирает STATIC_ROOT с хешами в именах
+# и пишет .gz/.br. ASSET_PIPELINE включает хешированное хранилище и раздачу
+# /static/ из STATIC_ROOT с immutable-кешем; пока сборки не было, шаблоны
+# подключают исходные файлы. По умолчанию включен, если DEBUG выключен
+ASSET_PIPELINE = os.environ.get('ASSET_PIPELINE', str(not DEBUG)).lower() == 'true'
+ASSET_BUILD_DIR = Path(os.environ.get('ASSET_BUILD_DIR', BASE_DIR / 'var' / 'assets'))
+
+STATICFILES_FINDERS = [
+    'django.contrib.staticfiles.finders.FileSystemFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+    'home.assets.BundleFinder',
+]
+
+if ASSET_PIPELINE:
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'home.assets.HashedStaticFilesStorage'},
+    }
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -152,6 +308,8 @@ if not DEBUG:
 
     # Redirect HTTP to HTTPS
     SECURE_SSL_REDIRECT = True
+    # Проверки балансировщика и сбор метрик идут по HTTP напрямую на воркер
+    SECURE_REDIRECT_EXEMPT = [r'^healthz$', r'^readyz$', r'^metrics$']
 
 DEBUG = True
 ALLOWED_HOSTS = ['*']
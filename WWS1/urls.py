@@ -1,16 +1,27 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from home.views import static_asset
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('home.urls')),
     path('mongodb/', include('mongodb.urls')),
     path('users/', include('users.urls')),
     path('company/', include('company.urls')),
+    path('', include('monitoring.urls')),
 ]
 
+if settings.ASSET_PIPELINE:
+    # Собранная статика: хешированные имена с immutable-кешем, .br/.gz (home/assets.py)
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), static_asset, name='static_asset'),
+    ]
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
\ No newline at end of file
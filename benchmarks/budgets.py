@@ -0,0 +1,171 @@
+# benchmarks/budgets.py - Бюджеты ключевых представлений
+#
+# Каждая цель - вызов представления (или context processor) в текущем
+# процессе через RequestFactory, без middleware и сети. Во время вызова
+# CaptureMongoCommands (monitoring/command_capture.py) записывает команды
+# MongoDB этого потока, поэтому фоновые потоки (опрос cache_bus) не влияют
+# на результат. Измеряется:
+#   - commands: число команд MongoDB (максимум по прогонам);
+#   - bytes: объем ответов MongoDB в BSON (максимум по прогонам);
+#   - ms: время вызова (медиана прогонов).
+# Измеряется "теплый" запрос: перед прогонами цель вызывается один раз,
+# чтобы заполнить кеши процесса (cache_bus, конфигурация).
+#
+# Бюджеты хранятся в view_budget.json в корне проекта и проверяются
+# командой manage.py check_view_budgets (--update пересчитывает их).
+
+import json
+import statistics
+import time
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.test import RequestFactory
+
+from monitoring.command_capture import CaptureMongoCommands
+
+from .datagen import BENCH_PASSWORD, bench_username
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BUDGET_FILE = BASE_DIR / 'view_budget.json'
+
+# Запас при --update: число команд - без запаса (лишний запрос к базе -
+# уже регрессия), байты и время зависят от данных и машины
+DEFAULT_HEADROOM = {'commands': 1.0, 'bytes': 1.25, 'ms': 2.0}
+
+# Минимальный запас времени: у быстрых целей (единицы мс) двукратный запас
+# меньше случайных пауз (GC, планировщик)
+MIN_MS_SLACK = 10
+
+METRICS = ('commands', 'bytes', 'ms')
+
+# Администратор из generate_users (первый 1% пользователей - администраторы)
+BUDGET_USER = bench_username(1)
+
+_AJAX = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+def _prepare(request, username=None):
+    """Сессия и сообщения, как после SessionMiddleware и MessageMiddleware"""
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+    if username:
+        request.session['user_authenticated'] = True
+        request.session['username'] = username
+    request._messages = FallbackStorage(request)
+    return request
+
+
+# ==================== ЦЕЛИ ====================
+
+def _home_anonymous(factory):
+    from home.views import home
+
+    return home(_prepare(factory.get('/', secure=True)))
+
+
+def _home_authenticated(factory):
+    from home.views import home
+
+    return home(_prepare(factory.get('/', secure=True), BUDGET_USER))
+
+
+def _company_info(factory):
+    from company.views.crud import company_info
+
+    return company_info(_prepare(factory.get('/company/info/', secure=True), BUDGET_USER))
+
+
+def _login_view(factory):
+    from users.views import login_view
+
+    request = factory.post('/users/login/', {'username': BUDGET_USER, 'password': BENCH_PASSWORD},
+                           secure=True, **_AJAX)
+    return login_view(_prepare(request))
+
+
+def _auth_context(factory):
+    from users.context_processors import auth_context
+
+    return auth_context(_prepare(factory.get('/', secure=True), BUDGET_USER))
+
+
+# Имя -> (функция, описание)
+TARGETS = {
+    'home_anonymous': (_home_anonymous, "home: главная без входа"),
+    'home_authenticated': (_home_authenticated, "home: главная администратора"),
+    'company_info': (_company_info, "company_info: страница компании"),
+    'login_view': (_login_view, "login_view: AJAX-вход"),
+    'auth_context': (_auth_context, "auth_context: context processor администратора"),
+}
+
+
+# ==================== ИЗМЕРЕНИЕ ====================
+
+def _status(result):
+    return getattr(result, 'status_code', None)
+
+
+def measure(name, runs=5):
+    """
+    {'commands', 'bytes', 'ms', 'status', 'by_command'} цели name.
+    status - код ответа представления (None для context processor).
+    """
+    target = TARGETS[name][0]
+    factory = RequestFactory()
+
+    target(factory)
+
+    samples = []
+    for _ in range(max(1, runs)):
+        with CaptureMongoCommands() as captured:
+            started = time.perf_counter()
+            result = target(factory)
+            elapsed = time.perf_counter() - started
+        samples.append((captured.count, captured.bytes, elapsed * 1000, _status(result), captured.by_command()))
+
+    heaviest = max(samples, key=lambda sample: sample[0])
+    return {
+        'commands': heaviest[0],
+        'bytes': max(sample[1] for sample in samples),
+        'ms': round(statistics.median(sample[2] for sample in samples), 2),
+        'status': samples[-1][3],
+        'by_command': heaviest[4],
+    }
+
+
+def check(measured, budget):
+    """[(метрика, измерено, бюджет)] превышенных бюджетов цели"""
+    exceeded = []
+    for metric in METRICS:
+        limit = budget.get(f"max_{metric}")
+        if limit is not None and measured[metric] > limit:
+            exceeded.append((metric, measured[metric], limit))
+    return exceeded
+
+
+# ==================== ФАЙЛ БЮДЖЕТОВ ====================
+
+def load_budget():
+    if not BUDGET_FILE.exists():
+        return {}
+    with open(BUDGET_FILE, encoding='utf-8') as f:
+        return json.load(f).get('views', {})
+
+
+def save_budget(measured, headroom=None):
+    """Записывает бюджеты: измеренное значение * запас (см. DEFAULT_HEADROOM)"""
+    headroom = {**DEFAULT_HEADROOM, **(headroom or {})}
+    views = {}
+    for name, result in measured.items():
+        views[name] = {
+            'max_commands': int(result['commands'] * headroom['commands']),
+            'max_bytes': int(result['bytes'] * headroom['bytes']),
+            'max_ms': round(max(result['ms'] * headroom['ms'], result['ms'] + MIN_MS_SLACK)),
+            'measured': {metric: result[metric] for metric in METRICS},
+        }
+
+    with open(BUDGET_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'headroom': headroom, 'views': views}, f, indent=2)
+        f.write('\n')
@@ -0,0 +1,117 @@
+# benchmarks/client.py - HTTP-клиенты сценариев нагрузочного теста
+#
+# HttpClient обращается к запущенному серверу (runserver, gunicorn) по сети,
+# InProcessClient вызывает WSGI-обработчик Django в текущем процессе
+# (django.test.Client) - так можно гонять сценарии на бэкенде 'memory'
+# без сервера. Интерфейс у обоих одинаковый: get()/post() возвращают
+# Response и записывают (метка, статус, секунды) в client.records.
+#
+# Редиректы не выполняются: сценарий сам решает, куда идти дальше, а
+# в статистику попадает время каждого отдельного запроса.
+
+import http.cookiejar
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+class Response:
+
+    def __init__(self, status, body, headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+    @property
+    def ok(self):
+        return self.status < 500
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class _BaseClient:
+
+    def __init__(self):
+        self.records = []
+
+    def get(self, path, label=None, headers=None):
+        return self._timed('GET', path, None, label, headers)
+
+    def post(self, path, data=None, label=None, headers=None):
+        return self._timed('POST', path, data or {}, label, headers)
+
+    def _timed(self, method, path, data, label, headers):
+        started = time.perf_counter()
+        try:
+            response = self._request(method, path, data, headers or {})
+        except OSError:
+            # Сервер не ответил (соединение, таймаут) - считаем ошибкой
+            response = Response(599, b'')
+        self.records.append((label or path.split('?')[0], response.status, time.perf_counter() - started))
+        return response
+
+    def _request(self, method, path, data, headers):
+        raise NotImplementedError
+
+
+class HttpClient(_BaseClient):
+    """Клиент реального сервера; cookie (сессия, csrftoken) - свои у каждого клиента"""
+
+    def __init__(self, base_url, timeout=30):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self._opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def _csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def _request(self, method, path, data, headers):
+        body = None
+        headers = dict(headers)
+        if data is not None:
+            body = urllib.parse.urlencode(data).encode()
+            headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+            headers['X-CSRFToken'] = self._csrf_token()
+            # Для HTTPS Django проверяет Referer при проверке CSRF
+            headers.setdefault('Referer', self.base_url + '/')
+
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with self._opener.open(request, timeout=self.timeout) as response:
+                return Response(response.status, response.read(), dict(response.headers))
+        except urllib.error.HTTPError as e:
+            # 3xx (редиректы отключены), 4xx, 5xx
+            return Response(e.code, e.read(), dict(e.headers or {}))
+
+
+class InProcessClient(_BaseClient):
+    """Запросы к Django в текущем процессе (без сети и без CSRF-проверки)"""
+
+    def __init__(self):
+        super().__init__()
+        from django.test import Client
+
+        self._client = Client()
+
+    def _request(self, method, path, data, headers):
+        extra = {f"HTTP_{name.upper().replace('-', '_')}": value for name, value in headers.items()}
+        # secure=True: при DEBUG=False SecurityMiddleware перенаправляет на HTTPS
+        if method == 'POST':
+            response = self._client.post(path, data, secure=True, **extra)
+        else:
+            response = self._client.get(path, secure=True, **extra)
+        return Response(response.status_code, b''.join(response) if response.streaming else response.content,
+                        dict(response.items()))
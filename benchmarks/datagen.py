@@ -0,0 +1,312 @@
+# benchmarks/datagen.py - Синтетические данные арендатора для нагрузочных тестов
+#
+# Генерирует то, что в реальной установке растет со временем:
+#   - пользователи (bench_user_00001...): тысячи записей в {db}_users;
+#   - справочник PLZ полного размера (~8 200 почтовых индексов Германии)
+#     в {db}_basic_address с районами и землями;
+#   - компания с большим числом дополнительных контактов и банковских счетов.
+#
+# Данные детерминированы (seed), поэтому прогоны сравнимы между собой.
+# У всех сгенерированных пользователей один пароль (BENCH_PASSWORD): хеш
+# PBKDF2 считается один раз, а не тысячи раз при генерации.
+
+import datetime
+import random
+
+from loguru import logger
+
+from mongodb import cache_bus
+from mongodb.mongodb_config import hash_password
+from mongodb.query_registry import ensure_indexes
+from users.user_search import build_search_fields
+
+BENCH_PASSWORD = 'Bench-Passwort-2024!'
+BENCH_USER_PREFIX = 'bench_user_'
+
+BATCH_SIZE = 1000
+
+# Земля -> (диапазоны первых двух цифр PLZ, крупные города)
+_LANDS = (
+    ('Sachsen', (1, 2, 4, 8, 9), ('Dresden', 'Leipzig', 'Chemnitz', 'Zwickau', 'Plauen', 'Görlitz')),
+    ('Brandenburg', (3, 14, 15, 16), ('Potsdam', 'Cottbus', 'Brandenburg an der Havel', 'Frankfurt (Oder)')),
+    ('Sachsen-Anhalt', (6, 38, 39), ('Halle (Saale)', 'Magdeburg', 'Dessau-Roßlau', 'Wittenberg')),
+    ('Thüringen', (7, 36, 37, 98, 99), ('Erfurt', 'Jena', 'Gera', 'Weimar', 'Gotha', 'Suhl')),
+    ('Berlin', (10, 12, 13), ('Berlin',)),
+    ('Mecklenburg-Vorpommern', (17, 18, 19, 23), ('Rostock', 'Schwerin', 'Neubrandenburg', 'Stralsund', 'Greifswald')),
+    ('Hamburg', (20, 21, 22), ('Hamburg',)),
+    ('Schleswig-Holstein', (24, 25), ('Kiel', 'Lübeck', 'Flensburg', 'Neumünster', 'Husum')),
+    ('Niedersachsen', (26, 27, 29, 30, 31, 48, 49), ('Hannover', 'Braunschweig', 'Oldenburg', 'Osnabrück', 'Göttingen', 'Wolfsburg')),
+    ('Bremen', (28,), ('Bremen', 'Bremerhaven')),
+    ('Nordrhein-Westfalen', (32, 33, 40, 41, 42, 44, 45, 46, 47, 50, 51, 52, 53, 57, 58, 59),
+     ('Köln', 'Düsseldorf', 'Dortmund', 'Essen', 'Duisburg', 'Bochum', 'Wuppertal', 'Bielefeld', 'Bonn', 'Münster')),
+    ('Hessen', (34, 35, 60, 61, 63, 64, 65), ('Frankfurt am Main', 'Wiesbaden', 'Kassel', 'Darmstadt', 'Offenbach am Main', 'Gießen')),
+    ('Rheinland-Pfalz', (54, 55, 56, 66, 67), ('Mainz', 'Ludwigshafen am Rhein', 'Koblenz', 'Trier', 'Kaiserslautern')),
+    ('Saarland', (66,), ('Saarbrücken', 'Neunkirchen', 'Homburg')),
+    ('Baden-Württemberg', (68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78, 79, 88, 89, 97),
+     ('Stuttgart', 'Mannheim', 'Karlsruhe', 'Freiburg im Breisgau', 'Heidelberg', 'Ulm', 'Heilbronn', 'Pforzheim')),
+    ('Bayern', (80, 81, 82, 83, 84, 85, 86, 87, 90, 91, 92, 93, 94, 95, 96, 97),
+     ('München', 'Nürnberg', 'Augsburg', 'Regensburg', 'Ingolstadt', 'Würzburg', 'Fürth', 'Erlangen', 'Bamberg', 'Passau')),
+)
+
+_TOWN_PREFIXES = (
+    'Alt', 'Neu', 'Ober', 'Nieder', 'Groß', 'Klein', 'Bad ', 'Hohen', 'Wald', 'Berg', 'Stein', 'Rosen',
+    'Linden', 'Eichen', 'Birken', 'Sonnen', 'Mühl', 'Kirch', 'Hoch', 'Tal',
+)
+_TOWN_SUFFIXES = (
+    'dorf', 'hausen', 'heim', 'feld', 'stadt', 'burg', 'berg', 'bach', 'au', 'ingen', 'hofen', 'brück',
+    'rode', 'kirchen', 'walde', 'furt', 'stedt', 'hagen', 'wiesen', 'beck',
+)
+
+_FIRST_NAMES = (
+    'Anna', 'Ben', 'Clara', 'David', 'Emma', 'Felix', 'Greta', 'Hannah', 'Jonas', 'Klara', 'Leon', 'Lena',
+    'Marie', 'Max', 'Mia', 'Noah', 'Paul', 'Sophie', 'Tim', 'Lukas', 'Julia', 'Finn', 'Laura', 'Elias',
+)
+_LAST_NAMES = (
+    'Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker', 'Schulz', 'Hoffmann',
+    'Schäfer', 'Koch', 'Bauer', 'Richter', 'Klein', 'Wolf', 'Schröder', 'Neumann', 'Schwarz', 'Zimmermann',
+)
+_BANKS = (
+    ('Sparkasse', 'SPKDE'), ('Volksbank', 'GENODE'), ('Deutsche Bank', 'DEUTDE'), ('Commerzbank', 'COBADE'),
+    ('Postbank', 'PBNKDE'), ('DKB', 'BYLADE'), ('ING', 'INGDDE'), ('HypoVereinsbank', 'HYVEDE'),
+)
+_CONTACT_TYPES = ('email', 'phone', 'mobile', 'fax', 'website')
+
+
+def _now():
+    return datetime.datetime.now()
+
+
+def _iban(rng):
+    """Немецкий IBAN с корректной контрольной суммой (mod 97)"""
+    bban = f"{rng.randint(10000000, 99999999)}{rng.randint(0, 9999999999):010d}"
+    # DE = 13 14, контрольные цифры при расчете - 00
+    check = 98 - int(f"{bban}131400") % 97
+    return f"DE{check:02d}{bban}"
+
+
+def _batched_insert(collection, documents):
+    inserted = 0
+    for start in range(0, len(documents), BATCH_SIZE):
+        result = collection.insert_many(documents[start:start + BATCH_SIZE], ordered=False)
+        inserted += len(result.inserted_ids)
+    return inserted
+
+
+# ==================== PLZ ====================
+
+def generate_plz_rows(count=8200, seed=42):
+    """
+    Строки справочника PLZ: уникальные 5-значные коды, распределенные по
+    землям (по первым двум цифрам), крупные города занимают много кодов.
+    """
+    rng = random.Random(seed)
+    rows = []
+    used = set()
+
+    by_prefix = {}
+    for land, prefixes, cities in _LANDS:
+        for prefix in prefixes:
+            by_prefix.setdefault(prefix, []).append((land, cities))
+
+    prefixes = sorted(by_prefix)
+    attempts = 0
+    while len(rows) < count and attempts < count * 20:
+        attempts += 1
+        prefix = rng.choice(prefixes)
+        code = f"{prefix:02d}{rng.randint(0, 999):03d}"
+        if code in used:
+            continue
+        used.add(code)
+
+        land, cities = rng.choice(by_prefix[prefix])
+        # Примерно треть кодов - крупные города (много PLZ на один город)
+        if rng.random() < 0.35:
+            city = rng.choice(cities)
+            district = city if len(cities) > 1 else f"{city}-{rng.choice(_TOWN_PREFIXES).strip()}{rng.choice(_TOWN_SUFFIXES)}"
+        else:
+            city = f"{rng.choice(_TOWN_PREFIXES)}{rng.choice(_TOWN_SUFFIXES)}"
+            district = f"Landkreis {rng.choice(cities)}"
+
+        rows.append({
+            'plz_code': code,
+            'plz_name': city,
+            'plz_name_long': f"{code} {city}",
+            'krs_name': district,
+            'lan_name': land,
+        })
+
+    rows.sort(key=lambda row: row['plz_code'])
+    return rows
+
+
+def generate_plz(db, db_name, count=8200, seed=42):
+    """Заменяет {db}_basic_address синтетическим справочником PLZ; возвращает строки"""
+    collection_name = f"{db_name}_basic_address"
+    now = _now()
+    rows = generate_plz_rows(count, seed)
+    for row in rows:
+        row.update({'created_at': now, 'modified_at': now, 'deleted': False})
+
+    db.drop_collection(collection_name)
+    db.create_collection(collection_name)
+    inserted = _batched_insert(db[collection_name], rows)
+    ensure_indexes(db, db_name, 'basic_address')
+
+    logger.info(f"📮 {collection_name}: {inserted} PLZ")
+    return rows
+
+
+# ==================== ПОЛЬЗОВАТЕЛИ ====================
+
+def bench_username(number):
+    return f"{BENCH_USER_PREFIX}{number:05d}"
+
+
+# Каждый 50-й пользователь удален, каждый 20-й - неактивен: сценарии входа
+# (benchmarks/scenarios.py) выбирают остальных, не обращаясь к базе
+def is_deleted(number):
+    return number % 50 == 0
+
+
+def is_active(number):
+    return number % 20 != 0
+
+
+def can_login(number):
+    return is_active(number) and not is_deleted(number)
+
+
+def generate_users(db, db_name, count=2000, seed=42, password=BENCH_PASSWORD):
+    """Заменяет сгенерированных пользователей (bench_user_*) в {db}_users"""
+    rng = random.Random(seed)
+    collection = db[f"{db_name}_users"]
+    now = _now()
+    password_hash = hash_password(password)
+
+    collection.delete_many({'username': {'$regex': f"^{BENCH_USER_PREFIX}"}})
+
+    users = []
+    for number in range(1, count + 1):
+        first_name = rng.choice(_FIRST_NAMES)
+        last_name = rng.choice(_LAST_NAMES)
+        username = bench_username(number)
+        created_at = now - datetime.timedelta(days=rng.randint(0, 1500), minutes=rng.randint(0, 1440))
+        users.append({
+            'username': username,
+            'password': password_hash,
+            'is_admin': number <= max(1, count // 100),
+            'is_active': is_active(number),
+            'profile': {
+                'salutation': rng.choice(('Herr', 'Frau')),
+                'title': None,
+                'first_name': first_name,
+                'last_name': last_name,
+                'email': f"{username}@bench.example",
+                'phone': f"+49 {rng.randint(30, 999)} {rng.randint(100000, 9999999)}",
+                'contacts': [],
+            },
+            'created_at': created_at,
+            'modified_at': created_at,
+            'deleted': is_deleted(number),
+            'last_login': None,
+            'failed_login_attempts': 0,
+            'locked_until': None,
+            'password_changed_at': created_at,
+        })
+        users[-1]['search'] = build_search_fields(users[-1])
+
+    inserted = _batched_insert(collection, users)
+    cache_bus.bump(cache_bus.USERS)
+    logger.info(f"👥 {db_name}_users: {inserted} пользователей бенчмарка")
+    return inserted
+
+
+# ==================== КОМПАНИЯ ====================
+
+def build_company_document(contacts=50, bank_accounts=10, seed=42, plz_rows=None):
+    """Документ крупной компании (type='company_info') без записи в базу"""
+    rng = random.Random(seed)
+    now = _now()
+    address = rng.choice(plz_rows) if plz_rows else {'plz_code': '10115', 'plz_name': 'Berlin'}
+
+    additional_contacts = []
+    for number in range(contacts):
+        contact_type = _CONTACT_TYPES[number % len(_CONTACT_TYPES)]
+        if contact_type == 'email':
+            value = f"abteilung{number}@bench-gmbh.example"
+        elif contact_type == 'website':
+            value = f"https://bench-gmbh.example/standort-{number}"
+        else:
+            value = f"+49 {rng.randint(30, 999)} {rng.randint(100000, 9999999)}"
+        additional_contacts.append({
+            'type': contact_type,
+            'value': value,
+            'note': f"Abteilung {number}",
+            'is_primary': number == 0,
+        })
+
+    banking_accounts = []
+    for number in range(bank_accounts):
+        bank_name, bic_prefix = rng.choice(_BANKS)
+        banking_accounts.append({
+            'bank_name': bank_name,
+            'iban': _iban(rng),
+            'bic': f"{bic_prefix}{rng.choice('MFBX')}{rng.choice('1234')}XXX",
+            'account_holder': 'Bench GmbH',
+            'bank_address': f"{address['plz_code']} {address['plz_name']}",
+            'account_type': 'business',
+            'is_primary': number == 0,
+            'notes': f"Konto {number + 1}",
+        })
+
+    company = {
+        'type': 'company_info',
+        'company_name': 'Bench GmbH',
+        'legal_form': 'gmbh',
+        'ceo_salutation': 'Herr',
+        'ceo_title': None,
+        'ceo_first_name': rng.choice(_FIRST_NAMES),
+        'ceo_last_name': rng.choice(_LAST_NAMES),
+        'commercial_register': 'HRB 123456',
+        'tax_number': '12/345/67890',
+        'vat_id': 'DE123456789',
+        'tax_id': '12345678901',
+        'street': 'Hauptstraße 1',
+        'postal_code': address['plz_code'],
+        'city': address['plz_name'],
+        'country': 'Deutschland',
+        'address_addition': None,
+        'po_box': None,
+        'email': 'info@bench-gmbh.example',
+        'phone': '+49 30 1234567',
+        'fax': None,
+        'website': 'https://bench-gmbh.example',
+        'additional_contacts': additional_contacts,
+        'banking_accounts': banking_accounts,
+        'is_primary': True,
+        'created_at': now,
+        'modified_at': now,
+    }
+    return company
+
+
+def generate_company(db, db_name, contacts=50, bank_accounts=10, seed=42, plz_rows=None):
+    """Заменяет документ компании (type='company_info') крупной компанией"""
+    company = build_company_document(contacts, bank_accounts, seed, plz_rows)
+
+    db[f"{db_name}_company_info"].replace_one({'type': 'company_info'}, company, upsert=True)
+    cache_bus.bump(cache_bus.COMPANY)
+    logger.info(f"🏢 Компания: {contacts} контактов, {bank_accounts} банковских счетов")
+    return company
+
+
+# ==================== АРЕНДАТОР ====================
+
+def generate_tenant(db, db_name, users=2000, plz=8200, contacts=50, bank_accounts=10, seed=42):
+    """Все синтетические данные арендатора; возвращает количество записей"""
+    plz_rows = generate_plz(db, db_name, plz, seed) if plz else []
+    user_count = generate_users(db, db_name, users, seed) if users else 0
+    generate_company(db, db_name, contacts, bank_accounts, seed, plz_rows)
+    cache_bus.bump(cache_bus.REFERENCE)
+
+    return {'users': user_count, 'plz': len(plz_rows), 'contacts': contacts, 'bank_accounts': bank_accounts}
@@ -0,0 +1,107 @@
+# benchmarks/management/commands/check_view_budgets.py - Бюджеты представлений
+
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from loguru import logger
+
+from benchmarks.budgets import BUDGET_FILE, DEFAULT_HEADROOM, TARGETS, check, load_budget, measure, save_budget
+from benchmarks.datagen import generate_tenant
+from mongodb.backends import is_memory_backend
+
+MEMORY_DB_NAME = 'wws_budgets'
+
+
+class Command(BaseCommand):
+    help = (
+        "Вызывает ключевые представления через RequestFactory, считает команды "
+        "MongoDB, байты ответов MongoDB и время и сравнивает с бюджетами из "
+        "view_budget.json. Завершается с ошибкой при превышении. "
+        "Пример без сервера MongoDB: WWS_MONGO_BACKEND=memory python manage.py check_view_budgets"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help=f"Цели (по умолчанию все: {', '.join(TARGETS)})")
+        parser.add_argument('--runs', type=int, default=5, help='Прогонов на цель (после прогрева)')
+        parser.add_argument('--users', type=int, default=2000, help='Пользователи bench_user_* (как в generate_tenant)')
+        parser.add_argument('--plz', type=int, default=8200, help='Количество PLZ (как в generate_tenant)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--generate', action='store_true',
+                            help='Сгенерировать данные перед проверкой (для memory - всегда)')
+        parser.add_argument('--log-level', default='ERROR', help='Уровень логов приложения')
+        parser.add_argument('--update', action='store_true', help='Записать новые бюджеты по результатам измерения')
+
+    def handle(self, *args, **options):
+        names = options['targets'] or list(TARGETS)
+        unknown = [name for name in names if name not in TARGETS]
+        if unknown:
+            raise CommandError(f"Неизвестные цели: {', '.join(unknown)}")
+
+        if not getattr(settings, 'METRICS_ENABLED', True) and not is_memory_backend():
+            # Команды pymongo видны только через CommandMetricsListener
+            raise CommandError("Команды MongoDB не учитываются: METRICS_ENABLED=False")
+
+        self._prepare(options)
+
+        budget = load_budget()
+        measured = {}
+        exceeded = []
+
+        for name in names:
+            result = measure(name, runs=options['runs'])
+            measured[name] = result
+            view_budget = budget.get(name)
+
+            if view_budget is None:
+                status = self.style.WARNING("нет бюджета")
+            else:
+                over = check(result, view_budget)
+                if over:
+                    details = ', '.join(f"{metric} {value} > {limit}" for metric, value, limit in over)
+                    status = self.style.ERROR(f"ПРЕВЫШЕН ({details})")
+                    exceeded.append(name)
+                else:
+                    status = self.style.SUCCESS("ok")
+
+            code = '-' if result['status'] is None else result['status']
+            self.stdout.write(
+                f"{name:<20} {code:>4}  {result['commands']:>3} команд  {result['bytes']:>9} байт  "
+                f"{result['ms']:>8} мс  {status}"
+            )
+            if result['by_command']:
+                commands = ', '.join(f"{command}={count}" for command, count in result['by_command'].items())
+                self.stdout.write(f"    {commands}")
+
+        if options['update']:
+            merged = {
+                name: data['measured'] for name, data in budget.items()
+                if 'measured' in data and name not in measured
+            }
+            merged.update(measured)
+            save_budget(merged, DEFAULT_HEADROOM)
+            self.stdout.write(self.style.SUCCESS(f"✅ Бюджеты записаны в {BUDGET_FILE}"))
+            return
+
+        if exceeded:
+            raise CommandError(f"Бюджет представлений превышен: {', '.join(exceeded)}")
+
+    def _prepare(self, options):
+        # Логи каждого вызова искажают время
+        logger.remove()
+        logger.add(sys.stderr, level=options['log_level'].upper())
+
+        from mongodb.mongodb_config import MongoConfig
+        from mongodb.mongodb_utils import MongoConnection
+
+        if is_memory_backend():
+            from mongodb import memory_backend
+            memory_backend.bootstrap(MEMORY_DB_NAME)
+            options['generate'] = True
+
+        if options['generate']:
+            db = MongoConnection.get_database()
+            db_name = MongoConfig.read_config().get('db_name')
+            if db is None or not db_name:
+                raise CommandError("MongoDB не настроена или недоступна")
+            generate_tenant(db, db_name, users=options['users'], plz=options['plz'], seed=options['seed'])
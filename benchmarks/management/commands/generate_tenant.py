@@ -0,0 +1,47 @@
+# benchmarks/management/commands/generate_tenant.py - Синтетические данные для нагрузочных тестов
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.datagen import BENCH_PASSWORD, generate_tenant
+from mongodb.backends import is_memory_backend
+from mongodb.mongodb_config import MongoConfig
+from mongodb.mongodb_utils import MongoConnection
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет настроенную базу синтетическим арендатором (benchmarks/datagen.py): "
+        "пользователи bench_user_*, справочник PLZ полного размера, компания с "
+        "контактами и банковскими счетами. Справочник PLZ и компания ЗАМЕНЯЮТСЯ."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000, help='Количество пользователей (по умолчанию 2000)')
+        parser.add_argument('--plz', type=int, default=8200, help='Количество PLZ (по умолчанию 8200)')
+        parser.add_argument('--contacts', type=int, default=50, help='Дополнительные контакты компании')
+        parser.add_argument('--bank-accounts', type=int, default=10, help='Банковские счета компании')
+        parser.add_argument('--seed', type=int, default=42, help='Seed генератора (одинаковые данные между прогонами)')
+
+    def handle(self, *args, **options):
+        if is_memory_backend():
+            raise CommandError(
+                "Бэкенд 'memory' хранит данные только в текущем процессе - "
+                "используйте loadtest --in-process --generate"
+            )
+
+        db = MongoConnection.get_database()
+        db_name = MongoConfig.read_config().get('db_name')
+        if db is None or not db_name:
+            raise CommandError("MongoDB не настроена или недоступна")
+
+        counts = generate_tenant(
+            db, db_name,
+            users=options['users'], plz=options['plz'],
+            contacts=options['contacts'], bank_accounts=options['bank_accounts'],
+            seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{db_name}: {counts['users']} пользователей, {counts['plz']} PLZ, "
+            f"компания с {counts['contacts']} контактами и {counts['bank_accounts']} счетами"
+        ))
+        self.stdout.write(f"Пароль пользователей bench_user_*: {BENCH_PASSWORD}")
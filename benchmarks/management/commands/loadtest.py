@@ -0,0 +1,182 @@
+# benchmarks/management/commands/loadtest.py - Нагрузочный тест по сценариям
+
+import json
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from loguru import logger
+
+from benchmarks import runner
+from benchmarks.client import HttpClient, InProcessClient
+from benchmarks.datagen import generate_tenant
+from benchmarks.scenarios import SCENARIOS, ScenarioContext
+from mongodb.backends import is_memory_backend
+
+MEMORY_DB_NAME = 'wws_loadtest'
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет сценарии нагрузки (benchmarks/scenarios.py) против запущенного "
+        "сервера (--url) или в текущем процессе (--in-process) и показывает "
+        "p50/p95/p99, запросы в секунду и команды MongoDB по сценариям. "
+        "Пример без сервера MongoDB: WWS_MONGO_BACKEND=memory python manage.py loadtest --in-process"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адрес запущенного сервера')
+        parser.add_argument('--in-process', action='store_true', help='Запросы через WSGI-обработчик этого процесса')
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                            help='Сценарий (можно несколько раз; по умолчанию - все)')
+        parser.add_argument('--iterations', type=int, default=100, help='Итераций каждого сценария')
+        parser.add_argument('--concurrency', type=int, default=4, help='Параллельных клиентов')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--users', type=int, default=2000, help='Пользователи bench_user_* (как в generate_tenant)')
+        parser.add_argument('--plz', type=int, default=8200, help='Количество PLZ (как в generate_tenant)')
+        parser.add_argument('--generate', action='store_true',
+                            help='Сгенерировать данные перед тестом (только --in-process; для memory - всегда)')
+        parser.add_argument('--metrics-token', default=None, help='Токен /metrics сервера (по умолчанию METRICS_TOKEN)')
+        parser.add_argument('--log-level', default='ERROR', help='Уровень логов приложения в режиме --in-process')
+        parser.add_argument('--save-baseline', action='store_true', help='Сохранить результаты как baseline')
+        parser.add_argument('--compare', action='store_true', help='Сравнить с сохраненным baseline')
+        parser.add_argument('--max-regression', type=float, default=None,
+                            help='Ошибка, если p95 хуже baseline больше чем на N процентов')
+        parser.add_argument('--baseline', default=None, help='Путь к baseline (по умолчанию BENCHMARK_DIR/loadtest_baseline.json)')
+        parser.add_argument('--json', dest='json_path', default=None, help='Записать результаты в JSON-файл')
+
+    def handle(self, *args, **options):
+        names = options['scenario'] or list(SCENARIOS)
+        baseline_path = options['baseline'] or runner.get_baseline_path('loadtest')
+
+        if options['in_process']:
+            client_factory, command_counts = self._prepare_in_process(options)
+        else:
+            if is_memory_backend():
+                raise CommandError("Бэкенд 'memory' не виден другому процессу - используйте --in-process")
+            client_factory, command_counts = self._prepare_http(options)
+
+        context = ScenarioContext(options['users'], options['plz'], options['seed'])
+
+        results = []
+        for name in names:
+            self.stdout.write(f"▶ {name}: {options['iterations']} итераций, {options['concurrency']} клиентов")
+            result = runner.run_scenario(
+                name, client_factory, context,
+                iterations=options['iterations'], concurrency=options['concurrency'],
+                seed=options['seed'], command_counts=command_counts,
+            )
+            results.append(result)
+            self._print_result(result)
+
+        meta = {
+            'mode': 'in-process' if options['in_process'] else options['url'],
+            'backend': 'memory' if is_memory_backend() else 'pymongo',
+            'iterations': options['iterations'],
+            'concurrency': options['concurrency'],
+        }
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as f:
+                json.dump({'meta': meta, 'results': results}, f, indent=2, ensure_ascii=False)
+
+        regressions = []
+        if options['compare'] or options['max_regression'] is not None:
+            regressions = self._compare(results, baseline_path, options['max_regression'])
+
+        if options['save_baseline']:
+            runner.save_baseline(results, baseline_path, meta)
+            self.stdout.write(self.style.SUCCESS(f"Baseline сохранен: {baseline_path}"))
+
+        if regressions:
+            raise CommandError(f"p95 хуже baseline более чем на {options['max_regression']}%: {', '.join(regressions)}")
+
+    # ---------- подготовка ----------
+
+    def _prepare_in_process(self, options):
+        # Логи каждого запроса в консоль искажают время ответа
+        logger.remove()
+        logger.add(sys.stderr, level=options['log_level'].upper())
+
+        from mongodb.mongodb_config import MongoConfig
+        from mongodb.mongodb_utils import MongoConnection
+
+        if is_memory_backend():
+            from mongodb import memory_backend
+            memory_backend.bootstrap(MEMORY_DB_NAME)
+            options['generate'] = True
+
+        if options['generate']:
+            db = MongoConnection.get_database()
+            db_name = MongoConfig.read_config().get('db_name')
+            if db is None or not db_name:
+                raise CommandError("MongoDB не настроена или недоступна")
+            started = time.perf_counter()
+            counts = generate_tenant(db, db_name, users=options['users'], plz=options['plz'], seed=options['seed'])
+            self.stdout.write(
+                f"Данные: {counts['users']} пользователей, {counts['plz']} PLZ "
+                f"({time.perf_counter() - started:.1f} с)"
+            )
+
+        return InProcessClient, runner.local_command_counts
+
+    def _prepare_http(self, options):
+        url = options['url']
+        token = options['metrics_token'] if options['metrics_token'] is not None else getattr(settings, 'METRICS_TOKEN', '')
+
+        if options['generate']:
+            self.stderr.write(self.style.WARNING("--generate без --in-process игнорируется: используйте generate_tenant"))
+
+        try:
+            runner.remote_command_counts(url, token)
+            # Воркеры сбрасывают счетчики в METRICS_DIR раз в METRICS_FLUSH_INTERVAL
+            settle = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0) + 0.5
+
+            def command_counts():
+                time.sleep(settle)
+                return runner.remote_command_counts(url, token)
+        except OSError as e:
+            self.stderr.write(self.style.WARNING(f"/metrics недоступен ({e}) - команды MongoDB не учитываются"))
+            command_counts = None
+
+        return (lambda: HttpClient(url)), command_counts
+
+    # ---------- вывод ----------
+
+    def _print_result(self, result):
+        style = self.style.ERROR if result['errors'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"  {result['requests']} запросов, ошибок {result['errors']}, "
+            f"{result['throughput_rps']} req/s | p50 {result['p50_ms']} мс, "
+            f"p95 {result['p95_ms']} мс, p99 {result['p99_ms']} мс"
+        ))
+        for label, stats in result['labels'].items():
+            self.stdout.write(
+                f"    {label:<22} {stats['requests']:>6}  p50 {stats['p50_ms']:>8}  "
+                f"p95 {stats['p95_ms']:>8}  p99 {stats['p99_ms']:>8}"
+            )
+        if result['mongo_commands']:
+            commands = ', '.join(f"{command}={count}" for command, count in result['mongo_commands'].items())
+            self.stdout.write(f"    MongoDB: {result['mongo_commands_per_request']} команд/запрос ({commands})")
+        for exception in result['exceptions']:
+            self.stdout.write(self.style.ERROR(f"    {exception}"))
+
+    def _compare(self, results, baseline_path, max_regression):
+        baseline = runner.load_baseline(baseline_path)
+        if baseline is None:
+            self.stderr.write(self.style.WARNING(f"Baseline не найден: {baseline_path}"))
+            return []
+
+        self.stdout.write(f"Сравнение с baseline от {baseline['created']}:")
+        regressions = []
+        for row in runner.compare(results, baseline):
+            change = 'n/a' if row['change_pct'] is None else f"{row['change_pct']:+.1f}%"
+            style = self.style.WARNING if row['worse'] else str
+            self.stdout.write(style(
+                f"  {row['scenario']:<16} {row['metric']:<28} {row['baseline']:>10} → {row['current']:>10}  {change}"
+            ))
+            if (max_regression is not None and row['metric'] == 'p95_ms' and row['change_pct'] is not None
+                    and row['change_pct'] > max_regression):
+                regressions.append(row['scenario'])
+        return regressions
@@ -0,0 +1,97 @@
+# benchmarks/management/commands/microbench.py - Микробенчмарки горячих мест
+
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from loguru import logger
+
+from benchmarks import microbench
+from mongodb.backends import is_memory_backend
+
+MEMORY_DB_NAME = 'wws_microbench'
+
+
+class Command(BaseCommand):
+    help = (
+        "Измеряет чистый Python горячих мест (обогащение и экспорт компании, "
+        "валидация регистрации, IBAN) и дописывает результат в историю "
+        "BENCHMARK_DIR/microbench_history.jsonl; показывает изменение медианы "
+        "относительно прошлого прогона."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('benchmarks', nargs='*',
+                            help=f"Бенчмарки (по умолчанию все: {', '.join(microbench.BENCHMARKS)})")
+        parser.add_argument('--rounds', type=int, default=20, help='Раундов на бенчмарк')
+        parser.add_argument('--disable-gc', action='store_true', help='Выключить сборщик мусора на время раундов')
+        parser.add_argument('--no-save', action='store_true', help='Не записывать прогон в историю')
+        parser.add_argument('--note', default=None, help='Комментарий к прогону в истории')
+        parser.add_argument('--max-regression', type=float, default=None,
+                            help='Ошибка, если медиана хуже прошлого прогона больше чем на N процентов')
+        parser.add_argument('--history', type=int, default=0, metavar='N',
+                            help='Показать медианы последних N прогонов и выйти')
+        parser.add_argument('--json', dest='json_path', default=None, help='Записать результаты в JSON-файл')
+
+    def handle(self, *args, **options):
+        names = options['benchmarks'] or list(microbench.BENCHMARKS)
+        unknown = [name for name in names if name not in microbench.BENCHMARKS]
+        if unknown:
+            raise CommandError(f"Неизвестные бенчмарки: {', '.join(unknown)}")
+
+        history = microbench.load_history()
+        if options['history']:
+            self._print_history(names, history[-options['history']:])
+            return
+
+        # Логи внутри измеряемых функций (get_company и т.п.) не должны попадать в консоль
+        logger.remove()
+        logger.add(sys.stderr, level='ERROR')
+
+        if is_memory_backend():
+            # Справочники enrich_company_data читаются из базы в памяти, а не ждут сервер
+            from mongodb import memory_backend
+            memory_backend.bootstrap(MEMORY_DB_NAME)
+
+        results = []
+        for name in names:
+            result = microbench.run_benchmark(name, rounds=options['rounds'], disable_gc=options['disable_gc'])
+            results.append(result)
+            self.stdout.write(
+                f"{name:<28} median {result['median_us']:>10.3f} мкс  min {result['min_us']:>10.3f}  "
+                f"± {result['stddev_us']:>8.3f}  {result['ops']:>12.1f} оп/с  ({result['iterations']} x {result['rounds']})"
+            )
+
+        regressions = []
+        previous = history[-1] if history else None
+        if previous is not None:
+            self.stdout.write(f"Сравнение с прогоном {previous['created']} ({previous.get('git') or '?'}):")
+            for name, old, new, change in microbench.compare(results, previous):
+                style = self.style.WARNING if change > 0 else self.style.SUCCESS
+                self.stdout.write(style(f"  {name:<28} {old:>10.3f} → {new:>10.3f} мкс  {change:+.1f}%"))
+                if options['max_regression'] is not None and change > options['max_regression']:
+                    regressions.append(name)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2, ensure_ascii=False)
+
+        if not options['no_save']:
+            microbench.append_history(results, note=options['note'])
+            self.stdout.write(self.style.SUCCESS(f"История: {microbench.get_history_path()}"))
+
+        if regressions:
+            raise CommandError(
+                f"Медиана хуже прошлого прогона более чем на {options['max_regression']}%: {', '.join(regressions)}"
+            )
+
+    def _print_history(self, names, history):
+        if not history:
+            self.stdout.write("История пуста")
+            return
+        for entry in history:
+            self.stdout.write(f"{entry['created']}  {entry.get('git') or '-':<9} {entry.get('note') or ''}")
+            for name in names:
+                result = entry.get('results', {}).get(name)
+                if result:
+                    self.stdout.write(f"    {name:<28} {result['median_us']:>10.3f} мкс")
@@ -0,0 +1,249 @@
+# benchmarks/microbench.py - Микробенчмарки CPU-горячих мест
+#
+# Бенчмарк - функция, которая готовит данные и возвращает вызываемый
+# объект без аргументов; измеряется только он (как фикстура + benchmark()
+# в pytest-benchmark). Число вызовов в раунде подбирается так, чтобы раунд
+# длился не меньше MIN_ROUND_TIME, - тогда точности таймера хватает и
+# для функций в единицы микросекунд. Результат - статистика времени
+# одного вызова по раундам.
+#
+# Каждый прогон дописывается строкой в BENCHMARK_DIR/microbench_history.jsonl
+# (время, коммит git, результаты), поэтому эффект оптимизации виден как
+# изменение медианы относительно прошлых прогонов.
+
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+
+from .datagen import build_company_document
+
+# Минимальная длительность раунда, секунды
+MIN_ROUND_TIME = 0.01
+
+BENCHMARKS = {}
+
+
+def benchmark(name, group):
+    """Регистрирует бенчмарк в BENCHMARKS"""
+
+    def decorator(setup):
+        BENCHMARKS[name] = {'setup': setup, 'group': group, 'doc': (setup.__doc__ or '').strip()}
+        return setup
+
+    return decorator
+
+
+def get_history_path():
+    return os.path.join(str(settings.BENCHMARK_DIR), 'microbench_history.jsonl')
+
+
+# ==================== ДАННЫЕ ====================
+
+# Размер документа компании - как у generate_tenant
+COMPANY_CONTACTS = 50
+COMPANY_BANK_ACCOUNTS = 10
+
+
+def _company_document():
+    return build_company_document(COMPANY_CONTACTS, COMPANY_BANK_ACCOUNTS)
+
+
+def _flat_company():
+    from company.company_manager import CompanyManager
+
+    return CompanyManager.flatten_company_document(_company_document())
+
+
+def _registration_data():
+    company = _flat_company()
+    company['secondary_bic'] = 'COBADEFFXXX'
+    return company
+
+
+# ==================== БЕНЧМАРКИ ====================
+
+@benchmark('enrich_company_data', 'company_info')
+def bench_enrich_company_data():
+    """enrich_company_data: display-названия и форматирование IBAN"""
+    from company.views.crud import enrich_company_data
+
+    company = _flat_company()
+    return lambda: enrich_company_data(company)
+
+
+@benchmark('format_iban', 'company_info')
+def bench_format_iban():
+    """format_iban: 10 IBAN с пробелами и без"""
+    from company.views.crud import format_iban
+
+    ibans = [account['iban'] for account in _company_document()['banking_accounts']]
+    ibans = [iban if index % 2 else iban.lower() for index, iban in enumerate(ibans)]
+
+    def run():
+        for iban in ibans:
+            format_iban(iban)
+
+    return run
+
+
+@benchmark('validate_registration_data', 'registration')
+def bench_validate_registration_data():
+    """validate_registration_data: полный набор полей шагов 2 и 5"""
+    from company.views.registration import validate_registration_data
+
+    data = _registration_data()
+    return lambda: validate_registration_data(data)
+
+
+@benchmark('iban_checksum', 'registration')
+def bench_iban_checksum():
+    """CompanyBankingForm.validate_iban_checksum: 10 IBAN (mod 97)"""
+    from company.forms.step5 import CompanyBankingForm
+
+    form = CompanyBankingForm()
+    ibans = [account['iban'] for account in _company_document()['banking_accounts']]
+
+    def run():
+        for iban in ibans:
+            form.validate_iban_checksum(iban)
+
+    return run
+
+
+@benchmark('flatten_company_document', 'company_manager')
+def bench_flatten_company_document():
+    """CompanyManager.flatten_company_document: контакты в JSON, счета в плоские поля"""
+    from company.company_manager import CompanyManager
+
+    company = _company_document()
+    # Преобразование меняет документ на месте - каждый вызов получает копию
+    return lambda: CompanyManager.flatten_company_document(dict(company))
+
+
+@benchmark('json_export', 'export')
+def bench_json_export():
+    """Экспорт компании: MongoJsonResponse(indent=True) - orjson, если установлен"""
+    from utils.json_response import MongoJsonResponse
+
+    company = _flat_company()
+    return lambda: MongoJsonResponse(company, indent=True).content
+
+
+@benchmark('json_export_stdlib', 'export')
+def bench_json_export_stdlib():
+    """Экспорт компании стандартным json (запасной путь без orjson)"""
+    from utils.json_response import dumps_stdlib
+
+    company = _flat_company()
+    return lambda: dumps_stdlib(company, indent=True)
+
+
+# ==================== ЗАПУСК ====================
+
+def _calibrate(func):
+    """Число вызовов в раунде, при котором раунд длится не меньше MIN_ROUND_TIME"""
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        if time.perf_counter() - started >= MIN_ROUND_TIME or iterations >= 1_000_000:
+            return iterations
+        iterations *= 2
+
+
+def run_benchmark(name, rounds=20, disable_gc=False):
+    """Статистика одного вызова, микросекунды: min, max, mean, stddev, median, ops"""
+    func = BENCHMARKS[name]['setup']()
+    func()  # прогрев: ленивые импорты, кеши
+    iterations = _calibrate(func)
+
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    if disable_gc:
+        gc.disable()
+    try:
+        for _ in range(max(2, rounds)):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            timings.append((time.perf_counter() - started) / iterations * 1_000_000)
+    finally:
+        if disable_gc and gc_was_enabled:
+            gc.enable()
+
+    mean = statistics.mean(timings)
+    return {
+        'name': name,
+        'group': BENCHMARKS[name]['group'],
+        'rounds': len(timings),
+        'iterations': iterations,
+        'min_us': round(min(timings), 3),
+        'max_us': round(max(timings), 3),
+        'mean_us': round(mean, 3),
+        'stddev_us': round(statistics.stdev(timings), 3),
+        'median_us': round(statistics.median(timings), 3),
+        'ops': round(1_000_000 / mean, 1) if mean else 0.0,
+    }
+
+
+# ==================== ИСТОРИЯ ====================
+
+def _git_revision():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def append_history(results, path=None, note=None):
+    path = path or get_history_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    entry = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'git': _git_revision(),
+        'python': platform.python_version(),
+        'note': note,
+        'results': {result['name']: result for result in results},
+    }
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    return entry
+
+
+def load_history(path=None):
+    """Прогоны из истории, старые первыми (битые строки пропускаются)"""
+    path = path or get_history_path()
+    if not os.path.exists(path):
+        return []
+    history = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                history.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return history
+
+
+def compare(results, previous):
+    """[(имя, медиана было, медиана стало, изменение %)] относительно прогона previous"""
+    rows = []
+    for result in results:
+        old = (previous or {}).get('results', {}).get(result['name'])
+        if old is None or not old.get('median_us'):
+            continue
+        change = round((result['median_us'] - old['median_us']) / old['median_us'] * 100, 1)
+        rows.append((result['name'], old['median_us'], result['median_us'], change))
+    return rows
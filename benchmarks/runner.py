@@ -0,0 +1,215 @@
+# benchmarks/runner.py - Запуск сценариев, статистика и baseline
+#
+# Для каждого сценария: p50/p95/p99 времени ответа, пропускная способность
+# (запросов в секунду) и число команд MongoDB - разница счетчика
+# wws_mongodb_commands_total до и после сценария. Сценарии выполняются по
+# очереди, поэтому вся разница относится к текущему сценарию (фоновые
+# потоки - опрос cache_bus - дают небольшой шум).
+#
+# Baseline - JSON с результатами прошлого прогона (BENCHMARK_DIR); compare()
+# показывает изменение каждой метрики относительно него.
+
+import datetime
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+
+from django.conf import settings
+
+from .scenarios import SCENARIOS
+
+_COMMAND_SAMPLE = re.compile(r'^wws_mongodb_commands_total\{command="([^"]*)",outcome="[^"]*"\} (\S+)$')
+
+
+def get_baseline_path(name='loadtest'):
+    return os.path.join(str(settings.BENCHMARK_DIR), f"{name}_baseline.json")
+
+
+# ==================== СЧЕТЧИКИ КОМАНД ====================
+
+def local_command_counts():
+    """Команды MongoDB текущего процесса (режим --in-process)"""
+    from monitoring import metrics
+
+    counts = {}
+    for labels, value in metrics.collect().get('wws_mongodb_commands_total', {}).items():
+        counts[labels[0]] = counts.get(labels[0], 0) + value
+    return counts
+
+
+def remote_command_counts(base_url, token=''):
+    """Команды MongoDB всех воркеров сервера (по /metrics)"""
+    request = urllib.request.Request(base_url.rstrip('/') + '/metrics')
+    if token:
+        request.add_header('Authorization', f"Bearer {token}")
+
+    counts = {}
+    with urllib.request.urlopen(request, timeout=10) as response:
+        for line in response.read().decode().splitlines():
+            match = _COMMAND_SAMPLE.match(line)
+            if match:
+                counts[match.group(1)] = counts.get(match.group(1), 0) + float(match.group(2))
+    return counts
+
+
+def _diff_counts(before, after):
+    diff = {command: after.get(command, 0) - before.get(command, 0) for command in after}
+    return {command: int(value) for command, value in sorted(diff.items()) if value > 0}
+
+
+# ==================== СТАТИСТИКА ====================
+
+def percentile(sorted_values, percent):
+    """Перцентиль методом ближайшего ранга (sorted_values - по возрастанию)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _latency_stats(durations):
+    values = sorted(duration * 1000 for duration in durations)
+    return {
+        'p50_ms': round(percentile(values, 50), 2),
+        'p95_ms': round(percentile(values, 95), 2),
+        'p99_ms': round(percentile(values, 99), 2),
+        'max_ms': round(values[-1], 2) if values else 0.0,
+    }
+
+
+def summarize(name, records, elapsed, iterations, commands):
+    errors = sum(1 for _label, status, _duration in records if status >= 500)
+
+    labels = {}
+    for label, _status, duration in records:
+        labels.setdefault(label, []).append(duration)
+
+    result = {
+        'scenario': name,
+        'iterations': iterations,
+        'requests': len(records),
+        'errors': errors,
+        'duration_s': round(elapsed, 3),
+        'throughput_rps': round(len(records) / elapsed, 2) if elapsed else 0.0,
+        **_latency_stats([duration for _label, _status, duration in records]),
+        'mongo_commands': commands,
+        'mongo_commands_per_request': round(sum(commands.values()) / len(records), 2) if records else 0.0,
+        'labels': {label: {'requests': len(durations), **_latency_stats(durations)}
+                   for label, durations in sorted(labels.items())},
+    }
+    return result
+
+
+# ==================== ЗАПУСК ====================
+
+def run_scenario(name, client_factory, context, iterations=100, concurrency=4, seed=42, command_counts=None):
+    """
+    Выполняет iterations итераций сценария в concurrency потоках.
+    client_factory() - новый клиент; command_counts() - счетчики команд MongoDB.
+    """
+    scenario, fresh_session = SCENARIOS[name]
+    remaining = [iterations]
+    lock = threading.Lock()
+    records = []
+    failures = []
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        client = client_factory()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            if fresh_session:
+                with lock:
+                    records.extend(client.records)
+                client = client_factory()
+            try:
+                scenario(client, rng, context)
+            except Exception as e:
+                with lock:
+                    failures.append(repr(e))
+        with lock:
+            records.extend(client.records)
+
+    before = command_counts() if command_counts else {}
+    started = time.perf_counter()
+
+    threads = [threading.Thread(target=worker, args=(index,), name=f"loadtest-{index}") for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - started
+    after = command_counts() if command_counts else {}
+
+    result = summarize(name, records, elapsed, iterations, _diff_counts(before, after))
+    result['exceptions'] = failures[:5]
+    result['errors'] += len(failures)
+    return result
+
+
+# ==================== BASELINE ====================
+
+def save_baseline(results, path, meta=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'meta': meta or {},
+        'scenarios': {result['scenario']: result for result in results},
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# Метрика -> True, если рост - это ухудшение
+COMPARED_METRICS = {
+    'p50_ms': True,
+    'p95_ms': True,
+    'p99_ms': True,
+    'throughput_rps': False,
+    'mongo_commands_per_request': True,
+}
+
+
+def compare(results, baseline):
+    """
+    [{'scenario', 'metric', 'baseline', 'current', 'change_pct', 'worse'}] -
+    изменение относительно baseline (change_pct None, если сравнивать не с чем)
+    """
+    rows = []
+    for result in results:
+        previous = (baseline or {}).get('scenarios', {}).get(result['scenario'])
+        if previous is None:
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            old = previous.get(metric)
+            new = result.get(metric)
+            if old is None or new is None:
+                continue
+            change = round((new - old) / old * 100, 1) if old else None
+            worse = change is not None and (change > 0 if higher_is_worse else change < 0)
+            rows.append({
+                'scenario': result['scenario'],
+                'metric': metric,
+                'baseline': old,
+                'current': new,
+                'change_pct': change,
+                'worse': worse,
+            })
+    return rows
@@ -0,0 +1,111 @@
+# benchmarks/scenarios.py - Сценарии нагрузочного теста
+#
+# Сценарий - одно действие пользователя (одна "итерация"), которое может
+# состоять из нескольких запросов. Функция сценария получает клиента
+# (benchmarks/client.py), генератор случайных чисел потока и ScenarioContext.
+# Сценарии, отмеченные в SCENARIOS как "новая сессия", получают новый
+# клиент (пустые cookie) на каждую итерацию - как новый посетитель.
+
+import re
+from urllib.parse import quote
+
+from .datagen import BENCH_PASSWORD, bench_username, can_login, generate_plz_rows
+
+_AJAX = {'X-Requested-With': 'XMLHttpRequest'}
+
+_SELECT = r'<select[^>]*name="{name}"[^>]*>(.*?)</select>'
+_OPTION = re.compile(r'<option[^>]*value="([^"]+)"')
+
+# Город шага 3 проверяется регулярным выражением формы (без скобок и т.п.)
+_CITY = re.compile(r'^[a-zA-ZäöüÄÖÜß\s\-]+$')
+
+
+class ScenarioContext:
+    """Общие для всех потоков параметры: число пользователей и строки PLZ"""
+
+    def __init__(self, users=2000, plz=8200, seed=42):
+        self.usernames = [bench_username(number) for number in range(1, users + 1) if can_login(number)]
+        self.plz_rows = generate_plz_rows(plz, seed) if plz else []
+        self.cities = sorted({row['plz_name'] for row in self.plz_rows})
+        self.wizard_addresses = [row for row in self.plz_rows if _CITY.match(row['plz_name'])]
+
+
+def _first_option(html, name):
+    match = re.search(_SELECT.format(name=name), html, re.S)
+    if match is None:
+        return ''
+    values = _OPTION.findall(match.group(1))
+    return values[0] if values else ''
+
+
+# ==================== СЦЕНАРИИ ====================
+
+def anonymous_home(client, rng, context):
+    """Главная страница без входа"""
+    client.get('/', label='home')
+
+
+def login_storm(client, rng, context):
+    """Главная (модальное окно входа, csrftoken) и AJAX-вход случайного пользователя"""
+    client.get('/', label='home')
+    username = rng.choice(context.usernames) if context.usernames else 'admin'
+    client.post('/users/login/', {'username': username, 'password': BENCH_PASSWORD}, label='login', headers=_AJAX)
+
+
+def wizard_steps(client, rng, context):
+    """Шаги 1-3 регистрации компании (данные только в сессии, без сохранения)"""
+    page = client.get('/company/register/step1/', label='wizard_step1_get')
+    if page.status != 200:
+        return
+
+    client.post('/company/register/step1/', {
+        'company_name': f"Lasttest {rng.randint(1, 10 ** 6)} GmbH",
+        'legal_form': _first_option(page.text, 'legal_form') or 'gmbh',
+        'ceo_salutation': _first_option(page.text, 'ceo_salutation') or 'Herr',
+        'ceo_title': '',
+        'ceo_first_name': 'Max',
+        'ceo_last_name': 'Mustermann',
+    }, label='wizard_step1_post')
+
+    client.post('/company/register/step2/', {
+        'commercial_register': f"HRB {rng.randint(1000, 999999)}",
+        'tax_number': f"{rng.randint(10, 99)}/{rng.randint(100, 999)}/{rng.randint(10000, 99999)}",
+        'vat_id': f"DE{rng.randint(100000000, 999999999)}",
+        'tax_id': f"{rng.randint(10 ** 10, 10 ** 11 - 1)}",
+    }, label='wizard_step2_post')
+
+    step3 = client.get('/company/register/step3/', label='wizard_step3_get')
+    address = rng.choice(context.wizard_addresses) if context.wizard_addresses else {'plz_code': '10115', 'plz_name': 'Berlin'}
+    client.post('/company/register/step3/', {
+        'street': f"Musterstraße {rng.randint(1, 200)}",
+        'postal_code': address['plz_code'],
+        'city': address['plz_name'],
+        'country': _first_option(step3.text, 'country') or 'Deutschland',
+    }, label='wizard_step3_post')
+
+
+def autocomplete(client, rng, context):
+    """Ввод города и PLZ по символу: запрос автодополнения на каждое нажатие"""
+    city = rng.choice(context.cities) if context.cities else 'Berlin'
+    for length in range(1, min(len(city), 6) + 1):
+        client.get(f"/company/api/search-cities/?q={quote(city[:length])}", label='search_cities', headers=_AJAX)
+
+    plz = rng.choice(context.plz_rows)['plz_code'] if context.plz_rows else '10115'
+    for length in range(2, 6):
+        client.get(f"/company/api/search-plz/?q={plz[:length]}", label='search_plz', headers=_AJAX)
+    client.get(f"/company/api/get-city-by-plz/?plz={plz}", label='city_by_plz', headers=_AJAX)
+
+
+def company_info(client, rng, context):
+    """Страница компании (много контактов и банковских счетов)"""
+    client.get('/company/info/', label='company_info')
+
+
+# Имя -> (функция, новая сессия на итерацию)
+SCENARIOS = {
+    'anonymous_home': (anonymous_home, False),
+    'login_storm': (login_storm, True),
+    'wizard_steps': (wizard_steps, True),
+    'autocomplete': (autocomplete, False),
+    'company_info': (company_info, False),
+}
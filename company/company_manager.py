@@ -3,8 +3,14 @@ import json
 
 from loguru import logger
 
+from mongodb import audit, cache_bus
 from mongodb.mongodb_config import MongoConfig
 from mongodb.mongodb_utils import MongoConnection
+from monitoring.instruments import track_operation
+from utils.fragment_cache import invalidate_company_fragments
+
+# Период активности в company_stats_json (дневные счетчики журнала)
+COMPANY_ACTIVITY_DAYS = 30
 
 
 class CompanyManager:
@@ -46,6 +52,7 @@ class CompanyManager:
             logger.error(f"Ошибка получения коллекции: {e}")
             return None
 
+    @track_operation('company', false_is_failure=False)
     def has_company(self):
         """Проверяет, зарегистрирована ли компания"""
         try:
@@ -72,6 +79,7 @@ class CompanyManager:
             logger.error(f"Ошибка проверки наличия компании: {e}")
             return False
 
+    @track_operation('company')
     def get_company(self):
         """Получает данные компании"""
         try:
@@ -88,40 +96,7 @@ class CompanyManager:
                 logger.info(f"🔍 get_company() найдена компания: {company.get('company_name', 'Без названия')}")
                 logger.info(f"🔍 Основные поля: email={company.get('email')}, phone={company.get('phone')}")
 
-                # ✅ ОБРАТНОЕ ПРЕОБРАЗОВАНИЕ: Конвертируем массив дополнительных контактов в JSON-строку для совместимости
-                if 'additional_contacts' in company and isinstance(company['additional_contacts'], list):
-                    company['additional_contacts_data'] = json.dumps(company['additional_contacts'])
-                    logger.info(f"Преобразовано {len(company['additional_contacts'])} дополнительных контактов в JSON-строку")
-
-                # ✅ ОБРАТНОЕ ПРЕОБРАЗОВАНИЕ: Конвертируем массив банковских счетов в плоские поля для совместимости
-                if 'banking_accounts' in company and isinstance(company['banking_accounts'], list):
-                    banking_accounts = company['banking_accounts']
-
-                    # Находим основной счёт
-                    primary_account = next((acc for acc in banking_accounts if acc.get('is_primary')), None)
-                    if not primary_account and banking_accounts:
-                        primary_account = banking_accounts[0]
-
-                    if primary_account:
-                        company['bank_name'] = primary_account.get('bank_name', '')
-                        company['iban'] = primary_account.get('iban', '')
-                        company['bic'] = primary_account.get('bic', '')
-                        company['account_holder'] = primary_account.get('account_holder', '')
-                        company['bank_address'] = primary_account.get('bank_address', '')
-                        company['account_type'] = primary_account.get('account_type', '')
-                        company['banking_notes'] = primary_account.get('notes', '')
-
-                    # Находим вторичный счёт
-                    secondary_accounts = [acc for acc in banking_accounts if not acc.get('is_primary')]
-                    if secondary_accounts:
-                        secondary_account = secondary_accounts[0]
-                        company['secondary_bank_name'] = secondary_account.get('bank_name', '')
-                        company['secondary_iban'] = secondary_account.get('iban', '')
-                        company['secondary_bic'] = secondary_account.get('bic', '')
-                        company['secondary_account_holder'] = secondary_account.get('account_holder', '')
-
-                    logger.info(f"Преобразовано {len(banking_accounts)} банковских счетов в плоские поля")
-
+                self.flatten_company_document(company)
             else:
                 logger.info("🔍 get_company() компания не найдена")
 
@@ -131,10 +106,54 @@ class CompanyManager:
             logger.error(f"Ошибка получения данных компании: {e}")
             return None
 
+    @staticmethod
+    def flatten_company_document(company):
+        """
+        Приводит документ компании к плоскому виду форм и шаблонов (на месте):
+        additional_contacts -> additional_contacts_data (JSON-строка),
+        banking_accounts -> bank_name/iban/... и secondary_*.
+        """
+        # ✅ ОБРАТНОЕ ПРЕОБРАЗОВАНИЕ: Конвертируем массив дополнительных контактов в JSON-строку для совместимости
+        if 'additional_contacts' in company and isinstance(company['additional_contacts'], list):
+            company['additional_contacts_data'] = json.dumps(company['additional_contacts'])
+            logger.info(f"Преобразовано {len(company['additional_contacts'])} дополнительных контактов в JSON-строку")
+
+        # ✅ ОБРАТНОЕ ПРЕОБРАЗОВАНИЕ: Конвертируем массив банковских счетов в плоские поля для совместимости
+        if 'banking_accounts' in company and isinstance(company['banking_accounts'], list):
+            banking_accounts = company['banking_accounts']
+
+            # Находим основной счёт
+            primary_account = next((acc for acc in banking_accounts if acc.get('is_primary')), None)
+            if not primary_account and banking_accounts:
+                primary_account = banking_accounts[0]
+
+            if primary_account:
+                company['bank_name'] = primary_account.get('bank_name', '')
+                company['iban'] = primary_account.get('iban', '')
+                company['bic'] = primary_account.get('bic', '')
+                company['account_holder'] = primary_account.get('account_holder', '')
+                company['bank_address'] = primary_account.get('bank_address', '')
+                company['account_type'] = primary_account.get('account_type', '')
+                company['banking_notes'] = primary_account.get('notes', '')
+
+            # Находим вторичный счёт
+            secondary_accounts = [acc for acc in banking_accounts if not acc.get('is_primary')]
+            if secondary_accounts:
+                secondary_account = secondary_accounts[0]
+                company['secondary_bank_name'] = secondary_account.get('bank_name', '')
+                company['secondary_iban'] = secondary_account.get('iban', '')
+                company['secondary_bic'] = secondary_account.get('bic', '')
+                company['secondary_account_holder'] = secondary_account.get('account_holder', '')
+
+            logger.info(f"Преобразовано {len(banking_accounts)} банковских счетов в плоские поля")
+
+        return company
+
     def get_primary_company(self):
         """Alias для совместимости - возвращает единственную компанию"""
         return self.get_company()
 
+    @track_operation('company')
     def create_or_update_company(self, company_data):
         """Создает или обновляет информацию о компании"""
         try:
@@ -248,6 +267,9 @@ class CompanyManager:
                     {'$set': company_data}
                 )
                 if result.modified_count > 0:
+                    self.company_changed()
+                    audit.record(audit.COMPANY_UPDATED, target=company_data.get('company_name'),
+                                 details={'fields': sorted(key for key in company_data if key not in ('type', 'modified_at'))})
                     logger.success(f"Информация о компании '{company_data['company_name']}' обновлена")
                     return True
                 else:
@@ -259,6 +281,8 @@ class CompanyManager:
                 company_data['created_at'] = now
                 result = collection.insert_one(company_data)
                 if result.inserted_id is not None:  # ✅ ИСПРАВЛЕНО: Правильная проверка
+                    self.company_changed()
+                    audit.record(audit.COMPANY_CREATED, target=company_data.get('company_name'))
                     logger.success(f"Компания '{company_data['company_name']}' зарегистрирована с ID: {result.inserted_id}")
                     return True
 
@@ -268,6 +292,16 @@ class CompanyManager:
             logger.error(f"Ошибка создания/обновления компании: {e}")
             return False
 
+    @staticmethod
+    def company_changed():
+        """
+        После записи компании: сбрасывает фрагменты шаблонов текущей версии и
+        увеличивает версию COMPANY (кеши и фрагменты во всех воркерах)
+        """
+        invalidate_company_fragments()
+        cache_bus.bump(cache_bus.COMPANY)
+
+    @track_operation('company')
     def delete_company(self):
         """Удаляет информацию о компании (полное удаление)"""
         try:
@@ -278,6 +312,8 @@ class CompanyManager:
 
             result = collection.delete_one({'type': 'company_info'})
             if result.deleted_count > 0:
+                self.company_changed()
+                audit.record(audit.COMPANY_DELETED)
                 logger.success("Информация о компании удалена")
                 return True
             else:
@@ -288,6 +324,7 @@ class CompanyManager:
             logger.error(f"Ошибка удаления компании: {e}")
             return False
 
+    @track_operation('company')
     def get_company_stats(self):
         """Возвращает статистику по компании"""
         try:
@@ -301,66 +338,94 @@ class CompanyManager:
             if company is None:
                 return None
 
-            # Подсчитываем ТОЛЬКО обязательные поля
-            filled_fields = 0
-            total_fields = 0
-
-            # Базовые обязательные поля (Шаги 1-3)
-            required_fields = [
-                'company_name', 'legal_form', 'street', 'postal_code', 'city', 'country', 'email', 'phone'
-            ]
-
-            # Банковские обязательные поля (Шаг 5)
-            # Проверяем, есть ли banking_accounts (новый формат) или старые плоские поля
-            if 'banking_accounts' in company and company['banking_accounts']:
-                banking_accounts = company['banking_accounts']
-
-                # Основной счёт (обязательный)
-                primary_account = next((acc for acc in banking_accounts if acc.get('is_primary')), None)
-                if not primary_account and banking_accounts:
-                    primary_account = banking_accounts[0]
-
-                if primary_account:
-                    # Обязательные банковские поля основного счёта
-                    banking_required = ['bank_name', 'iban', 'bic', 'account_holder']
-                    for field in banking_required:
-                        total_fields += 1
-                        if field in primary_account and primary_account[field] and str(primary_account[field]).strip():
-                            filled_fields += 1
-                else:
-                    # Если нет основного счёта, всё равно считаем 4 пустых обязательных поля
-                    total_fields += 4
-            else:
-                # Старый формат (плоские поля) - для обратной совместимости
-                banking_required_old = ['bank_name', 'iban', 'bic', 'account_holder']
+            return self.compute_company_stats(company)
+        except Exception as e:
+            logger.error(f"Ошибка получения статистики компании: {e}")
+            return None
 
-                for field in banking_required_old:
+    def get_company_activity(self, days=COMPANY_ACTIVITY_DAYS):
+        """Изменения компании за последние days дней - из дневных счетчиков журнала"""
+        since, until = audit.window(audit.DAY, days)
+        try:
+            rollups = audit.read_rollups(audit.DAY, since, until)
+        except Exception as e:
+            logger.error(f"Ошибка получения активности компании: {e}")
+            rollups = None
+        return self.compute_company_activity(rollups or [], since, until)
+
+    @staticmethod
+    def compute_company_activity(rollups, since, until):
+        """Считает активность по прочитанным бакетам (без обращений к БД)"""
+        daily = [
+            {'date': day['bucket'].date(), 'changes': sum(day['counts'].values())}
+            for day in audit.build_series(rollups, audit.DAY, since, until, audit.COMPANY_EVENTS)
+        ]
+        return {
+            'days': len(daily),
+            'changes': sum(day['changes'] for day in daily),
+            'daily': daily,
+        }
+
+    @staticmethod
+    def compute_company_stats(company):
+        """Считает статистику заполненности по документу компании (без обращений к БД)"""
+        # Подсчитываем ТОЛЬКО обязательные поля
+        filled_fields = 0
+        total_fields = 0
+
+        # Базовые обязательные поля (Шаги 1-3)
+        required_fields = [
+            'company_name', 'legal_form', 'street', 'postal_code', 'city', 'country', 'email', 'phone'
+        ]
+
+        # Банковские обязательные поля (Шаг 5)
+        # Проверяем, есть ли banking_accounts (новый формат) или старые плоские поля
+        if 'banking_accounts' in company and company['banking_accounts']:
+            banking_accounts = company['banking_accounts']
+
+            # Основной счёт (обязательный)
+            primary_account = next((acc for acc in banking_accounts if acc.get('is_primary')), None)
+            if not primary_account and banking_accounts:
+                primary_account = banking_accounts[0]
+
+            if primary_account:
+                # Обязательные банковские поля основного счёта
+                banking_required = ['bank_name', 'iban', 'bic', 'account_holder']
+                for field in banking_required:
                     total_fields += 1
-                    if field in company and company[field] and str(company[field]).strip():
+                    if field in primary_account and primary_account[field] and str(primary_account[field]).strip():
                         filled_fields += 1
+            else:
+                # Если нет основного счёта, всё равно считаем 4 пустых обязательных поля
+                total_fields += 4
+        else:
+            # Старый формат (плоские поля) - для обратной совместимости
+            banking_required_old = ['bank_name', 'iban', 'bic', 'account_holder']
 
-            # Базовые обязательные поля компании
-            for field in required_fields:
+            for field in banking_required_old:
                 total_fields += 1
                 if field in company and company[field] and str(company[field]).strip():
                     filled_fields += 1
 
-            # Дополнительные контакты
-            additional_contacts = company.get('additional_contacts_data', [])
-            if isinstance(additional_contacts, str):
-                try:
-                    additional_contacts = json.loads(additional_contacts)
-                except:
-                    additional_contacts = []
-
-            return {
-                'filled_fields': filled_fields,
-                'total_fields': total_fields,
-                'completion_percentage': round((filled_fields / total_fields) * 100, 1) if total_fields > 0 else 0,
-                'additional_contacts_count': len(additional_contacts) if additional_contacts else 0,
-                'created_at': company.get('created_at'),
-                'modified_at': company.get('modified_at')
-            }
-        except Exception as e:
-            logger.error(f"Ошибка получения статистики компании: {e}")
-            return None
\ No newline at end of file
+        # Базовые обязательные поля компании
+        for field in required_fields:
+            total_fields += 1
+            if field in company and company[field] and str(company[field]).strip():
+                filled_fields += 1
+
+        # Дополнительные контакты
+        additional_contacts = company.get('additional_contacts_data', [])
+        if isinstance(additional_contacts, str):
+            try:
+                additional_contacts = json.loads(additional_contacts)
+            except:
+                additional_contacts = []
+
+        return {
+            'filled_fields': filled_fields,
+            'total_fields': total_fields,
+            'completion_percentage': round((filled_fields / total_fields) * 100, 1) if total_fields > 0 else 0,
+            'additional_contacts_count': len(additional_contacts) if additional_contacts else 0,
+            'created_at': company.get('created_at'),
+            'modified_at': company.get('modified_at')
+        }
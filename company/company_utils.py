@@ -1,8 +1,8 @@
 from django.contrib import messages
-from django.http import JsonResponse
 from django.shortcuts import redirect, render
 
 from mongodb.mongodb_config import MongoConfig
+from utils.json_response import MongoJsonResponse
 
 
 def render_toast_response(request):
@@ -16,7 +16,7 @@ def render_toast_response(request):
             'delay': 5000
         })
 
-    response = JsonResponse({'messages': messages_list})
+    response = MongoJsonResponse({'messages': messages_list})
     response['Content-Type'] = 'application/json'
     return response
 
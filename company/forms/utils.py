@@ -3,28 +3,34 @@
 from loguru import logger
 from mongodb.mongodb_utils import MongoConnection
 from mongodb.mongodb_config import MongoConfig
+from mongodb import stale_cache
+from mongodb.cache_bus import reference_cache
 
 
 def get_salutations_from_mongodb():
     """Загружает салютации (Anrede) из MongoDB коллекции basic_salutations"""
+    cached = reference_cache.get('company.salutations')
+    if cached is not None:
+        return cached
+
     try:
         logger.info("Загружаем salutations из MongoDB для компании")
         db = MongoConnection.get_database()
         if db is None:
             logger.error("База данных недоступна")
-            return get_default_salutation_choices()
+            return stale_cache.recall('company.salutations', get_default_salutation_choices())
 
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
         if not db_name:
             logger.error("Имя базы данных не найдено в конфигурации")
-            return get_default_salutation_choices()
+            return stale_cache.recall('company.salutations', get_default_salutation_choices())
 
         salutations_collection_name = f"{db_name}_basic_salutations"
         collections = db.list_collection_names()
         if salutations_collection_name not in collections:
             logger.warning(f"Коллекция '{salutations_collection_name}' не найдена")
-            return get_default_salutation_choices()
+            return stale_cache.recall('company.salutations', get_default_salutation_choices())
 
         salutations_collection = db[salutations_collection_name]
 
@@ -49,11 +55,11 @@ def get_salutations_from_mongodb():
                 count += 1
 
         logger.success(f"Успешно загружено {count} salutations из коллекции")
-        return choices
+        return reference_cache.set('company.salutations', stale_cache.remember('company.salutations', choices))
 
     except Exception as e:
         logger.error(f"Ошибка загрузки salutations из MongoDB: {e}")
-        return get_default_salutation_choices()
+        return stale_cache.recall('company.salutations', get_default_salutation_choices())
 
 
 def get_default_salutation_choices():
@@ -68,24 +74,28 @@ def get_default_salutation_choices():
 
 def get_titles_from_mongodb():
     """Загружает titles из MongoDB коллекции"""
+    cached = reference_cache.get('company.titles')
+    if cached is not None:
+        return cached
+
     try:
         logger.info("Загружаем titles из MongoDB для компании")
         db = MongoConnection.get_database()
         if db is None:
             logger.error("База данных недоступна")
-            return get_default_title_choices()
+            return stale_cache.recall('company.titles', get_default_title_choices())
 
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
         if not db_name:
             logger.error("Имя базы данных не найдено в конфигурации")
-            return get_default_title_choices()
+            return stale_cache.recall('company.titles', get_default_title_choices())
 
         titles_collection_name = f"{db_name}_basic_titles"
         collections = db.list_collection_names()
         if titles_collection_name not in collections:
             logger.warning(f"Коллекция '{titles_collection_name}' не найдена")
-            return get_default_title_choices()
+            return stale_cache.recall('company.titles', get_default_title_choices())
 
         titles_collection = db[titles_collection_name]
         titles_cursor = titles_collection.find(
@@ -105,11 +115,11 @@ def get_titles_from_mongodb():
                 count += 1
 
         logger.success(f"Успешно загружено {count} titles из коллекции")
-        return choices
+        return reference_cache.set('company.titles', stale_cache.remember('company.titles', choices))
 
     except Exception as e:
         logger.error(f"Ошибка загрузки titles из MongoDB: {e}")
-        return get_default_title_choices()
+        return stale_cache.recall('company.titles', get_default_title_choices())
 
 
 def get_default_title_choices():
@@ -135,24 +145,28 @@ def get_default_title_choices():
 # НОВОЕ: Функция для загрузки правовых форм из MongoDB
 def get_legal_forms_from_mongodb():
     """Загружает правовые формы (Rechtsform) из MongoDB коллекции basic_legal_forms"""
+    cached = reference_cache.get('company.legal_forms')
+    if cached is not None:
+        return cached
+
     try:
         logger.info("Загружаем legal forms из MongoDB")
         db = MongoConnection.get_database()
         if db is None:
             logger.error("База данных недоступна")
-            return get_default_legal_form_choices()
+            return stale_cache.recall('company.legal_forms', get_default_legal_form_choices())
 
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
         if not db_name:
             logger.error("Имя базы данных не найдено в конфигурации")
-            return get_default_legal_form_choices()
+            return stale_cache.recall('company.legal_forms', get_default_legal_form_choices())
 
         legal_forms_collection_name = f"{db_name}_basic_legal_forms"
         collections = db.list_collection_names()
         if legal_forms_collection_name not in collections:
             logger.warning(f"Коллекция '{legal_forms_collection_name}' не найдена")
-            return get_default_legal_form_choices()
+            return stale_cache.recall('company.legal_forms', get_default_legal_form_choices())
 
         legal_forms_collection = db[legal_forms_collection_name]
         legal_forms_cursor = legal_forms_collection.find(
@@ -172,11 +186,11 @@ def get_legal_forms_from_mongodb():
                 count += 1
 
         logger.success(f"Успешно загружено {count} legal forms из коллекции")
-        return choices
+        return reference_cache.set('company.legal_forms', stale_cache.remember('company.legal_forms', choices))
 
     except Exception as e:
         logger.error(f"Ошибка загрузки legal forms из MongoDB: {e}")
-        return get_default_legal_form_choices()
+        return stale_cache.recall('company.legal_forms', get_default_legal_form_choices())
 
 
 def get_default_legal_form_choices():
@@ -200,25 +214,29 @@ def get_default_legal_form_choices():
 
 def get_countries_from_mongodb():
     """Загружает страны из MongoDB коллекции basic_countrys"""
+    cached = reference_cache.get('company.countries')
+    if cached is not None:
+        return cached
+
     try:
         logger.info("Загружаем countries из MongoDB")
         db = MongoConnection.get_database()
         if db is None:
             logger.error("База данных недоступна")
-            return get_default_country_choices()
+            return stale_cache.recall('company.countries', get_default_country_choices())
 
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
         if not db_name:
             logger.error("Имя базы данных не найдено в конфигурации")
-            return get_default_country_choices()
+            return stale_cache.recall('company.countries', get_default_country_choices())
 
         # ИСПРАВЛЕНО: используем basic_countrys вместо countries
         countries_collection_name = f"{db_name}_basic_countrys"
         collections = db.list_collection_names()
         if countries_collection_name not in collections:
             logger.warning(f"Коллекция '{countries_collection_name}' не найдена")
-            return get_default_country_choices()
+            return stale_cache.recall('company.countries', get_default_country_choices())
 
         countries_collection = db[countries_collection_name]
 
@@ -243,11 +261,11 @@ def get_countries_from_mongodb():
                 count += 1
 
         logger.success(f"Успешно загружено {count} countries из коллекции")
-        return choices
+        return reference_cache.set('company.countries', stale_cache.remember('company.countries', choices))
 
     except Exception as e:
         logger.error(f"Ошибка загрузки countries из MongoDB: {e}")
-        return get_default_country_choices()
+        return stale_cache.recall('company.countries', get_default_country_choices())
 
 
 def get_default_country_choices():
@@ -275,21 +293,25 @@ def get_default_country_choices():
 
 def get_industries_from_mongodb():
     """Загружает отрасли из MongoDB"""
+    cached = reference_cache.get('company.industries')
+    if cached is not None:
+        return cached
+
     try:
         logger.info("Загружаем industries из MongoDB")
         db = MongoConnection.get_database()
         if db is None:
-            return get_default_industry_choices()
+            return stale_cache.recall('company.industries', get_default_industry_choices())
 
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
         if not db_name:
-            return get_default_industry_choices()
+            return stale_cache.recall('company.industries', get_default_industry_choices())
 
         industries_collection_name = f"{db_name}_industries"
         collections = db.list_collection_names()
         if industries_collection_name not in collections:
-            return get_default_industry_choices()
+            return stale_cache.recall('company.industries', get_default_industry_choices())
 
         industries_collection = db[industries_collection_name]
         industries_cursor = industries_collection.find(
@@ -309,11 +331,11 @@ def get_industries_from_mongodb():
                 count += 1
 
         logger.success(f"Успешно загружено {count} industries из коллекции")
-        return choices
+        return reference_cache.set('company.industries', stale_cache.remember('company.industries', choices))
 
     except Exception as e:
         logger.error(f"Ошибка загрузки industries из MongoDB: {e}")
-        return get_default_industry_choices()
+        return stale_cache.recall('company.industries', get_default_industry_choices())
 
 
 def get_default_industry_choices():
@@ -347,23 +369,27 @@ def get_default_industry_choices():
 
 def get_communication_config_from_mongodb():
     """Получает полную конфигурацию коммуникаций из MongoDB"""
+    cached = reference_cache.get('company.communication_config')
+    if cached is not None:
+        return cached
+
     try:
         logger.info("Загружаем конфигурацию коммуникаций из MongoDB")
         db = MongoConnection.get_database()
         if db is None:
-            return get_default_communication_config()
+            return stale_cache.recall('company.communication_config', get_default_communication_config())
 
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
         if not db_name:
-            return get_default_communication_config()
+            return stale_cache.recall('company.communication_config', get_default_communication_config())
 
         comm_types_collection_name = f"{db_name}_basic_communication_types"
         collections = db.list_collection_names()
 
         if comm_types_collection_name not in collections:
             logger.warning(f"Коллекция '{comm_types_collection_name}' не найдена")
-            return get_default_communication_config()
+            return stale_cache.recall('company.communication_config', get_default_communication_config())
 
         comm_types_collection = db[comm_types_collection_name]
 
@@ -390,13 +416,13 @@ def get_communication_config_from_mongodb():
 
         if config_dict:
             logger.success(f"Загружена конфигурация для {len(config_dict)} типов коммуникации")
-            return config_dict
+            return reference_cache.set('company.communication_config', stale_cache.remember('company.communication_config', config_dict))
         else:
-            return get_default_communication_config()
+            return stale_cache.recall('company.communication_config', get_default_communication_config())
 
     except Exception as e:
         logger.error(f"Ошибка загрузки конфигурации коммуникаций: {e}")
-        return get_default_communication_config()
+        return stale_cache.recall('company.communication_config', get_default_communication_config())
 
 
 def get_default_communication_config():
@@ -464,22 +490,26 @@ def get_default_communication_config():
 # ДОБАВИТЬ экспорт в конец файла
 def get_communication_types_from_mongodb():
     """Получает типы коммуникаций из MongoDB (для Django choices)"""
+    cached = reference_cache.get('company.communication_types')
+    if cached is not None:
+        return cached
+
     try:
         logger.info("Загружаем типы коммуникаций из MongoDB для Django choices")
         db = MongoConnection.get_database()
         if db is None:
-            return get_default_communication_type_choices()
+            return stale_cache.recall('company.communication_types', get_default_communication_type_choices())
 
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
         if not db_name:
-            return get_default_communication_type_choices()
+            return stale_cache.recall('company.communication_types', get_default_communication_type_choices())
 
         comm_types_collection_name = f"{db_name}_basic_communication_types"
         collections = db.list_collection_names()
 
         if comm_types_collection_name not in collections:
-            return get_default_communication_type_choices()
+            return stale_cache.recall('company.communication_types', get_default_communication_type_choices())
 
         comm_types_collection = db[comm_types_collection_name]
 
@@ -501,11 +531,11 @@ def get_communication_types_from_mongodb():
                 count += 1
 
         logger.success(f"Загружено {count} типов коммуникаций из MongoDB")
-        return choices
+        return reference_cache.set('company.communication_types', stale_cache.remember('company.communication_types', choices))
 
     except Exception as e:
         logger.error(f"Ошибка загрузки типов коммуникаций: {e}")
-        return get_default_communication_type_choices()
+        return stale_cache.recall('company.communication_types', get_default_communication_type_choices())
 
 
 def get_default_communication_type_choices():
@@ -0,0 +1,106 @@
+# company/reference_bundle.py - Версионированный JSON справочников для форм
+#
+# Шаги мастера регистрации раньше выводили все <option> для Rechtsform,
+# Anrede, Titel, Land и типов контактов прямо в HTML, а шаг 4 еще и клал
+# конфигурацию коммуникаций в сессию и на страницу. Теперь справочники
+# отдаются одним JSON:
+#
+#     /company/api/reference/<version>.json
+#
+# version - хеш содержимого, поэтому ответ кешируется браузером навсегда
+# (Cache-Control: immutable): новое содержимое = новый URL. Страницы
+# содержат только <meta name="reference-data-url"> (тег
+# {% reference_data_meta %}) и выбранное значение каждого select;
+# static/js/reference_data.js загружает бандл и заполняет select[data-reference].
+#
+# Бандл собирается из тех же функций company/forms/utils.py, что и choices
+# форм (серверная валидация не меняется), и хранится в reference_cache:
+# запись справочников или конфигурации в любом воркере (cache_bus) дает
+# новую версию.
+
+import hashlib
+
+from django.urls import reverse
+
+from mongodb.cache_bus import reference_cache
+from utils.json_response import dumps
+
+from .forms.utils import (
+    get_communication_config_from_mongodb,
+    get_communication_types_from_mongodb,
+    get_countries_from_mongodb,
+    get_industries_from_mongodb,
+    get_legal_forms_from_mongodb,
+    get_salutations_from_mongodb,
+    get_titles_from_mongodb,
+)
+
+CACHE_KEY = 'company.reference_bundle'
+
+# Ключ в бандле -> загрузчик choices (тот же, что у форм)
+CHOICE_LOADERS = {
+    'legal_forms': get_legal_forms_from_mongodb,
+    'salutations': get_salutations_from_mongodb,
+    'titles': get_titles_from_mongodb,
+    'countries': get_countries_from_mongodb,
+    'industries': get_industries_from_mongodb,
+    'communication_types': get_communication_types_from_mongodb,
+}
+
+# Ключи reference_cache, под которыми загрузчики кешируют данные из MongoDB.
+# Если какого-то нет, загрузчик вернул запасной список (MongoDB недоступна) -
+# такой бандл не кешируется, чтобы после восстановления сразу получить данные
+SOURCE_CACHE_KEYS = (
+    'company.legal_forms',
+    'company.salutations',
+    'company.titles',
+    'company.countries',
+    'company.industries',
+    'company.communication_types',
+    'company.communication_config',
+)
+
+
+class ReferenceBundle:
+    """Содержимое бандла (JSON в bytes) и его версия"""
+
+    __slots__ = ('version', 'content')
+
+    def __init__(self, content):
+        self.content = content
+        self.version = hashlib.blake2b(content, digest_size=8).hexdigest()
+
+    @property
+    def url(self):
+        return reverse('company:reference_bundle', kwargs={'version': self.version})
+
+
+def build_bundle():
+    """
+    Собирает бандл. Пустые значения ('-- Auswählen --') не попадают в choices:
+    placeholder задает сам select.
+    """
+    data = {
+        'choices': {
+            key: [[value, text] for value, text in loader() if value]
+            for key, loader in CHOICE_LOADERS.items()
+        },
+        'communication_config': get_communication_config_from_mongodb(),
+    }
+    return ReferenceBundle(dumps(data))
+
+
+def get_bundle():
+    """Текущий бандл (из reference_cache)"""
+    bundle = reference_cache.get(CACHE_KEY)
+    if bundle is not None:
+        return bundle
+
+    bundle = build_bundle()
+    if all(reference_cache.get(key) is not None for key in SOURCE_CACHE_KEYS):
+        reference_cache.set(CACHE_KEY, bundle)
+    return bundle
+
+
+def get_bundle_url():
+    return get_bundle().url
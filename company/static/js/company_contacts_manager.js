@@ -941,26 +941,38 @@ document.addEventListener('DOMContentLoaded', function() {
     if (document.getElementById('company-step4-form')) {
         console.log('✅ Найдена форма company-step4-form');
 
-        window.companyAdditionalContactManager = new CompanyAdditionalContactManager();
-        companyAdditionalContactManager.init();
-
-        // Загружаем существующие контакты если есть
-        const existingContacts = window.initialAdditionalContactsData || [];
-        if (existingContacts.length > 0) {
-            console.log(`📥 Загрузка ${existingContacts.length} существующих контактов`);
-            companyAdditionalContactManager.loadAdditionalContacts(existingContacts);
-        } else {
-            console.log('📋 Нет существующих контактов для загрузки');
-        }
-
-        console.log('✅ Company Additional Contact Manager успешно инициализирован');
-        console.log('📋 Доступные типы контактов:', window.contactTypeChoices);
-        console.log('⚙️ Конфигурация коммуникации:', window.communicationConfig);
+        // Типы контактов и конфигурация - из бандла справочников; без него
+        // менеджер использует свои значения по умолчанию
+        WWSReference.fillSelects().then(data => {
+            if (data) {
+                window.contactTypeChoices = data.choices.communication_types.map(([value, text]) => ({value, text}));
+                window.communicationConfig = data.communication_config;
+            }
+            initCompanyAdditionalContactManager();
+        });
     } else {
         console.warn('⚠️ Форма company-step4-form не найдена на странице');
     }
 });
 
+function initCompanyAdditionalContactManager() {
+    window.companyAdditionalContactManager = new CompanyAdditionalContactManager();
+    companyAdditionalContactManager.init();
+
+    // Загружаем существующие контакты если есть
+    const existingContacts = window.initialAdditionalContactsData || [];
+    if (existingContacts.length > 0) {
+        console.log(`📥 Загрузка ${existingContacts.length} существующих контактов`);
+        companyAdditionalContactManager.loadAdditionalContacts(existingContacts);
+    } else {
+        console.log('📋 Нет существующих контактов для загрузки');
+    }
+
+    console.log('✅ Company Additional Contact Manager успешно инициализирован');
+    console.log('📋 Доступные типы контактов:', window.contactTypeChoices);
+    console.log('⚙️ Конфигурация коммуникации:', window.communicationConfig);
+}
+
 // Глобальная функция для показа тостов
 if (typeof window.showToast === 'undefined') {
     window.showToast = function(message, type = 'info', delay = 5000) {
@@ -0,0 +1,67 @@
+// ==================== СПРАВОЧНИКИ ФОРМ (company/reference_bundle.py) ====================
+// URL бандла берется из <meta name="reference-data-url"> ({% reference_data_meta %}).
+// В URL - хеш содержимого, ответ кешируется браузером навсегда: бандл
+// загружается один раз, пока справочники не изменятся.
+//
+// <select data-reference="countries"> заполняется вариантами из бандла;
+// выбранным остается значение, выведенное сервером, а если его нет -
+// option с текстом data-default-text.
+window.WWSReference = (function () {
+    let loading = null;
+
+    function getUrl() {
+        const meta = document.querySelector('meta[name="reference-data-url"]');
+        return meta ? meta.content : null;
+    }
+
+    function load() {
+        if (!loading) {
+            const url = getUrl();
+            loading = url
+                ? fetch(url, {credentials: 'same-origin'}).then(response => {
+                    if (!response.ok) {
+                        throw new Error(`HTTP ${response.status}`);
+                    }
+                    return response.json();
+                })
+                : Promise.reject(new Error('reference-data-url fehlt'));
+            // Неудачную загрузку можно повторить
+            loading.catch(() => { loading = null; });
+        }
+        return loading;
+    }
+
+    function fillSelect(select, choices) {
+        const current = select.value;
+        const defaultText = select.dataset.defaultText;
+        const fragment = document.createDocumentFragment();
+
+        fragment.appendChild(new Option('', ''));
+        choices.forEach(([value, text]) => {
+            const selected = current ? value === current : Boolean(defaultText) && text === defaultText;
+            fragment.appendChild(new Option(text, value, selected, selected));
+        });
+
+        select.replaceChildren(fragment);
+    }
+
+    // Заполняет все select[data-reference] внутри root; null - бандл не загрузился
+    // (select остаются с выбранным значением, которое вывел сервер)
+    function fillSelects(root) {
+        const selects = (root || document).querySelectorAll('select[data-reference]');
+        return load().then(data => {
+            selects.forEach(select => {
+                const choices = data.choices[select.dataset.reference];
+                if (choices) {
+                    fillSelect(select, choices);
+                }
+            });
+            return data;
+        }).catch(error => {
+            console.error('❌ Справочники не загружены:', error);
+            return null;
+        });
+    }
+
+    return {load, fillSelect, fillSelects};
+})();
@@ -1,4 +1,8 @@
 from django import template
+from django.conf import settings
+from django.urls import reverse
+from django.utils.html import format_html
+from company.reference_bundle import get_bundle_url
 from mongodb.mongodb_utils import MongoConnection
 from mongodb.mongodb_config import MongoConfig
 from loguru import logger
@@ -204,4 +208,28 @@ def country_display(country_code):
         'sonstige': 'Sonstige',
     }
 
-    return countries.get(country_code, country_code)
\ No newline at end of file
+    return countries.get(country_code, country_code)
+
+
+@register.simple_tag
+def company_api_url(name):
+    """URL API-эндпоинта компании: async-вариант, если включен COMPANY_ASYNC_API"""
+    if getattr(settings, 'COMPANY_ASYNC_API', False):
+        return reverse(f'company:{name}_async')
+    return reverse(f'company:{name}')
+
+
+@register.simple_tag
+def reference_data_meta():
+    """<meta> с URL бандла справочников для static/js/reference_data.js"""
+    return format_html('<meta name="reference-data-url" content="{}">', get_bundle_url())
+
+
+@register.filter
+def choice_label(bound_field):
+    """Подпись выбранного варианта ChoiceField (остальные варианты - из бандла справочников)"""
+    value = bound_field.value()
+    for choice_value, label in bound_field.field.choices:
+        if choice_value and str(choice_value) == str(value):
+            return label
+    return value or ''
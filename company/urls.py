@@ -44,4 +44,13 @@ urlpatterns = [
     path('api/get-plz-by-city/', views.get_plz_by_city, name='get_plz_by_city'),
     path('api/search-cities/', views.search_cities_autocomplete, name='search_cities_autocomplete'),
     path('api/search-plz/', views.search_plz_ajax, name='search_plz_ajax'),
-]
\ No newline at end of file
+    path('api/reference/<str:version>.json', views.reference_bundle, name='reference_bundle'),
+
+    # Async API (ASGI) - те же ответы, без блокировки потока на время запроса к MongoDB
+    path('api/async/get-city-by-plz/', views.get_city_by_plz_async, name='get_city_by_plz_async'),
+    path('api/async/get-plz-by-city/', views.get_plz_by_city_async, name='get_plz_by_city_async'),
+    path('api/async/search-cities/', views.search_cities_autocomplete_async, name='search_cities_autocomplete_async'),
+    path('api/async/search-plz/', views.search_plz_ajax_async, name='search_plz_ajax_async'),
+    path('api/async/stats/', views.company_stats_json_async, name='company_stats_json_async'),
+    path('api/async/status/', views.company_status_async, name='company_status_async'),
+]
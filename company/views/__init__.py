@@ -57,6 +57,19 @@ from .api_step3 import (
     search_plz_ajax
 )
 
+# Справочники форм (версионированный JSON)
+from .api_reference import reference_bundle
+
+# Async API (ASGI)
+from .api_async import (
+    company_stats_json_async,
+    company_status_async,
+    get_city_by_plz_async,
+    get_plz_by_city_async,
+    search_cities_autocomplete_async,
+    search_plz_ajax_async,
+)
+
 # Экспортируем все для удобства
 __all__ = [
     # Session
@@ -101,4 +114,15 @@ __all__ = [
     'get_plz_by_city',
     'search_cities_autocomplete',
     'search_plz_ajax',
+
+    # Reference data
+    'reference_bundle',
+
+    # Async API
+    'company_stats_json_async',
+    'company_status_async',
+    'get_city_by_plz_async',
+    'get_plz_by_city_async',
+    'search_cities_autocomplete_async',
+    'search_plz_ajax_async',
 ]
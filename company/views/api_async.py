@@ -0,0 +1,232 @@
+# ========== views/api_async.py - Async API endpoints (ASGI) ==========
+#
+# Асинхронные варианты частых I/O-эндпоинтов: автокомплит PLZ/городов
+# (api_step3.py) и JSON-статус компании (extra.py). Формы запросов и ответов
+# общие с синхронными views, поэтому ответы совпадают байт в байт.
+# Под ASGI-сервером (uvicorn WWS1.asgi:application) ожидание MongoDB
+# не занимает поток воркера.
+
+from django.conf import settings
+from django.views.decorators.http import require_http_methods
+from loguru import logger
+
+from mongodb import audit, stale_cache
+from mongodb.mongodb_async import AsyncMongoConnection
+from mongodb.mongodb_utils import MongoConnection
+from utils.http_cache import company_stats_etag, company_status_etag, conditional_view, reference_data_etag
+from utils.json_response import MongoJsonResponse
+
+from ..company_manager import COMPANY_ACTIVITY_DAYS, CompanyManager
+from .api_step3 import (
+    CITY_BY_PLZ_PROJECTION,
+    PLZ_BY_CITY_LIMIT,
+    PLZ_BY_CITY_PROJECTION,
+    PLZ_PAGE_SIZE,
+    PLZ_SEARCH_PROJECTION,
+    build_cities_autocomplete_pipeline,
+    build_cities_autocomplete_response,
+    build_city_by_plz_filter,
+    build_city_by_plz_response,
+    build_plz_by_city_filter,
+    build_plz_by_city_response,
+    build_plz_search_filter,
+    build_plz_search_response,
+)
+
+
+async def _get_collection(suffix):
+    """Async-коллекция {db_name}_{suffix} или None, если MongoDB недоступна"""
+    db = await AsyncMongoConnection.get_database()
+    if db is None:
+        return None
+    return db[f"{db.name}_{suffix}"]
+
+
+# ==================== PLZ / ГОРОДА ====================
+
+@require_http_methods(["GET"])
+async def search_plz_ajax_async(request):
+    """API (async): AJAX поиск PLZ для Select2"""
+    query = request.GET.get('q', '').strip()
+    page = int(request.GET.get('page', 1))
+
+    try:
+        plz_collection = await _get_collection('basic_address')
+        if plz_collection is None:
+            return MongoJsonResponse({'results': [], 'pagination': {'more': False}})
+
+        search_filter = build_plz_search_filter(query)
+        skip = (page - 1) * PLZ_PAGE_SIZE
+
+        plz_docs = await plz_collection.find(
+            search_filter,
+            PLZ_SEARCH_PROJECTION
+        ).sort('plz_code', 1).skip(skip).limit(PLZ_PAGE_SIZE).to_list()
+
+        total_count = await plz_collection.count_documents(search_filter)
+
+        return MongoJsonResponse(build_plz_search_response(plz_docs, page, total_count))
+
+    except Exception as e:
+        logger.error(f"Ошибка async AJAX поиска PLZ: {e}")
+        return MongoJsonResponse({'results': [], 'pagination': {'more': False}})
+
+
+@require_http_methods(["GET"])
+@conditional_view(reference_data_etag, public=True, max_age=settings.REFERENCE_HTTP_MAX_AGE)
+async def get_city_by_plz_async(request):
+    """API (async): получение города по PLZ"""
+    plz_code = request.GET.get('plz', '').strip()
+
+    if not plz_code:
+        return MongoJsonResponse({'error': 'PLZ не указан'}, status=400)
+
+    try:
+        plz_collection = await _get_collection('basic_address')
+        if plz_collection is None:
+            return MongoJsonResponse({'error': 'MongoDB not available'}, status=503)
+
+        plz_doc = await plz_collection.find_one(
+            build_city_by_plz_filter(plz_code),
+            CITY_BY_PLZ_PROJECTION
+        )
+
+        if plz_doc:
+            return MongoJsonResponse(build_city_by_plz_response(plz_doc))
+        return MongoJsonResponse({'error': 'PLZ nicht gefunden'}, status=404)
+
+    except Exception as e:
+        logger.error(f"Ошибка async получения города по PLZ: {e}")
+        return MongoJsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+@conditional_view(reference_data_etag, public=True, max_age=settings.REFERENCE_HTTP_MAX_AGE)
+async def get_plz_by_city_async(request):
+    """API (async): получение списка PLZ по названию города"""
+    city_name = request.GET.get('city', '').strip()
+
+    if not city_name or len(city_name) < 2:
+        return MongoJsonResponse({'error': 'Минимум 2 символа для поиска'}, status=400)
+
+    try:
+        plz_collection = await _get_collection('basic_address')
+        if plz_collection is None:
+            return MongoJsonResponse({'error': 'MongoDB not available'}, status=503)
+
+        plz_docs = await plz_collection.find(
+            build_plz_by_city_filter(city_name),
+            PLZ_BY_CITY_PROJECTION
+        ).sort('plz_code', 1).limit(PLZ_BY_CITY_LIMIT).to_list()
+
+        return MongoJsonResponse(build_plz_by_city_response(plz_docs))
+
+    except Exception as e:
+        logger.error(f"Ошибка async получения PLZ по городу: {e}")
+        return MongoJsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+async def search_cities_autocomplete_async(request):
+    """API (async): автокомплит для поиска городов (для datalist)"""
+    query = request.GET.get('q', '').strip()
+
+    if not query or len(query) < 2:
+        return MongoJsonResponse({'cities': []})
+
+    try:
+        plz_collection = await _get_collection('basic_address')
+        if plz_collection is None:
+            return MongoJsonResponse({'cities': []})
+
+        cursor = await plz_collection.aggregate(build_cities_autocomplete_pipeline(query))
+        cities = build_cities_autocomplete_response([doc async for doc in cursor])
+
+        return MongoJsonResponse({'cities': cities})
+
+    except Exception as e:
+        logger.error(f"Ошибка async автокомплита городов: {e}")
+        return MongoJsonResponse({'cities': []})
+
+
+# ==================== СТАТУС / СТАТИСТИКА КОМПАНИИ ====================
+
+@require_http_methods(["GET"])
+@conditional_view(company_stats_etag, public=True, no_cache=True)
+async def company_stats_json_async(request):
+    """API (async): статистика компании в JSON формате"""
+    try:
+        collection = await _get_collection('company_info')
+        if collection is None:
+            return MongoJsonResponse({'error': 'MongoDB not available'}, status=500)
+
+        company = await collection.find_one({'type': 'company_info'})
+        if company is None:
+            return MongoJsonResponse({'error': 'No company found'}, status=404)
+
+        stats = CompanyManager.compute_company_stats(company)
+
+        since, until = audit.window(audit.DAY, COMPANY_ACTIVITY_DAYS)
+        rollups_collection = await _get_collection(audit.ROLLUPS_SUFFIX)
+        rollups = []
+        if rollups_collection is not None:
+            rollups = await rollups_collection.find(
+                audit.rollup_filter(audit.DAY, since, until), {'counts': 1}
+            ).to_list()
+        stats['activity'] = CompanyManager.compute_company_activity(rollups, since, until)
+
+        # datetime кодирует MongoJsonResponse (ISO 8601)
+        return MongoJsonResponse(stats)
+
+    except Exception as e:
+        logger.error(f"Ошибка async статистики компании: {e}")
+        return MongoJsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+@conditional_view(company_status_etag, public=True, no_cache=True)
+async def company_status_async(request):
+    """
+    API (async): есть ли зарегистрированная компания.
+    В отличие от синхронного company_status не создает отдельный
+    MongoClient для ping: доступность определяет общий circuit breaker
+    и пул AsyncMongoConnection.
+    """
+    circuit_state = MongoConnection.get_circuit_status()['state']
+    collection = None
+
+    config = await AsyncMongoConnection.read_config()
+    if config.get('setup_completed'):
+        try:
+            collection = await _get_collection('company_info')
+        except Exception as e:
+            logger.error(f"Ошибка async проверки статуса компании: {e}")
+
+    if collection is None:
+        # Во время сбоя отдаем последнее известное название компании
+        stale_header = stale_cache.recall('company_header')
+        return MongoJsonResponse({
+            'has_company': False,
+            'mongodb_available': False,
+            'mongodb_circuit': circuit_state,
+            'company_name': stale_header['company_name'] if stale_header else None,
+            'stale': stale_header is not None,
+            'error': 'MongoDB not configured'
+        })
+
+    try:
+        company = await collection.find_one(
+            {'type': 'company_info'},
+            {'company_name': 1, 'is_primary': 1}
+        )
+    except Exception as e:
+        logger.error(f"Ошибка async проверки статуса компании: {e}")
+        company = None
+
+    return MongoJsonResponse({
+        'has_company': company is not None,
+        'mongodb_available': True,
+        'mongodb_circuit': circuit_state,
+        'company_name': company.get('company_name') if company else None,
+        'is_primary': company.get('is_primary', True) if company else None
+    })
@@ -0,0 +1,31 @@
+# ========== views/api_reference.py - Справочники форм одним JSON ==========
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+from ..reference_bundle import get_bundle
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+@require_safe
+def reference_bundle(request, version):
+    """
+    Бандл справочников (company/reference_bundle.py). URL с текущей версией
+    кешируется навсегда; устаревшая версия (страница открыта до изменения
+    справочника или воркер еще не узнал о новой версии) получает текущее
+    содержимое без долгого кеширования - без редиректа, чтобы воркеры с
+    разными версиями не отправляли браузер друг к другу по кругу.
+    """
+    bundle = get_bundle()
+    etag = f'"{bundle.version}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(bundle.content, content_type='application/json')
+    if version == bundle.version:
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    response.headers['ETag'] = etag
+    return response
@@ -1,18 +1,181 @@
 # ========== views/step3.py - API endpoints ==========
 
-from django.http import JsonResponse
+from django.conf import settings
 from mongodb.mongodb_utils import MongoConnection
 from mongodb.mongodb_config import MongoConfig
+from mongodb import reference_snapshot
+from utils.http_cache import conditional_view, reference_data_etag
+from utils.json_response import MongoJsonResponse
 from loguru import logger
 
+PLZ_PAGE_SIZE = 30  # Результатов на страницу
+PLZ_BY_CITY_LIMIT = 50
+CITIES_AUTOCOMPLETE_LIMIT = 20
+
+# Те же строки, что попадают в снимок справочников (reference_snapshot._load_table_rows):
+# ответ не должен зависеть от того, готов ли снимок
+PLZ_ACTIVE_FILTER = {'deleted': {'$ne': True}, 'active': {'$ne': False}}
+
+
+# ==================== ОБЩИЕ ФОРМЫ ЗАПРОСОВ (sync + async) ====================
+
+def build_plz_search_filter(query):
+    """Фильтр поиска PLZ по коду или названию города"""
+    if query:
+        return {
+            '$or': [
+                {'plz_code': {'$regex': f'^{query}', '$options': 'i'}},
+                {'plz_name': {'$regex': query, '$options': 'i'}}
+            ],
+            **PLZ_ACTIVE_FILTER
+        }
+    return dict(PLZ_ACTIVE_FILTER)
+
+
+def build_plz_search_response(plz_docs, page, total_count):
+    """Ответ в формате Select2"""
+    results = []
+    for plz_doc in plz_docs:
+        results.append({
+            'id': plz_doc.get('plz_code', ''),
+            'text': plz_doc.get('plz_name_long', '')
+        })
+
+    return {
+        'results': results,
+        'pagination': {
+            'more': (page * PLZ_PAGE_SIZE) < total_count
+        }
+    }
+
+
+def build_city_by_plz_filter(plz_code):
+    return {'plz_code': plz_code, **PLZ_ACTIVE_FILTER}
+
+
+def build_city_by_plz_response(plz_doc):
+    return {
+        'success': True,
+        'city': plz_doc.get('plz_name', ''),
+        'district': plz_doc.get('krs_name', ''),
+        'state': plz_doc.get('lan_name', '')
+    }
+
+
+def build_plz_by_city_filter(city_name):
+    # Ищем города, содержащие введенный текст (регистронезависимый поиск)
+    return {
+        'plz_name': {'$regex': city_name, '$options': 'i'},
+        **PLZ_ACTIVE_FILTER
+    }
+
+
+def build_plz_by_city_response(plz_docs):
+    results = []
+    for plz_doc in plz_docs:
+        results.append({
+            'plz_code': plz_doc.get('plz_code', ''),
+            'plz_name': plz_doc.get('plz_name', ''),
+            'plz_name_long': plz_doc.get('plz_name_long', '')
+        })
+
+    if results:
+        return {
+            'success': True,
+            'count': len(results),
+            'results': results
+        }
+    return {
+        'success': False,
+        'message': 'Keine Städte gefunden'
+    }
+
+
+def build_cities_autocomplete_pipeline(query):
+    """Уникальные названия городов с наименьшим PLZ (порядок - build_cities_autocomplete_response)"""
+    return [
+        {
+            '$match': {
+                'plz_name': {'$regex': f'^{query}', '$options': 'i'},
+                **PLZ_ACTIVE_FILTER
+            }
+        },
+        {
+            '$group': {
+                '_id': '$plz_name',
+                'plz_code': {'$min': '$plz_code'}
+            }
+        },
+    ]
+
+
+def build_cities_autocomplete_response(city_docs):
+    """
+    Названия городов как в снимке (_derive_plz_cities): без учета регистра
+    (casefold), из вариантов написания - у наименьшего PLZ, по алфавиту casefold
+    """
+    cities = {}
+    for doc in sorted(city_docs, key=lambda doc: doc.get('plz_code') or ''):
+        name = (doc.get('_id') or '').strip()
+        if name:
+            cities.setdefault(name.casefold(), name)
+    return [cities[key] for key in sorted(cities)][:CITIES_AUTOCOMPLETE_LIMIT]
+
+
+PLZ_SEARCH_PROJECTION = {'plz_code': 1, 'plz_name_long': 1}
+CITY_BY_PLZ_PROJECTION = {'plz_name': 1, 'krs_name': 1, 'lan_name': 1}
+PLZ_BY_CITY_PROJECTION = {'plz_code': 1, 'plz_name': 1, 'plz_name_long': 1}
+
+
+# ==================== СНИМОК СПРАВОЧНИКОВ (mmap) ====================
+# Если снимок справочников готов (mongodb/reference_snapshot.py), точные и
+# префиксные запросы обслуживаются из общей памяти без обращения к MongoDB.
+# Поиск по подстроке названия города по-прежнему выполняет MongoDB.
+
+def search_plz_in_snapshot(snapshot, query, page):
+    """Поиск PLZ по префиксу кода; None - запрос должен выполнить MongoDB"""
+    table = snapshot.table('plz')
+    if table is None or (query and not query.isdigit()):
+        return None
+
+    start, stop = table.prefix_range(query)
+    skip = start + (page - 1) * PLZ_PAGE_SIZE
+    plz_docs = table.rows(skip, min(skip + PLZ_PAGE_SIZE, stop))
+    return build_plz_search_response(plz_docs, page, stop - start)
+
+
+def find_city_in_snapshot(snapshot, plz_code):
+    """(найден ли снимок, документ PLZ или None)"""
+    table = snapshot.table('plz')
+    if table is None:
+        return False, None
+    return True, table.find(plz_code)
+
+
+def search_cities_in_snapshot(snapshot, query):
+    table = snapshot.table('plz_cities')
+    if table is None:
+        return None
+
+    start, stop = table.prefix_range(query.casefold())
+    stop = min(stop, start + CITIES_AUTOCOMPLETE_LIMIT)
+    return [table.cell(row, 1) for row in range(start, stop)]
+
+
+# ==================== SYNC VIEWS ====================
 
 def search_plz_ajax(request):
     """API: AJAX поиск PLZ для Select2"""
     query = request.GET.get('q', '').strip()
     page = int(request.GET.get('page', 1))
-    page_size = 30  # Результатов на страницу
 
     try:
+        snapshot = reference_snapshot.get_snapshot()
+        if snapshot is not None:
+            response = search_plz_in_snapshot(snapshot, query, page)
+            if response is not None:
+                return MongoJsonResponse(response)
+
         db = MongoConnection.get_database()
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
@@ -20,55 +183,43 @@ def search_plz_ajax(request):
         plz_collection = db[f"{db_name}_basic_address"]
 
         # Поиск по PLZ коду или названию города
-        if query:
-            search_filter = {
-                '$or': [
-                    {'plz_code': {'$regex': f'^{query}', '$options': 'i'}},
-                    {'plz_name': {'$regex': query, '$options': 'i'}}
-                ],
-                'deleted': {'$ne': True}
-            }
-        else:
-            search_filter = {'deleted': {'$ne': True}}
+        search_filter = build_plz_search_filter(query)
 
         # Пагинация
-        skip = (page - 1) * page_size
+        skip = (page - 1) * PLZ_PAGE_SIZE
 
         plz_cursor = plz_collection.find(
             search_filter,
-            {'plz_code': 1, 'plz_name_long': 1}
-        ).sort('plz_code', 1).skip(skip).limit(page_size)
+            PLZ_SEARCH_PROJECTION
+        ).sort('plz_code', 1).skip(skip).limit(PLZ_PAGE_SIZE)
 
         # Подсчет общего количества
         total_count = plz_collection.count_documents(search_filter)
 
-        results = []
-        for plz_doc in plz_cursor:
-            results.append({
-                'id': plz_doc.get('plz_code', ''),
-                'text': plz_doc.get('plz_name_long', '')
-            })
-
-        return JsonResponse({
-            'results': results,
-            'pagination': {
-                'more': (page * page_size) < total_count
-            }
-        })
+        return MongoJsonResponse(build_plz_search_response(plz_cursor, page, total_count))
 
     except Exception as e:
         logger.error(f"Ошибка AJAX поиска PLZ: {e}")
-        return JsonResponse({'results': [], 'pagination': {'more': False}})
+        return MongoJsonResponse({'results': [], 'pagination': {'more': False}})
 
 
+@conditional_view(reference_data_etag, public=True, max_age=settings.REFERENCE_HTTP_MAX_AGE)
 def get_city_by_plz(request):
     """API: получение города по PLZ"""
     plz_code = request.GET.get('plz', '').strip()
 
     if not plz_code:
-        return JsonResponse({'error': 'PLZ не указан'}, status=400)
+        return MongoJsonResponse({'error': 'PLZ не указан'}, status=400)
 
     try:
+        snapshot = reference_snapshot.get_snapshot()
+        if snapshot is not None:
+            has_table, plz_doc = find_city_in_snapshot(snapshot, plz_code)
+            if has_table:
+                if plz_doc:
+                    return MongoJsonResponse(build_city_by_plz_response(plz_doc))
+                return MongoJsonResponse({'error': 'PLZ nicht gefunden'}, status=404)
+
         db = MongoConnection.get_database()
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
@@ -76,31 +227,27 @@ def get_city_by_plz(request):
         plz_collection = db[f"{db_name}_basic_address"]
 
         plz_doc = plz_collection.find_one(
-            {'plz_code': plz_code, 'deleted': {'$ne': True}},
-            {'plz_name': 1, 'krs_name': 1, 'lan_name': 1}
+            build_city_by_plz_filter(plz_code),
+            CITY_BY_PLZ_PROJECTION
         )
 
         if plz_doc:
-            return JsonResponse({
-                'success': True,
-                'city': plz_doc.get('plz_name', ''),
-                'district': plz_doc.get('krs_name', ''),
-                'state': plz_doc.get('lan_name', '')
-            })
+            return MongoJsonResponse(build_city_by_plz_response(plz_doc))
         else:
-            return JsonResponse({'error': 'PLZ nicht gefunden'}, status=404)
+            return MongoJsonResponse({'error': 'PLZ nicht gefunden'}, status=404)
 
     except Exception as e:
         logger.error(f"Ошибка получения города по PLZ: {e}")
-        return JsonResponse({'error': str(e)}, status=500)
+        return MongoJsonResponse({'error': str(e)}, status=500)
 
 
+@conditional_view(reference_data_etag, public=True, max_age=settings.REFERENCE_HTTP_MAX_AGE)
 def get_plz_by_city(request):
     """API: получение списка PLZ по названию города"""
     city_name = request.GET.get('city', '').strip()
 
     if not city_name or len(city_name) < 2:
-        return JsonResponse({'error': 'Минимум 2 символа для поиска'}, status=400)
+        return MongoJsonResponse({'error': 'Минимум 2 символа для поиска'}, status=400)
 
     try:
         db = MongoConnection.get_database()
@@ -109,38 +256,16 @@ def get_plz_by_city(request):
 
         plz_collection = db[f"{db_name}_basic_address"]
 
-        # Ищем города, содержащие введенный текст (регистронезависимый поиск)
         plz_cursor = plz_collection.find(
-            {
-                'plz_name': {'$regex': city_name, '$options': 'i'},
-                'deleted': {'$ne': True}
-            },
-            {'plz_code': 1, 'plz_name': 1, 'plz_name_long': 1}
-        ).sort('plz_code', 1).limit(50)  # Ограничиваем результаты
-
-        results = []
-        for plz_doc in plz_cursor:
-            results.append({
-                'plz_code': plz_doc.get('plz_code', ''),
-                'plz_name': plz_doc.get('plz_name', ''),
-                'plz_name_long': plz_doc.get('plz_name_long', '')
-            })
-
-        if results:
-            return JsonResponse({
-                'success': True,
-                'count': len(results),
-                'results': results
-            })
-        else:
-            return JsonResponse({
-                'success': False,
-                'message': 'Keine Städte gefunden'
-            })
+            build_plz_by_city_filter(city_name),
+            PLZ_BY_CITY_PROJECTION
+        ).sort('plz_code', 1).limit(PLZ_BY_CITY_LIMIT)  # Ограничиваем результаты
+
+        return MongoJsonResponse(build_plz_by_city_response(plz_cursor))
 
     except Exception as e:
         logger.error(f"Ошибка получения PLZ по городу: {e}")
-        return JsonResponse({'error': str(e)}, status=500)
+        return MongoJsonResponse({'error': str(e)}, status=500)
 
 
 def search_cities_autocomplete(request):
@@ -148,38 +273,26 @@ def search_cities_autocomplete(request):
     query = request.GET.get('q', '').strip()
 
     if not query or len(query) < 2:
-        return JsonResponse({'cities': []})
+        return MongoJsonResponse({'cities': []})
 
     try:
+        snapshot = reference_snapshot.get_snapshot()
+        if snapshot is not None:
+            cities = search_cities_in_snapshot(snapshot, query)
+            if cities is not None:
+                return MongoJsonResponse({'cities': cities})
+
         db = MongoConnection.get_database()
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
 
         plz_collection = db[f"{db_name}_basic_address"]
 
-        # Получаем уникальные названия городов
-        pipeline = [
-            {
-                '$match': {
-                    'plz_name': {'$regex': f'^{query}', '$options': 'i'},
-                    'deleted': {'$ne': True}
-                }
-            },
-            {
-                '$group': {
-                    '_id': '$plz_name',
-                    'count': {'$sum': 1}
-                }
-            },
-            {'$sort': {'_id': 1}},
-            {'$limit': 20}
-        ]
-
-        result = plz_collection.aggregate(pipeline)
-        cities = [doc['_id'] for doc in result]
-
-        return JsonResponse({'cities': cities})
+        result = plz_collection.aggregate(build_cities_autocomplete_pipeline(query))
+        cities = build_cities_autocomplete_response(result)
+
+        return MongoJsonResponse({'cities': cities})
 
     except Exception as e:
         logger.error(f"Ошибка автокомплита городов: {e}")
-        return JsonResponse({'cities': []})
+        return MongoJsonResponse({'cities': []})
@@ -1,21 +1,23 @@
 import json
 
+from django.conf import settings
 from django.contrib import messages
 from django.shortcuts import redirect, render
+from django.utils.functional import SimpleLazyObject
 from django.views.decorators.http import require_http_methods
 from loguru import logger
 
+from mongodb import cache_bus
+from mongodb.cache_bus import company_cache
 from mongodb.mongodb_utils import MongoConnection
 from mongodb.mongodb_config import MongoConfig
+from utils.fragment_cache import mark_degraded
+from utils.http_cache import conditional_view, version_etag
 
 from ..company_manager import CompanyManager
 from .session import CompanySessionManager
 from ..company_utils import check_mongodb_availability
 
-from company.forms.utils import (
-    get_communication_types_from_mongodb,
-    get_communication_config_from_mongodb
-)
 import json
 
 def get_display_value_from_db(collection_name, code_field, code_value, name_field='name'):
@@ -189,6 +191,14 @@ def get_account_type_display(code):
     return account_types.get(code, code)
 
 
+def format_iban(iban):
+    """IBAN для отображения: без пробелов, заглавными, группами по 4 символа"""
+    iban = iban.replace(' ', '').upper()
+    if len(iban) < 4:
+        return iban
+    return ' '.join([iban[i:i + 4] for i in range(0, len(iban), 4)])
+
+
 def enrich_company_data(company):
     """Обогащает данные компании человекочитаемыми названиями - ОБНОВЛЕНО с банковскими данными"""
     if not company:
@@ -225,36 +235,17 @@ def enrich_company_data(company):
 
     # Форматируем IBAN для отображения (с пробелами)
     if company.get('iban'):
-        iban = company['iban'].replace(' ', '').upper()
-        if len(iban) >= 4:
-            formatted_iban = ' '.join([iban[i:i + 4] for i in range(0, len(iban), 4)])
-            enriched['iban_formatted'] = formatted_iban
-        else:
-            enriched['iban_formatted'] = iban
+        enriched['iban_formatted'] = format_iban(company['iban'])
 
     if company.get('secondary_iban'):
-        iban = company['secondary_iban'].replace(' ', '').upper()
-        if len(iban) >= 4:
-            formatted_iban = ' '.join([iban[i:i + 4] for i in range(0, len(iban), 4)])
-            enriched['secondary_iban_formatted'] = formatted_iban
-        else:
-            enriched['secondary_iban_formatted'] = iban
+        enriched['secondary_iban_formatted'] = format_iban(company['secondary_iban'])
 
     return enriched
 
 
-def company_info(request):
-    """Показывает информацию о компании с человекочитаемыми названиями - ОБНОВЛЕНО с банковскими данными"""
-    if not check_mongodb_availability():
-        messages.error(request, "MongoDB muss zuerst konfiguriert werden")
-        return redirect('home')
-
-    company_manager = CompanyManager()
-    company = company_manager.get_company()
-
-    if not company:
-        messages.warning(request, "Noch keine Firma registriert")
-        return redirect('company:register_company_step1')
+def get_company_info_sections(company_manager):
+    """Данные разделов страницы компании: обогащенная компания, контакты, статистика"""
+    company = company_manager.get_company() or {}
 
     # Обогащаем данные компании
     company = enrich_company_data(company)
@@ -262,6 +253,10 @@ def company_info(request):
     # Получаем статистику
     stats = company_manager.get_company_stats()
 
+    # Компания или статистика не прочитаны (сбой MongoDB) - разделы не кешируем
+    if not company or stats is None:
+        mark_degraded()
+
     # Обрабатываем дополнительные контакты для отображения
     additional_contacts = []
     contacts_data = company.get('additional_contacts_data', '[]')
@@ -282,12 +277,55 @@ def company_info(request):
         company.get('secondary_iban')
     ])
 
-    context = {
+    return {
         'company': company,
         'additional_contacts': additional_contacts,
         'stats': stats,
         'has_banking_data': has_banking_data  # НОВОЕ
     }
+
+
+def company_info_etag(request):
+    """
+    Страница компании зависит от данных компании и справочников, а шапка -
+    от пользователя, его CSRF-токена и статистики пользователей. Пока в
+    сессии есть непоказанные сообщения, 304 не отдаем - они бы потерялись.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    return version_etag(
+        (cache_bus.COMPANY, cache_bus.REFERENCE, cache_bus.USERS, cache_bus.CONFIG),
+        request.session.get('username', ''),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        MongoConnection.get_circuit_status()['state'],
+    )
+
+
+@conditional_view(company_info_etag, private=True, no_cache=True)
+def company_info(request):
+    """Показывает информацию о компании с человекочитаемыми названиями - ОБНОВЛЕНО с банковскими данными"""
+    if not check_mongodb_availability():
+        messages.error(request, "MongoDB muss zuerst konfiguriert werden")
+        return redirect('home')
+
+    company_manager = CompanyManager()
+
+    # Наличие компании кешируется до ее записи (как в get_system_info)
+    if not company_cache.get('has_company'):
+        if not company_manager.has_company():
+            messages.warning(request, "Noch keine Firma registriert")
+            return redirect('company:register_company_step1')
+        company_cache.set('has_company', True)
+
+    # Данные читаются лениво: если разделы взяты из кеша фрагментов
+    # (utils/fragment_cache.py), MongoDB не запрашивается
+    sections = SimpleLazyObject(lambda: get_company_info_sections(company_manager))
+    context = {
+        'company': SimpleLazyObject(lambda: sections['company']),
+        'additional_contacts': SimpleLazyObject(lambda: sections['additional_contacts']),
+        'stats': SimpleLazyObject(lambda: sections['stats']),
+        'has_banking_data': SimpleLazyObject(lambda: sections['has_banking_data']),  # НОВОЕ
+    }
     return render(request, 'company_info.html', context)
 
 
@@ -450,10 +488,6 @@ def edit_company_step4(request):
         messages.warning(request, "Keine Firma zum Bearbeiten gefunden")
         return redirect('company:register_company_step1')
 
-    # Загружаем типы контактов и конфигурацию из MongoDB
-    contact_type_choices = get_communication_types_from_mongodb()
-    communication_config = get_communication_config_from_mongodb()
-
     # ✅ ИСПРАВЛЕНО: Правильная обработка дополнительных контактов из MongoDB
     additional_contacts_data = company.get('additional_contacts_data', '[]')
 
@@ -484,15 +518,6 @@ def edit_company_step4(request):
                     cleaned_contact[key] = value
             cleaned_contacts.append(cleaned_contact)
 
-    # Преобразуем choices в JSON для JavaScript
-    contact_type_choices_json = json.dumps([
-        {'value': choice[0], 'text': choice[1]}
-        for choice in contact_type_choices
-    ], ensure_ascii=False)
-
-    # Преобразуем конфигурацию в JSON
-    communication_config_json = json.dumps(communication_config, ensure_ascii=False)
-
     # ✅ ИСПРАВЛЕНО: Преобразуем очищенные контакты в JSON
     existing_additional_contacts_json = json.dumps(cleaned_contacts, ensure_ascii=False)
 
@@ -520,8 +545,6 @@ def edit_company_step4(request):
     logger.info(f"Редактирование шага 4 (Kontaktdaten) для компании '{company.get('company_name')}'")
 
     # ✅ ИСПРАВЛЕНО: Сохраняем во временной сессии для передачи в шаблон
-    request.session['_temp_contact_type_choices_json'] = contact_type_choices_json
-    request.session['_temp_communication_config_json'] = communication_config_json
     request.session['_temp_existing_additional_contacts'] = existing_additional_contacts_json
     request.session.modified = True
 
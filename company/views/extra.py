@@ -2,41 +2,51 @@ import datetime
 import json
 
 from django.contrib import messages
-from django.http import JsonResponse, Http404
+from django.http import Http404
 from django.views.decorators.http import require_http_methods
 from loguru import logger
 
+from mongodb import stale_cache
+from mongodb.mongodb_utils import MongoConnection
+from utils.http_cache import company_data_etag, company_stats_etag, company_status_etag, conditional_view
+from utils.json_response import MongoJsonResponse
+
 from ..company_manager import CompanyManager
 from ..company_utils import check_mongodb_availability
 
 
 @require_http_methods(["GET"])
+@conditional_view(company_stats_etag, public=True, no_cache=True)
 def company_stats_json(request):
     """API endpoint для получения статистики компании в JSON формате"""
     if not check_mongodb_availability():
-        return JsonResponse({'error': 'MongoDB not available'}, status=500)
+        return MongoJsonResponse({'error': 'MongoDB not available'}, status=500)
 
     company_manager = CompanyManager()
     stats = company_manager.get_company_stats()
 
     if stats is None:
-        return JsonResponse({'error': 'No company found'}, status=404)
+        return MongoJsonResponse({'error': 'No company found'}, status=404)
 
-    # Конвертируем datetime объекты в строки
-    if stats.get('created_at'):
-        stats['created_at'] = stats['created_at'].isoformat()
-    if stats.get('modified_at'):
-        stats['modified_at'] = stats['modified_at'].isoformat()
+    # Активность - из счетчиков журнала (mongodb/audit.py), O(дней), а не O(событий)
+    stats['activity'] = company_manager.get_company_activity()
 
-    return JsonResponse(stats)
+    # datetime кодирует MongoJsonResponse (ISO 8601)
+    return MongoJsonResponse(stats)
 
 @require_http_methods(["GET"])
+@conditional_view(company_status_etag, public=True, no_cache=True)
 def company_status(request):
     """Проверяет статус компании (есть ли зарегистрированная компания)"""
     if not check_mongodb_availability():
-        return JsonResponse({
+        # Во время сбоя отдаем последнее известное название компании
+        stale_header = stale_cache.recall('company_header')
+        return MongoJsonResponse({
             'has_company': False,
             'mongodb_available': False,
+            'mongodb_circuit': MongoConnection.get_circuit_status()['state'],
+            'company_name': stale_header['company_name'] if stale_header else None,
+            'stale': stale_header is not None,
             'error': 'MongoDB not configured'
         })
 
@@ -44,9 +54,10 @@ def company_status(request):
     has_company = company_manager.has_company()
     company = company_manager.get_company() if has_company else None
 
-    return JsonResponse({
+    return MongoJsonResponse({
         'has_company': has_company,
         'mongodb_available': True,
+        'mongodb_circuit': MongoConnection.get_circuit_status()['state'],
         'company_name': company.get('company_name') if company else None,
         'is_primary': company.get('is_primary', True) if company else None
     })
@@ -60,66 +71,40 @@ def debug_company_data(request):
         raise Http404("Not available in production")
 
     if not check_mongodb_availability():
-        return JsonResponse({'error': 'MongoDB not available'}, status=500)
+        return MongoJsonResponse({'error': 'MongoDB not available'}, status=500)
 
     company_manager = CompanyManager()
     company = company_manager.get_company()
 
     if not company:
-        return JsonResponse({'error': 'No company found'}, status=404)
-
-    # Конвертируем ObjectId и datetime в строки для JSON
-    def serialize_mongo_data(obj):
-        if hasattr(obj, '__dict__'):
-            return obj.__dict__
-        elif isinstance(obj, datetime.datetime):
-            return obj.isoformat()
-        elif hasattr(obj, '__str__'):
-            return str(obj)
-        return obj
-
-    # Безопасно сериализуем данные
-    safe_company = {}
-    for key, value in company.items():
-        if key == '_id':
-            safe_company[key] = str(value)
-        elif isinstance(value, datetime.datetime):
-            safe_company[key] = value.isoformat()
-        else:
-            safe_company[key] = value
+        return MongoJsonResponse({'error': 'No company found'}, status=404)
 
-    return JsonResponse({
-        'company_data': safe_company,
+    return MongoJsonResponse({
+        'company_data': company,
         'stats': company_manager.get_company_stats(),
         'collection_name': company_manager.company_collection_name,
         'debug_info': {
             'mongodb_available': True,
             'collection_exists': company_manager.get_collection() is not None
         }
-    }, indent=2)
+    }, indent=True)
 
 @require_http_methods(["GET"])
+@conditional_view(company_data_etag, private=True, no_cache=True)
 def export_company_data(request):
     """Экспорт данных компании в JSON формате"""
     if not check_mongodb_availability():
-        return JsonResponse({'error': 'MongoDB not available'}, status=500)
+        return MongoJsonResponse({'error': 'MongoDB not available'}, status=500)
 
     company_manager = CompanyManager()
     company = company_manager.get_company()
 
     if not company:
-        return JsonResponse({'error': 'No company found'}, status=404)
+        return MongoJsonResponse({'error': 'No company found'}, status=404)
 
     try:
-        # Подготавливаем данные для экспорта
-        export_data = {}
-        for key, value in company.items():
-            if key == '_id':
-                export_data[key] = str(value)
-            elif isinstance(value, datetime.datetime):
-                export_data[key] = value.isoformat()
-            else:
-                export_data[key] = value
+        # Документ экспортируется как есть: ObjectId и datetime кодирует MongoJsonResponse
+        export_data = company
 
         # Добавляем метаданные экспорта
         export_data['export_metadata'] = {
@@ -128,7 +113,7 @@ def export_company_data(request):
             'system_info': 'Company Registration System'
         }
 
-        response = JsonResponse(export_data, json_dumps_params={'indent': 2})
+        response = MongoJsonResponse(export_data, indent=True)
         response['Content-Disposition'] = f'attachment; filename="company_data_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}.json"'
 
         logger.info(f"Экспорт данных компании '{company.get('company_name', 'Unknown')}'")
@@ -136,7 +121,7 @@ def export_company_data(request):
 
     except Exception as e:
         logger.error(f"Ошибка экспорта данных компании: {e}")
-        return JsonResponse({'error': 'Export failed'}, status=500)
+        return MongoJsonResponse({'error': 'Export failed'}, status=500)
 
 
 @require_http_methods(["POST"])
@@ -144,7 +129,7 @@ def import_company_data(request):
     """Импорт данных компании из JSON (для восстановления/миграции)"""
     if not check_mongodb_availability():
         messages.error(request, "MongoDB muss zuerst konfiguriert werden")
-        return JsonResponse({'error': 'MongoDB not available'}, status=500)
+        return MongoJsonResponse({'error': 'MongoDB not available'}, status=500)
 
     try:
         # Получаем JSON данные из запроса
@@ -154,14 +139,14 @@ def import_company_data(request):
             # Попытка получить из form data
             json_data = request.POST.get('company_data')
             if not json_data:
-                return JsonResponse({'error': 'No data provided'}, status=400)
+                return MongoJsonResponse({'error': 'No data provided'}, status=400)
             import_data = json.loads(json_data)
 
         # Валидируем обязательные поля
         required_fields = ['company_name', 'legal_form']
         for field in required_fields:
             if field not in import_data:
-                return JsonResponse({'error': f'Missing required field: {field}'}, status=400)
+                return MongoJsonResponse({'error': f'Missing required field: {field}'}, status=400)
 
         # Очищаем служебные поля импорта
         excluded_fields = {'_id', 'export_metadata', 'created_at', 'modified_at'}
@@ -172,13 +157,13 @@ def import_company_data(request):
         if company_manager.create_or_update_company(clean_data):
             logger.success(f"Импорт данных компании '{clean_data['company_name']}' успешен")
             messages.success(request, f"Daten für Firma '{clean_data['company_name']}' erfolgreich importiert")
-            return JsonResponse({'success': True, 'message': 'Import successful'})
+            return MongoJsonResponse({'success': True, 'message': 'Import successful'})
         else:
-            return JsonResponse({'error': 'Failed to save imported data'}, status=500)
+            return MongoJsonResponse({'error': 'Failed to save imported data'}, status=500)
 
     except json.JSONDecodeError as e:
         logger.error(f"Ошибка парсинга JSON при импорте: {e}")
-        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+        return MongoJsonResponse({'error': 'Invalid JSON data'}, status=400)
     except Exception as e:
         logger.error(f"Ошибка импорта данных компании: {e}")
-        return JsonResponse({'error': 'Import failed'}, status=500)
\ No newline at end of file
+        return MongoJsonResponse({'error': 'Import failed'}, status=500)
\ No newline at end of file
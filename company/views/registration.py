@@ -2,16 +2,12 @@ import json
 import re
 
 from django.contrib import messages
-from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 from loguru import logger
 
-from ..forms.utils import (
-    get_communication_types_from_mongodb,
-    get_communication_config_from_mongodb
-)
+from utils.json_response import MongoJsonResponse
 
 from ..company_manager import CompanyManager
 from .session import CompanySessionManager
@@ -54,7 +50,7 @@ def register_company_step1(request):
             if action == 'save_and_close':
                 success = save_partial_company_data(request, step_data, step=1)
                 if success:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': True,
                         'action': 'save_and_close',
                         'messages': [{
@@ -65,7 +61,7 @@ def register_company_step1(request):
                         'redirect_url': reverse('company:company_info')
                     })
                 else:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': False,
                         'messages': [{
                             'text': "Fehler beim Speichern der Grunddaten",
@@ -171,7 +167,7 @@ def register_company_step2(request):
                 full_data = CompanySessionManager.get_session_data(request)
                 success = save_partial_company_data(request, full_data, step=2)
                 if success:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': True,
                         'action': 'save_and_close',
                         'messages': [{
@@ -182,7 +178,7 @@ def register_company_step2(request):
                         'redirect_url': reverse('company:company_info')
                     })
                 else:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': False,
                         'messages': [{
                             'text': "Fehler beim Speichern der Registrierungsdaten",
@@ -260,7 +256,7 @@ def register_company_step3(request):
                 full_data = CompanySessionManager.get_session_data(request)
                 success = save_partial_company_data(request, full_data, step=3)
                 if success:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': True,
                         'action': 'save_and_close',
                         'messages': [{
@@ -271,7 +267,7 @@ def register_company_step3(request):
                         'redirect_url': reverse('company:company_info')
                     })
                 else:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': False,
                         'messages': [{
                             'text': "Fehler beim Speichern der Adressdaten",
@@ -322,31 +318,13 @@ def register_company_step4(request):
     company_name = session_data.get('company_name', '')
     legal_form = session_data.get('legal_form', '')
 
-    # ✅ ВСЕГДА загружаем типы контактов из MongoDB (нужны для формы)
-    contact_type_choices = get_communication_types_from_mongodb()
-    communication_config_dict = get_communication_config_from_mongodb()
-
-    # Преобразуем в JSON для JavaScript
-    contact_type_choices_json = json.dumps([
-        {'value': choice[0], 'text': choice[1]}
-        for choice in contact_type_choices
-    ], ensure_ascii=False)
-
-    communication_config_json = json.dumps(communication_config_dict, ensure_ascii=False)
+    # Типы контактов и конфигурация коммуникаций страница загружает из
+    # бандла справочников (company/reference_bundle.py)
 
     # ✅ Проверяем временные данные из edit_company_step4
     if '_temp_existing_additional_contacts' in request.session:
         # Данные уже подготовлены из edit_company_step4
         existing_additional_contacts_json = request.session.pop('_temp_existing_additional_contacts')
-        # Перезаписываем JSON если он был в временной сессии
-        temp_contact_choices = request.session.pop('_temp_contact_type_choices_json', None)
-        temp_config = request.session.pop('_temp_communication_config_json', None)
-
-        if temp_contact_choices:
-            contact_type_choices_json = temp_contact_choices
-        if temp_config:
-            communication_config_json = temp_config
-
         request.session.modified = True
         logger.info("Загружены данные из временной сессии (edit mode)")
     else:
@@ -421,7 +399,7 @@ def register_company_step4(request):
                 success = save_partial_company_data(request, full_data, step=4)
                 if success:
                     additional_count = len(cleaned_contacts_for_save)
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': True,
                         'action': 'save_and_close',
                         'messages': [{
@@ -432,7 +410,7 @@ def register_company_step4(request):
                         'redirect_url': reverse('company:company_info')
                     })
                 else:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': False,
                         'messages': [{
                             'text': "Fehler beim Speichern der Kontaktdaten",
@@ -465,9 +443,6 @@ def register_company_step4(request):
                     'company_name': company_name,
                     'legal_form': legal_form,
                     'existing_additional_contacts': existing_additional_contacts_json,
-                    'contact_type_choices': contact_type_choices,
-                    'contact_type_choices_json': contact_type_choices_json,
-                    'communication_config_json': communication_config_json
                 },
                 reverse('company:register_company_step5')
             )
@@ -485,9 +460,6 @@ def register_company_step4(request):
         'company_name': company_name,
         'legal_form': legal_form,
         'existing_additional_contacts': existing_additional_contacts_json,
-        'contact_type_choices': contact_type_choices,
-        'contact_type_choices_json': contact_type_choices_json,
-        'communication_config_json': communication_config_json
     }
     return render(request, 'register_company_step4.html', context)
 
@@ -586,7 +558,7 @@ def register_company_step5(request):
             if action == 'save_and_close':
                 success = save_partial_company_data(request, final_data, step=5)
                 if success:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': True,
                         'action': 'save_and_close',
                         'messages': [{
@@ -597,7 +569,7 @@ def register_company_step5(request):
                         'redirect_url': reverse('company:company_info')
                     })
                 else:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': False,
                         'messages': [{
                             'text': "Fehler beim Speichern der Bankdaten",
@@ -710,13 +682,13 @@ def save_partial_company_data(request, data, step):
 def company_validation_check(request):
     """ОБНОВЛЕНО: Улучшенная проверка валидности данных компании с обязательными банковскими полями"""
     if not check_mongodb_availability():
-        return JsonResponse({'error': 'MongoDB not available'}, status=500)
+        return MongoJsonResponse({'error': 'MongoDB not available'}, status=500)
 
     company_manager = CompanyManager()
     company = company_manager.get_company()
 
     if not company:
-        return JsonResponse({'error': 'No company found'}, status=404)
+        return MongoJsonResponse({'error': 'No company found'}, status=404)
 
     # Валидируем данные компании
     validation_results = {
@@ -879,7 +851,7 @@ def company_validation_check(request):
         'overall_banking_status': 'complete' if main_banking_complete else 'incomplete'
     }
 
-    return JsonResponse(validation_results)
+    return MongoJsonResponse(validation_results)
 
 
 def validate_registration_data(data):
@@ -0,0 +1,93 @@
+# gunicorn.conf.py - Конфигурация gunicorn: gthread-воркеры + --preload
+#
+# Запуск:
+#     gunicorn -c gunicorn.conf.py
+#
+# preload_app = True загружает код Django один раз в master-процессе:
+# воркеры стартуют быстрее и делят страницы памяти (copy-on-write).
+# MongoClient при этом НЕ должен переходить через fork() - pymongo это не
+# поддерживает. MongoConnection создает клиент лениво, а post_fork ниже
+# (и os.register_at_fork в mongodb/mongodb_utils.py) сбрасывает всё, что
+# могло быть унаследовано от master, так что каждый воркер открывает
+# собственный пул соединений при первом запросе.
+#
+# post_worker_init прогревает воркер (mongodb/warmup.py) до приема
+# соединений; /readyz отвечает 200 только после прогрева.
+#
+# Метрики (monitoring/metrics.py): воркеры пишут значения в общий каталог
+# METRICS_DIR, /metrics объединяет их. on_starting очищает каталог от
+# прошлого запуска, child_exit архивирует счетчики завершенного воркера.
+# worker_exit дописывает буфер last_login/last_activity (users/login_telemetry.py).
+#
+# Все параметры можно переопределить переменными окружения GUNICORN_*.
+
+import multiprocessing
+import os
+
+wsgi_app = 'WWS1.wsgi:application'
+
+# Задается до загрузки приложения (preload_app), чтобы settings его увидели
+os.environ.setdefault('METRICS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'var', 'metrics'))
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+# Потоковые воркеры: MongoConnection.get_client() защищен блокировкой
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Периодический перезапуск воркеров ограничивает рост памяти
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+errorlog = os.environ.get('GUNICORN_ERRORLOG', '-')
+
+
+def on_starting(server):
+    """Master-процесс стартует: счетчики прошлого запуска не должны суммироваться"""
+    from monitoring.metrics import clear_metrics_dir
+
+    clear_metrics_dir(os.environ['METRICS_DIR'])
+
+
+def worker_exit(server, worker):
+    """Последняя запись метрик и телеметрии входа (потоки записи - daemon и не успеют)"""
+    from monitoring.metrics import flush
+    from users import login_telemetry
+
+    login_telemetry.flush()
+    flush()
+
+
+def child_exit(server, worker):
+    """Воркер завершился (max_requests, сбой): переносим его счетчики в архив"""
+    from monitoring.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid, os.environ['METRICS_DIR'])
+
+
+def post_fork(server, worker):
+    """Воркер только что создан: сбрасываем состояние MongoDB, унаследованное от master"""
+    from mongodb.mongodb_utils import MongoConnection
+
+    MongoConnection.reset_after_fork()
+    server.log.info(f"Worker {worker.pid}: MongoDB connection state reset after fork")
+
+
+def post_worker_init(worker):
+    """
+    Прогрев до приема соединений: воркер начинает слушать сокет только
+    после возврата из этого хука, поэтому первый запрос не платит за
+    подключение к MongoDB, справочники и компиляцию шаблонов.
+    """
+    from mongodb.warmup import run_warmup
+
+    status = run_warmup()
+    worker.log.info(f"Worker {worker.pid}: warm-up finished in {status['duration_ms']} ms")
@@ -0,0 +1,440 @@
+# home/assets.py - Сборка статики: бандлы по страницам, хеши в именах, сжатие
+#
+# python manage.py build_assets:
+#   1. склеивает файлы каждого бандла из BUNDLES в ASSET_BUILD_DIR
+#      (base.css, register_company_step4.js, ...). Файлы без ".min" в имени
+#      минифицируются (rcssmin/rjsmin, если установлены; без rjsmin JS
+#      только склеивается). Относительные url() в CSS пересчитываются от
+#      каталога bundles/, комментарии sourceMappingURL удаляются;
+#   2. collectstatic с HashedStaticFilesStorage: в STATIC_ROOT попадают
+#      копии с хешем содержимого в имени (bundles/base.3f2a9c1e0b7d.css)
+#      и staticfiles.json с соответствием имен;
+#   3. рядом с хешированными текстовыми файлами пишутся .gz и .br
+#      (brotli, если установлен).
+#
+# Тег {% asset_bundle %} (home/templatetags/assets.py) выводит один
+# <link>/<script> на бандл, если он собран, иначе - исходные файлы по
+# одному, как раньше (разработка без сборки).
+#
+# serve_static() отдает STATIC_ROOT: хешированные имена - с
+# Cache-Control: immutable на год (новое содержимое = новое имя), сжатый
+# вариант - по Accept-Encoding. Файлы, которых нет в STATIC_ROOT, ищутся
+# finders и отдаются без долгого кеширования.
+
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.finders import BaseFinder
+from django.contrib.staticfiles.storage import HashedFilesMixin, ManifestStaticFilesStorage, staticfiles_storage
+from django.contrib.staticfiles.utils import get_files
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.templatetags.static import static
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from django.utils.http import http_date
+from django.utils.safestring import mark_safe
+from django.views.static import was_modified_since
+from loguru import logger
+
+try:
+    import brotli
+except ImportError:  # необязательная зависимость - только gzip
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:  # необязательная зависимость - простая минификация CSS
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # необязательная зависимость - JS только склеивается
+    rjsmin = None
+
+BUNDLE_PREFIX = 'bundles'
+
+# Бандлы: имя -> исходные файлы (пути static) по типам, в порядке подключения
+BUNDLES = {
+    # Каждая страница (base.html)
+    'base': {
+        'css': [
+            'bootstrap/css/bootstrap.min.css',
+            'bootstrap/icons/bootstrap-icons.css',
+            'select2/dist/css/select2.min.css',
+            'select2-bootstrap-5-theme/select2-bootstrap-5-theme.min.css',
+            'css/layout-heights.css',
+            'css/main_styles.css',
+            'css/sidebar.css',
+            'css/components.css',
+            'css/toasts.css',
+        ],
+        'js': [
+            'jquery/jquery-3.7.1.min.js',
+            'js/toasts.js',
+            'bootstrap/js/bootstrap.bundle.min.js',
+            'select2/dist/js/select2.min.js',
+            'select2/dist/js/i18n/de.js',
+            'htmx/js/htmx.min.js',
+        ],
+    },
+    'sidebar': {
+        'js': ['js/sidebar.js'],
+    },
+    'login_modal': {
+        'css': ['css/login_modal.css'],
+        'js': ['js/login_modal_htmx.js'],
+    },
+    'mongodb_forms': {
+        'js': ['js/mongodb_forms_htmx.js'],
+    },
+    'create_admin_step1': {
+        'js': ['js/create_admin_step1.js'],
+    },
+    'create_admin_step2': {
+        'js': ['js/create_admin_step2_updated.js'],
+    },
+    'create_admin_step3': {
+        'js': ['js/create_admin_step3.js'],
+    },
+    'user_list': {
+        'js': ['js/user_list_search.js'],
+    },
+    'company_info': {
+        'css': ['css/create_admin_step1-3.css', 'css/company_info.css'],
+    },
+    # Шаги 1-3 мастера регистрации компании
+    'register_company': {
+        'js': ['js/reference_data.js', 'js/register_company_htmx.js'],
+    },
+    'register_company_step4': {
+        'js': [
+            'js/reference_data.js',
+            'js/register_company_htmx.js',
+            'js/register_company_step4.js',
+            'js/company_contacts_manager.js',
+        ],
+    },
+    'register_company_step5': {
+        'js': ['js/register_company_htmx.js', 'js/register_company_step5.js'],
+    },
+}
+
+# Исходники и документация библиотек в STATIC_ROOT не нужны
+COLLECT_IGNORE_PATTERNS = [
+    'select2/src/*', 'select2/tests/*', 'select2/docs/*',
+    '*.md', '*.scss', 'Gruntfile.js', 'bower.json', 'component.json', 'composer.json', 'package.json',
+]
+
+# Что сжимать: текстовые форматы не меньше MIN_COMPRESS_SIZE байт
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.map', '.txt', '.ico')
+MIN_COMPRESS_SIZE = 1024
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+_CSS_CHARSET_RE = re.compile(r'@charset\s+["\'][^"\']*["\']\s*;', re.IGNORECASE)
+_CSS_COMMENT_RE = re.compile(r'/\*(?!!).*?\*/', re.DOTALL)
+_SOURCE_MAP_RE = re.compile(r'^\s*(?://[#@] sourceMappingURL=.*|/\*[#@] sourceMappingURL=.*?\*/)\s*$', re.MULTILINE)
+
+
+# ==================== СБОРКА БАНДЛОВ ====================
+
+def bundle_path(name, kind):
+    """Путь бандла в static: bundles/base.css"""
+    return f"{BUNDLE_PREFIX}/{name}.{kind}"
+
+
+def _is_minified(path):
+    return '.min.' in posixpath.basename(path)
+
+
+def _rewrite_css_urls(text, source_path):
+    """url() относительно исходного файла -> относительно каталога bundles/"""
+    source_dir = posixpath.dirname(source_path)
+
+    def replace(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        # ?v=... и #iefix остаются как есть
+        split = re.search(r'[?#]', url)
+        path, suffix = (url[:split.start()], url[split.start():]) if split else (url, '')
+        target = posixpath.normpath(posixpath.join(source_dir, path))
+        return f"url({quote}{posixpath.relpath(target, BUNDLE_PREFIX)}{suffix}{quote})"
+
+    return _CSS_URL_RE.sub(replace, text)
+
+
+def _minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    # Без rcssmin: комментарии (кроме /*! лицензий) и пустые строки
+    text = _CSS_COMMENT_RE.sub('', text)
+    return '\n'.join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def _minify_js(text):
+    return rjsmin.jsmin(text) if rjsmin is not None else text
+
+
+def build_bundle(name, kind, output_dir=None):
+    """Склеивает файлы бандла в output_dir; возвращает статистику сборки"""
+    output_dir = str(output_dir or settings.ASSET_BUILD_DIR)
+    parts = []
+    missing = []
+    source_bytes = 0
+
+    for path in BUNDLES[name].get(kind, ()):
+        absolute = finders.find(path)
+        if absolute is None:
+            missing.append(path)
+            continue
+
+        with open(absolute, encoding='utf-8') as f:
+            text = f.read()
+        source_bytes += len(text.encode('utf-8'))
+
+        # Карты исходников относятся к отдельным файлам, а не к бандлу
+        text = _SOURCE_MAP_RE.sub('', text)
+        if kind == 'css':
+            text = _CSS_CHARSET_RE.sub('', _rewrite_css_urls(text, path))
+            if not _is_minified(path):
+                text = _minify_css(text)
+        elif not _is_minified(path):
+            text = _minify_js(text)
+        parts.append(text.strip())
+
+    target = os.path.join(output_dir, f"{name}.{kind}")
+    if not parts:
+        # Нечего собирать - шаблон подключит исходные файлы
+        if os.path.exists(target):
+            os.remove(target)
+        content = ''
+    else:
+        # Между скриптами - ";": файл без завершающей точки с запятой не склеится со следующим
+        content = ('\n' if kind == 'css' else '\n;\n').join(parts) + '\n'
+        os.makedirs(output_dir, exist_ok=True)
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    return {
+        'bundle': bundle_path(name, kind),
+        'files': len(parts),
+        'missing': missing,
+        'source_bytes': source_bytes,
+        'bytes': len(content.encode('utf-8')),
+    }
+
+
+def build_bundles(output_dir=None):
+    """Собирает все бандлы BUNDLES"""
+    results = []
+    for name, kinds in BUNDLES.items():
+        for kind in kinds:
+            result = build_bundle(name, kind, output_dir)
+            for path in result['missing']:
+                logger.warning(f"⚠️ {result['bundle']}: файл {path} не найден")
+            results.append(result)
+    return results
+
+
+# ==================== СЖАТИЕ ====================
+
+def _write_if_smaller(path, data, original_size):
+    if len(data) >= original_size:
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+def compress_file(path):
+    """Пишет path.gz и path.br (если есть brotli); возвращает размеры"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    sizes = {'bytes': len(data), 'gzip': None, 'br': None}
+    if len(data) < MIN_COMPRESS_SIZE:
+        return sizes
+
+    # mtime=0 - одинаковый .gz при одинаковом содержимом
+    sizes['gzip'] = _write_if_smaller(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0), len(data))
+    if brotli is not None:
+        sizes['br'] = _write_if_smaller(path + '.br', brotli.compress(data, quality=11), len(data))
+    return sizes
+
+
+def compress_static(root=None, hashed_files=None):
+    """Сжимает хешированные текстовые файлы из манифеста; {имя: размеры}"""
+    root = str(root or settings.STATIC_ROOT)
+    if hashed_files is None:
+        hashed_files = staticfiles_storage.hashed_files
+    results = {}
+    for hashed_name in set(hashed_files.values()):
+        if not hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+            continue
+        path = os.path.join(root, hashed_name)
+        if os.path.isfile(path):
+            results[hashed_name] = compress_file(path)
+    return results
+
+
+# ==================== STATICFILES ====================
+
+class BundleFinder(BaseFinder):
+    """
+    Собранные бандлы из ASSET_BUILD_DIR под префиксом bundles/ (каталога
+    может еще не быть). find() находит и хешированные копии в STATIC_ROOT -
+    runserver отдает их так же, как serve_static().
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.storage = FileSystemStorage(location=str(settings.ASSET_BUILD_DIR))
+        self.storage.prefix = BUNDLE_PREFIX
+
+    def find(self, path, find_all=False, **kwargs):
+        find_all = find_all or kwargs.get('all', False)
+        prefix = f"{BUNDLE_PREFIX}/"
+        matched = None
+        if is_hashed(path):
+            matched = os.path.join(str(settings.STATIC_ROOT), *path.split('/'))
+        elif path.startswith(prefix):
+            candidate = self.storage.path(path[len(prefix):])
+            if os.path.isfile(candidate):
+                matched = candidate
+        # Как у finders Django: промах - пустой список и при find_all=False
+        if matched is None:
+            return []
+        return [matched] if find_all else matched
+
+    def list(self, ignore_patterns):
+        if not os.path.isdir(self.storage.location):
+            return
+        for path in get_files(self.storage, ignore_patterns):
+            yield path, self.storage
+
+
+class HashedStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Хеш содержимого в именах (collectstatic + staticfiles.json). url() отдает
+    хешированное имя и при DEBUG; без собранного манифеста - исходное имя.
+    """
+
+    manifest_strict = False
+
+    def url(self, name, force=False):
+        if not self.hashed_files:
+            # Сборки еще не было - исходные имена, без обращений к STATIC_ROOT
+            return super(HashedFilesMixin, self).url(name)
+        return super().url(name, force=True)
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None:
+                raise
+            # CSS ссылается на отсутствующий файл (например, *.map) - имя без хеша
+            logger.debug(f"Статика без хеша: {name}")
+            return name
+
+    @cached_property
+    def hashed_names(self):
+        return frozenset(self.hashed_files.values())
+
+
+def is_hashed(name):
+    """name - хешированное имя из манифеста (содержимое по нему не меняется)"""
+    return name in getattr(staticfiles_storage, 'hashed_names', ())
+
+
+def is_bundle_built(name, kind):
+    if not settings.ASSET_PIPELINE:
+        return False
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None) or {}
+    return bundle_path(name, kind) in hashed_files
+
+
+# ==================== ШАБЛОНЫ ====================
+
+_TAG_TEMPLATES = {
+    'css': '<link rel="stylesheet" href="{}">',
+    'js': '<script src="{}"></script>',
+    'js_defer': '<script src="{}" defer></script>',
+}
+
+
+def bundle_tags(name, kind, defer=False):
+    """<link>/<script> бандла: один собранный файл или исходные файлы по одному"""
+    if name not in BUNDLES:
+        raise ValueError(f"Неизвестный бандл: {name}")
+
+    paths = [bundle_path(name, kind)] if is_bundle_built(name, kind) else BUNDLES[name].get(kind, ())
+    template = _TAG_TEMPLATES['js_defer' if kind == 'js' and defer else kind]
+    return mark_safe('\n'.join(format_html(template, static(path)) for path in paths))
+
+
+# ==================== РАЗДАЧА ====================
+
+def _accepted_encodings(request):
+    """Кодировки из Accept-Encoding (q=0 - запрещена)"""
+    accepted = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _safe_join(root, path):
+    path = posixpath.normpath(path).lstrip('/')
+    if path.startswith('..') or '\x00' in path:
+        raise Http404("Ungültiger Pfad")
+    return os.path.join(root, *path.split('/')), path
+
+
+def serve_static(request, path):
+    """Файл статики: из STATIC_ROOT (со сжатыми вариантами) или через finders"""
+    absolute, path = _safe_join(str(settings.STATIC_ROOT), path)
+    immutable = False
+    encoding = None
+
+    if os.path.isfile(absolute):
+        immutable = is_hashed(path)
+        accepted = _accepted_encodings(request)
+        for coding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if coding in accepted and os.path.isfile(absolute + suffix):
+                encoding = coding
+                absolute += suffix
+                break
+    else:
+        absolute = finders.find(path)
+        if not absolute or not os.path.isfile(absolute):
+            raise Http404("Datei nicht gefunden")
+
+    stat = os.stat(absolute)
+    if not immutable and not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    content_type, _ = mimetypes.guess_type(path)
+    response = FileResponse(open(absolute, 'rb'), content_type=content_type or 'application/octet-stream')
+    response.headers['Last-Modified'] = http_date(stat.st_mtime)
+    response.headers['Vary'] = 'Accept-Encoding'
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if immutable:
+        response.headers['Cache-Control'] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        # Имя без хеша может получить новое содержимое - только с проверкой
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
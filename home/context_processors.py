@@ -1,11 +1,50 @@
 # home/context_processors.py - ПРОСТОЙ ВАРИАНТ
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject, lazy
 from loguru import logger
 
+from mongodb import stale_cache
+from mongodb.cache_bus import company_cache
+from utils.fragment_cache import mark_degraded
+
 
 def company_name(request):
-    """Простой context processor для получения названия компании и правовой формы"""
+    """
+    Простой context processor для получения названия компании и правовой формы.
+    Значения ленивые: если шапка взята из кеша фрагментов, заголовок не читается.
+    """
+    header = SimpleLazyObject(get_company_header)
+    return {
+        'company_name': lazy(lambda: header['company_name'], str)(),
+        'company_legal_form': lazy(lambda: header['company_legal_form'], str)(),
+    }
+
+
+def fragment_cache(request):
+    """Таймаут {% cached_fragment %} для фрагментов шаблонов (utils/fragment_cache.py)"""
+    return {'fragment_cache_timeout': settings.TEMPLATE_FRAGMENT_TIMEOUT}
+
+
+def get_company_header():
+    """Название компании и правовая форма (кешируются до записи компании)"""
+    fallback = {
+        'company_name': 'WWS1',
+        'company_legal_form': ''
+    }
+
     try:
         from company.company_manager import CompanyManager
+        from mongodb.mongodb_utils import MongoConnection
+
+        # MongoDB недоступна (circuit breaker открыт) - отдаем последнее известное название
+        if not MongoConnection.is_available():
+            mark_degraded()
+            return stale_cache.recall('company_header', fallback)
+
+        # Заголовок сбрасывается при любой записи компании (в любом воркере)
+        cached = company_cache.get('company_header')
+        if cached is not None:
+            return cached
 
         company_manager = CompanyManager()
         company = company_manager.get_company()
@@ -15,11 +54,16 @@ def company_name(request):
             legal_form = company.get('legal_form', '')
             legal_form_display = get_legal_form_display(legal_form) if legal_form else ''
 
-            return {
+            return company_cache.set('company_header', stale_cache.remember('company_header', {
                 'company_name': company['company_name'],
                 'company_legal_form': legal_form_display
-            }
+            }))
+        elif not MongoConnection.is_available():
+            mark_degraded()
+            return stale_cache.recall('company_header', fallback)
         else:
+            # Компании нет или чтение не удалось - шапку navbar не кешируем
+            mark_degraded()
             return {
                 'company_name': 'Keine Firma registriert',
                 'company_legal_form': ''
@@ -27,10 +71,8 @@ def company_name(request):
 
     except Exception as e:
         logger.error(f"Ошибка получения данных компании: {e}")
-        return {
-            'company_name': 'WWS1',
-            'company_legal_form': ''
-        }
+        mark_degraded()
+        return stale_cache.recall('company_header', fallback)
 
 
 def get_legal_form_display(legal_form_code):
@@ -0,0 +1,71 @@
+# home/management/commands/build_assets.py - Сборка статики для продакшена
+
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from home import assets
+
+
+class Command(BaseCommand):
+    help = (
+        "Склеивает и минифицирует бандлы страниц (home/assets.py), собирает "
+        "STATIC_ROOT с хешем содержимого в именах файлов и пишет рядом .gz/.br. "
+        "Требует ASSET_PIPELINE=True."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Очистить STATIC_ROOT перед сборкой')
+        parser.add_argument('--no-compress', action='store_true', help='Не писать .gz/.br')
+
+    def handle(self, *args, **options):
+        if not settings.ASSET_PIPELINE:
+            raise CommandError("ASSET_PIPELINE выключен: без хешированного хранилища сборка бесполезна")
+
+        self.stdout.write(f"📦 Бандлы → {settings.ASSET_BUILD_DIR}")
+        for result in assets.build_bundles():
+            ratio = result['bytes'] / result['source_bytes'] * 100 if result['source_bytes'] else 0
+            line = (
+                f"  {result['bundle']:<36} {result['files']:>2} файлов  "
+                f"{result['source_bytes']:>9} → {result['bytes']:>9} байт ({ratio:.0f}%)"
+            )
+            if result['missing']:
+                self.stdout.write(self.style.WARNING(f"{line}  нет: {', '.join(result['missing'])}"))
+            else:
+                self.stdout.write(line)
+
+        self.stdout.write(f"🔑 collectstatic → {settings.STATIC_ROOT}")
+        call_command(
+            'collectstatic', interactive=False, clear=options['clear'], verbosity=0,
+            ignore_patterns=assets.COLLECT_IGNORE_PATTERNS,
+        )
+        hashed_files = staticfiles_storage.hashed_files
+        self.stdout.write(f"  {len(hashed_files)} файлов в манифесте")
+
+        if options['no_compress']:
+            return
+
+        if assets.brotli is None:
+            self.stdout.write(self.style.WARNING("  brotli не установлен - только .gz"))
+        compressed = assets.compress_static(hashed_files=hashed_files)
+        total = sum(sizes['bytes'] for sizes in compressed.values())
+        total_gzip = sum(sizes['gzip'] or sizes['bytes'] for sizes in compressed.values())
+        total_br = sum(sizes['br'] or sizes['gzip'] or sizes['bytes'] for sizes in compressed.values())
+        self.stdout.write(
+            f"🗜️ Сжато {len(compressed)} файлов: {total} → gzip {total_gzip}"
+            + (f", br {total_br}" if assets.brotli is not None else "") + " байт"
+        )
+
+        for name, kinds in assets.BUNDLES.items():
+            for kind in kinds:
+                hashed_name = hashed_files.get(assets.bundle_path(name, kind))
+                sizes = compressed.get(hashed_name)
+                if sizes and os.path.exists(os.path.join(str(settings.STATIC_ROOT), hashed_name)):
+                    self.stdout.write(
+                        f"  {hashed_name:<50} {sizes['bytes']:>9}  gzip {sizes['gzip'] or '-':>8}  br {sizes['br'] or '-':>8}"
+                    )
+
+        self.stdout.write(self.style.SUCCESS("✅ Статика собрана"))
@@ -0,0 +1,82 @@
+# home/management/commands/check_import_time.py - Бюджет времени импорта
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.import_profile import (
+    BUDGET_FILE,
+    DEFAULT_HEADROOM,
+    DEFAULT_RUNS,
+    SCENARIOS,
+    load_budget,
+    profile_scenario,
+    save_budget,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Измеряет время импорта сценариев (-X importtime) и сравнивает с "
+        "бюджетом из import_budget.json. Завершается с ошибкой при превышении."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenarios',
+            nargs='*',
+            help=f"Сценарии (по умолчанию все: {', '.join(SCENARIOS)})",
+        )
+        parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help='Прогонов на сценарий (берется медиана)')
+        parser.add_argument('--top', type=int, default=8, help='Сколько самых тяжелых модулей показать')
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Записать новые бюджеты по результатам измерения',
+        )
+        parser.add_argument(
+            '--headroom',
+            type=float,
+            default=DEFAULT_HEADROOM,
+            help='Запас бюджета относительно измеренного времени при --update',
+        )
+
+    def handle(self, *args, **options):
+        names = options['scenarios'] or list(SCENARIOS)
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f"Неизвестные сценарии: {', '.join(unknown)}")
+
+        budget = load_budget()
+        measured = {}
+        exceeded = []
+
+        for name in names:
+            try:
+                result = profile_scenario(SCENARIOS[name], runs=options['runs'])
+            except RuntimeError as e:
+                raise CommandError(f"Сценарий {name} завершился с ошибкой: {e}")
+
+            measured[name] = result['total_ms']
+            budget_ms = budget.get(name, {}).get('budget_ms')
+
+            if budget_ms is None:
+                status = self.style.WARNING("нет бюджета")
+            elif result['total_ms'] > budget_ms:
+                status = self.style.ERROR(f"ПРЕВЫШЕН (бюджет {budget_ms} мс)")
+                exceeded.append(name)
+            else:
+                status = self.style.SUCCESS(f"ok (бюджет {budget_ms} мс)")
+
+            self.stdout.write(f"{name:<14} {result['total_ms']:>8} мс  {status}")
+            for module, cumulative_ms in result['top'][:options['top']]:
+                self.stdout.write(f"    {cumulative_ms:>8} мс  {module}")
+
+        if options['update']:
+            merged = {scenario: data['measured_ms'] for scenario, data in budget.items() if 'measured_ms' in data}
+            merged.update(measured)
+            save_budget(merged, options['headroom'])
+            self.stdout.write(self.style.SUCCESS(f"✅ Бюджеты записаны в {BUDGET_FILE}"))
+            return
+
+        if exceeded:
+            raise CommandError(f"Бюджет времени импорта превышен: {', '.join(exceeded)}")
@@ -0,0 +1,11 @@
+from django import template
+
+from home.assets import bundle_tags
+
+register = template.Library()
+
+
+@register.simple_tag
+def asset_bundle(name, kind, defer=False):
+    """<link>/<script> бандла статики (home/assets.py)"""
+    return bundle_tags(name, kind, defer=defer)
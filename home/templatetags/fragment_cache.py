@@ -0,0 +1,34 @@
+from django import template
+
+from utils.fragment_cache import render_fragment
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, timeout, name):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        return render_fragment(
+            self.name.resolve(context),
+            lambda: self.nodelist.render(context),
+            int(timeout) if timeout is not None else None,
+        )
+
+
+@register.tag
+def cached_fragment(parser, token):
+    """
+    {% cached_fragment timeout 'name' %}...{% endcached_fragment %} - как
+    {% cache %} с версией фрагмента, но запасные данные не кешируются
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' принимает два аргумента: timeout и имя фрагмента")
+    nodelist = parser.parse(('endcached_fragment',))
+    parser.delete_first_token()
+    return CachedFragmentNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
@@ -0,0 +1,30 @@
+import json
+
+from django import template
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+# Как в django.utils.html.json_script: значение вставляется внутрь <script>
+_JSON_ESCAPES = {
+    ord('>'): '\\u003E',
+    ord('<'): '\\u003C',
+    ord('&'): '\\u0026',
+}
+
+
+class _Encoder(DjangoJSONEncoder):
+    """Даты - ISO 8601, ObjectId и прочие типы - строкой"""
+
+    def default(self, o):
+        try:
+            return super().default(o)
+        except TypeError:
+            return str(o)
+
+
+@register.filter
+def to_json(value):
+    """JSON-литерал для JavaScript в base.html"""
+    return mark_safe(json.dumps(value, cls=_Encoder).translate(_JSON_ESCAPES))
@@ -1,12 +1,15 @@
 # home/views.py - ИСПРАВЛЕНО: правильная логика перенаправлений
 
 from django.shortcuts import render, redirect
+from django.views.decorators.http import require_GET, require_safe
 from django.contrib import messages
 from loguru import logger
 
+from home.assets import serve_static
 from mongodb.mongodb_config import MongoConfig
 from users.user_utils import UserManager
 from user_auth import is_user_authenticated
+from utils.json_response import MongoJsonResponse
 
 def home(request):
 
@@ -232,4 +235,32 @@ def get_next_steps(is_authenticated, admin_count, has_company):
             'action': 'ready'
         })
 
-    return steps
\ No newline at end of file
+    return steps
+
+
+# ==================== HEALTH / READINESS ====================
+
+@require_GET
+def healthz(request):
+    """Liveness: процесс жив и обрабатывает запросы (без обращений к MongoDB)"""
+    return MongoJsonResponse({'status': 'ok'})
+
+
+@require_GET
+def readyz(request):
+    """Readiness: 200 только после прогрева воркера (mongodb/warmup.py)"""
+    from mongodb import warmup
+    from mongodb.mongodb_utils import MongoConnection
+
+    # Прогрев не запускался ни хуком gunicorn, ни AppConfig - запускаем сейчас
+    warmup.start_background_warmup()
+
+    status = warmup.get_status()
+    status['mongodb_circuit'] = MongoConnection.get_circuit_status()['state']
+    return MongoJsonResponse(status, status=200 if warmup.is_ready() else 503)
+
+
+@require_safe
+def static_asset(request, path):
+    """Статика из STATIC_ROOT: хешированные файлы кешируются браузером навсегда"""
+    return serve_static(request, path)
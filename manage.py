@@ -3,9 +3,9 @@
 import os
 import sys
 
-from icecream import install
+from utils.lazy_imports import install_lazy_ic
 
-install()
+install_lazy_ic()
 
 from utils.logger import setup_logger
 
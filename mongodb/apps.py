@@ -0,0 +1,25 @@
+import os
+import sys
+
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class MongodbConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'mongodb'
+    verbose_name = 'MongoDB'
+
+    def ready(self):
+        # Под gunicorn прогрев выполняет post_worker_init (gunicorn.conf.py):
+        # при --preload ready() вызывается в master-процессе, где подключаться
+        # к MongoDB бессмысленно - соединения не переживают fork()
+        if not getattr(settings, 'WARMUP_ON_STARTUP', False):
+            return
+
+        # Процесс-наблюдатель автоперезагрузки runserver запросы не обслуживает
+        if 'runserver' in sys.argv and os.environ.get('RUN_MAIN') != 'true':
+            return
+
+        from .warmup import start_background_warmup
+        start_background_warmup()
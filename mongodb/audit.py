@@ -0,0 +1,335 @@
+# mongodb/audit.py - Журнал событий (вход, изменения пользователей и компании)
+#
+# События только добавляются; изменять или удалять их незачем. Хранение -
+# две коллекции:
+#
+#   {db_name}_audit_events  - сами события. Создается как time-series
+#       коллекция (MongoDB 5+ хранит события бакетами по времени) с
+#       expireAfterSeconds = AUDIT_EVENT_RETENTION_DAYS. Если сервер не
+#       поддерживает time-series, это обычная коллекция с TTL-индексом по ts.
+#
+#       {'ts': datetime, 'meta': {'type': 'login_failure', 'actor': 'admin',
+#        'target': 'mmueller'}, 'details': {'reason': 'password'}}
+#
+#   {db_name}_audit_rollups - счетчики по часам и по дням, обновляются при
+#       каждой записи события ($inc с upsert), без чтения событий:
+#
+#       {'_id': 'hour:2026-10-19T13', 'granularity': 'hour',
+#        'bucket': datetime(2026, 10, 19, 13), 'counts': {'login_success': 12},
+#        'expires_at': ...}
+#
+#       _id упорядочен по времени, поэтому счетчики за период - один
+#       диапазонный запрос по _id: число прочитанных документов равно
+#       числу бакетов, а не событий. Часовые бакеты хранятся
+#       AUDIT_HOURLY_RETENTION_DAYS, дневные - AUDIT_DAILY_RETENTION_DAYS.
+#
+# Все времена журнала - aware UTC (так их хранит MongoDB): TTL, часовые и
+# дневные бакеты (сутки UTC) не сдвигаются на смещение сервера и переход
+# на летнее время. Бакеты и окна считаются только через utcnow()/_as_utc().
+#
+# Запись событий не должна ломать операцию, которая их порождает: ошибки
+# MongoDB только логируются. Автор изменения (actor) берется из запроса -
+# AuditActorMiddleware (mongodb/audit_context.py) кладет username из сессии
+# в contextvar.
+
+import datetime
+
+from loguru import logger
+from pymongo import UpdateOne
+from pymongo.errors import CollectionInvalid, OperationFailure, PyMongoError
+
+from mongodb.audit_context import get_actor, reset_actor, set_actor  # noqa: F401 - прежний API модуля
+from mongodb.circuit_breaker import mongo_breaker
+
+EVENTS_SUFFIX = 'audit_events'
+ROLLUPS_SUFFIX = 'audit_rollups'
+
+# ==================== ТИПЫ СОБЫТИЙ ====================
+
+LOGIN_SUCCESS = 'login_success'
+LOGIN_FAILURE = 'login_failure'
+USER_LOCKED = 'user_locked'
+USER_UNLOCKED = 'user_unlocked'
+USER_CREATED = 'user_created'
+USER_UPDATED = 'user_updated'
+USER_DELETED = 'user_deleted'
+PASSWORD_CHANGED = 'password_changed'
+USERS_IMPORTED = 'users_imported'
+COMPANY_CREATED = 'company_created'
+COMPANY_UPDATED = 'company_updated'
+COMPANY_DELETED = 'company_deleted'
+
+COMPANY_EVENTS = (COMPANY_CREATED, COMPANY_UPDATED, COMPANY_DELETED)
+
+HOUR = 'hour'
+DAY = 'day'
+
+_BUCKET_FORMATS = {
+    HOUR: '%Y-%m-%dT%H',
+    DAY: '%Y-%m-%d',
+}
+
+_prepared = set()    # базы, для которых коллекции уже созданы в этом процессе
+
+
+def utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _as_utc(moment):
+    """aware UTC; naive значения (так их возвращает pymongo без tz_aware) считаются UTC"""
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.astimezone(datetime.timezone.utc)
+
+
+def _setting(name, default):
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def _enabled():
+    return bool(_setting('AUDIT_ENABLED', True))
+
+
+def _retention(granularity=None):
+    """Срок хранения (timedelta) событий или бакетов"""
+    if granularity == HOUR:
+        days = _setting('AUDIT_HOURLY_RETENTION_DAYS', 14)
+    elif granularity == DAY:
+        days = _setting('AUDIT_DAILY_RETENTION_DAYS', 400)
+    else:
+        days = _setting('AUDIT_EVENT_RETENTION_DAYS', 90)
+    return datetime.timedelta(days=int(days))
+
+
+# ==================== КОЛЛЕКЦИИ ====================
+
+def _get_database():
+    """(db, db_name) или (None, None), если MongoDB недоступна или не настроена"""
+    from mongodb.mongodb_config import MongoConfig
+    from mongodb.mongodb_utils import MongoConnection
+
+    config = MongoConfig.read_config()
+    db_name = config.get('db_name')
+    if not db_name or not config.get('setup_completed'):
+        return None, None
+
+    if not mongo_breaker.allow_request():
+        return None, None
+
+    db = MongoConnection.get_database()
+    if db is None:
+        return None, None
+    return db, db_name
+
+
+def _prepare(db, db_name):
+    """Создает коллекцию событий (time-series с TTL) и индексы реестра - один раз на процесс"""
+    from mongodb.query_registry import collection_name, ensure_indexes
+
+    if db_name in _prepared:
+        return
+
+    events_name = collection_name(db_name, EVENTS_SUFFIX)
+    retention = int(_retention().total_seconds())
+    if events_name not in db.list_collection_names():
+        try:
+            db.create_collection(
+                events_name,
+                timeseries={'timeField': 'ts', 'metaField': 'meta', 'granularity': 'hours'},
+                expireAfterSeconds=retention,
+            )
+            logger.info(f"📜 Коллекция журнала '{events_name}' создана (time-series)")
+        except CollectionInvalid:
+            pass  # создана другим воркером
+        except OperationFailure as e:
+            # MongoDB < 5.0: обычная коллекция, срок хранения - TTL-индекс
+            logger.warning(f"⚠️ Time-series недоступны ({e}), '{events_name}' - обычная коллекция")
+            db[events_name].create_index([('ts', 1)], name='idx_ts_ttl', expireAfterSeconds=retention)
+
+    ensure_indexes(db, db_name, EVENTS_SUFFIX)
+    ensure_indexes(db, db_name, ROLLUPS_SUFFIX)
+    _prepared.add(db_name)
+
+
+def _get_collections():
+    """(events, rollups) или (None, None)"""
+    from mongodb.query_registry import collection_name
+
+    db, db_name = _get_database()
+    if db is None:
+        return None, None
+
+    _prepare(db, db_name)
+    return db[collection_name(db_name, EVENTS_SUFFIX)], db[collection_name(db_name, ROLLUPS_SUFFIX)]
+
+
+# ==================== БАКЕТЫ ====================
+
+def bucket_start(moment, granularity):
+    """Начало часа или дня (UTC), в который попадает moment"""
+    moment = _as_utc(moment)
+    if granularity == HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def bucket_id(moment, granularity):
+    """_id документа счетчиков (UTC): 'hour:2026-10-19T13', 'day:2026-10-19'"""
+    return f"{granularity}:{_as_utc(moment).strftime(_BUCKET_FORMATS[granularity])}"
+
+
+def _rollup_update(event_type, moment, granularity):
+    bucket = bucket_start(moment, granularity)
+    return UpdateOne(
+        {'_id': bucket_id(bucket, granularity)},
+        {
+            '$inc': {f"counts.{event_type}": 1},
+            '$setOnInsert': {
+                'granularity': granularity,
+                'bucket': bucket,
+                'expires_at': bucket + _step(granularity) + _retention(granularity),
+            },
+        },
+        upsert=True,
+    )
+
+
+def rollup_filter(granularity, since, until):
+    """Фильтр бакетов [since, until) - диапазон по _id"""
+    return {'_id': {
+        '$gte': bucket_id(bucket_start(since, granularity), granularity),
+        '$lt': bucket_id(bucket_start(until, granularity), granularity),
+    }}
+
+
+def sum_counts(rollups, types=None):
+    """Суммирует counts прочитанных бакетов: {тип: число}"""
+    totals = {}
+    for rollup in rollups:
+        for event_type, count in (rollup.get('counts') or {}).items():
+            if types is None or event_type in types:
+                totals[event_type] = totals.get(event_type, 0) + count
+    return totals
+
+
+def build_series(rollups, granularity, since, until, types=None):
+    """Ряд по бакетам [since, until) без пропусков: [{'bucket', 'counts'}]"""
+    by_id = {rollup['_id']: rollup for rollup in rollups}
+    step = _step(granularity)
+    until = _as_utc(until)
+
+    series = []
+    bucket = bucket_start(since, granularity)
+    while bucket < until:
+        rollup = by_id.get(bucket_id(bucket, granularity))
+        series.append({'bucket': bucket, 'counts': sum_counts([rollup], types) if rollup else {}})
+        bucket += step
+    return series
+
+
+# ==================== ЗАПИСЬ ====================
+
+def record(event_type, target=None, details=None, actor=None):
+    """Записывает событие и увеличивает часовой и дневной счетчики"""
+    if not _enabled():
+        return False
+
+    now = utcnow()
+    event = {
+        'ts': now,
+        'meta': {
+            'type': event_type,
+            'actor': actor if actor is not None else get_actor(),
+            'target': target,
+        },
+    }
+    if details:
+        event['details'] = details
+
+    try:
+        events, rollups = _get_collections()
+        if events is None:
+            return False
+
+        events.insert_one(event)
+        rollups.bulk_write([
+            _rollup_update(event_type, now, HOUR),
+            _rollup_update(event_type, now, DAY),
+        ], ordered=False)
+        return True
+    except PyMongoError as e:
+        logger.warning(f"⚠️ Событие журнала '{event_type}' не записано: {e}")
+        return False
+
+
+# ==================== ЧТЕНИЕ ====================
+
+def _step(granularity):
+    return datetime.timedelta(hours=1) if granularity == HOUR else datetime.timedelta(days=1)
+
+
+def window(granularity, size, now=None):
+    """(since, until) последних size бакетов (UTC), включая текущий"""
+    now = _as_utc(now) if now is not None else utcnow()
+    until = bucket_start(now, granularity) + _step(granularity)
+    return until - _step(granularity) * size, until
+
+
+def read_rollups(granularity, since, until):
+    """Бакеты [since, until) или None, если MongoDB недоступна"""
+    _, rollups = _get_collections()
+    if rollups is None:
+        return None
+    return list(rollups.find(rollup_filter(granularity, since, until), {'counts': 1}))
+
+
+def counts(types=None, hours=None, days=None):
+    """
+    Число событий за последние hours часов (часовые бакеты) или days дней
+    (дневные, включая текущий день): {тип: число}. Читает только бакеты.
+    """
+    granularity, size = (HOUR, hours) if hours is not None else (DAY, days or 1)
+    try:
+        rollups = read_rollups(granularity, *window(granularity, size))
+    except PyMongoError as e:
+        logger.warning(f"⚠️ Счетчики журнала недоступны: {e}")
+        return {}
+    return sum_counts(rollups or [], types)
+
+
+def series(granularity, size, types=None):
+    """Счетчики последних size бакетов без пропусков: [{'bucket', 'counts'}]"""
+    since, until = window(granularity, size)
+    try:
+        rollups = read_rollups(granularity, since, until)
+    except PyMongoError as e:
+        logger.warning(f"⚠️ Счетчики журнала недоступны: {e}")
+        return []
+    return build_series(rollups or [], granularity, since, until, types)
+
+
+def recent_events(limit=50, event_type=None, target=None):
+    """Последние события (новые первыми)"""
+    query = {}
+    if event_type:
+        query['meta.type'] = event_type
+    if target:
+        query['meta.target'] = target
+
+    try:
+        events, _ = _get_collections()
+        if events is None:
+            return []
+        found = list(events.find(query, {'_id': 0}).sort('ts', -1).limit(limit))
+    except PyMongoError as e:
+        logger.warning(f"⚠️ События журнала недоступны: {e}")
+        return []
+
+    for event in found:
+        event['ts'] = _as_utc(event['ts'])
+    return found
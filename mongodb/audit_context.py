@@ -0,0 +1,38 @@
+# mongodb/audit_context.py - Автор событий журнала (actor) текущего запроса
+#
+# AuditActorMiddleware стоит в MIDDLEWARE и загружается при старте WSGI,
+# поэтому модуль не импортирует pymongo (и mongodb/audit.py): запись
+# событий подгружается только при первом событии.
+
+import contextvars
+
+_current_actor = contextvars.ContextVar('audit_actor', default=None)
+
+
+def get_actor():
+    """Автор событий текущего запроса или None"""
+    return _current_actor.get()
+
+
+def set_actor(username):
+    """Автор событий текущего запроса; возвращает токен для reset_actor()"""
+    return _current_actor.set(username)
+
+
+def reset_actor(token):
+    _current_actor.reset(token)
+
+
+class AuditActorMiddleware:
+    """Передает username из сессии в события, записанные во время запроса"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        session = getattr(request, 'session', None)
+        token = set_actor(session.get('username') if session is not None else None)
+        try:
+            return self.get_response(request)
+        finally:
+            reset_actor(token)
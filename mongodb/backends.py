@@ -0,0 +1,40 @@
+# mongodb/backends.py - Выбор бэкенда MongoDB (settings.MONGO_BACKEND)
+#
+#   'pymongo' - pymongo.MongoClient / AsyncMongoClient (по умолчанию);
+#   'memory'  - mongodb/memory_backend.py: pymongo-совместимый движок в
+#               памяти процесса, чтобы запускать приложение без сервера.
+#
+# Все клиенты проекта создаются через create_client()/create_async_client().
+
+from django.conf import settings
+
+BACKEND_PYMONGO = 'pymongo'
+BACKEND_MEMORY = 'memory'
+
+
+def get_backend():
+    return getattr(settings, 'MONGO_BACKEND', BACKEND_PYMONGO)
+
+
+def is_memory_backend():
+    return get_backend() == BACKEND_MEMORY
+
+
+def create_client(*args, **kwargs):
+    """MongoClient выбранного бэкенда (аргументы - как у pymongo.MongoClient)"""
+    if is_memory_backend():
+        from .memory_backend import MemoryClient
+        return MemoryClient(*args, **kwargs)
+
+    import pymongo
+    return pymongo.MongoClient(*args, **kwargs)
+
+
+def create_async_client(*args, **kwargs):
+    """AsyncMongoClient выбранного бэкенда"""
+    if is_memory_backend():
+        from .memory_backend import AsyncMemoryClient
+        return AsyncMemoryClient(*args, **kwargs)
+
+    from pymongo import AsyncMongoClient
+    return AsyncMongoClient(*args, **kwargs)
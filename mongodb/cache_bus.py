@@ -0,0 +1,328 @@
+# mongodb/cache_bus.py - Шина инвалидации кешей между воркерами
+#
+# Каждый gunicorn-воркер держит собственные in-process кеши (справочники,
+# заголовок компании, количество администраторов). Когда один воркер пишет
+# в MongoDB, остальные должны узнать об этом. Для этого используется
+# крошечная коллекция {db_name}_cache_versions:
+#
+#     {'_id': 'reference', 'version': 17, 'updated_at': ...}
+#
+# Писатель вызывает bump(namespace) - атомарный $inc. Читатель сравнивает
+# версию namespace с той, под которой заполнен его кеш (VersionedCache),
+# и при расхождении сбрасывает кеш.
+#
+# Версии узнаются двумя способами:
+#   - опрос: не чаще раза в CACHE_BUS_POLL_INTERVAL секунд одним find()
+#     по всей коллекции (несколько документов);
+#   - change stream: если MongoDB запущена как replica set, фоновый поток
+#     получает изменения сразу и опрос не нужен.
+# В обоих случаях задержка инвалидации ограничена CACHE_BUS_POLL_INTERVAL.
+#
+# Проверка на локальном single-node replica set:
+#     mongod --replSet rs0 --dbpath /tmp/rs0 --port 27017
+#     mongosh --eval 'rs.initiate()'
+#     python manage.py cache_versions --watch      # в одном терминале
+#     python manage.py cache_versions --bump company  # в другом
+
+import datetime
+import os
+import threading
+import time
+
+from loguru import logger
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+
+from mongodb.circuit_breaker import mongo_breaker
+from monitoring.instruments import CACHE_REQUESTS
+
+# Пространства имен версий
+CONFIG = 'config'
+REFERENCE = 'reference'
+COMPANY = 'company'
+USERS = 'users'
+
+NAMESPACES = (CONFIG, REFERENCE, COMPANY, USERS)
+
+COLLECTION_SUFFIX = 'cache_versions'
+
+# Код ошибки "The $changeStream stage is only supported on replica sets"
+_CHANGE_STREAM_UNSUPPORTED = 40573
+
+_lock = threading.Lock()
+_versions = {}       # версии из MongoDB
+_local_bumps = {}    # bump без MongoDB (только текущий процесс)
+_last_poll = 0.0
+_watcher_thread = None
+_watcher_active = False
+_watcher_unsupported = False
+
+
+def _poll_interval():
+    try:
+        from django.conf import settings
+        return float(getattr(settings, 'CACHE_BUS_POLL_INTERVAL', 2.0))
+    except Exception:
+        return 2.0
+
+
+def _change_streams_enabled():
+    try:
+        from django.conf import settings
+        return bool(getattr(settings, 'CACHE_BUS_CHANGE_STREAMS', True))
+    except Exception:
+        return True
+
+
+def get_collection():
+    """Коллекция версий или None, если MongoDB недоступна"""
+    from mongodb.mongodb_config import MongoConfig
+    from mongodb.mongodb_utils import MongoConnection
+
+    # До завершения настройки рабочей базы версии хранить негде
+    config = MongoConfig.read_config()
+    db_name = config.get('db_name')
+    if not db_name or not config.get('setup_completed'):
+        return None
+
+    if not mongo_breaker.allow_request():
+        return None
+
+    db = MongoConnection.get_database()
+    if db is None:
+        return None
+    return db[f"{db_name}_{COLLECTION_SUFFIX}"]
+
+
+# ==================== ЗАПИСЬ ====================
+
+def bump(namespace):
+    """
+    Увеличивает версию namespace после записи в MongoDB.
+    Локальные кеши текущего процесса сбрасываются сразу, остальные
+    воркеры увидят новую версию в пределах интервала опроса.
+    Ошибки не пробрасываются: запись данных уже прошла успешно.
+    """
+    try:
+        collection = get_collection()
+        if collection is None:
+            _bump_local(namespace)
+            return None
+
+        doc = collection.find_one_and_update(
+            {'_id': namespace},
+            {
+                '$inc': {'version': 1},
+                '$set': {'updated_at': datetime.datetime.now(), 'pid': os.getpid()}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            projection={'version': 1}
+        )
+        version = doc['version']
+        with _lock:
+            _versions[namespace] = max(version, _versions.get(namespace, 0))
+        logger.debug(f"🔔 Версия кеша '{namespace}' -> {version}")
+        return version
+
+    except PyMongoError as e:
+        logger.warning(f"⚠️ Не удалось обновить версию кеша '{namespace}': {e}")
+        _bump_local(namespace)
+        return None
+
+
+def _bump_local(namespace):
+    """Без MongoDB сбрасываем хотя бы кеши текущего процесса"""
+    with _lock:
+        _local_bumps[namespace] = _local_bumps.get(namespace, 0) + 1
+
+
+# ==================== ЧТЕНИЕ ====================
+
+def get_version(namespace):
+    """Текущая известная версия namespace (0, если версий еще не было)"""
+    global _last_poll
+
+    now = time.monotonic()
+    if not _watcher_active and now - _last_poll >= _poll_interval():
+        with _lock:
+            due = now - _last_poll >= _poll_interval()
+            if due:
+                _last_poll = now
+        if due:
+            refresh()
+            _ensure_watcher()
+
+    return _versions.get(namespace, 0) + _local_bumps.get(namespace, 0)
+
+
+def refresh():
+    """Загружает все версии из MongoDB одним запросом"""
+    try:
+        collection = get_collection()
+        if collection is None:
+            return False
+
+        remote = {doc['_id']: doc.get('version', 0) for doc in collection.find({}, {'version': 1})}
+    except PyMongoError as e:
+        logger.debug(f"Опрос версий кеша не удался: {e}")
+        return False
+
+    with _lock:
+        for namespace, version in remote.items():
+            if version > _versions.get(namespace, 0):
+                _versions[namespace] = version
+    return True
+
+
+def get_status():
+    """Состояние шины для отображения и management-команды"""
+    return {
+        'versions': {namespace: _versions.get(namespace, 0) + _local_bumps.get(namespace, 0)
+                     for namespace in NAMESPACES},
+        'mode': 'change_stream' if _watcher_active else 'polling',
+        'poll_interval': _poll_interval(),
+        'change_streams_supported': not _watcher_unsupported,
+    }
+
+
+# ==================== CHANGE STREAM ====================
+
+def _ensure_watcher():
+    """Запускает поток change stream один раз на процесс (если это replica set)"""
+    global _watcher_thread
+
+    if _watcher_unsupported or not _change_streams_enabled():
+        return
+
+    with _lock:
+        if _watcher_thread is not None and _watcher_thread.is_alive():
+            return
+        _watcher_thread = threading.Thread(target=_watch_loop, name='cache-bus-watcher', daemon=True)
+        _watcher_thread.start()
+
+
+def _watch_loop():
+    global _watcher_active, _watcher_unsupported
+
+    collection = get_collection()
+    if collection is None:
+        return
+
+    try:
+        with collection.watch(full_document='updateLookup') as stream:
+            _watcher_active = True
+            logger.info("📡 Шина кеша: change stream активен, опрос отключен")
+            # Изменения, случившиеся до открытия потока
+            refresh()
+            for change in stream:
+                doc = change.get('fullDocument') or {}
+                namespace = doc.get('_id') or change.get('documentKey', {}).get('_id')
+                version = doc.get('version')
+                if namespace is None or version is None:
+                    continue
+                with _lock:
+                    if version > _versions.get(namespace, 0):
+                        _versions[namespace] = version
+
+    except OperationFailure as e:
+        if e.code == _CHANGE_STREAM_UNSUPPORTED:
+            _watcher_unsupported = True
+            logger.info("📡 Шина кеша: MongoDB не является replica set, используется опрос")
+        else:
+            logger.warning(f"⚠️ Шина кеша: change stream остановлен: {e}")
+    except PyMongoError as e:
+        logger.warning(f"⚠️ Шина кеша: change stream остановлен: {e}")
+    finally:
+        # Возвращаемся к опросу; поток перезапустится при следующем опросе
+        _watcher_active = False
+
+
+def reset_after_fork():
+    """Поток change stream не переживает fork() - дочерний процесс начинает с опроса"""
+    global _lock, _last_poll, _watcher_thread, _watcher_active
+    _lock = threading.Lock()
+    _last_poll = 0.0
+    _watcher_thread = None
+    _watcher_active = False
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_after_fork)
+
+
+# ==================== КЕШ ====================
+
+_MISSING = object()
+
+
+class VersionedCache:
+    """
+    In-process кеш, привязанный к версиям одного или нескольких namespace.
+    Как только версия меняется (запись в любом воркере), все записи
+    сбрасываются при следующем обращении.
+
+        cached = reference_cache.get('company.titles')
+        if cached is not None:
+            return cached
+        ...
+        return reference_cache.set('company.titles', choices)
+
+    set() сохраняет значение только если версия не изменилась с момента
+    get() в этом же потоке - данные, прочитанные до записи, не попадут
+    в кеш новой версии.
+    """
+
+    def __init__(self, *namespaces, name=None):
+        self.namespaces = namespaces
+        self.name = name or '+'.join(namespaces)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = None
+        self._local = threading.local()
+
+    def _sync(self, version):
+        # Вызывается под self._lock
+        if version != self._version:
+            self._entries = {}
+            self._version = version
+
+    def _current_version(self):
+        return tuple(get_version(namespace) for namespace in self.namespaces)
+
+    def get(self, key, default=None):
+        version = self._current_version()
+        self._local.version = version
+        with self._lock:
+            self._sync(version)
+            value = self._entries.get(key, _MISSING)
+        CACHE_REQUESTS.inc(cache=self.name, result='miss' if value is _MISSING else 'hit')
+        return default if value is _MISSING else value
+
+    def set(self, key, value):
+        version = getattr(self._local, 'version', None)
+        if version is None:
+            version = self._current_version()
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = value
+        return value
+
+    def get_or_load(self, key, loader):
+        """Значение из кеша или loader() (None не кешируется)"""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+
+# Смена конфигурации (например, другой рабочей базы) сбрасывает все кеши данных
+reference_cache = VersionedCache(REFERENCE, CONFIG, name='reference')
+company_cache = VersionedCache(COMPANY, CONFIG, name='company')
+users_cache = VersionedCache(USERS, CONFIG, name='users')
@@ -0,0 +1,153 @@
+# mongodb/circuit_breaker.py - Circuit breaker для подключения к MongoDB
+#
+# Пока MongoDB недоступна, каждый вызов get_client() блокировался бы на
+# serverSelectionTimeoutMS. Breaker переходит в состояние OPEN после
+# failure_threshold ошибок подряд и сразу отказывает всем вызовам, а
+# фоновый поток (recovery probe) периодически проверяет сервер и закрывает
+# breaker, как только ping снова проходит.
+
+import threading
+import time
+
+from loguru import logger
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=1, reset_timeout=30, probe_interval=5):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_interval = probe_interval
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._last_error = None
+        self._probe = None
+        self._probe_thread = None
+        self._stop_event = threading.Event()
+
+    # ==================== СОСТОЯНИЕ ====================
+
+    @property
+    def state(self):
+        with self._lock:
+            # Страховка на случай, если probe не настроен: через reset_timeout
+            # пропускаем одну пробную попытку (HALF_OPEN)
+            if (self._state == self.OPEN and self._probe is None
+                    and time.monotonic() - self._opened_at >= self.reset_timeout):
+                self._state = self.HALF_OPEN
+            return self._state
+
+    def is_open(self):
+        return self.state == self.OPEN
+
+    def allow_request(self):
+        """True, если можно обращаться к серверу"""
+        return self.state != self.OPEN
+
+    def get_status(self):
+        """Состояние breaker для отображения и health-проверок"""
+        state = self.state
+        with self._lock:
+            return {
+                'name': self.name,
+                'state': state,
+                'failures': self._failures,
+                'open_for_seconds': round(time.monotonic() - self._opened_at, 1) if self._opened_at else None,
+                'last_error': self._last_error,
+            }
+
+    # ==================== СОБЫТИЯ ====================
+
+    def record_success(self):
+        with self._lock:
+            was_open = self._state != self.CLOSED
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._last_error = None
+
+        if was_open:
+            logger.success(f"🟢 Circuit breaker '{self.name}' закрыт - сервер снова доступен")
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error) if error else None
+
+            if self._state == self.OPEN or self._failures < self.failure_threshold:
+                return
+
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+        logger.error(f"🔴 Circuit breaker '{self.name}' открыт: {error}")
+        self._start_probe_thread()
+
+    def reset(self):
+        """Сбрасывает состояние (например, после изменения конфигурации или fork)"""
+        self._stop_event.set()
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._last_error = None
+            self._probe_thread = None
+        self._stop_event = threading.Event()
+
+    def reinit_after_fork(self):
+        """
+        Вызывается в дочернем процессе после fork(): поток probe не переживает
+        fork, а блокировка могла быть захвачена в родителе.
+        """
+        self._lock = threading.Lock()
+        self.reset()
+
+    # ==================== RECOVERY PROBE ====================
+
+    def set_probe(self, probe):
+        """
+        Устанавливает функцию проверки сервера.
+        probe() должна вернуть True, если сервер доступен.
+        """
+        self._probe = probe
+
+    def _start_probe_thread(self):
+        if self._probe is None:
+            return
+
+        with self._lock:
+            if self._probe_thread is not None and self._probe_thread.is_alive():
+                return
+            self._probe_thread = threading.Thread(
+                target=self._probe_loop,
+                args=(self._stop_event,),
+                name=f"{self.name}-recovery-probe",
+                daemon=True,
+            )
+            self._probe_thread.start()
+
+    def _probe_loop(self, stop_event):
+        logger.info(f"🔍 Recovery probe '{self.name}' запущен (интервал {self.probe_interval}s)")
+
+        while not stop_event.wait(self.probe_interval):
+            if self.state == self.CLOSED:
+                break
+            try:
+                if self._probe():
+                    self.record_success()
+                    break
+            except Exception as e:
+                with self._lock:
+                    self._last_error = str(e)
+                logger.debug(f"Recovery probe '{self.name}': сервер всё ещё недоступен: {e}")
+
+
+# Единственный breaker для подключения MongoConnection
+mongo_breaker = CircuitBreaker('mongodb')
@@ -0,0 +1,59 @@
+# mongodb/management/commands/build_reference_snapshot.py - Сборка снимка справочников
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mongodb import cache_bus, reference_snapshot
+from mongodb.mongodb_config import MongoConfig
+
+
+class Command(BaseCommand):
+    help = (
+        "Компилирует коллекции {db}_basic_* в бинарный снимок для mmap "
+        "(mongodb/reference_snapshot.py). С --bump сначала увеличивает версию "
+        "справочников, чтобы все воркеры перешли на новый снимок."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bump',
+            action='store_true',
+            help='Увеличить версию reference перед сборкой (после импорта справочников)',
+        )
+        parser.add_argument(
+            '--info',
+            action='store_true',
+            help='Только показать содержимое текущего снимка',
+        )
+
+    def handle(self, *args, **options):
+        db_name = MongoConfig.read_config().get('db_name')
+        if not db_name:
+            raise CommandError("Рабочая база данных не настроена")
+
+        if options['bump']:
+            version = cache_bus.bump(cache_bus.REFERENCE)
+            if version is None:
+                raise CommandError("Не удалось увеличить версию справочников (MongoDB недоступна?)")
+        else:
+            cache_bus.refresh()
+            version = cache_bus.get_version(cache_bus.REFERENCE)
+
+        path = reference_snapshot.snapshot_path(db_name, version)
+        if not options['info']:
+            path = reference_snapshot.build(db_name, version)
+            if path is None:
+                raise CommandError("База данных MongoDB недоступна")
+        elif not os.path.exists(path):
+            raise CommandError(f"Снимок для версии {version} не найден: {path}")
+
+        snapshot = reference_snapshot.ReferenceSnapshot(path)
+        try:
+            self.stdout.write(f"Снимок: {path} ({os.path.getsize(path)} байт), версия справочников {version}")
+            for name, table in snapshot.tables.items():
+                self.stdout.write(f"  {name:<22} {len(table):>7} строк  [{', '.join(table.columns)}]")
+        finally:
+            snapshot.close()
+
+        self.stdout.write(self.style.SUCCESS("✅ Снимок справочников готов"))
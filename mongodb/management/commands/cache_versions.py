@@ -0,0 +1,71 @@
+# mongodb/management/commands/cache_versions.py - Просмотр и сброс версий шины кеша
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mongodb import cache_bus
+
+
+class Command(BaseCommand):
+    help = (
+        "Показывает версии кешей из коллекции {db}_cache_versions, "
+        "увеличивает версию namespace (--bump) или следит за изменениями (--watch)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bump',
+            choices=cache_bus.NAMESPACES,
+            action='append',
+            default=[],
+            help='Увеличить версию namespace (сбросит кеши во всех воркерах)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Увеличить версии всех namespace',
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Следить за версиями до Ctrl+C',
+        )
+
+    def handle(self, *args, **options):
+        if cache_bus.get_collection() is None:
+            raise CommandError("Коллекция версий недоступна (MongoDB не настроена или недоступна)")
+
+        namespaces = cache_bus.NAMESPACES if options['all'] else options['bump']
+        for namespace in namespaces:
+            version = cache_bus.bump(namespace)
+            self.stdout.write(self.style.SUCCESS(f"  🔔 {namespace}: -> {version}"))
+
+        cache_bus.refresh()
+        self._print_status()
+
+        if options['watch']:
+            self._watch()
+
+    def _print_status(self):
+        status = cache_bus.get_status()
+        self.stdout.write(f"Режим: {status['mode']} (интервал опроса {status['poll_interval']}s)")
+        for namespace, version in status['versions'].items():
+            self.stdout.write(f"  {namespace:<10} {version}")
+
+    def _watch(self):
+        self.stdout.write("Ожидание изменений (Ctrl+C для выхода)...")
+        seen = {namespace: cache_bus.get_version(namespace) for namespace in cache_bus.NAMESPACES}
+        started = time.monotonic()
+        try:
+            while True:
+                time.sleep(0.2)
+                for namespace in cache_bus.NAMESPACES:
+                    version = cache_bus.get_version(namespace)
+                    if version != seen[namespace]:
+                        elapsed = time.monotonic() - started
+                        mode = cache_bus.get_status()['mode']
+                        self.stdout.write(f"  [{elapsed:8.1f}s] {namespace}: {seen[namespace]} -> {version} ({mode})")
+                        seen[namespace] = version
+        except KeyboardInterrupt:
+            self.stdout.write("")
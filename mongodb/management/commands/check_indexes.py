@@ -0,0 +1,82 @@
+# mongodb/management/commands/check_indexes.py - Проверка индексов по реестру запросов
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mongodb.mongodb_config import MongoConfig
+from mongodb.mongodb_utils import MongoConnection
+from mongodb.query_registry import (
+    INDEXES,
+    QUERY_SHAPES,
+    collection_name,
+    ensure_indexes,
+    find_collscans,
+    find_missing_indexes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет индексы рабочей базы с реестром mongodb/query_registry.py, "
+        "создает недостающие и завершается с ошибкой, если зарегистрированный "
+        "запрос выполняется через COLLSCAN."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать недостающие индексы, не создавая их',
+        )
+        parser.add_argument(
+            '--skip-explain',
+            action='store_true',
+            help='Не проверять планы выполнения запросов',
+        )
+
+    def handle(self, *args, **options):
+        db = MongoConnection.get_database()
+        if db is None:
+            raise CommandError("База данных MongoDB недоступна")
+
+        db_name = MongoConfig.read_config().get('db_name')
+        existing_collections = set(db.list_collection_names())
+
+        # ==================== ИНДЕКСЫ ====================
+        missing_total = 0
+        for suffix in INDEXES:
+            name = collection_name(db_name, suffix)
+            if name not in existing_collections:
+                self.stdout.write(f"  ⏭  {name}: коллекция отсутствует")
+                continue
+
+            if options['dry_run']:
+                missing = find_missing_indexes(db[name], suffix)
+                missing_total += len(missing)
+                for spec in missing:
+                    self.stdout.write(self.style.WARNING(f"  ➕ {name}: нет индекса {spec['name']} {spec['keys']}"))
+                if not missing:
+                    self.stdout.write(f"  ✅ {name}: все индексы на месте")
+            else:
+                created = ensure_indexes(db, db_name, suffix)
+                missing_total += len(created)
+                if created:
+                    self.stdout.write(self.style.SUCCESS(f"  ➕ {name}: созданы {', '.join(created)}"))
+                else:
+                    self.stdout.write(f"  ✅ {name}: все индексы на месте")
+
+        if options['skip_explain']:
+            return
+
+        # ==================== ПЛАНЫ ЗАПРОСОВ ====================
+        self.stdout.write(f"Проверка {len(QUERY_SHAPES)} форм запросов...")
+        collscans = find_collscans(db, db_name)
+
+        if collscans:
+            for shape, stages in collscans:
+                self.stderr.write(self.style.ERROR(
+                    f"  ❌ {shape['name']} ({shape['used_by']}): {' <- '.join(stages)}"
+                ))
+            hint = " (запустите без --dry-run, чтобы создать индексы)" if options['dry_run'] and missing_total else ""
+            raise CommandError(f"{len(collscans)} зарегистрированных запросов выполняются через COLLSCAN{hint}")
+
+        self.stdout.write(self.style.SUCCESS("✅ Ни один зарегистрированный запрос не использует COLLSCAN"))
@@ -0,0 +1,34 @@
+# mongodb/management/commands/warmup.py - Прогрев кешей, соединений и шаблонов
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mongodb.warmup import run_warmup
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет прогрев (mongodb/warmup.py): подключение к MongoDB, "
+        "справочники, снимок PLZ, шаблоны - и показывает время каждого шага."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Завершиться с ошибкой, если хотя бы один шаг не удался',
+        )
+
+    def handle(self, *args, **options):
+        status = run_warmup()
+
+        styles = {'ok': self.style.SUCCESS, 'skipped': self.style.WARNING, 'failed': self.style.ERROR}
+        for step in status['steps']:
+            style = styles.get(step['result'], str)
+            detail = f" - {step['detail']}" if step['detail'] else ""
+            self.stdout.write(style(f"  {step['name']:<20} {step['result']:<8} {step['duration_ms']:>8} мс{detail}"))
+
+        self.stdout.write(f"Итого: {status['duration_ms']} мс")
+
+        failed = [step['name'] for step in status['steps'] if step['result'] == 'failed']
+        if failed and options['strict']:
+            raise CommandError(f"Шаги прогрева не удались: {', '.join(failed)}")
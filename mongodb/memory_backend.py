@@ -0,0 +1,1479 @@
+# mongodb/memory_backend.py - In-process замена сервера MongoDB (WWS_MONGO_BACKEND=memory)
+#
+# Весь доступ к данным идет через MongoConnection.get_client()/get_database(),
+# поэтому достаточно подменить клиент: mongodb/backends.py создает MemoryClient
+# вместо pymongo.MongoClient, когда settings.MONGO_BACKEND == 'memory'.
+#
+# Поддерживается подмножество API pymongo, которое использует проект:
+#   - find/find_one (проекции, sort/skip/limit, explain), count_documents,
+#     distinct, insert_*, update_*/replace_one (в т.ч. upsert), delete_*,
+#     find_one_and_update/replace/delete;
+#   - операторы запросов $eq $ne $gt $gte $lt $lte $in $nin $exists $regex
+#     $not $size $all $elemMatch $and $or $nor;
+#   - операторы обновления $set $unset $inc $mul $min $max $push $addToSet
+#     $pull $pop $rename $setOnInsert $currentDate;
+#   - aggregate: $match $project $addFields/$set $group $sort $skip $limit
+#     $count $unwind;
+#   - индексы (create_index/index_information/drop_index) с unique, sparse
+#     и partialFilterExpression - уникальность проверяется как в MongoDB
+#     (DuplicateKeyError, code 11000).
+#
+# Данные живут в памяти процесса и общие для всех MemoryClient: несколько
+# клиентов (test_connection, authenticate_admin, get_client) видят одну
+# "базу", как с настоящим сервером. Между процессами данные не делятся -
+# бэкенд предназначен для runserver, тестов и бенчмарков (один процесс).
+#
+# Change streams не поддерживаются (OperationFailure 40573) - cache_bus
+# переходит на опрос, как на standalone-сервере.
+
+import copy
+import datetime
+import functools
+import re
+import threading
+import time
+
+from bson import ObjectId
+from bson.regex import Regex
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, InvalidOperation, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from monitoring import command_capture
+
+_MISSING = object()
+
+SERVER_VERSION = '7.0.0-memory'
+
+
+class _Store:
+    """Все базы процесса: {имя базы: {имя коллекции: _CollectionData}}"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.databases = {}
+
+
+_store = _Store()
+
+
+def reset():
+    """Удаляет все данные (между тестами/прогонами бенчмарка)"""
+    with _store.lock:
+        _store.databases.clear()
+
+
+# ==================== МЕТРИКИ ====================
+# Команды учитываются в wws_mongodb_commands_total так же, как
+# CommandMetricsListener учитывает команды pymongo: нагрузочные тесты
+# (benchmarks/) сравнивают число обращений к MongoDB на обоих бэкендах.
+# Для CaptureMongoCommands (monitoring/command_capture.py) передается и
+# результат: его размер в BSON - аналог размера ответа сервера.
+
+_instruments = None
+
+
+def _record_command(name, outcome, duration, reply=None):
+    global _instruments
+    if _instruments is None:
+        from django.conf import settings
+
+        if getattr(settings, 'METRICS_ENABLED', True):
+            from monitoring import instruments
+            _instruments = instruments
+        else:
+            _instruments = False
+
+    if _instruments:
+        _instruments.MONGO_COMMANDS.inc(command=name, outcome=outcome)
+        _instruments.MONGO_COMMAND_LATENCY.observe(duration, command=name)
+
+    if command_capture.is_active():
+        command_capture.record(name, duration, reply)
+
+
+def _command(name):
+    """Декоратор метода: вызов учитывается как команда MongoDB name"""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = 'failed'
+            result = None
+            try:
+                result = method(*args, **kwargs)
+                outcome = 'ok'
+                return result
+            finally:
+                _record_command(name, outcome, time.perf_counter() - started, result)
+
+        return wrapper
+
+    return decorator
+
+
+# ==================== ПУТИ И ЗНАЧЕНИЯ ====================
+
+def _get_values(doc, path):
+    """Все значения по пути с точками (массивы разворачиваются, как в MongoDB)"""
+    values = [doc]
+    for part in path.split('.'):
+        next_values = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    next_values.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit():
+                    index = int(part)
+                    if index < len(value):
+                        next_values.append(value[index])
+                else:
+                    for item in value:
+                        if isinstance(item, dict) and part in item:
+                            next_values.append(item[part])
+        values = next_values
+        if not values:
+            break
+    return values
+
+
+def _get_value(doc, path, default=None):
+    """Первое значение по пути (для сортировки, группировки, проекций)"""
+    values = _get_values(doc, path)
+    return values[0] if values else default
+
+
+def _set_path(doc, path, value):
+    parts = path.split('.')
+    target = doc
+    for part in parts[:-1]:
+        if isinstance(target, list) and part.isdigit():
+            target = target[int(part)]
+            continue
+        nested = target.get(part)
+        if not isinstance(nested, (dict, list)):
+            nested = target[part] = {}
+        target = nested
+    if isinstance(target, list) and parts[-1].isdigit():
+        target[int(parts[-1])] = value
+    else:
+        target[parts[-1]] = value
+
+
+def _unset_path(doc, path):
+    parts = path.split('.')
+    target = doc
+    for part in parts[:-1]:
+        target = target.get(part) if isinstance(target, dict) else None
+        if target is None:
+            return _MISSING
+    if isinstance(target, dict):
+        return target.pop(parts[-1], _MISSING)
+    return _MISSING
+
+
+def _lookup_path(doc, path):
+    """Значение по пути без разворачивания массивов (_MISSING, если нет)"""
+    target = doc
+    for part in path.split('.'):
+        if isinstance(target, dict) and part in target:
+            target = target[part]
+        elif isinstance(target, list) and part.isdigit() and int(part) < len(target):
+            target = target[int(part)]
+        else:
+            return _MISSING
+    return target
+
+
+# Порядок типов BSON при сравнении и сортировке
+def _type_rank(value):
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime.datetime):
+        return 9
+    return 10
+
+
+def _sort_value(value):
+    rank = _type_rank(value)
+    if rank == 1:
+        return (rank, 0)
+    if rank in (4, 5, 10):
+        return (rank, repr(value))
+    return (rank, value)
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return tuple((key, _hashable(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+def _equal(a, b):
+    # В MongoDB True != 1, в Python - равны
+    if isinstance(a, bool) != isinstance(b, bool):
+        return False
+    return a == b
+
+
+def _compile_regex(pattern, options=''):
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    if isinstance(pattern, Regex):
+        return pattern.try_compile()
+    flags = 0
+    for option in options or '':
+        flags |= {'i': re.IGNORECASE, 'm': re.MULTILINE, 'x': re.VERBOSE, 's': re.DOTALL}.get(option, 0)
+    return re.compile(pattern, flags)
+
+
+def _is_regex(value):
+    return isinstance(value, (re.Pattern, Regex))
+
+
+# ==================== ЗАПРОСЫ ====================
+
+def _candidates(values):
+    """Значения поля + элементы массивов (условие выполняется для любого)"""
+    for value in values:
+        yield value
+        if isinstance(value, list):
+            yield from value
+
+
+def _match_equal(values, expected):
+    if _is_regex(expected):
+        regex = _compile_regex(expected)
+        return any(isinstance(value, str) and regex.search(value) for value in _candidates(values))
+    if expected is None:
+        return not values or any(value is None for value in _candidates(values))
+    return any(_equal(value, expected) for value in _candidates(values))
+
+
+def _compare(values, expected, operator):
+    rank = _type_rank(expected)
+    for value in _candidates(values):
+        if _type_rank(value) != rank or value is None:
+            continue
+        try:
+            if operator(value, expected):
+                return True
+        except TypeError:
+            continue
+    return False
+
+
+def _match_operators(values, condition):
+    """Условие поля вида {'$gt': 1, '$ne': 2, ...}"""
+    for operator, argument in condition.items():
+        if operator == '$eq':
+            matched = _match_equal(values, argument)
+        elif operator == '$ne':
+            matched = not _match_equal(values, argument)
+        elif operator == '$gt':
+            matched = _compare(values, argument, lambda a, b: a > b)
+        elif operator == '$gte':
+            matched = _compare(values, argument, lambda a, b: a >= b)
+        elif operator == '$lt':
+            matched = _compare(values, argument, lambda a, b: a < b)
+        elif operator == '$lte':
+            matched = _compare(values, argument, lambda a, b: a <= b)
+        elif operator == '$in':
+            matched = any(_match_equal(values, item) for item in argument)
+        elif operator == '$nin':
+            matched = not any(_match_equal(values, item) for item in argument)
+        elif operator == '$exists':
+            matched = bool(values) == bool(argument)
+        elif operator == '$regex':
+            regex = _compile_regex(argument, condition.get('$options', ''))
+            matched = any(isinstance(value, str) and regex.search(value) for value in _candidates(values))
+        elif operator == '$options':
+            continue
+        elif operator == '$not':
+            if isinstance(argument, dict):
+                matched = not _match_operators(values, argument)
+            else:
+                matched = not _match_equal(values, argument)
+        elif operator == '$size':
+            matched = any(isinstance(value, list) and len(value) == argument for value in values)
+        elif operator == '$all':
+            matched = any(
+                isinstance(value, list) and all(any(_equal(item, wanted) for item in value) for wanted in argument)
+                for value in values
+            )
+        elif operator == '$elemMatch':
+            matched = any(
+                isinstance(value, list) and any(_match_element(item, argument) for item in value)
+                for value in values
+            )
+        else:
+            raise OperationFailure(f"unknown operator: {operator}", code=2)
+
+        if not matched:
+            return False
+    return True
+
+
+def _match_element(item, condition):
+    if isinstance(item, dict) and not any(key.startswith('$') for key in condition):
+        return _match_document(item, condition)
+    return _match_operators([item], condition)
+
+
+def _is_operator_condition(condition):
+    return isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition)
+
+
+def _match_document(doc, query):
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            if not all(_match_document(doc, sub) for sub in condition):
+                return False
+        elif key == '$or':
+            if not any(_match_document(doc, sub) for sub in condition):
+                return False
+        elif key == '$nor':
+            if any(_match_document(doc, sub) for sub in condition):
+                return False
+        elif key == '$comment':
+            continue
+        elif key.startswith('$'):
+            raise OperationFailure(f"unknown top level operator: {key}", code=2)
+        else:
+            values = _get_values(doc, key)
+            if _is_operator_condition(condition):
+                if not _match_operators(values, condition):
+                    return False
+            elif not _match_equal(values, condition):
+                return False
+    return True
+
+
+def _sort_documents(documents, sort):
+    # Стабильная сортировка по ключам в обратном порядке
+    for field, direction in reversed(sort):
+        documents.sort(key=lambda doc: _sort_value(_get_value(doc, field)), reverse=direction == -1)
+    return documents
+
+
+def _normalize_sort(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(key, value) for key, value in key_or_list]
+
+
+# ==================== ПРОЕКЦИИ ====================
+
+def _apply_projection(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+
+    include_id = projection.get('_id', 1)
+    fields = {key: value for key, value in projection.items() if key != '_id'}
+    inclusion = any(value for value in fields.values())
+
+    if inclusion:
+        result = {}
+        if include_id and '_id' in doc:
+            result['_id'] = copy.deepcopy(doc['_id'])
+        for field, wanted in fields.items():
+            if not wanted:
+                continue
+            value = _lookup_path(doc, field)
+            if value is not _MISSING:
+                _set_path(result, field, copy.deepcopy(value))
+        return result
+
+    result = copy.deepcopy(doc)
+    if not include_id:
+        result.pop('_id', None)
+    for field in fields:
+        _unset_path(result, field)
+    return result
+
+
+# ==================== ОБНОВЛЕНИЯ ====================
+
+def _is_operator_update(update):
+    return any(key.startswith('$') for key in update)
+
+
+def _apply_update(doc, update, inserting=False):
+    """Применяет операторы обновления к doc (на месте); True - документ изменен"""
+    before = copy.deepcopy(doc)
+
+    for operator, fields in update.items():
+        if operator == '$setOnInsert' and not inserting:
+            continue
+        for path, argument in fields.items():
+            if path == '_id' and operator in ('$set', '$unset', '$rename') and not inserting:
+                if operator != '$set' or argument != doc.get('_id'):
+                    raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'", code=66)
+
+            current = _lookup_path(doc, path)
+            if operator in ('$set', '$setOnInsert'):
+                _set_path(doc, path, copy.deepcopy(argument))
+            elif operator == '$unset':
+                _unset_path(doc, path)
+            elif operator == '$inc':
+                _set_path(doc, path, (0 if current is _MISSING else current) + argument)
+            elif operator == '$mul':
+                _set_path(doc, path, (0 if current is _MISSING else current) * argument)
+            elif operator == '$min':
+                if current is _MISSING or _sort_value(argument) < _sort_value(current):
+                    _set_path(doc, path, argument)
+            elif operator == '$max':
+                if current is _MISSING or _sort_value(argument) > _sort_value(current):
+                    _set_path(doc, path, argument)
+            elif operator == '$currentDate':
+                _set_path(doc, path, datetime.datetime.now())
+            elif operator == '$rename':
+                value = _unset_path(doc, path)
+                if value is not _MISSING:
+                    _set_path(doc, argument, value)
+            elif operator in ('$push', '$addToSet'):
+                items = argument['$each'] if isinstance(argument, dict) and '$each' in argument else [argument]
+                array = [] if current is _MISSING else current
+                if not isinstance(array, list):
+                    raise OperationFailure(f"The field '{path}' must be an array", code=2)
+                for item in items:
+                    if operator == '$push' or not any(_equal(existing, item) for existing in array):
+                        array.append(copy.deepcopy(item))
+                _set_path(doc, path, array)
+            elif operator == '$pull':
+                if isinstance(current, list):
+                    if isinstance(argument, dict):
+                        kept = [item for item in current if not _match_element(item, argument)]
+                    else:
+                        kept = [item for item in current if not _match_equal([item], argument)]
+                    _set_path(doc, path, kept)
+            elif operator == '$pop':
+                if isinstance(current, list) and current:
+                    current.pop(0 if argument == -1 else -1)
+            else:
+                raise OperationFailure(f"Unknown modifier: {operator}", code=9)
+
+    return doc != before
+
+
+def _upsert_base(query):
+    """Документ для upsert: поля равенства из фильтра"""
+    doc = {}
+    for key, condition in (query or {}).items():
+        if key.startswith('$'):
+            continue
+        if _is_operator_condition(condition):
+            if '$eq' in condition:
+                _set_path(doc, key, copy.deepcopy(condition['$eq']))
+        elif not _is_regex(condition):
+            _set_path(doc, key, copy.deepcopy(condition))
+    return doc
+
+
+# ==================== АГРЕГАЦИЯ ====================
+
+def _eval_expression(expression, doc):
+    if isinstance(expression, str) and expression.startswith('$'):
+        return _get_value(doc, expression[1:])
+    if isinstance(expression, list):
+        return [_eval_expression(item, doc) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+
+    if len(expression) == 1:
+        operator, argument = next(iter(expression.items()))
+        if operator.startswith('$'):
+            if operator == '$literal':
+                return argument
+            args = _eval_expression(argument, doc)
+            if operator == '$concat':
+                return None if any(arg is None for arg in args) else ''.join(args)
+            if operator == '$toLower':
+                return (args or '').lower()
+            if operator == '$toUpper':
+                return (args or '').upper()
+            if operator == '$ifNull':
+                return next((arg for arg in args if arg is not None), None)
+            if operator == '$size':
+                return len(args)
+            if operator == '$eq':
+                return _equal(args[0], args[1])
+            raise OperationFailure(f"Unsupported expression operator in memory backend: {operator}", code=168)
+
+    return {key: _eval_expression(value, doc) for key, value in expression.items()}
+
+
+def _accumulate(groups, accumulators):
+    results = []
+    for group_id, docs in groups.items():
+        result = {'_id': docs[0][0]}
+        for field, spec in accumulators.items():
+            operator, expression = next(iter(spec.items()))
+            values = [_eval_expression(expression, doc) for _key, doc in docs]
+            numbers = [value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+            present = [value for value in values if value is not None]
+            if operator == '$sum':
+                result[field] = sum(numbers)
+            elif operator == '$avg':
+                result[field] = sum(numbers) / len(numbers) if numbers else None
+            elif operator == '$min':
+                result[field] = min(present, key=_sort_value) if present else None
+            elif operator == '$max':
+                result[field] = max(present, key=_sort_value) if present else None
+            elif operator == '$first':
+                result[field] = values[0] if values else None
+            elif operator == '$last':
+                result[field] = values[-1] if values else None
+            elif operator == '$push':
+                result[field] = values
+            elif operator == '$addToSet':
+                unique = []
+                for value in values:
+                    if not any(_equal(value, existing) for existing in unique):
+                        unique.append(value)
+                result[field] = unique
+            elif operator == '$count':
+                result[field] = len(values)
+            else:
+                raise OperationFailure(f"Unsupported accumulator in memory backend: {operator}", code=15952)
+        results.append(result)
+    return results
+
+
+def _run_pipeline(documents, pipeline):
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == '$match':
+            documents = [doc for doc in documents if _match_document(doc, spec)]
+        elif name == '$project':
+            computed = {key: value for key, value in spec.items() if not isinstance(value, (int, bool))}
+            plain = {key: value for key, value in spec.items() if isinstance(value, (int, bool))}
+            if computed:
+                plain.update({key: 1 for key in computed})
+            projected = []
+            for doc in documents:
+                result = _apply_projection(doc, plain)
+                for key, expression in computed.items():
+                    _set_path(result, key, _eval_expression(expression, doc))
+                projected.append(result)
+            documents = projected
+        elif name in ('$addFields', '$set'):
+            for doc in documents:
+                for key, expression in spec.items():
+                    _set_path(doc, key, _eval_expression(expression, doc))
+        elif name == '$group':
+            groups = {}
+            accumulators = {key: value for key, value in spec.items() if key != '_id'}
+            for doc in documents:
+                group_id = _eval_expression(spec['_id'], doc)
+                groups.setdefault(_hashable(group_id), []).append((group_id, doc))
+            documents = _accumulate(groups, accumulators)
+        elif name == '$sort':
+            documents = _sort_documents(documents, list(spec.items()))
+        elif name == '$skip':
+            documents = documents[spec:]
+        elif name == '$limit':
+            documents = documents[:spec]
+        elif name == '$count':
+            documents = [{spec: len(documents)}] if documents else []
+        elif name == '$unwind':
+            path = spec if isinstance(spec, str) else spec['path']
+            path = path[1:]
+            unwound = []
+            for doc in documents:
+                value = _lookup_path(doc, path)
+                if isinstance(value, list):
+                    for item in value:
+                        copy_doc = copy.deepcopy(doc)
+                        _set_path(copy_doc, path, item)
+                        unwound.append(copy_doc)
+                elif value is not _MISSING and value is not None:
+                    unwound.append(doc)
+            documents = unwound
+        else:
+            raise OperationFailure(f"Unsupported pipeline stage in memory backend: {name}", code=40324)
+    return documents
+
+
+# ==================== ХРАНИЛИЩЕ КОЛЛЕКЦИИ ====================
+
+class _CollectionData:
+    """Документы коллекции {_id: doc} (в порядке вставки) и уникальные индексы"""
+
+    def __init__(self, options=None):
+        self.documents = {}
+        self.options = options or {}
+        self.indexes = {'_id_': {'key': [('_id', 1)], 'unique': True}}
+        # Для unique-индексов: {имя индекса: {ключ: _id}}
+        self.unique_keys = {}
+
+    def index_key(self, spec, doc):
+        if spec.get('partialFilterExpression') and not _match_document(doc, spec['partialFilterExpression']):
+            return _MISSING
+        values = [_lookup_path(doc, field) for field, _direction in spec['key']]
+        if spec.get('sparse') and all(value is _MISSING for value in values):
+            return _MISSING
+        return tuple(_hashable(None if value is _MISSING else value) for value in values)
+
+    def check_unique(self, doc, ignore_id=_MISSING):
+        for name, spec in self.indexes.items():
+            if not spec.get('unique') or name == '_id_':
+                continue
+            key = self.index_key(spec, doc)
+            if key is _MISSING:
+                continue
+            owner = self.unique_keys.get(name, {}).get(key, _MISSING)
+            if owner is not _MISSING and owner != ignore_id:
+                fields = ', '.join(f"{field}: {value!r}" for (field, _), value in zip(spec['key'], key))
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error index: {name} dup key: {{ {fields} }}",
+                    code=11000,
+                    details={'keyPattern': dict(spec['key']), 'index': name},
+                )
+
+    def add_keys(self, doc):
+        for name, spec in self.indexes.items():
+            if spec.get('unique') and name != '_id_':
+                key = self.index_key(spec, doc)
+                if key is not _MISSING:
+                    self.unique_keys.setdefault(name, {})[key] = _hashable(doc['_id'])
+
+    def remove_keys(self, doc):
+        for name, spec in self.indexes.items():
+            if spec.get('unique') and name != '_id_':
+                key = self.index_key(spec, doc)
+                if key is not _MISSING:
+                    self.unique_keys.get(name, {}).pop(key, None)
+
+    def insert(self, doc):
+        doc_id = _hashable(doc['_id'])
+        if doc_id in self.documents:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error index: _id_ dup key: {{ _id: {doc['_id']!r} }}",
+                code=11000,
+                details={'keyPattern': {'_id': 1}, 'index': '_id_'},
+            )
+        self.check_unique(doc)
+        self.documents[doc_id] = doc
+        self.add_keys(doc)
+
+    def replace(self, old_doc, new_doc):
+        doc_id = _hashable(old_doc['_id'])
+        self.remove_keys(old_doc)
+        try:
+            self.check_unique(new_doc, ignore_id=doc_id)
+        except DuplicateKeyError:
+            self.add_keys(old_doc)
+            raise
+        self.documents[doc_id] = new_doc
+        self.add_keys(new_doc)
+
+    def delete(self, doc):
+        self.remove_keys(doc)
+        del self.documents[_hashable(doc['_id'])]
+
+    def rebuild_unique_keys(self, name):
+        spec = self.indexes[name]
+        keys = {}
+        for doc in self.documents.values():
+            key = self.index_key(spec, doc)
+            if key is _MISSING:
+                continue
+            if key in keys:
+                raise DuplicateKeyError(f"E11000 duplicate key error index: {name}", code=11000)
+            keys[key] = _hashable(doc['_id'])
+        self.unique_keys[name] = keys
+
+
+# ==================== КУРСОРЫ ====================
+
+class MemoryCursor:
+    """Ленивый курсор find(): выполняется при первой итерации"""
+
+    def __init__(self, collection, filter=None, projection=None, sort=None, skip=0, limit=0):
+        self.collection = collection
+        self._filter = filter or {}
+        self._projection = projection
+        self._sort = _normalize_sort(sort) if sort else None
+        self._skip = skip
+        self._limit = limit
+        self._results = None
+        self._position = 0
+
+    def _check_not_started(self):
+        if self._results is not None:
+            raise InvalidOperation("cannot set options after executing query")
+
+    def sort(self, key_or_list, direction=None):
+        self._check_not_started()
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, skip):
+        self._check_not_started()
+        self._skip = skip
+        return self
+
+    def limit(self, limit):
+        self._check_not_started()
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size):
+        return self
+
+    def hint(self, index):
+        return self
+
+    def max_time_ms(self, max_time_ms):
+        return self
+
+    def collation(self, collation):
+        return self
+
+    def _execute(self):
+        if self._results is None:
+            self._results = self._run()
+        return self._results
+
+    @_command('find')
+    def _run(self):
+        documents = self.collection._matching(self._filter)
+        if self._sort:
+            documents = _sort_documents(documents, self._sort)
+        if self._skip:
+            documents = documents[self._skip:]
+        if self._limit:
+            documents = documents[:abs(self._limit)]
+        return [_apply_projection(doc, self._projection) for doc in documents]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        results = self._execute()
+        if self._position >= len(results):
+            raise StopIteration
+        self._position += 1
+        return results[self._position - 1]
+
+    next = __next__
+
+    def to_list(self, length=None):
+        results = self._execute()[self._position:]
+        if length is not None:
+            results = results[:length]
+        self._position += len(results)
+        return results
+
+    def rewind(self):
+        self._results = None
+        self._position = 0
+        return self
+
+    def clone(self):
+        return MemoryCursor(self.collection, self._filter, self._projection, self._sort, self._skip, self._limit)
+
+    def close(self):
+        self._results = []
+
+    @property
+    def alive(self):
+        return self._results is None or self._position < len(self._results)
+
+    def explain(self):
+        return {'queryPlanner': {'winningPlan': self.collection._plan(self._filter, self._sort)}, 'ok': 1.0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MemoryCommandCursor:
+    """Результат aggregate()"""
+
+    def __init__(self, documents):
+        self._documents = documents
+        self._position = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._position >= len(self._documents):
+            raise StopIteration
+        self._position += 1
+        return self._documents[self._position - 1]
+
+    next = __next__
+
+    def to_list(self, length=None):
+        results = self._documents[self._position:]
+        if length is not None:
+            results = results[:length]
+        self._position += len(results)
+        return results
+
+    def close(self):
+        self._position = len(self._documents)
+
+    @property
+    def alive(self):
+        return self._position < len(self._documents)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# ==================== КОЛЛЕКЦИЯ ====================
+
+def _write_error(index, error, op):
+    """Элемент writeErrors BulkWriteError (keyPattern - какой уникальный индекс нарушен)"""
+    return {
+        'index': index,
+        'code': 11000,
+        'errmsg': str(error),
+        'keyPattern': (error.details or {}).get('keyPattern', {}),
+        'op': op,
+    }
+
+
+class MemoryCollection:
+
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.full_name = f"{database.name}.{name}"
+
+    def __repr__(self):
+        return f"MemoryCollection({self.full_name!r})"
+
+    def __getitem__(self, name):
+        return self.database[f"{self.name}.{name}"]
+
+    def with_options(self, **kwargs):
+        return self
+
+    def _data(self, create=False):
+        collections = _store.databases.get(self.database.name)
+        if collections is None:
+            if not create:
+                return None
+            collections = _store.databases[self.database.name] = {}
+        data = collections.get(self.name)
+        if data is None and create:
+            data = collections[self.name] = _CollectionData()
+        return data
+
+    def _matching(self, query):
+        with _store.lock:
+            data = self._data()
+            if data is None:
+                return []
+            return [doc for doc in data.documents.values() if _match_document(doc, query)]
+
+    def _plan(self, query, sort):
+        """Упрощенный план для explain(): IXSCAN, если индекс начинается с поля фильтра/сортировки"""
+        data = self._data()
+        fields = [key for key in (query or {}) if not key.startswith('$')]
+        sort_fields = [field for field, _direction in (sort or [])]
+        for name, spec in (data.indexes.items() if data else []):
+            first_field = spec['key'][0][0]
+            if first_field in fields or (sort_fields and first_field == sort_fields[0]):
+                return {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': name,
+                                                         'keyPattern': dict(spec['key'])}}
+        return {'stage': 'COLLSCAN', 'filter': query or {}}
+
+    # ---------- чтение ----------
+
+    def find(self, filter=None, projection=None, skip=0, limit=0, sort=None, **kwargs):
+        return MemoryCursor(self, filter, projection, sort, skip, limit)
+
+    def find_one(self, filter=None, projection=None, *args, sort=None, **kwargs):
+        if filter is not None and not isinstance(filter, dict):
+            filter = {'_id': filter}
+        for doc in self.find(filter, projection, sort=sort).limit(1):
+            return doc
+        return None
+
+    @_command('aggregate')
+    def count_documents(self, filter, skip=0, limit=0, **kwargs):
+        count = max(len(self._matching(filter)) - skip, 0)
+        return min(count, limit) if limit else count
+
+    def estimated_document_count(self, **kwargs):
+        with _store.lock:
+            data = self._data()
+            return len(data.documents) if data else 0
+
+    @_command('distinct')
+    def distinct(self, key, filter=None, **kwargs):
+        values = []
+        for doc in self._matching(filter or {}):
+            for value in _candidates(_get_values(doc, key)):
+                if isinstance(value, list):
+                    continue
+                if not any(_equal(value, existing) for existing in values):
+                    values.append(copy.deepcopy(value))
+        return values
+
+    @_command('aggregate')
+    def aggregate(self, pipeline, **kwargs):
+        documents = [copy.deepcopy(doc) for doc in self._matching({})]
+        return MemoryCommandCursor(_run_pipeline(documents, pipeline))
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+    # ---------- запись ----------
+
+    @_command('insert')
+    def insert_one(self, document, **kwargs):
+        with _store.lock:
+            if '_id' not in document:
+                document['_id'] = ObjectId()
+            self._data(create=True).insert(copy.deepcopy(document))
+        return InsertOneResult(document['_id'], True)
+
+    @_command('insert')
+    def insert_many(self, documents, ordered=True, **kwargs):
+        """Как в MongoDB: ordered=False продолжает после дубликата, ошибки - в BulkWriteError"""
+        inserted_ids = []
+        write_errors = []
+        with _store.lock:
+            data = self._data(create=True)
+            for index, document in enumerate(documents):
+                if '_id' not in document:
+                    document['_id'] = ObjectId()
+                try:
+                    data.insert(copy.deepcopy(document))
+                except DuplicateKeyError as e:
+                    write_errors.append(_write_error(index, e, document))
+                    if ordered:
+                        break
+                    continue
+                inserted_ids.append(document['_id'])
+
+        if write_errors:
+            raise BulkWriteError({
+                'nInserted': len(inserted_ids), 'nUpserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0,
+                'upserted': [], 'writeErrors': write_errors, 'writeConcernErrors': [],
+            })
+        return InsertManyResult(inserted_ids, True)
+
+    def _update(self, filter, update, upsert, multi, replace=False):
+        if not update:
+            raise ValueError("update cannot be empty")
+        if replace and _is_operator_update(update):
+            raise ValueError("replacement can not include $ operators")
+        if not replace and not _is_operator_update(update):
+            raise ValueError("update only works with $ operators")
+
+        with _store.lock:
+            data = self._data(create=upsert)
+            matched = [] if data is None else [doc for doc in data.documents.values() if _match_document(doc, filter)]
+            if not multi:
+                matched = matched[:1]
+
+            modified = 0
+            for doc in matched:
+                new_doc = copy.deepcopy(doc)
+                if replace:
+                    new_doc = dict(copy.deepcopy(update), _id=doc['_id'])
+                    changed = new_doc != doc
+                else:
+                    changed = _apply_update(new_doc, update)
+                if changed:
+                    data.replace(doc, new_doc)
+                    modified += 1
+
+            raw_result = {'n': len(matched), 'nModified': modified, 'ok': 1.0, 'updatedExisting': bool(matched)}
+            if not matched and upsert:
+                new_doc = _upsert_base(filter)
+                if replace:
+                    new_doc.update(copy.deepcopy(update))
+                else:
+                    _apply_update(new_doc, update, inserting=True)
+                new_doc.setdefault('_id', ObjectId())
+                data.insert(new_doc)
+                raw_result.update({'n': 1, 'upserted': new_doc['_id']})
+
+        return UpdateResult(raw_result, True)
+
+    @_command('update')
+    def update_one(self, filter, update, upsert=False, **kwargs):
+        return self._update(filter, update, upsert, multi=False)
+
+    @_command('update')
+    def update_many(self, filter, update, upsert=False, **kwargs):
+        return self._update(filter, update, upsert, multi=True)
+
+    @_command('update')
+    def replace_one(self, filter, replacement, upsert=False, **kwargs):
+        return self._update(filter, replacement, upsert, multi=False, replace=True)
+
+    def _delete(self, filter, multi):
+        with _store.lock:
+            data = self._data()
+            if data is None:
+                return DeleteResult({'n': 0, 'ok': 1.0}, True)
+            matched = [doc for doc in data.documents.values() if _match_document(doc, filter)]
+            if not multi:
+                matched = matched[:1]
+            for doc in matched:
+                data.delete(doc)
+        return DeleteResult({'n': len(matched), 'ok': 1.0}, True)
+
+    @_command('delete')
+    def delete_one(self, filter, **kwargs):
+        return self._delete(filter, multi=False)
+
+    @_command('delete')
+    def delete_many(self, filter, **kwargs):
+        return self._delete(filter, multi=True)
+
+    @_command('bulkWrite')
+    def bulk_write(self, requests, ordered=True, **kwargs):
+        """InsertOne/UpdateOne/UpdateMany/ReplaceOne/DeleteOne/DeleteMany одной командой"""
+        result = {
+            'nInserted': 0, 'nUpserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0,
+            'upserted': [], 'writeErrors': [], 'writeConcernErrors': [],
+        }
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    document = request._doc
+                    with _store.lock:
+                        document.setdefault('_id', ObjectId())
+                        self._data(create=True).insert(copy.deepcopy(document))
+                    result['nInserted'] += 1
+                    continue
+                if isinstance(request, (DeleteOne, DeleteMany)):
+                    deleted = self._delete(request._filter, multi=isinstance(request, DeleteMany))
+                    result['nRemoved'] += deleted.deleted_count
+                    continue
+                if isinstance(request, (UpdateOne, UpdateMany)):
+                    updated = self._update(request._filter, request._doc, request._upsert,
+                                           multi=isinstance(request, UpdateMany))
+                elif isinstance(request, ReplaceOne):
+                    updated = self._update(request._filter, request._doc, request._upsert, multi=False, replace=True)
+                else:
+                    raise TypeError(f"{request!r} is not a valid request")
+            except DuplicateKeyError as e:
+                result['writeErrors'].append(_write_error(index, e, request))
+                if ordered:
+                    break
+                continue
+
+            if updated.upserted_id is not None:
+                result['nUpserted'] += 1
+                result['upserted'].append({'index': index, '_id': updated.upserted_id})
+            else:
+                result['nMatched'] += updated.matched_count
+                result['nModified'] += updated.modified_count
+
+        if result['writeErrors']:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    def _find_one_and(self, filter, projection, sort, action, return_document):
+        with _store.lock:
+            documents = self._matching(filter)
+            if sort:
+                documents = _sort_documents(documents, _normalize_sort(sort))
+            before = documents[0] if documents else None
+            after = action(before)
+        result = after if return_document == ReturnDocument.AFTER else before
+        return None if result is None else _apply_projection(result, projection)
+
+    @_command('findAndModify')
+    def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                            return_document=ReturnDocument.BEFORE, **kwargs):
+        def action(doc):
+            if doc is None:
+                if not upsert:
+                    return None
+                result = self._update(filter, update, upsert=True, multi=False)
+                return self._data().documents[_hashable(result.upserted_id)]
+            self._update({'_id': doc['_id']}, update, upsert=False, multi=False)
+            return self._data().documents[_hashable(doc['_id'])]
+
+        return self._find_one_and(filter, projection, sort, action, return_document)
+
+    @_command('findAndModify')
+    def find_one_and_replace(self, filter, replacement, projection=None, sort=None, upsert=False,
+                             return_document=ReturnDocument.BEFORE, **kwargs):
+        def action(doc):
+            if doc is None:
+                if not upsert:
+                    return None
+                result = self._update(filter, replacement, upsert=True, multi=False, replace=True)
+                return self._data().documents[_hashable(result.upserted_id)]
+            self._update({'_id': doc['_id']}, replacement, upsert=False, multi=False, replace=True)
+            return self._data().documents[_hashable(doc['_id'])]
+
+        return self._find_one_and(filter, projection, sort, action, return_document)
+
+    @_command('findAndModify')
+    def find_one_and_delete(self, filter, projection=None, sort=None, **kwargs):
+        def action(doc):
+            if doc is not None:
+                self._delete({'_id': doc['_id']}, multi=False)
+            return None
+
+        return self._find_one_and(filter, projection, sort, action, ReturnDocument.BEFORE)
+
+    # ---------- индексы ----------
+
+    @_command('createIndexes')
+    def create_index(self, keys, **kwargs):
+        keys = _normalize_sort(keys)
+        name = kwargs.get('name') or '_'.join(f"{field}_{direction}" for field, direction in keys)
+
+        with _store.lock:
+            data = self._data(create=True)
+            spec = {'key': keys}
+            for option in ('unique', 'sparse', 'partialFilterExpression', 'expireAfterSeconds', 'collation'):
+                if option in kwargs:
+                    spec[option] = kwargs[option]
+
+            existing = data.indexes.get(name)
+            if existing is not None:
+                if existing != spec:
+                    raise OperationFailure(f"Index with name: {name} already exists with different options", code=86)
+                return name
+            for other_name, other in data.indexes.items():
+                if other['key'] == keys and other != spec:
+                    raise OperationFailure(f"Index already exists with a different name: {other_name}", code=85)
+
+            data.indexes[name] = spec
+            if spec.get('unique'):
+                try:
+                    data.rebuild_unique_keys(name)
+                except DuplicateKeyError:
+                    del data.indexes[name]
+                    raise
+        return name
+
+    def create_indexes(self, indexes, **kwargs):
+        return [self.create_index(index.document['key'], **{k: v for k, v in index.document.items() if k != 'key'})
+                for index in indexes]
+
+    def index_information(self):
+        with _store.lock:
+            data = self._data()
+            indexes = data.indexes if data else {}
+            return {name: dict(copy.deepcopy(spec), v=2) for name, spec in indexes.items()}
+
+    def list_indexes(self):
+        return MemoryCommandCursor([dict(info, name=name) for name, info in self.index_information().items()])
+
+    def drop_index(self, index_or_name):
+        name = index_or_name if isinstance(index_or_name, str) else \
+            '_'.join(f"{field}_{direction}" for field, direction in _normalize_sort(index_or_name))
+        with _store.lock:
+            data = self._data()
+            if data is None or name not in data.indexes or name == '_id_':
+                raise OperationFailure(f"index not found with name [{name}]", code=27)
+            del data.indexes[name]
+            data.unique_keys.pop(name, None)
+
+    def drop_indexes(self):
+        with _store.lock:
+            data = self._data()
+            if data is not None:
+                data.indexes = {'_id_': data.indexes['_id_']}
+                data.unique_keys = {}
+
+    def drop(self):
+        self.database.drop_collection(self.name)
+
+
+# ==================== БАЗА И КЛИЕНТ ====================
+
+class MemoryDatabase:
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def __repr__(self):
+        return f"MemoryDatabase({self.name!r})"
+
+    def __getitem__(self, name):
+        return MemoryCollection(self, name)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return MemoryCollection(self, name)
+
+    def __eq__(self, other):
+        return isinstance(other, MemoryDatabase) and other.name == self.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def get_collection(self, name, **kwargs):
+        return MemoryCollection(self, name)
+
+    def with_options(self, **kwargs):
+        return self
+
+    @_command('listCollections')
+    def list_collection_names(self, filter=None, **kwargs):
+        with _store.lock:
+            names = list(_store.databases.get(self.name, {}))
+        if filter and 'name' in filter:
+            names = [name for name in names if _match_document({'name': name}, {'name': filter['name']})]
+        return names
+
+    def create_collection(self, name, **kwargs):
+        with _store.lock:
+            collections = _store.databases.setdefault(self.name, {})
+            if name in collections:
+                raise CollectionInvalid(f"collection {name} already exists")
+            collections[name] = _CollectionData(options=kwargs)
+        return MemoryCollection(self, name)
+
+    def drop_collection(self, name_or_collection, **kwargs):
+        name = getattr(name_or_collection, 'name', name_or_collection)
+        with _store.lock:
+            _store.databases.get(self.name, {}).pop(name, None)
+        return {'ok': 1.0}
+
+    def command(self, command, value=1, **kwargs):
+        name = command if isinstance(command, str) else next(iter(command))
+        return _command(name)(self._run_command)(name)
+
+    def _run_command(self, name):
+        if name == 'ping':
+            return {'ok': 1.0}
+        if name.lower() == 'buildinfo':
+            return {'version': SERVER_VERSION, 'ok': 1.0}
+        if name == 'listDatabases':
+            return {'databases': [{'name': db_name} for db_name in self.client.list_database_names()], 'ok': 1.0}
+        if name == 'dbStats':
+            with _store.lock:
+                collections = _store.databases.get(self.name, {})
+                objects = sum(len(data.documents) for data in collections.values())
+            return {'db': self.name, 'collections': len(collections), 'objects': objects, 'ok': 1.0}
+        raise OperationFailure(f"no such command: '{name}' (memory backend)", code=59)
+
+
+class MemoryClient:
+    """
+    Клиент с интерфейсом pymongo.MongoClient. Строка подключения и опции
+    принимаются и игнорируются: любые учетные данные считаются верными.
+    """
+
+    def __init__(self, host=None, port=None, **kwargs):
+        self.host = host
+        self._closed = False
+
+    def __repr__(self):
+        return "MemoryClient()"
+
+    def __getitem__(self, name):
+        return MemoryDatabase(self, name)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return MemoryDatabase(self, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def address(self):
+        return ('memory', 0)
+
+    def get_database(self, name=None, **kwargs):
+        return MemoryDatabase(self, name or 'test')
+
+    def list_database_names(self, **kwargs):
+        with _store.lock:
+            return ['admin'] + [name for name in _store.databases if name != 'admin']
+
+    def drop_database(self, name_or_database, **kwargs):
+        name = getattr(name_or_database, 'name', name_or_database)
+        with _store.lock:
+            _store.databases.pop(name, None)
+
+    def server_info(self):
+        return {'version': SERVER_VERSION, 'ok': 1.0}
+
+    def close(self):
+        self._closed = True
+
+
+# ==================== ASYNC ====================
+#
+# Обертки с интерфейсом pymongo.AsyncMongoClient для company/views/api_async.py.
+# Операции в памяти не блокируют event loop надолго, поэтому выполняются
+# синхронно внутри корутин.
+
+class AsyncMemoryCursor:
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, key_or_list, direction=None):
+        self._cursor.sort(key_or_list, direction)
+        return self
+
+    def skip(self, skip):
+        self._cursor.skip(skip)
+        return self
+
+    def limit(self, limit):
+        self._cursor.limit(limit)
+        return self
+
+    async def to_list(self, length=None):
+        return self._cursor.to_list(length)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._cursor)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self):
+        self._cursor.close()
+
+
+class AsyncMemoryCollection:
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.name = collection.name
+
+    def find(self, *args, **kwargs):
+        return AsyncMemoryCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, pipeline, **kwargs):
+        return AsyncMemoryCursor(self._collection.aggregate(pipeline, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+        if not callable(method):
+            return method
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+class AsyncMemoryDatabase:
+
+    def __init__(self, database):
+        self._database = database
+        self.name = database.name
+
+    def __getitem__(self, name):
+        return AsyncMemoryCollection(self._database[name])
+
+    def get_collection(self, name, **kwargs):
+        return self[name]
+
+    async def list_collection_names(self, **kwargs):
+        return self._database.list_collection_names(**kwargs)
+
+    async def command(self, command, value=1, **kwargs):
+        return self._database.command(command, value, **kwargs)
+
+
+class AsyncMemoryClient:
+
+    def __init__(self, host=None, port=None, **kwargs):
+        self._client = MemoryClient(host, port, **kwargs)
+
+    def __getitem__(self, name):
+        return AsyncMemoryDatabase(self._client[name])
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_database(self, name=None, **kwargs):
+        return AsyncMemoryDatabase(self._client.get_database(name))
+
+    async def list_database_names(self, **kwargs):
+        return self._client.list_database_names()
+
+    async def close(self):
+        self._client.close()
+
+
+# ==================== ЗАПОЛНЕНИЕ ====================
+
+def bootstrap(db_name='wws_memory', admin_user=None, admin_password=None):
+    """
+    Готовит "сервер" в памяти так же, как мастер настройки (шаги 1-3):
+    конфигурация подключения, база со справочниками из static/defaults/data
+    и, если указан admin_user, пользователь-администратор приложения.
+    Пути справочников относительные - вызывать из корня проекта.
+    """
+    from mongodb.mongodb_config import MongoConfig, hash_password
+    from mongodb.mongodb_utils import MongoConnection
+
+    reset()
+    MongoConfig.save_config({'host': 'memory', 'port': 27017, 'admin_user': 'memory', 'admin_password': 'memory'})
+    MongoConnection.reset_client()
+
+    if not MongoConnection.create_database_step3(db_name):
+        raise RuntimeError(f"Не удалось создать базу '{db_name}' в памяти")
+    MongoConfig.update_config({'db_name': db_name, 'setup_completed': True})
+
+    if admin_user:
+        from users.user_utils import UserManager
+
+        created = UserManager().create_user({
+            'username': admin_user,
+            'password': hash_password(admin_password),
+            'is_admin': True,
+            'is_active': True,
+            'profile': {'first_name': 'Admin', 'last_name': admin_user, 'email': f"{admin_user}@example.com"},
+        })
+        if not created:
+            raise RuntimeError(f"Не удалось создать пользователя '{admin_user}'")
+
+    return db_name
@@ -0,0 +1,135 @@
+# mongodb/mongodb_async.py - Асинхронное подключение к MongoDB (для ASGI)
+#
+# AsyncMongoClient привязан к event loop, в котором был создан, поэтому
+# клиент хранится отдельно для каждого loop. Под uvicorn/daphne это один
+# клиент на процесс; под WSGI (runserver, gunicorn gthread) async-views
+# выполняются через async_to_sync и получают короткоживущие loop'ы - для
+# них async-эндпоинты не дают выигрыша и по умолчанию выключены
+# (см. COMPANY_ASYNC_API в settings.py).
+#
+# Circuit breaker общий с синхронным MongoConnection.
+#
+# MongoConfig.read_config() читает и расшифровывает файл - в event loop
+# его не вызываем: read_config() выполняется в потоке, а db_name
+# запоминается вместе с клиентом loop'а.
+
+import asyncio
+import os
+import threading
+import weakref
+
+from asgiref.sync import sync_to_async
+from loguru import logger
+from pymongo.errors import ConnectionFailure, OperationFailure
+
+from mongodb.backends import create_async_client
+from mongodb.circuit_breaker import mongo_breaker
+from mongodb.mongodb_config import MongoConfig
+from mongodb.mongodb_utils import MongoConnection
+from monitoring.mongo_listeners import get_event_listeners
+
+
+class AsyncMongoConnection:
+    _clients = weakref.WeakKeyDictionary()  # event loop -> (AsyncMongoClient, db_name)
+    _lock = threading.Lock()
+
+    @staticmethod
+    async def read_config():
+        """MongoConfig.read_config() в потоке, не блокируя event loop"""
+        return await sync_to_async(MongoConfig.read_config, thread_sensitive=False)()
+
+    @classmethod
+    async def get_client(cls):
+        """Возвращает AsyncMongoClient текущего event loop (создает при первом вызове)"""
+        if not mongo_breaker.allow_request():
+            return None
+
+        entry = await cls._get_entry()
+        return entry[0] if entry is not None else None
+
+    @classmethod
+    async def _get_entry(cls):
+        """(клиент, db_name) текущего event loop; создает при первом вызове"""
+        loop = asyncio.get_running_loop()
+        entry = cls._clients.get(loop)
+        if entry is not None:
+            return entry
+
+        config = await cls.read_config()
+        client = await cls._create_client(config)
+        if client is None:
+            return None
+
+        entry = (client, config.get('db_name'))
+        with cls._lock:
+            existing = cls._clients.get(loop)
+            if existing is None:
+                cls._clients[loop] = entry
+        if existing is not None:
+            # Параллельная корутина успела раньше - лишний клиент закрываем
+            await client.close()
+            return existing
+        return entry
+
+    @classmethod
+    async def _create_client(cls, config):
+        if not config:
+            logger.error("Konfigurationsdatei für die Datenbankverbindung nicht gefunden")
+            return None
+
+        connection_string = MongoConnection.build_connection_string(config)
+        if connection_string is None:
+            return None
+
+        client = None
+        try:
+            client = create_async_client(
+                connection_string,
+                serverSelectionTimeoutMS=5000,
+                event_listeners=get_event_listeners()
+            )
+            await client.admin.command('ping')
+            mongo_breaker.record_success()
+            logger.success("⚡ Async MongoDB клиент создан")
+            return client
+        except (ConnectionFailure, OperationFailure) as e:
+            logger.error(f"Ошибка подключения async MongoDB клиента: {e}")
+            if client is not None:
+                await client.close()
+            if isinstance(e, ConnectionFailure):
+                mongo_breaker.record_failure(e)
+            return None
+
+    @classmethod
+    async def get_database(cls):
+        """Возвращает async-объект базы данных из конфигурации"""
+        if not mongo_breaker.allow_request():
+            return None
+
+        entry = await cls._get_entry()
+        if entry is None:
+            return None
+
+        client, db_name = entry
+        if not db_name:
+            return None
+        return client[db_name]
+
+    @classmethod
+    async def close(cls):
+        """Закрывает клиент текущего event loop (например, при lifespan shutdown)"""
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            entry = cls._clients.pop(loop, None)
+        if entry is not None:
+            await entry[0].close()
+
+    @classmethod
+    def reset_after_fork(cls):
+        """Клиенты родительского процесса в дочернем непригодны"""
+        cls._lock = threading.Lock()
+        cls._clients = weakref.WeakKeyDictionary()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=AsyncMongoConnection.reset_after_fork)
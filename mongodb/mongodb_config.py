@@ -1,11 +1,11 @@
 import os
+import threading
 from django.contrib.auth.hashers import make_password, check_password
 from urllib.parse import quote_plus
-from pymongo.errors import ConnectionFailure, OperationFailure
 from loguru import logger
-from pymongo import MongoClient
-from cryptography.fernet import Fernet
 from . import language
+from .backends import create_client, is_memory_backend
+from .circuit_breaker import mongo_breaker
 
 
 def hash_password(password):
@@ -19,34 +19,76 @@ def verify_password(password, hashed):
 class MongoConfig:
     CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mongo_config.env.enc')
 
-    # Получаем ключ шифрования из переменных окружения
-    SECRET_KEY = os.environ.get("MONGO_CONFIG_KEY")
-    if not SECRET_KEY:
-        raise ValueError(
-            "MONGO_CONFIG_KEY environment variable is required. "
-            "Please run utils/init_mongodb_key.py to generate a key and add it to your .env file."
-        )
+    # Расшифрованная конфигурация, привязанная к (mtime, size) файла:
+    # файл общий для всех воркеров хоста, поэтому запись в одном воркере
+    # меняет mtime и остальные перечитывают файл при следующем обращении
+    _cache = None
+    _cache_stamp = None
+    _cache_lock = threading.Lock()
+
+    # Fernet (и cryptography) создается при первом чтении/записи конфигурации,
+    # а не при импорте модуля - см. get_fernet()
+    _fernet = None
+
+    # Бэкенд 'memory' (mongodb/backends.py): конфигурация хранится в памяти
+    # процесса, файл сервера MongoDB не читается и не перезаписывается
+    _memory_config = None
+
+    @classmethod
+    def get_fernet(cls):
+        """Объект Fernet из MONGO_CONFIG_KEY (проверка ключа - при первом использовании)"""
+        if cls._fernet is None:
+            from cryptography.fernet import Fernet
+
+            # Получаем ключ шифрования из переменных окружения
+            secret_key = os.environ.get("MONGO_CONFIG_KEY")
+            if not secret_key:
+                raise ValueError(
+                    "MONGO_CONFIG_KEY environment variable is required. "
+                    "Please run utils/init_mongodb_key.py to generate a key and add it to your .env file."
+                )
 
-    try:
-        fernet = Fernet(SECRET_KEY.encode())
-    except Exception as e:
-        raise ValueError(f"Invalid MONGO_CONFIG_KEY format. Please regenerate the key. Error: {e}")
+            try:
+                cls._fernet = Fernet(secret_key.encode())
+            except Exception as e:
+                raise ValueError(f"Invalid MONGO_CONFIG_KEY format. Please regenerate the key. Error: {e}")
+        return cls._fernet
 
     @staticmethod
     def config_exists():
         """Проверяет существование файла конфигурации"""
+        if is_memory_backend():
+            return MongoConfig._memory_config is not None
         return os.path.exists(MongoConfig.CONFIG_FILE)
 
+    @staticmethod
+    def _file_stamp():
+        try:
+            stat = os.stat(MongoConfig.CONFIG_FILE)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
     @staticmethod
     def read_config():
-        """Читает и расшифровывает конфигурацию"""
+        """Читает и расшифровывает конфигурацию (кешируется до изменения файла)"""
+        if is_memory_backend():
+            return dict(MongoConfig._memory_config or {})
+
+        stamp = MongoConfig._file_stamp()
+        with MongoConfig._cache_lock:
+            if stamp is not None and stamp == MongoConfig._cache_stamp:
+                return dict(MongoConfig._cache)
+
         config = {}
-        if MongoConfig.config_exists():
+        if stamp is not None:
+            # Отсутствующий/неверный MONGO_CONFIG_KEY - ошибка конфигурации, не "нет файла"
+            fernet = MongoConfig.get_fernet()
             try:
                 with open(MongoConfig.CONFIG_FILE, 'rb') as f:
                     encrypted_data = f.read()
 
-                decrypted_data = MongoConfig.fernet.decrypt(encrypted_data).decode()
+                decrypted_data = fernet.decrypt(encrypted_data).decode()
                 for line in decrypted_data.splitlines():
                     if '=' in line and not line.strip().startswith('#'):
                         key, value = line.strip().split('=', 1)
@@ -54,12 +96,36 @@ class MongoConfig:
             except Exception as e:
                 logger.error(f"Ошибка чтения файла конфигурации: {e}")
                 logger.warning("Возможно, файл поврежден или ключ шифрования неверный")
+                return config
+
+            with MongoConfig._cache_lock:
+                MongoConfig._cache = dict(config)
+                MongoConfig._cache_stamp = stamp
 
         return config
 
+    @staticmethod
+    def clear_cache():
+        with MongoConfig._cache_lock:
+            MongoConfig._cache = None
+            MongoConfig._cache_stamp = None
+
     @staticmethod
     def save_config(config_data):
         """Сохраняет зашифрованную конфигурацию"""
+        if is_memory_backend():
+            # Как в файле: все значения - строки
+            MongoConfig._memory_config = {key: str(value) for key, value in config_data.items()}
+        else:
+            MongoConfig._write_config_file(config_data)
+
+        # Кеши данных в других воркерах зависят от конфигурации (например, db_name)
+        if config_data.get('setup_completed'):
+            from .cache_bus import bump, CONFIG
+            bump(CONFIG)
+
+    @staticmethod
+    def _write_config_file(config_data):
         try:
             # Добавляем комментарий и метку времени
             import datetime
@@ -67,7 +133,7 @@ class MongoConfig:
             plain_text = f"# MongoDB Configuration - Created: {timestamp}\n"
             plain_text += "\n".join(f"{key}={value}" for key, value in config_data.items())
 
-            encrypted_data = MongoConfig.fernet.encrypt(plain_text.encode())
+            encrypted_data = MongoConfig.get_fernet().encrypt(plain_text.encode())
 
             # Создаем директорию если не существует
             os.makedirs(os.path.dirname(MongoConfig.CONFIG_FILE), exist_ok=True)
@@ -81,6 +147,9 @@ class MongoConfig:
         except Exception as e:
             logger.error(f"Ошибка сохранения конфигурации: {e}")
             raise
+        finally:
+            # mtime может не измениться при записи в пределах одного тика ФС
+            MongoConfig.clear_cache()
 
     @staticmethod
     def update_config(new_data):
@@ -134,6 +203,8 @@ class MongoConfig:
     @staticmethod
     def check_config_completeness():
         """Проверяет полноту конфигурации и возвращает статус"""
+        from pymongo.errors import ConnectionFailure, OperationFailure
+
         logger.info("")
         logger.info("--- Start APP ---")
 
@@ -162,14 +233,20 @@ class MongoConfig:
             logger.error("Неверный формат порта в конфигурации")
             return 'connection_required'
 
+        # Пока circuit breaker открыт - не ждем таймаут, сервер заведомо недоступен
+        if not mongo_breaker.allow_request():
+            logger.warning(f"{host}:{port} — circuit breaker открыт, ping пропущен")
+            return 'ping_failed'
+
         # Тестируем подключение к серверу
         try:
             connection_uri = f"mongodb://{host}:{port}/"
-            client = MongoClient(connection_uri, serverSelectionTimeoutMS=3000)
+            client = create_client(connection_uri, serverSelectionTimeoutMS=3000)
             client.admin.command('ping')
             logger.success(f"{host}:{port} — {language.mess_server_ping_success}")
         except ConnectionFailure as e:
             logger.error(f"{host}:{port} — {language.mess_server_ping_error}: {str(e)}")
+            mongo_breaker.record_failure(e)
             return 'ping_failed'
 
         # Проверяем авторизацию администратора
@@ -182,7 +259,7 @@ class MongoConfig:
             password = quote_plus(config['admin_password'])
             auth_db = config.get('auth_source', 'admin')
             connection_uri = f"mongodb://{username}:{password}@{host}:{port}/admin?authSource={auth_db}"
-            client = MongoClient(connection_uri, serverSelectionTimeoutMS=3000)
+            client = create_client(connection_uri, serverSelectionTimeoutMS=3000)
             client.admin.command('ping')
             logger.success(language.mess_server_auth_success)
         except (ConnectionFailure, OperationFailure) as e:
@@ -204,9 +281,13 @@ class MongoConfig:
     @staticmethod
     def delete_config():
         """Удаляет файл конфигурации"""
+        if is_memory_backend():
+            MongoConfig._memory_config = None
+            return True
         if MongoConfig.config_exists():
             try:
                 os.remove(MongoConfig.CONFIG_FILE)
+                MongoConfig.clear_cache()
                 logger.info("Файл конфигурации удален")
                 return True
             except Exception as e:
@@ -3,20 +3,54 @@
 import datetime
 import json
 import os
+import threading
 
-import pymongo
+from pymongo import monitoring
 from pymongo.errors import ConnectionFailure, OperationFailure
 from urllib.parse import quote_plus
 
+from . import cache_bus
+from .backends import create_client
+from .circuit_breaker import mongo_breaker
 from .mongodb_config import MongoConfig, verify_password
+from .query_registry import ensure_indexes, get_index_specs
 from loguru import logger
 
 from . import language
+from monitoring.mongo_listeners import get_event_listeners
+
+
+class _BreakerTopologyListener(monitoring.TopologyListener):
+    """Сообщает circuit breaker о потере/восстановлении сервера (по данным мониторинга pymongo)"""
+
+    def opened(self, event):
+        pass
+
+    def description_changed(self, event):
+        new_description = event.new_description
+        if new_description.has_writable_server():
+            mongo_breaker.record_success()
+        elif event.previous_description.has_writable_server():
+            mongo_breaker.record_failure("Нет доступного сервера MongoDB")
+
+    def closed(self, event):
+        pass
 
 
 class MongoConnection:
+    """
+    Ленивое, потокобезопасное и fork-безопасное создание MongoClient.
+
+    - Клиент создается один раз на процесс под блокировкой (double-checked locking),
+      поэтому gthread-воркеры не создают параллельно несколько MongoClient.
+    - MongoClient нельзя использовать после fork(): os.register_at_fork и
+      post_fork-хук gunicorn (gunicorn.conf.py) вызывают reset_after_fork(),
+      и дочерний процесс создает собственный клиент при первом обращении.
+    """
     _instance = None
     _client = None
+    _client_pid = None
+    _lock = threading.RLock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -26,36 +60,82 @@ class MongoConnection:
     @classmethod
     def get_client(cls):
         """Получает клиент MongoDB из конфигурации"""
-        if cls._client is None:
-            config = MongoConfig.read_config()
-            if not config:
-                logger.error("Konfigurationsdatei für die Datenbankverbindung nicht gefunden")
-                return None
+        # Пока circuit breaker открыт - сразу отказываем, не дожидаясь serverSelectionTimeoutMS
+        if not mongo_breaker.allow_request():
+            return None
+
+        # Быстрый путь без блокировки: клиент уже создан в этом процессе
+        client = cls._client
+        if client is not None and cls._client_pid == os.getpid():
+            return client
+
+        with cls._lock:
+            # Клиент унаследован от родительского процесса (fork без хука)
+            if cls._client is not None and cls._client_pid != os.getpid():
+                logger.warning("⚠️ MongoClient унаследован через fork() - создаем новый")
+                cls._client = None
 
-            host = config.get('host')
-            port = config.get('port')
-            admin_user = config.get('admin_user')
-            admin_password = config.get('admin_password')
-            db_name = config.get('db_name')
+            if cls._client is None:
+                # Потоки, ждавшие блокировку, пока первый упирался в таймаут:
+                # breaker уже мог открыться - не повторяем попытку каждым из них
+                if not mongo_breaker.allow_request():
+                    return None
+                cls._client = cls._create_client()
+                cls._client_pid = os.getpid() if cls._client is not None else None
 
-            if host and port:
-                try:
-                    if admin_user and admin_password:
-                        # Экранируем пароль для URL
-                        escaped_password = quote_plus(admin_password)
-                        connection_string = f"mongodb://{admin_user}:{escaped_password}@{host}:{port}/admin"
-                        logger.info(f"🔐 Подключение с администратором: {admin_user}")
-                    else:
-                        connection_string = f"mongodb://{host}:{port}/"
-                        logger.warning("⚠️ Подключение БЕЗ аутентификации!")
-
-                    cls._client = pymongo.MongoClient(connection_string, serverSelectionTimeoutMS=5000)
-                    cls._client.admin.command('ping')  # Проверка соединения
-                    logger.success(language.mess_server_auth_success)
-                except (ConnectionFailure, OperationFailure) as e:
-                    logger.error(f"{language.mess_server_auth_error}: {e}")
-                    cls._client = None
-        return cls._client
+            return cls._client
+
+    @classmethod
+    def _create_client(cls):
+        """Создает и проверяет новый MongoClient (вызывается под cls._lock)"""
+        config = MongoConfig.read_config()
+        if not config:
+            logger.error("Konfigurationsdatei für die Datenbankverbindung nicht gefunden")
+            return None
+
+        connection_string = cls.build_connection_string(config)
+        if connection_string is None:
+            return None
+
+        client = None
+        try:
+            client = create_client(
+                connection_string,
+                serverSelectionTimeoutMS=5000,
+                event_listeners=[_BreakerTopologyListener(), *get_event_listeners()]
+            )
+            client.admin.command('ping')  # Проверка соединения
+            mongo_breaker.record_success()
+            logger.success(language.mess_server_auth_success)
+            return client
+        except (ConnectionFailure, OperationFailure) as e:
+            logger.error(f"{language.mess_server_auth_error}: {e}")
+            if client is not None:
+                client.close()
+            # Ошибка авторизации - не сбой сервера, breaker не трогаем
+            if isinstance(e, ConnectionFailure):
+                mongo_breaker.record_failure(e)
+            return None
+
+    @classmethod
+    def build_connection_string(cls, config):
+        """Строка подключения из конфигурации (None, если host/port не настроены)"""
+        host = config.get('host')
+        port = config.get('port')
+        admin_user = config.get('admin_user')
+        admin_password = config.get('admin_password')
+
+        if not (host and port):
+            return None
+
+        if admin_user and admin_password:
+            # Экранируем пароль для URL
+            escaped_password = quote_plus(admin_password)
+            logger.info(f"🔐 Подключение с администратором: {admin_user}")
+            return f"mongodb://{admin_user}:{escaped_password}@{host}:{port}/admin"
+
+        logger.warning("⚠️ Подключение БЕЗ аутентификации!")
+        return f"mongodb://{host}:{port}/"
 
     @classmethod
     def reset_client(cls):
@@ -63,15 +143,59 @@ class MongoConnection:
         ✅ НОВЫЙ МЕТОД: Принудительно сбрасывает кешированный клиент
         Используется после изменения конфигурации (например, после authenticate_admin)
         """
-        if cls._client is not None:
-            try:
-                cls._client.close()
-                logger.info("🔌 MongoDB клиент закрыт")
-            except:
-                pass
-        cls._client = None
+        with cls._lock:
+            if cls._client is not None:
+                try:
+                    cls._client.close()
+                    logger.info("🔌 MongoDB клиент закрыт")
+                except:
+                    pass
+            cls._client = None
+            cls._client_pid = None
+        mongo_breaker.reset()
         logger.info("🔄 Кеш MongoDB клиента сброшен")
 
+    @classmethod
+    def reset_after_fork(cls):
+        """
+        Вызывается в дочернем процессе сразу после fork().
+        Унаследованный клиент не закрываем (его сокеты и потоки принадлежат
+        родителю) - просто забываем его; блокировки пересоздаем, т.к. в момент
+        fork они могли быть захвачены другим потоком родителя.
+        """
+        cls._lock = threading.RLock()
+        cls._client = None
+        cls._client_pid = None
+        mongo_breaker.reinit_after_fork()
+
+    @classmethod
+    def is_available(cls):
+        """False, пока circuit breaker открыт (сервер MongoDB недоступен)"""
+        return mongo_breaker.allow_request()
+
+    @classmethod
+    def get_circuit_status(cls):
+        """Состояние circuit breaker подключения"""
+        return mongo_breaker.get_status()
+
+    @classmethod
+    def _probe_server(cls):
+        """Recovery probe: короткий ping сервера отдельным клиентом"""
+        config = MongoConfig.read_config()
+        host = config.get('host')
+        port = config.get('port')
+        if not host or not port:
+            return False
+
+        probe_client = create_client(f"mongodb://{host}:{port}/", serverSelectionTimeoutMS=1000)
+        try:
+            probe_client.admin.command('ping')
+            return True
+        except ConnectionFailure:
+            return False
+        finally:
+            probe_client.close()
+
     @classmethod
     def get_database(cls):
         """Возвращает объект базы данных"""
@@ -88,7 +212,7 @@ class MongoConnection:
     def test_connection(cls, host, port):
         """Тестирует соединение с сервером MongoDB"""
         try:
-            client = pymongo.MongoClient(f"mongodb://{host}:{port}/", serverSelectionTimeoutMS=5000)
+            client = create_client(f"mongodb://{host}:{port}/", serverSelectionTimeoutMS=5000)
             client.admin.command('ping')
             logger.success(f"{host}:{port} — {language.mess_server_ping_success}")
             return True
@@ -112,7 +236,7 @@ class MongoConnection:
             escaped_username = quote_plus(username)
             escaped_password = quote_plus(password)
 
-            auth_client = pymongo.MongoClient(
+            auth_client = create_client(
                 f"mongodb://{escaped_username}:{escaped_password}@{host}:{port}/admin",
                 serverSelectionTimeoutMS=5000
             )
@@ -128,7 +252,7 @@ class MongoConnection:
 
                 # ✅ КРИТИЧНО: Сбрасываем кеш клиента после успешной аутентификации
                 # Это заставит get_client() пересоздать клиент с новыми учетными данными
-                cls._client = None
+                cls.reset_client()
                 logger.info("🔄 Кеш клиента сброшен - клиент будет пересоздан с правами администратора")
 
                 return True
@@ -136,8 +260,7 @@ class MongoConnection:
                 logger.warning(f"Пользователь '{username}' авторизован, но без админских прав: {e}")
 
                 # ✅ КРИТИЧНО: Сбрасываем кеш клиента даже если нет полных прав
-                cls._client = None
-                logger.info("🔄 Кеш клиента сброшен")
+                cls.reset_client()
 
                 return True  # Возвращаем True, так как авторизация прошла
 
@@ -339,6 +462,10 @@ class MongoConnection:
                             result = db[collection_name].insert_one(data)
                             logger.success(f"✅ В коллекцию '{collection_name}' вставлен 1 документ")
 
+                        # Индексы справочника (если описаны в реестре)
+                        if get_index_specs(base_collection_name):
+                            ensure_indexes(db, db_name, base_collection_name)
+
                         created_collections.append(collection_name)
 
                     except FileNotFoundError:
@@ -365,6 +492,7 @@ class MongoConnection:
                 logger.info(f"📊 {coll_name}: {count} записей")
 
             logger.success(f"✅ База данных '{db_name}' успешно создана с {len(created_collections)} коллекциями")
+            cache_bus.bump(cache_bus.REFERENCE)
             return True
 
         except OperationFailure as e:
@@ -506,13 +634,8 @@ class MongoConnection:
             db.create_collection(company_collection_name, validator=validator)
             logger.success(f"✅ Коллекция '{company_collection_name}' успешно создана программно")
 
-            # Индексы
-            company_collection = db[company_collection_name]
-            company_collection.create_index("type", unique=True, name="idx_type_unique")
-            company_collection.create_index("company_name", name="idx_company_name")
-            company_collection.create_index("email", name="idx_email")
-            company_collection.create_index("is_primary", name="idx_is_primary")
-            company_collection.create_index("created_at", name="idx_created_at")
+            # Индексы (описаны в mongodb/query_registry.py)
+            ensure_indexes(db, db_name, 'company_info')
 
             logger.success(f"📊 Индексы созданы для коллекции '{company_collection_name}'")
             return True
@@ -557,6 +680,7 @@ class MongoConnection:
                         "modified_at": {"bsonType": "date"},
                         "deleted": {"bsonType": "bool"},
                         "last_login": {"bsonType": ["date", "null"]},
+                        "last_activity": {"bsonType": ["date", "null"]},
                         "password_changed_at": {"bsonType": ["date", "null"]},
                         "profile": {
                             "bsonType": "object",
@@ -590,13 +714,8 @@ class MongoConnection:
             db.create_collection(users_collection_name, validator=validator)
             logger.success(f"✅ Коллекция '{users_collection_name}' успешно создана программно")
 
-            # Индексы
-            users_collection = db[users_collection_name]
-            users_collection.create_index("username", unique=True, name="idx_username_unique")
-            users_collection.create_index("profile.email", unique=True, name="idx_email_unique")
-            users_collection.create_index([("is_active", 1), ("deleted", 1)], name="idx_active_not_deleted")
-            users_collection.create_index([("is_admin", 1), ("deleted", 1)], name="idx_admin_not_deleted")
-            users_collection.create_index("created_at", name="idx_created_at")
+            # Индексы (описаны в mongodb/query_registry.py)
+            ensure_indexes(db, db_name, 'users')
 
             logger.success(f"📊 Индексы созданы для коллекции '{users_collection_name}'")
             return True
@@ -637,4 +756,11 @@ class MongoConnection:
                 return None
         except Exception as e:
             logger.error(f"Ошибка аутентификации пользователя '{username}': {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+mongo_breaker.set_probe(MongoConnection._probe_server)
+
+# MongoClient не fork-безопасен: дочерний процесс создает собственный клиент
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=MongoConnection.reset_after_fork)
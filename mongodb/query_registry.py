@@ -0,0 +1,391 @@
+# mongodb/query_registry.py - Декларативный реестр форм запросов и индексов
+#
+# Каждая коллекция описывается суффиксом ('users' -> '{db_name}_users').
+# INDEXES     - индексы, которые должны существовать в каждой коллекции
+# QUERY_SHAPES - формы запросов, которые выполняют менеджеры и views
+#
+# Примечание: partialFilterExpression в MongoDB не поддерживает $ne/$not,
+# поэтому запросы вида {'deleted': {'$ne': True}} не могут использовать
+# partial-индекс. Вместо этого 'deleted' добавляется ключом в составной индекс.
+
+import datetime
+
+from bson import ObjectId
+from loguru import logger
+from pymongo.errors import OperationFailure
+
+
+NOT_DELETED = {'deleted': {'$ne': True}}
+ACTIVE_NOT_DELETED = {'deleted': {'$ne': True}, 'active': {'$ne': False}}
+
+
+INDEXES = {
+    'users': [
+        {'keys': [('username', 1)], 'name': 'idx_username_unique', 'unique': True},
+        {'keys': [('profile.email', 1)], 'name': 'idx_email_unique', 'unique': True, 'sparse': True},
+        {'keys': [('is_active', 1), ('deleted', 1)], 'name': 'idx_active_not_deleted'},
+        {'keys': [('is_admin', 1), ('deleted', 1)], 'name': 'idx_admin_not_deleted'},
+        {'keys': [('created_at', 1)], 'name': 'idx_created_at'},
+        {'keys': [('deleted', 1), ('username', 1)], 'name': 'idx_deleted_username'},
+        # Список пользователей: keyset-пагинация по (username, _id) без сортировки в памяти;
+        # фильтры active/admin/locked/deleted проверяются на прочитанных документах
+        {'keys': [('username', 1), ('_id', 1)], 'name': 'idx_username_id'},
+        # Поиск пользователей (users/user_search.py): префикс - диапазон по ключам,
+        # нечеткий - $in по триграммам; оба поля мультиключевые
+        {'keys': [('search.keys', 1)], 'name': 'idx_search_keys'},
+        {'keys': [('search.trigrams', 1)], 'name': 'idx_search_trigrams'},
+        {'keys': [('locked_until', 1)], 'name': 'idx_locked_until'},
+    ],
+    'company_info': [
+        {'keys': [('type', 1)], 'name': 'idx_type_unique', 'unique': True},
+        {'keys': [('company_name', 1)], 'name': 'idx_company_name'},
+        {'keys': [('email', 1)], 'name': 'idx_email'},
+        {'keys': [('is_primary', 1)], 'name': 'idx_is_primary'},
+        {'keys': [('created_at', 1)], 'name': 'idx_created_at'},
+    ],
+    # Журнал (mongodb/audit.py): события - time-series с TTL (создает audit._prepare),
+    # счетчики читаются диапазоном по _id ('hour:2026-10-19T13'), здесь только TTL
+    'audit_events': [
+        {'keys': [('meta.type', 1), ('ts', -1)], 'name': 'idx_type_ts'},
+        {'keys': [('meta.target', 1), ('ts', -1)], 'name': 'idx_target_ts'},
+    ],
+    'audit_rollups': [
+        {'keys': [('expires_at', 1)], 'name': 'idx_expires_at_ttl', 'expireAfterSeconds': 0},
+    ],
+    'basic_address': [
+        {'keys': [('plz_code', 1), ('deleted', 1)], 'name': 'idx_plz_code_deleted'},
+        {'keys': [('plz_name', 1), ('deleted', 1)], 'name': 'idx_plz_name_deleted'},
+    ],
+    'basic_titles': [
+        {'keys': [('code', 1), ('deleted', 1)], 'name': 'idx_code_deleted'},
+        {'keys': [('display_order', 1), ('deleted', 1)], 'name': 'idx_display_order_deleted'},
+    ],
+    'basic_legal_forms': [
+        {'keys': [('code', 1), ('deleted', 1)], 'name': 'idx_code_deleted'},
+        {'keys': [('display_order', 1), ('deleted', 1)], 'name': 'idx_display_order_deleted'},
+    ],
+    'basic_communication_types': [
+        {'keys': [('code', 1), ('deleted', 1)], 'name': 'idx_code_deleted'},
+        {'keys': [('display_order', 1), ('deleted', 1)], 'name': 'idx_display_order_deleted'},
+    ],
+    'basic_communications': [
+        {'keys': [('display_order', 1), ('deleted', 1)], 'name': 'idx_display_order_deleted'},
+    ],
+    'basic_salutations': [
+        {'keys': [('salutation', 1), ('deleted', 1)], 'name': 'idx_salutation_deleted'},
+    ],
+    'basic_countrys': [
+        {'keys': [('country', 1), ('deleted', 1)], 'name': 'idx_country_deleted'},
+    ],
+    'countries': [
+        {'keys': [('code', 1), ('deleted', 1)], 'name': 'idx_code_deleted'},
+    ],
+    'industries': [
+        {'keys': [('code', 1), ('deleted', 1)], 'name': 'idx_code_deleted'},
+        {'keys': [('display_order', 1), ('deleted', 1)], 'name': 'idx_display_order_deleted'},
+    ],
+}
+
+
+# Пример значения подставляется в фильтр только для explain(); форма запроса
+# определяется ключами и операторами, а не конкретными значениями.
+QUERY_SHAPES = [
+    # ==================== USERS ====================
+    {
+        'name': 'users.by_username',
+        'collection': 'users',
+        'filter': {'username': 'admin', **NOT_DELETED},
+        'used_by': 'UserManager.find_user_by_username / update_user / delete_user',
+    },
+    {
+        'name': 'users.by_email',
+        'collection': 'users',
+        'filter': {'profile.email': 'admin@example.com', **NOT_DELETED},
+        'used_by': 'UserManager.find_user_by_email',
+    },
+    {
+        'name': 'users.admin_count',
+        'collection': 'users',
+        'filter': {'is_admin': True, 'deleted': {'$ne': True}, 'is_active': True},
+        'used_by': 'UserManager.get_admin_count / get_collection_stats',
+    },
+    {
+        'name': 'users.active_count',
+        'collection': 'users',
+        'filter': {'is_active': True, **NOT_DELETED},
+        'used_by': 'UserManager.get_collection_stats',
+    },
+    {
+        'name': 'users.deleted_count',
+        'collection': 'users',
+        'filter': {'deleted': True},
+        'used_by': 'UserManager.get_collection_stats',
+    },
+    {
+        'name': 'users.locked_count',
+        'collection': 'users',
+        'filter': {'locked_until': {'$gt': datetime.datetime(2000, 1, 1)}},
+        'used_by': 'UserManager.get_collection_stats',
+    },
+    {
+        'name': 'users.list',
+        'collection': 'users',
+        'filter': dict(NOT_DELETED),
+        'sort': [('username', 1), ('_id', 1)],
+        'used_by': 'UserManager.list_users (первая страница)',
+    },
+    {
+        'name': 'users.list_after',
+        'collection': 'users',
+        'filter': {
+            'is_admin': True,
+            **NOT_DELETED,
+            '$or': [{'username': {'$gt': 'admin'}}, {'username': 'admin', '_id': {'$gt': ObjectId('000000000000000000000000')}}],
+        },
+        'sort': [('username', 1), ('_id', 1)],
+        'used_by': 'UserManager.list_users (следующие страницы, user_list_page)',
+    },
+    {
+        'name': 'users.search_prefix',
+        'collection': 'users',
+        'filter': {'search.keys': {'$gte': 'mul', '$lt': 'mul\uffff'}, **NOT_DELETED},
+        # Без sort: диапазон по мультиключевому индексу не дает порядок
+        # (username, _id). Читается не больше user_search.SEARCH_MAX_MATCHES + 1
+        # совпадений, они сортируются в UserManager.search_users
+        'limit': 201,
+        'used_by': 'UserManager.search_users',
+    },
+    {
+        'name': 'users.search_fuzzy',
+        'collection': 'users',
+        'filter': {'search.trigrams': {'$in': ['mue', 'uel', 'ele', 'ler']}, **NOT_DELETED},
+        'limit': 500,  # user_search.FUZZY_CANDIDATE_LIMIT
+        'used_by': 'UserManager.search_users (fuzzy)',
+    },
+
+    # ==================== COMPANY ====================
+    {
+        'name': 'company_info.by_type',
+        'collection': 'company_info',
+        'filter': {'type': 'company_info'},
+        'used_by': 'CompanyManager.get_company / has_company / create_or_update_company',
+    },
+
+    # ==================== AUDIT ====================
+    {
+        'name': 'audit_rollups.window',
+        'collection': 'audit_rollups',
+        'filter': {'_id': {'$gte': 'day:2026-09-20', '$lt': 'day:2026-10-20'}},
+        'used_by': 'audit.counts / audit.series (company_stats_json, get_user_stats)',
+    },
+    {
+        'name': 'audit_events.recent_by_type',
+        'collection': 'audit_events',
+        'filter': {'meta.type': 'login_failure'},
+        'sort': [('ts', -1)],
+        'used_by': 'audit.recent_events',
+    },
+
+    # ==================== PLZ / ADDRESS ====================
+    {
+        'name': 'basic_address.by_plz',
+        'collection': 'basic_address',
+        'filter': {'plz_code': '10115', **ACTIVE_NOT_DELETED},
+        'used_by': 'get_city_by_plz',
+    },
+    {
+        'name': 'basic_address.by_city',
+        'collection': 'basic_address',
+        'filter': {'plz_name': {'$regex': 'Berlin', '$options': 'i'}, **ACTIVE_NOT_DELETED},
+        'sort': [('plz_code', 1)],
+        'used_by': 'get_plz_by_city',
+    },
+    {
+        'name': 'basic_address.city_prefix',
+        'collection': 'basic_address',
+        'filter': {'plz_name': {'$regex': '^Ber', '$options': 'i'}, **ACTIVE_NOT_DELETED},
+        'used_by': 'search_cities_autocomplete ($match)',
+    },
+    {
+        'name': 'basic_address.search',
+        'collection': 'basic_address',
+        'filter': dict(ACTIVE_NOT_DELETED),
+        'sort': [('plz_code', 1)],
+        'used_by': 'search_plz_ajax',
+    },
+
+    # ==================== REFERENCE DATA ====================
+    {
+        'name': 'basic_titles.choices',
+        'collection': 'basic_titles',
+        'filter': dict(ACTIVE_NOT_DELETED),
+        'sort': [('display_order', 1)],
+        'used_by': 'get_titles_from_mongodb',
+    },
+    {
+        'name': 'basic_titles.by_code',
+        'collection': 'basic_titles',
+        'filter': {'code': 'dr', **NOT_DELETED},
+        'used_by': 'get_title_display / title_display',
+    },
+    {
+        'name': 'basic_legal_forms.choices',
+        'collection': 'basic_legal_forms',
+        'filter': dict(ACTIVE_NOT_DELETED),
+        'sort': [('display_order', 1)],
+        'used_by': 'get_legal_forms_from_mongodb',
+    },
+    {
+        'name': 'basic_communication_types.choices',
+        'collection': 'basic_communication_types',
+        'filter': dict(ACTIVE_NOT_DELETED),
+        'sort': [('display_order', 1)],
+        'used_by': 'get_communication_types_from_mongodb (company)',
+    },
+    {
+        'name': 'basic_communications.choices',
+        'collection': 'basic_communications',
+        'filter': dict(ACTIVE_NOT_DELETED),
+        'sort': [('display_order', 1)],
+        'used_by': 'get_communication_types_from_mongodb (users)',
+    },
+    {
+        'name': 'basic_salutations.choices',
+        'collection': 'basic_salutations',
+        'filter': dict(NOT_DELETED),
+        'sort': [('salutation', 1)],
+        'used_by': 'get_salutations_from_mongodb',
+    },
+    {
+        'name': 'basic_salutations.by_salutation',
+        'collection': 'basic_salutations',
+        'filter': {'salutation': 'Herr', **NOT_DELETED},
+        'used_by': 'get_salutation_display / salutation_display',
+    },
+    {
+        'name': 'basic_countrys.choices',
+        'collection': 'basic_countrys',
+        'filter': dict(NOT_DELETED),
+        'sort': [('country', 1)],
+        'used_by': 'get_countries_from_mongodb',
+    },
+    {
+        'name': 'countries.by_code',
+        'collection': 'countries',
+        'filter': {'code': 'deutschland', **NOT_DELETED},
+        'used_by': 'get_country_display / country_display',
+    },
+    {
+        'name': 'industries.choices',
+        'collection': 'industries',
+        'filter': dict(ACTIVE_NOT_DELETED),
+        'sort': [('display_order', 1)],
+        'used_by': 'get_industries_from_mongodb',
+    },
+    {
+        'name': 'industries.by_code',
+        'collection': 'industries',
+        'filter': {'code': 'handel', **NOT_DELETED},
+        'used_by': 'get_industry_display / industry_display',
+    },
+]
+
+
+def collection_name(db_name, suffix):
+    """Полное имя коллекции по суффиксу реестра"""
+    return f"{db_name}_{suffix}"
+
+
+def get_index_specs(suffix):
+    """Возвращает спецификации индексов для коллекции"""
+    return INDEXES.get(suffix, [])
+
+
+def _index_options(spec):
+    """Опции create_index из спецификации (всё, кроме ключей)"""
+    return {k: v for k, v in spec.items() if k != 'keys'}
+
+
+def find_missing_indexes(collection, suffix):
+    """Возвращает спецификации индексов, которых нет в коллекции"""
+    existing = collection.index_information()
+    existing_keys = {tuple(tuple(k) for k in info['key']) for info in existing.values()}
+
+    missing = []
+    for spec in get_index_specs(suffix):
+        keys = tuple(tuple(k) for k in spec['keys'])
+        if spec['name'] in existing or keys in existing_keys:
+            continue
+        missing.append(spec)
+    return missing
+
+
+def ensure_indexes(db, db_name, suffix):
+    """
+    Создает недостающие индексы коллекции по реестру.
+    Возвращает список имен созданных индексов.
+    """
+    collection = db[collection_name(db_name, suffix)]
+    created = []
+
+    for spec in find_missing_indexes(collection, suffix):
+        try:
+            collection.create_index(spec['keys'], **_index_options(spec))
+            created.append(spec['name'])
+        except OperationFailure as e:
+            # 85/86 - индекс с тем же именем или ключами, но другими опциями
+            logger.warning(f"⚠️ Индекс '{spec['name']}' для '{collection.name}' не создан: {e}")
+
+    if created:
+        logger.success(f"📊 Созданы индексы для '{collection.name}': {created}")
+    return created
+
+
+def _plan_stages(plan):
+    """Рекурсивно собирает все стадии плана выполнения"""
+    if not isinstance(plan, dict):
+        return []
+
+    stages = [plan.get('stage')]
+    if 'inputStage' in plan:
+        stages.extend(_plan_stages(plan['inputStage']))
+    for child in plan.get('inputStages', []):
+        stages.extend(_plan_stages(child))
+    # Начиная с MongoDB 7 (SBE) план может быть вложен в queryPlan
+    if 'queryPlan' in plan:
+        stages.extend(_plan_stages(plan['queryPlan']))
+    return stages
+
+
+def explain_shape(db, db_name, shape):
+    """Возвращает список стадий выигрышного плана для формы запроса"""
+    collection = db[collection_name(db_name, shape['collection'])]
+    cursor = collection.find(shape['filter'], shape.get('projection'))
+    if shape.get('sort'):
+        cursor = cursor.sort(shape['sort'])
+    if shape.get('limit'):
+        cursor = cursor.limit(shape['limit'])
+
+    explanation = cursor.explain()
+    winning_plan = explanation.get('queryPlanner', {}).get('winningPlan', {})
+    return [stage for stage in _plan_stages(winning_plan) if stage]
+
+
+def find_collscans(db, db_name, shapes=None):
+    """
+    Выполняет explain() для всех зарегистрированных форм запросов.
+    Возвращает список (shape, stages) для запросов с COLLSCAN.
+    Коллекции, которых нет в базе, пропускаются.
+    """
+    existing_collections = set(db.list_collection_names())
+    collscans = []
+
+    for shape in shapes if shapes is not None else QUERY_SHAPES:
+        if collection_name(db_name, shape['collection']) not in existing_collections:
+            continue
+
+        stages = explain_shape(db, db_name, shape)
+        if 'COLLSCAN' in stages:
+            collscans.append((shape, stages))
+
+    return collscans
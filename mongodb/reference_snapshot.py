@@ -0,0 +1,493 @@
+# mongodb/reference_snapshot.py - Справочники в общем read-only файле (mmap)
+#
+# Справочники {db}_basic_* и особенно набор PLZ (basic_address) одинаковы
+# во всех gunicorn-воркерах. Вместо того чтобы каждый воркер держал свою
+# копию в памяти, они компилируются в компактный бинарный снимок, который
+# воркеры открывают через mmap только для чтения - физически в памяти
+# находится одна копия (page cache), общая для всех процессов.
+#
+# Формат файла (версия FORMAT_VERSION):
+#
+#     заголовок     magic, формат, версия справочников, число строк,
+#                   смещение и длина каталога
+#     строки        (N + 1) смещений uint32 + UTF-8 данные всех строк
+#                   (каждая уникальная строка хранится один раз)
+#     таблицы       для каждой таблицы rows * columns индексов uint32
+#                   в таблице строк, строки таблицы отсортированы по
+#                   первой колонке (бинарный поиск по префиксу)
+#     каталог       JSON: колонки, число строк и смещение каждой таблицы
+#
+# Имя файла содержит версию namespace 'reference' шины кеша
+# (mongodb/cache_bus.py): после bump(REFERENCE) воркеры перестают
+# использовать старый снимок, первый из них собирает новый в фоне, а пока
+# снимка нет, запросы идут в MongoDB как раньше.
+
+import array
+import contextlib
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессной блокировки сборки нет
+    fcntl = None
+
+from mongodb import cache_bus
+from mongodb.mongodb_config import MongoConfig
+
+MAGIC = b'WWSREF\x00\x01'
+FORMAT_VERSION = 1
+
+# magic, формат, версия справочников, число строк, смещение каталога, длина каталога
+_HEADER = struct.Struct('<8sIQIQI')
+
+# Повторная попытка сборки после ошибки - не чаще
+BUILD_RETRY_SECONDS = 30
+
+# Таблицы снимка: коллекция {db}_<collection>, колонки и сортировка.
+# Первая колонка - ключ сортировки и бинарного поиска.
+TABLES = {
+    'plz': {
+        'collection': 'basic_address',
+        'columns': ('plz_code', 'plz_name', 'plz_name_long', 'krs_name', 'lan_name'),
+    },
+    'salutations': {
+        'collection': 'basic_salutations',
+        'columns': ('salutation',),
+    },
+    'titles': {
+        'collection': 'basic_titles',
+        'columns': ('code', 'name'),
+        'keep_order': True,
+    },
+    'legal_forms': {
+        'collection': 'basic_legal_forms',
+        'columns': ('code', 'name'),
+        'keep_order': True,
+    },
+    'countries': {
+        'collection': 'basic_countrys',
+        'columns': ('country',),
+    },
+    'industries': {
+        'collection': 'industries',
+        'columns': ('code', 'name'),
+        'keep_order': True,
+    },
+    'communication_types': {
+        'collection': 'basic_communication_types',
+        'columns': ('code', 'label', 'icon_class', 'validation_pattern', 'placeholder', 'hint'),
+        'keep_order': True,
+    },
+    'communications': {
+        'collection': 'basic_communications',
+        'columns': ('type', 'icon', 'required_format', 'validation_pattern', 'placeholder', 'hint_de'),
+        'keep_order': True,
+    },
+}
+
+
+class SnapshotError(Exception):
+    """Файл снимка поврежден или имеет неподдерживаемый формат"""
+
+
+# ==================== ЧТЕНИЕ ====================
+
+class SnapshotTable:
+    """Таблица снимка: строки читаются из mmap по требованию"""
+
+    def __init__(self, snapshot, name, columns, row_count, offset):
+        self.snapshot = snapshot
+        self.name = name
+        self.columns = tuple(columns)
+        self._ncols = len(columns)
+        self._row_count = row_count
+        self._cells = snapshot._view[offset:offset + row_count * self._ncols * 4].cast('I')
+
+    def __len__(self):
+        return self._row_count
+
+    def cell(self, row, column=0):
+        return self.snapshot._string(self._cells[row * self._ncols + column])
+
+    def row(self, row):
+        base = row * self._ncols
+        return {name: self.snapshot._string(self._cells[base + i]) for i, name in enumerate(self.columns)}
+
+    def rows(self, start=0, stop=None):
+        stop = self._row_count if stop is None else min(stop, self._row_count)
+        for row in range(start, stop):
+            yield self.row(row)
+
+    def _bisect_left(self, key):
+        lo, hi = 0, self._row_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.cell(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key):
+        """Первая строка с точным значением ключа или None"""
+        row = self._bisect_left(key)
+        if row < self._row_count and self.cell(row) == key:
+            return self.row(row)
+        return None
+
+    def prefix_range(self, prefix):
+        """(start, stop) строк, ключ которых начинается с prefix"""
+        start = self._bisect_left(prefix)
+        if not prefix:
+            return start, self._row_count
+        # Все ключи с префиксом лежат перед prefix + максимальный символ
+        stop = self._bisect_left(prefix + '\U0010ffff')
+        return start, stop
+
+
+class ReferenceSnapshot:
+    """Открытый только для чтения снимок справочников"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        try:
+            magic, fmt, reference_version, string_count, dir_offset, dir_length = _HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or fmt != FORMAT_VERSION:
+                raise SnapshotError(f"Неподдерживаемый формат снимка: {magic!r} v{fmt}")
+
+            directory = json.loads(bytes(self._view[dir_offset:dir_offset + dir_length]))
+            if directory.get('byteorder') != sys.byteorder:
+                raise SnapshotError("Снимок собран на платформе с другим порядком байтов")
+        except (struct.error, ValueError) as e:
+            self.close()
+            raise SnapshotError(f"Поврежденный снимок {path}: {e}")
+        except SnapshotError:
+            self.close()
+            raise
+
+        self.reference_version = reference_version
+        self.db_name = directory['db_name']
+        self.built_at = directory.get('built_at')
+
+        offsets_start = _HEADER.size
+        self._string_offsets = self._view[offsets_start:offsets_start + (string_count + 1) * 4].cast('I')
+        self._strings_start = offsets_start + (string_count + 1) * 4
+
+        self.tables = {
+            name: SnapshotTable(self, name, meta['columns'], meta['rows'], meta['offset'])
+            for name, meta in directory['tables'].items()
+        }
+
+    def _string(self, index):
+        start = self._strings_start + self._string_offsets[index]
+        end = self._strings_start + self._string_offsets[index + 1]
+        return str(self._view[start:end], 'utf-8')
+
+    def table(self, name):
+        return self.tables.get(name)
+
+    def close(self):
+        for table in getattr(self, 'tables', {}).values():
+            table._cells.release()
+        if hasattr(self, '_string_offsets'):
+            self._string_offsets.release()
+        self._view.release()
+        self._mm.close()
+
+
+# ==================== СБОРКА ====================
+
+class _StringTable:
+    def __init__(self):
+        self._index = {}
+        self._data = bytearray()
+        self._offsets = array.array('I', [0])
+
+    def add(self, value):
+        index = self._index.get(value)
+        if index is None:
+            index = len(self._offsets) - 1
+            self._index[value] = index
+            self._data += value.encode('utf-8')
+            self._offsets.append(len(self._data))
+        return index
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+
+def _as_text(value):
+    return '' if value is None else str(value).strip()
+
+
+def _load_table_rows(db, db_name, spec, existing_collections):
+    collection_name = f"{db_name}_{spec['collection']}"
+    if collection_name not in existing_collections:
+        return None
+
+    columns = spec['columns']
+    projection = {column: 1 for column in columns}
+    cursor = db[collection_name].find({'deleted': {'$ne': True}, 'active': {'$ne': False}}, projection)
+
+    if spec.get('keep_order'):
+        # Порядок отображения как в загрузчиках форм; первая колонка - ключ поиска
+        cursor = cursor.sort([('display_order', 1), (columns[0], 1)])
+        return [tuple(_as_text(doc.get(column)) for column in columns) for doc in cursor]
+
+    rows = [tuple(_as_text(doc.get(column)) for column in columns) for doc in cursor]
+    rows.sort()
+    return rows
+
+
+def _derive_plz_cities(plz_rows):
+    """Уникальные названия городов, ключ - casefold для поиска без учета регистра"""
+    cities = {}
+    for row in plz_rows:
+        name = row[1]
+        if name:
+            cities.setdefault(name.casefold(), name)
+    return sorted(cities.items())
+
+
+def write_snapshot(path, db_name, reference_version, tables):
+    """
+    Записывает снимок атомарно (tmp + os.replace).
+    tables: {name: (columns, rows)}, rows - список кортежей строк.
+    """
+    strings = _StringTable()
+    table_cells = {}
+    for name, (columns, rows) in tables.items():
+        cells = array.array('I')
+        for row in rows:
+            cells.extend(strings.add(value) for value in row)
+        table_cells[name] = (columns, len(rows), cells)
+
+    offsets = strings._offsets.tobytes()
+    position = _HEADER.size + len(offsets) + len(strings._data)
+    padding = (-position) % 4
+    position += padding
+
+    directory = {
+        'db_name': db_name,
+        'byteorder': sys.byteorder,
+        'built_at': time.time(),
+        'tables': {},
+    }
+    for name, (columns, row_count, cells) in table_cells.items():
+        directory['tables'][name] = {'columns': list(columns), 'rows': row_count, 'offset': position}
+        position += len(cells) * 4
+
+    directory_bytes = json.dumps(directory, ensure_ascii=False).encode('utf-8')
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, reference_version, len(strings), position, len(directory_bytes))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(offsets)
+        f.write(strings._data)
+        f.write(b'\x00' * padding)
+        for _columns, _row_count, cells in table_cells.values():
+            f.write(cells.tobytes())
+        f.write(directory_bytes)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def _snapshot_dir():
+    from django.conf import settings
+    return str(getattr(settings, 'REFERENCE_SNAPSHOT_DIR'))
+
+
+def snapshot_path(db_name, reference_version):
+    return os.path.join(_snapshot_dir(), f"reference-{db_name}-v{reference_version}.bin")
+
+
+def build(db_name=None, reference_version=None):
+    """
+    Собирает снимок из MongoDB (синхронно). Возвращает путь к файлу или None.
+    Старые снимки этой базы удаляются: открытые в других воркерах mmap
+    остаются валидными до закрытия.
+    """
+    from mongodb.mongodb_utils import MongoConnection
+
+    db_name = db_name or MongoConfig.read_config().get('db_name')
+    if not db_name:
+        return None
+    if reference_version is None:
+        reference_version = cache_bus.get_version(cache_bus.REFERENCE)
+
+    db = MongoConnection.get_database()
+    if db is None:
+        return None
+
+    started = time.perf_counter()
+    existing_collections = set(db.list_collection_names())
+
+    tables = {}
+    for name, spec in TABLES.items():
+        rows = _load_table_rows(db, db_name, spec, existing_collections)
+        if rows is not None:
+            tables[name] = (spec['columns'], rows)
+
+    if 'plz' in tables:
+        tables['plz_cities'] = (('name_key', 'plz_name'), _derive_plz_cities(tables['plz'][1]))
+
+    os.makedirs(_snapshot_dir(), exist_ok=True)
+    path = write_snapshot(snapshot_path(db_name, reference_version), db_name, reference_version, tables)
+
+    for old_path in glob.glob(os.path.join(_snapshot_dir(), f"reference-{db_name}-v*.bin")):
+        if old_path != path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    elapsed = (time.perf_counter() - started) * 1000
+    row_total = sum(len(rows) for _columns, rows in tables.values())
+    logger.success(
+        f"📦 Снимок справочников v{reference_version} собран: {len(tables)} таблиц, "
+        f"{row_total} строк, {os.path.getsize(path)} байт за {elapsed:.0f} мс"
+    )
+    return path
+
+
+# ==================== ТЕКУЩИЙ СНИМОК ПРОЦЕССА ====================
+
+_lock = threading.Lock()
+_current = None
+_build_thread = None
+_last_build_failure = 0.0
+
+
+def _enabled():
+    from django.conf import settings
+    return getattr(settings, 'REFERENCE_SNAPSHOT_ENABLED', True)
+
+
+def get_snapshot():
+    """
+    Снимок, соответствующий текущей версии справочников, или None.
+    None означает "читать из MongoDB": снимок отключен, еще не настроена
+    база или новый снимок собирается в фоне.
+    """
+    global _current
+
+    if not _enabled():
+        return None
+
+    config = MongoConfig.read_config()
+    db_name = config.get('db_name')
+    if not db_name or not config.get('setup_completed'):
+        return None
+
+    version = cache_bus.get_version(cache_bus.REFERENCE)
+    snapshot = _current
+    if snapshot is not None and snapshot.db_name == db_name and snapshot.reference_version == version:
+        return snapshot
+
+    path = snapshot_path(db_name, version)
+    if os.path.exists(path):
+        try:
+            snapshot = ReferenceSnapshot(path)
+        except (OSError, SnapshotError) as e:
+            logger.error(f"❌ Не удалось открыть снимок справочников: {e}")
+        else:
+            with _lock:
+                # Старый снимок не закрываем явно: его строки могут еще читаться в других потоках
+                _current = snapshot
+            logger.info(f"📦 Открыт снимок справочников v{version} ({path})")
+            return snapshot
+
+    _schedule_build(db_name, version)
+    return None
+
+
+def _schedule_build(db_name, version):
+    global _build_thread
+
+    with _lock:
+        if _build_thread is not None and _build_thread.is_alive():
+            return
+        if time.monotonic() - _last_build_failure < BUILD_RETRY_SECONDS:
+            return
+        _build_thread = threading.Thread(
+            target=_build_in_background,
+            args=(db_name, version),
+            name='reference-snapshot-build',
+            daemon=True,
+        )
+        _build_thread.start()
+
+
+@contextlib.contextmanager
+def _build_lock(wait):
+    """
+    Межпроцессная блокировка сборки (.build.lock): build() удаляет снимки
+    других версий, поэтому собирает только один воркер. Отдает True, если
+    блокировка получена; wait=False - не ждать занятую.
+    """
+    os.makedirs(_snapshot_dir(), exist_ok=True)
+    if fcntl is None:
+        yield True
+        return
+
+    with open(os.path.join(_snapshot_dir(), '.build.lock'), 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+
+
+def build_locked(db_name, version):
+    """
+    Синхронная сборка для прогрева: ждет сборку другого воркера и собирает
+    снимок, только если файла этой версии все еще нет. Путь к файлу или None.
+    """
+    with _build_lock(wait=True):
+        path = snapshot_path(db_name, version)
+        if os.path.exists(path):
+            return path
+        return build(db_name, version)
+
+
+def _build_in_background(db_name, version):
+    global _last_build_failure
+
+    try:
+        with _build_lock(wait=False) as acquired:
+            # Не получена - другой воркер уже собирает снимок, он появится на диске
+            if not acquired or os.path.exists(snapshot_path(db_name, version)):
+                return
+            if build(db_name, version) is None:
+                _last_build_failure = time.monotonic()
+
+    except Exception as e:
+        _last_build_failure = time.monotonic()
+        logger.error(f"❌ Ошибка сборки снимка справочников: {e}")
+
+
+def reset_after_fork():
+    global _lock, _build_thread
+    _lock = threading.Lock()
+    _build_thread = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_after_fork)
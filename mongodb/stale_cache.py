@@ -0,0 +1,36 @@
+# mongodb/stale_cache.py - Последние успешно загруженные данные на время сбоя MongoDB
+#
+# Пока circuit breaker открыт, справочники и название компании отдаются
+# из этого кеша (устаревшие, но реальные данные) вместо статичных fallback.
+
+import threading
+import time
+
+_storage = {}
+_lock = threading.Lock()
+
+
+def remember(key, value):
+    """Запоминает последнее успешно загруженное значение"""
+    with _lock:
+        _storage[key] = (value, time.time())
+    return value
+
+
+def recall(key, default=None):
+    """Возвращает последнее сохраненное значение или default"""
+    with _lock:
+        entry = _storage.get(key)
+    return entry[0] if entry is not None else default
+
+
+def age(key):
+    """Возраст сохраненного значения в секундах (None, если значения нет)"""
+    with _lock:
+        entry = _storage.get(key)
+    return time.time() - entry[1] if entry is not None else None
+
+
+def clear():
+    with _lock:
+        _storage.clear()
@@ -1,10 +1,10 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.http import JsonResponse
 from django.urls import reverse
 from loguru import logger
 import datetime
 
+from utils.json_response import MongoJsonResponse
 from .forms import MongoConnectionForm, MongoLoginForm, CreateDatabaseForm
 from .mongodb_config import MongoConfig
 from .mongodb_utils import MongoConnection
@@ -22,7 +22,7 @@ def render_toast_response(request, redirect_url=None):
             'messages': [],
             'redirect_url': redirect_url
         }
-        response = JsonResponse(response_data)
+        response = MongoJsonResponse(response_data)
         response['Content-Type'] = 'application/json'
         response['HX-Redirect'] = redirect_url
         return response
@@ -38,7 +38,7 @@ def render_toast_response(request, redirect_url=None):
         })
 
     response_data = {'messages': messages_list}
-    response = JsonResponse(response_data)
+    response = MongoJsonResponse(response_data)
     response['Content-Type'] = 'application/json'
 
     return response
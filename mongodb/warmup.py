@@ -0,0 +1,255 @@
+# mongodb/warmup.py - Прогрев воркера до приема трафика
+#
+# Первые запросы свежего воркера оплачивают разовые расходы: расшифровку
+# конфигурации, подключение к MongoDB, первый list_collection_names,
+# загрузку справочников, открытие снимка PLZ и компиляцию шаблонов.
+# run_warmup() выполняет всё это заранее; /readyz (home/views.py)
+# отвечает 200 только после завершения прогрева, поэтому балансировщик
+# не отправляет трафик холодному воркеру.
+#
+# Где вызывается:
+#   - gunicorn: post_worker_init в gunicorn.conf.py (синхронно, до приема
+#     соединений);
+#   - runserver/uvicorn: MongodbConfig.ready() при WARMUP_ON_STARTUP=True
+#     (в фоновом потоке);
+#   - иначе - первый запрос к /readyz запускает прогрев в фоне;
+#   - вручную: python manage.py warmup.
+#
+# Ошибки отдельных шагов (например, MongoDB еще не настроена) не мешают
+# готовности: такой воркер отвечает так же, как и прогретый.
+
+import os
+import threading
+import time
+
+from loguru import logger
+
+PENDING = 'pending'
+RUNNING = 'running'
+READY = 'ready'
+
+_lock = threading.Lock()
+_state = {
+    'status': PENDING,
+    'started_at': None,
+    'duration_ms': None,
+    'steps': [],
+}
+_thread = None
+
+
+# ==================== ШАГИ ====================
+
+def _mongodb_ready():
+    from mongodb.mongodb_config import MongoConfig
+    from mongodb.mongodb_utils import MongoConnection
+
+    return bool(MongoConfig.read_config().get('setup_completed')) and MongoConnection.is_available()
+
+
+def _warm_config():
+    from mongodb.mongodb_config import MongoConfig
+
+    config = MongoConfig.read_config()
+    if not config.get('setup_completed'):
+        return 'skipped', 'MongoDB не настроена'
+    return 'ok', None
+
+
+def _warm_connection():
+    from mongodb.mongodb_config import MongoConfig
+    from mongodb.mongodb_utils import MongoConnection
+
+    if not MongoConfig.read_config().get('setup_completed'):
+        return 'skipped', 'MongoDB не настроена'
+
+    db = MongoConnection.get_database()
+    if db is None:
+        return 'failed', 'База данных недоступна'
+
+    collections = db.list_collection_names()
+    return 'ok', f"{len(collections)} коллекций"
+
+
+def _warm_cache_bus():
+    from mongodb import cache_bus
+
+    if not cache_bus.refresh():
+        return 'skipped', 'Коллекция версий недоступна'
+    return 'ok', str(cache_bus.get_status()['versions'])
+
+
+def _warm_reference_data():
+    if not _mongodb_ready():
+        return 'skipped', 'MongoDB не настроена или недоступна'
+
+    from company import reference_bundle
+    from company.forms import utils as company_reference
+    from users import forms as users_reference
+
+    loaders = [
+        company_reference.get_salutations_from_mongodb,
+        company_reference.get_titles_from_mongodb,
+        company_reference.get_legal_forms_from_mongodb,
+        company_reference.get_countries_from_mongodb,
+        company_reference.get_industries_from_mongodb,
+        company_reference.get_communication_config_from_mongodb,
+        company_reference.get_communication_types_from_mongodb,
+        users_reference.get_salutations_from_mongodb,
+        users_reference.get_titles_from_mongodb,
+        users_reference.get_communication_types_from_mongodb,
+        users_reference.get_communication_config_from_mongodb,
+        # Бандл для форм (версия в URL на каждой странице мастера)
+        reference_bundle.get_bundle,
+    ]
+    for loader in loaders:
+        loader()
+    return 'ok', f"{len(loaders)} справочников"
+
+
+def _warm_reference_snapshot():
+    from mongodb import cache_bus, reference_snapshot
+    from mongodb.mongodb_config import MongoConfig
+
+    config = MongoConfig.read_config()
+    if not reference_snapshot._enabled() or not config.get('setup_completed'):
+        return 'skipped', 'Снимок отключен или MongoDB не настроена'
+
+    # При прогреве можно позволить себе синхронную сборку - под блокировкой
+    # сборки: снимок собирает один воркер, остальные ждут и открывают его файл
+    version = cache_bus.get_version(cache_bus.REFERENCE)
+    if not os.path.exists(reference_snapshot.snapshot_path(config['db_name'], version)):
+        if reference_snapshot.build_locked(config['db_name'], version) is None:
+            return 'failed', 'Не удалось собрать снимок'
+
+    snapshot = reference_snapshot.get_snapshot()
+    if snapshot is None:
+        return 'failed', 'Снимок не открыт'
+
+    plz = snapshot.table('plz')
+    return 'ok', f"PLZ: {len(plz) if plz is not None else 0} строк"
+
+
+def _warm_company_header():
+    if not _mongodb_ready():
+        return 'skipped', 'MongoDB не настроена или недоступна'
+
+    from home.context_processors import get_company_header
+    header = get_company_header()
+    return 'ok', header.get('company_name')
+
+
+def _warm_templates():
+    from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+    from django.template.utils import get_app_template_dirs
+
+    engine = engines['django']
+    compiled = 0
+    errors = 0
+    # С явным cached.Loader (TEMPLATE_LOADER_PROFILE=production) APP_DIRS
+    # выключен - каталоги приложений добавляем сами
+    template_dirs = dict.fromkeys(str(path) for path in [*engine.template_dirs, *get_app_template_dirs('templates')])
+    for template_dir in template_dirs:
+        template_dir = str(template_dir)
+        if not os.path.isdir(template_dir):
+            continue
+        for root, _dirs, files in os.walk(template_dir):
+            for file_name in files:
+                if not file_name.endswith('.html'):
+                    continue
+                name = os.path.relpath(os.path.join(root, file_name), template_dir).replace(os.sep, '/')
+                try:
+                    engine.get_template(name)
+                    compiled += 1
+                except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+                    errors += 1
+                    logger.debug(f"Шаблон {name} не скомпилирован: {e}")
+
+    return 'ok', f"{compiled} шаблонов" + (f", ошибок: {errors}" if errors else "")
+
+
+STEPS = (
+    ('config', _warm_config),
+    ('connection', _warm_connection),
+    ('cache_bus', _warm_cache_bus),
+    ('reference_data', _warm_reference_data),
+    ('reference_snapshot', _warm_reference_snapshot),
+    ('company_header', _warm_company_header),
+    ('templates', _warm_templates),
+)
+
+
+# ==================== ЗАПУСК ====================
+
+def run_warmup():
+    """Синхронно выполняет все шаги прогрева и помечает процесс готовым"""
+    with _lock:
+        _state['status'] = RUNNING
+        _state['started_at'] = time.time()
+        _state['steps'] = []
+
+    started = time.perf_counter()
+    logger.info(f"🔥 Прогрев воркера {os.getpid()}...")
+
+    for name, step in STEPS:
+        step_started = time.perf_counter()
+        try:
+            result, detail = step()
+        except Exception as e:
+            result, detail = 'failed', str(e)
+
+        duration_ms = round((time.perf_counter() - step_started) * 1000, 1)
+        with _lock:
+            _state['steps'].append({'name': name, 'result': result, 'detail': detail, 'duration_ms': duration_ms})
+
+        if result == 'failed':
+            logger.warning(f"🔥 {name}: {detail} ({duration_ms} мс)")
+        else:
+            logger.debug(f"🔥 {name}: {result} ({duration_ms} мс)")
+
+    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    with _lock:
+        _state['status'] = READY
+        _state['duration_ms'] = duration_ms
+
+    logger.success(f"🔥 Воркер {os.getpid()} прогрет за {duration_ms} мс")
+    return get_status()
+
+
+def start_background_warmup():
+    """Запускает прогрев в фоновом потоке (если он еще не выполнялся)"""
+    global _thread
+
+    with _lock:
+        if _state['status'] != PENDING:
+            return False
+        _state['status'] = RUNNING
+        _thread = threading.Thread(target=run_warmup, name='worker-warmup', daemon=True)
+        _thread.start()
+    return True
+
+
+def is_ready():
+    return _state['status'] == READY
+
+
+def get_status():
+    with _lock:
+        return {
+            'status': _state['status'],
+            'pid': os.getpid(),
+            'duration_ms': _state['duration_ms'],
+            'steps': [dict(step) for step in _state['steps']],
+        }
+
+
+def reset_after_fork():
+    """Прогрев master-процесса не переносится в воркер (соединения не наследуются)"""
+    global _lock, _thread
+    _lock = threading.Lock()
+    _thread = None
+    _state.update({'status': PENDING, 'started_at': None, 'duration_ms': None, 'steps': []})
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_after_fork)
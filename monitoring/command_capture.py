@@ -0,0 +1,89 @@
+# monitoring/command_capture.py - Команды MongoDB текущего потока
+#
+# CaptureMongoCommands - аналог django.test.utils.CaptureQueriesContext для
+# MongoDB: внутри блока with каждая команда этого потока записывается как
+# (команда, секунды, байт ответа). Команды pymongo приходят из
+# CommandMetricsListener (события публикуются в потоке, выполняющем
+# команду), команды бэкенда 'memory' - из _record_command.
+#
+# Вне блока record() только проверяет thread-local и ничего не кодирует,
+# поэтому на обычные запросы не влияет. Используется бюджетами
+# представлений (benchmarks/budgets.py).
+
+import threading
+
+import bson
+
+_local = threading.local()
+
+
+def is_active():
+    return getattr(_local, 'captures', None) is not None
+
+
+def reply_size(reply):
+    """Размер ответа в BSON (документ или список документов)"""
+    try:
+        if isinstance(reply, dict):
+            return len(bson.encode(reply))
+        if isinstance(reply, (list, tuple)):
+            return sum(len(bson.encode(item)) for item in reply if isinstance(item, dict))
+    except Exception:
+        # Ключи не-строки и т.п. - размер неизвестен
+        pass
+    return 0
+
+
+def record(command, duration, reply=None):
+    """Записывает команду во все активные CaptureMongoCommands этого потока"""
+    captures = getattr(_local, 'captures', None)
+    if not captures:
+        return
+    size = reply_size(reply) if reply is not None else 0
+    for capture in captures:
+        capture.commands.append((command, duration, size))
+
+
+class CaptureMongoCommands:
+    """
+    with CaptureMongoCommands() as captured:
+        ...
+    captured.count, captured.bytes, captured.by_command()
+    """
+
+    def __init__(self):
+        self.commands = []
+
+    def __enter__(self):
+        if getattr(_local, 'captures', None) is None:
+            _local.captures = []
+        _local.captures.append(self)
+        self.commands = []
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.captures.remove(self)
+        if not _local.captures:
+            _local.captures = None
+        return False
+
+    def __len__(self):
+        return len(self.commands)
+
+    @property
+    def count(self):
+        return len(self.commands)
+
+    @property
+    def bytes(self):
+        return sum(size for _command, _duration, size in self.commands)
+
+    @property
+    def seconds(self):
+        return sum(duration for _command, duration, _size in self.commands)
+
+    def by_command(self):
+        counts = {}
+        for command, _duration, _size in self.commands:
+            counts[command] = counts.get(command, 0) + 1
+        return dict(sorted(counts.items()))
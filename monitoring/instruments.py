@@ -0,0 +1,151 @@
+# monitoring/instruments.py - Метрики приложения и помощники для их обновления
+#
+# Все метрики проекта объявлены здесь, чтобы /metrics показывал полный
+# список (с нулями) даже до первого события.
+
+import functools
+import time
+
+from . import metrics
+
+# ==================== HTTP ====================
+
+HTTP_REQUESTS = metrics.Counter(
+    'wws_http_requests_total', 'HTTP-запросы по view, методу и статусу',
+    ('view', 'method', 'status'),
+)
+HTTP_LATENCY = metrics.Histogram(
+    'wws_http_request_duration_seconds', 'Время обработки запроса',
+    ('view', 'method'),
+)
+HTTP_IN_PROGRESS = metrics.Gauge(
+    'wws_http_requests_in_progress', 'Запросы в обработке',
+)
+HTTP_EXCEPTIONS = metrics.Counter(
+    'wws_http_exceptions_total', 'Необработанные исключения во view',
+    ('view', 'exception'),
+)
+
+# ==================== MONGODB ====================
+
+MONGO_POOL_CONNECTIONS = metrics.Gauge(
+    'wws_mongodb_pool_connections', 'Соединения пула MongoDB (open - всего, in_use - выданы)',
+    ('state',),
+)
+MONGO_POOL_CHECKOUT_WAIT = metrics.Histogram(
+    'wws_mongodb_pool_checkout_wait_seconds', 'Ожидание свободного соединения пула',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+MONGO_POOL_CHECKOUT_FAILURES = metrics.Counter(
+    'wws_mongodb_pool_checkout_failures_total', 'Неудачные попытки получить соединение',
+    ('reason',),
+)
+MONGO_POOL_CLEARED = metrics.Counter(
+    'wws_mongodb_pool_cleared_total', 'Сбросы пула (потеря сервера)',
+)
+MONGO_COMMANDS = metrics.Counter(
+    'wws_mongodb_commands_total', 'Команды MongoDB',
+    ('command', 'outcome'),
+)
+MONGO_COMMAND_LATENCY = metrics.Histogram(
+    'wws_mongodb_command_duration_seconds', 'Время выполнения команды MongoDB',
+    ('command',),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+MONGO_BREAKER_OPEN = metrics.Gauge(
+    'wws_mongodb_circuit_open', '1, если circuit breaker MongoDB открыт',
+    multiprocess_mode='max',
+)
+
+# ==================== МЕНЕДЖЕРЫ ====================
+
+MANAGER_OPERATIONS = metrics.Counter(
+    'wws_manager_operations_total', 'Операции UserManager/CompanyManager',
+    ('manager', 'operation', 'outcome'),
+)
+MANAGER_LATENCY = metrics.Histogram(
+    'wws_manager_operation_duration_seconds', 'Время операции менеджера',
+    ('manager', 'operation'),
+)
+
+# ==================== КЕШИ И ЗАЩИТА ====================
+
+CACHE_REQUESTS = metrics.Counter(
+    'wws_cache_requests_total', 'Обращения к VersionedCache',
+    ('cache', 'result'),
+)
+RATE_LIMIT_DECISIONS = metrics.Counter(
+    'wws_rate_limit_decisions_total', 'Решения rate_limit_user',
+    ('view', 'decision'),
+)
+
+# ==================== ВХОД ====================
+
+# Проверка пароля (PBKDF2) - самая дорогая операция входа; число
+# одновременных проверок показывает очередь за CPU
+PASSWORD_CHECKS_IN_PROGRESS = metrics.Gauge(
+    'wws_auth_password_checks_in_progress', 'Проверки пароля, выполняемые сейчас',
+)
+PASSWORD_CHECK_LATENCY = metrics.Histogram(
+    'wws_auth_password_check_duration_seconds', 'Время проверки хеша пароля',
+    ('result',),
+)
+
+# Буфер телеметрии входа (users/login_telemetry.py)
+LOGIN_TELEMETRY_UPDATES = metrics.Counter(
+    'wws_login_telemetry_updates_total', 'Обновления last_login/last_activity (buffered, coalesced, dropped)',
+    ('result',),
+)
+LOGIN_TELEMETRY_FLUSHES = metrics.Counter(
+    'wws_login_telemetry_flushes_total', 'Записи буфера телеметрии одним bulk_write',
+    ('outcome',),
+)
+LOGIN_TELEMETRY_PENDING = metrics.Gauge(
+    'wws_login_telemetry_pending', 'Пользователи с незаписанной телеметрией входа',
+)
+
+
+def track_operation(manager, operation=None, false_is_failure=True):
+    """
+    Декоратор метода менеджера: время и исход операции.
+    Исход: 'error' - исключение, 'failed' - метод вернул False (для
+    методов-проверок вроде has_company() - false_is_failure=False), иначе 'ok'.
+    """
+
+    def decorator(method):
+        name = operation or method.__name__
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = method(*args, **kwargs)
+                outcome = 'failed' if result is False and false_is_failure else 'ok'
+                return result
+            finally:
+                MANAGER_LATENCY.observe(time.perf_counter() - started, manager=manager, operation=name)
+                MANAGER_OPERATIONS.inc(manager=manager, operation=name, outcome=outcome)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_password_check(check, password, encoded):
+    """Вызывает check(password, encoded) с учетом метрик проверки пароля"""
+    PASSWORD_CHECKS_IN_PROGRESS.inc()
+    started = time.perf_counter()
+    result = False
+    try:
+        result = check(password, encoded)
+        return result
+    finally:
+        PASSWORD_CHECKS_IN_PROGRESS.dec()
+        PASSWORD_CHECK_LATENCY.observe(time.perf_counter() - started, result='match' if result else 'mismatch')
+
+
+@metrics.register_collector
+def _collect_circuit_breaker():
+    from mongodb.circuit_breaker import mongo_breaker
+    MONGO_BREAKER_OPEN.set(1 if mongo_breaker.is_open() else 0)
@@ -0,0 +1,209 @@
+# monitoring/memory.py - Диагностика памяти долгоживущего воркера (tracemalloc)
+#
+# Порядок поиска утечки без перезапуска воркера:
+#   1. start() - включает tracemalloc (замедляет аллокации, только на время
+#      диагностики);
+#   2. take_snapshot() - снимок сразу и через несколько часов нагрузки;
+#   3. diff(a, b) - рост памяти по месту аллокации (файл:строка);
+#   4. object_counts() - количество живых объектов по модулям и типам;
+#   5. stop().
+#
+# Всё относится к ОДНОМУ процессу: под gunicorn запросы к странице
+# /monitoring/memory/ попадают в разные воркеры, поэтому в ответе всегда
+# указан pid, а снимки хранятся в MEMORY_SNAPSHOT_DIR с pid в имени файла.
+
+import collections
+import gc
+import os
+import re
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from loguru import logger
+
+KEY_TYPES = ('lineno', 'filename', 'traceback')
+
+# Аллокации самого tracemalloc и импорта модулей - шум для поиска утечек
+_NOISE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+_SNAPSHOT_NAME = re.compile(r'^(\d+)-(\d+)-([A-Za-z0-9_.-]*)\.tracemalloc$')
+
+_lock = threading.Lock()
+
+
+def get_snapshot_dir():
+    return str(getattr(settings, 'MEMORY_SNAPSHOT_DIR', settings.BASE_DIR / 'var' / 'memory'))
+
+
+# ==================== TRACEMALLOC ====================
+
+def start(frames=None):
+    """Включает tracemalloc (frames - глубина стека аллокации)"""
+    if tracemalloc.is_tracing():
+        return False
+    frames = frames or getattr(settings, 'MEMORY_TRACE_FRAMES', 10)
+    tracemalloc.start(frames)
+    logger.warning(f"🧠 tracemalloc включен в воркере {os.getpid()} (глубина {frames})")
+    return True
+
+
+def stop():
+    if not tracemalloc.is_tracing():
+        return False
+    tracemalloc.stop()
+    logger.info(f"🧠 tracemalloc выключен в воркере {os.getpid()}")
+    return True
+
+
+def take_snapshot(label=''):
+    """Сохраняет снимок в MEMORY_SNAPSHOT_DIR; возвращает имя файла"""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc не включен")
+
+    label = re.sub(r'[^A-Za-z0-9_.-]+', '-', label).strip('-')[:40]
+    snapshot_dir = get_snapshot_dir()
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    with _lock:
+        snapshot = tracemalloc.take_snapshot().filter_traces(_NOISE_FILTERS)
+        file_name = f"{os.getpid()}-{int(time.time() * 1000)}-{label}.tracemalloc"
+        snapshot.dump(os.path.join(snapshot_dir, file_name))
+
+    logger.info(f"🧠 Снимок памяти {file_name}: {len(snapshot.traces)} трасс")
+    _rotate(snapshot_dir, getattr(settings, 'MEMORY_MAX_SNAPSHOTS', 20))
+    return file_name
+
+
+def list_snapshots(pid=None):
+    """Снимки процесса pid (по умолчанию - текущего), самые новые первыми"""
+    pid = pid or os.getpid()
+    snapshot_dir = get_snapshot_dir()
+    if not os.path.isdir(snapshot_dir):
+        return []
+
+    snapshots = []
+    for file_name in os.listdir(snapshot_dir):
+        match = _SNAPSHOT_NAME.match(file_name)
+        if match is None or int(match.group(1)) != pid:
+            continue
+        try:
+            size = os.path.getsize(os.path.join(snapshot_dir, file_name))
+        except OSError:
+            continue
+        snapshots.append({
+            'name': file_name,
+            'created': time.strftime('%d.%m.%Y %H:%M:%S', time.localtime(int(match.group(2)) / 1000)),
+            'label': match.group(3),
+            'size': size,
+        })
+
+    snapshots.sort(key=lambda entry: entry['name'], reverse=True)
+    return snapshots
+
+
+def _rotate(snapshot_dir, max_snapshots):
+    for entry in list_snapshots()[max_snapshots:]:
+        try:
+            os.remove(os.path.join(snapshot_dir, entry['name']))
+        except OSError:
+            pass
+
+
+def _load(file_name):
+    if _SNAPSHOT_NAME.match(file_name) is None:
+        raise ValueError(f"Неверное имя снимка: {file_name}")
+    return tracemalloc.Snapshot.load(os.path.join(get_snapshot_dir(), file_name))
+
+
+def diff(old_name, new_name, key_type='lineno', limit=30):
+    """
+    Рост памяти между двумя снимками по месту аллокации:
+    [{'location', 'size_diff', 'size', 'count_diff', 'count'}], крупнейший рост первым.
+    """
+    if key_type not in KEY_TYPES:
+        raise ValueError(f"key_type: одно из {KEY_TYPES}")
+
+    old_snapshot = _load(old_name)
+    new_snapshot = _load(new_name)
+
+    result = []
+    for stat in new_snapshot.compare_to(old_snapshot, key_type)[:limit]:
+        frames = stat.traceback.format(most_recent_first=True) if key_type == 'traceback' else [str(stat.traceback[0])]
+        result.append({
+            'location': frames[0].strip() if frames else '?',
+            'traceback': [line.strip() for line in frames[1:]] if key_type == 'traceback' else [],
+            'size_diff': stat.size_diff,
+            'size': stat.size,
+            'count_diff': stat.count_diff,
+            'count': stat.count,
+        })
+    return result
+
+
+def top_allocations(key_type='lineno', limit=30):
+    """Крупнейшие места аллокаций прямо сейчас (без сохранения снимка)"""
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = tracemalloc.take_snapshot().filter_traces(_NOISE_FILTERS)
+    return [
+        {'location': str(stat.traceback[0]), 'size': stat.size, 'count': stat.count}
+        for stat in snapshot.statistics(key_type)[:limit]
+    ]
+
+
+# ==================== ОБЪЕКТЫ ====================
+
+def object_counts(limit=30):
+    """
+    Живые объекты, отслеживаемые gc, по модулю их типа:
+    {'modules': [(модуль, количество)], 'types': [(модуль.тип, количество)]}
+    """
+    modules = collections.Counter()
+    types = collections.Counter()
+    for obj in gc.get_objects():
+        obj_type = type(obj)
+        module = getattr(obj_type, '__module__', None) or '?'
+        modules[module] += 1
+        types[f"{module}.{obj_type.__qualname__}"] += 1
+
+    return {
+        'total': sum(modules.values()),
+        'modules': modules.most_common(limit),
+        'types': types.most_common(limit),
+    }
+
+
+# ==================== СОСТОЯНИЕ ====================
+
+def _rss_bytes():
+    """Текущий RSS процесса (Linux: /proc/self/statm)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss - пиковое значение (КБ на Linux), лучше, чем ничего
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def get_status():
+    from user_auth.decorators import get_rate_limit_stats
+
+    current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    return {
+        'pid': os.getpid(),
+        'rss_bytes': _rss_bytes(),
+        'tracing': tracemalloc.is_tracing(),
+        'traced_current_bytes': current,
+        'traced_peak_bytes': peak,
+        'gc_counts': gc.get_count(),
+        'rate_limit': get_rate_limit_stats(),
+        'snapshots': list_snapshots(),
+    }
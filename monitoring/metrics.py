@@ -0,0 +1,423 @@
+# monitoring/metrics.py - Реестр метрик и текстовый формат Prometheus
+#
+# Метрики объявляются на уровне модуля и обновляются из кода приложения:
+#
+#     REQUESTS = Counter('http_requests_total', 'HTTP-запросы', ('view', 'method', 'status'))
+#     REQUESTS.inc(view='home', method='GET', status='200')
+#
+# Несколько процессов (gunicorn): каждый воркер хранит значения в памяти и
+# раз в METRICS_FLUSH_INTERVAL секунд записывает их фоновым потоком в
+# METRICS_DIR/<pid>.json. /metrics (monitoring/views.py) объединяет файлы
+# всех воркеров: счетчики и гистограммы суммируются, gauge - только по
+# живым процессам. Значения завершившихся воркеров gunicorn-хук child_exit
+# переносит в архив (mark_process_dead), так что счетчики не убывают.
+#
+# Без METRICS_DIR (runserver, manage.py) /metrics отдает метрики текущего
+# процесса.
+
+import glob
+import json
+import math
+import os
+import threading
+import time
+
+from loguru import logger
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ARCHIVE_FILE = 'archive.json'
+
+_registry = {}
+_collectors = []
+_registry_lock = threading.Lock()
+
+_flusher = None
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+# ==================== МЕТРИКИ ====================
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+        with _registry_lock:
+            if name in _registry:
+                raise ValueError(f"Метрика {name} уже зарегистрирована")
+            _registry[name] = self
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: ожидались метки {self.labelnames}, получены {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _dump(self):
+        """Значения для записи в файл процесса: [[метки..., значение], ...]"""
+        with self._lock:
+            return [list(key) + [value] for key, value in self._values.items()]
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        _ensure_flusher()
+
+
+class Gauge(_Metric):
+    """
+    Текущее значение. multiprocess_mode определяет объединение воркеров:
+    'livesum' - сумма по живым процессам, 'max' - максимум по живым.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), multiprocess_mode='livesum'):
+        super().__init__(name, documentation, labelnames)
+        self.multiprocess_mode = multiprocess_mode
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+        _ensure_flusher()
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        _ensure_flusher()
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам (значения - [счетчики корзин, сумма, количество])"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+        _ensure_flusher()
+
+    def time(self, **labels):
+        """Контекстный менеджер: with HISTOGRAM.time(op='x'): ..."""
+        return _Timer(self, labels)
+
+    def _dump(self):
+        with self._lock:
+            return [list(key) + [[list(entry[0]), entry[1], entry[2]]] for key, entry in self._values.items()]
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+def register_collector(collector):
+    """
+    Функция, вызываемая перед каждым сбором /metrics (например, чтобы
+    выставить gauge состояния circuit breaker). Исключения игнорируются.
+    """
+    _collectors.append(collector)
+    return collector
+
+
+def _run_collectors():
+    for collector in _collectors:
+        try:
+            collector()
+        except Exception as e:
+            logger.debug(f"📈 Сборщик метрик {getattr(collector, '__name__', collector)}: {e}")
+
+
+# ==================== НЕСКОЛЬКО ПРОЦЕССОВ ====================
+
+def get_metrics_dir():
+    from django.conf import settings
+    return str(getattr(settings, 'METRICS_DIR', '') or '')
+
+
+def _flush_interval():
+    from django.conf import settings
+    return float(getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0))
+
+
+def _snapshot():
+    """Снимок всех метрик процесса в виде, пригодном для JSON"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return {metric.name: metric._dump() for metric in metrics}
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def flush():
+    """Записывает метрики текущего процесса в METRICS_DIR/<pid>.json"""
+    metrics_dir = get_metrics_dir()
+    if not metrics_dir:
+        return False
+
+    try:
+        os.makedirs(metrics_dir, exist_ok=True)
+        _write_json(os.path.join(metrics_dir, f"{os.getpid()}.json"),
+                    {'pid': os.getpid(), 'metrics': _snapshot()})
+        return True
+    except OSError as e:
+        logger.warning(f"📈 Не удалось записать метрики в {metrics_dir}: {e}")
+        return False
+
+
+def _flush_loop():
+    while True:
+        time.sleep(_flush_interval())
+        if _flusher_pid != os.getpid():
+            return
+        flush()
+
+
+def _ensure_flusher():
+    """Лениво запускает поток записи метрик (только при METRICS_DIR)"""
+    global _flusher, _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    if not get_metrics_dir():
+        return
+
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+        _flusher = threading.Thread(target=_flush_loop, name='metrics-flusher', daemon=True)
+        _flusher.start()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(target, metric, samples, alive):
+    """Добавляет значения одного процесса к объединенным значениям"""
+    for sample in samples:
+        key, value = tuple(sample[:-1]), sample[-1]
+
+        if metric.kind == 'histogram':
+            entry = target.setdefault(key, [[0] * len(metric.buckets), 0.0, 0])
+            if len(value[0]) != len(entry[0]):
+                continue  # корзины изменились между версиями кода
+            entry[0] = [a + b for a, b in zip(entry[0], value[0])]
+            entry[1] += value[1]
+            entry[2] += value[2]
+        elif metric.kind == 'counter':
+            target[key] = target.get(key, 0) + value
+        elif alive:
+            if metric.multiprocess_mode == 'max':
+                target[key] = max(target.get(key, value), value)
+            else:
+                target[key] = target.get(key, 0) + value
+
+
+def mark_process_dead(pid, metrics_dir=None):
+    """
+    Переносит счетчики и гистограммы завершившегося воркера в archive.json
+    и удаляет его файл (gauge мертвого процесса просто отбрасываются).
+    Вызывается хуком child_exit в gunicorn.conf.py.
+    """
+    metrics_dir = metrics_dir or get_metrics_dir()
+    if not metrics_dir:
+        return
+
+    path = os.path.join(metrics_dir, f"{pid}.json")
+    data = _read_json(path)
+    if data is None:
+        return
+
+    import fcntl
+
+    from . import instruments  # noqa: F401 - типы метрик нужны для объединения
+
+    with open(os.path.join(metrics_dir, '.archive.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        archive_path = os.path.join(metrics_dir, ARCHIVE_FILE)
+        archive = (_read_json(archive_path) or {}).get('metrics', {})
+        for name, samples in data.get('metrics', {}).items():
+            metric = _registry.get(name)
+            if metric is None or metric.kind == 'gauge':
+                continue
+            merged = {tuple(sample[:-1]): sample[-1] for sample in archive.get(name, [])}
+            _merge(merged, metric, samples, alive=False)
+            archive[name] = [list(key) + [value] for key, value in merged.items()]
+
+        _write_json(archive_path, {'pid': None, 'metrics': archive})
+        os.remove(path)
+
+
+def clear_metrics_dir(metrics_dir=None):
+    """Удаляет файлы метрик прошлого запуска (gunicorn on_starting)"""
+    metrics_dir = metrics_dir or get_metrics_dir()
+    if not metrics_dir or not os.path.isdir(metrics_dir):
+        return
+    for path in glob.glob(os.path.join(metrics_dir, '*.json')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def collect():
+    """{имя метрики: {метки: значение}} по всем процессам (или текущему)"""
+    _run_collectors()
+
+    metrics_dir = get_metrics_dir()
+    if not metrics_dir:
+        with _registry_lock:
+            metrics = list(_registry.values())
+        return {metric.name: {tuple(sample[:-1]): sample[-1] for sample in metric._dump()} for metric in metrics}
+
+    # Собственные значения записываем сразу - ответ не отстает на интервал
+    flush()
+
+    merged = {name: {} for name in _registry}
+    for path in glob.glob(os.path.join(metrics_dir, '*.json')):
+        data = _read_json(path)
+        if data is None:
+            continue
+        pid = data.get('pid')
+        alive = pid is not None and (pid == os.getpid() or _pid_alive(pid))
+        for name, samples in data.get('metrics', {}).items():
+            metric = _registry.get(name)
+            if metric is not None:
+                _merge(merged[name], metric, samples, alive)
+    return merged
+
+
+# ==================== ТЕКСТОВЫЙ ФОРМАТ ====================
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus 0.0.4"""
+    values = collect()
+    lines = []
+
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda metric: metric.name)
+
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+
+        for key, value in sorted(values.get(metric.name, {}).items()):
+            if metric.kind != 'histogram':
+                lines.append(f"{metric.name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+                continue
+
+            bucket_counts, total, count = value
+            names = metric.labelnames + ('le',)
+            cumulative = 0
+            for bound, bucket_count in zip(metric.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{metric.name}_bucket{_format_labels(names, key + (bound,))} {cumulative}")
+            lines.append(f"{metric.name}_bucket{_format_labels(names, key + ('+Inf',))} {count}")
+            lines.append(f"{metric.name}_sum{_format_labels(metric.labelnames, key)} {_format_value(float(total))}")
+            lines.append(f"{metric.name}_count{_format_labels(metric.labelnames, key)} {count}")
+
+    return '\n'.join(lines) + '\n'
+
+
+# ==================== FORK ====================
+
+def reset_after_fork():
+    """
+    Воркер не должен повторно учитывать значения master-процесса
+    (--preload): обнуляем метрики, поток записи запустится заново.
+    """
+    global _registry_lock, _flusher_lock, _flusher, _flusher_pid
+    _registry_lock = threading.Lock()
+    _flusher_lock = threading.Lock()
+    _flusher = None
+    _flusher_pid = None
+    for metric in _registry.values():
+        metric._lock = threading.Lock()
+        metric._values = {}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_after_fork)
@@ -0,0 +1,98 @@
+# monitoring/middleware.py - Метрики и профилирование HTTP-запросов
+#
+# Оба middleware стоят первыми в MIDDLEWARE, чтобы учитывать время всех
+# остальных middleware. Метка view - имя маршрута (namespace:name), поэтому
+# количество серий не зависит от параметров URL.
+
+import random
+import time
+
+from django.conf import settings
+
+from .instruments import HTTP_EXCEPTIONS, HTTP_IN_PROGRESS, HTTP_LATENCY, HTTP_REQUESTS
+
+# Эти запросы не учитываются: сбор метрик и проверки балансировщика
+_SKIPPED_VIEWS = {'metrics', 'healthz', 'readyz'}
+
+
+def _view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match._func_path
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        HTTP_IN_PROGRESS.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            HTTP_IN_PROGRESS.dec()
+
+        view = _view_label(request)
+        if view not in _SKIPPED_VIEWS:
+            HTTP_LATENCY.observe(time.perf_counter() - started, view=view, method=request.method)
+            HTTP_REQUESTS.inc(view=view, method=request.method, status=str(response.status_code))
+        return response
+
+    def process_exception(self, request, exception):
+        if self.enabled:
+            HTTP_EXCEPTIONS.inc(view=_view_label(request), exception=type(exception).__name__)
+        return None
+
+
+class ProfilerMiddleware:
+    """
+    Выборочное профилирование (monitoring/profiler.py). Стеки собираются для
+    каждого запроса, пока PROFILER_ENABLED, а сохраняются только для
+    выборки PROFILER_SAMPLE_RATE и для запросов дольше PROFILER_SLOW_MS.
+    PROFILER_VIEWS ограничивает профилирование списком view (пусто - все).
+    """
+
+    def __init__(self, get_response):
+        from django.core.exceptions import MiddlewareNotUsed
+
+        if not getattr(settings, 'PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed
+
+        from . import profiler
+
+        self.get_response = get_response
+        self.profiler = profiler
+        self.sampler = profiler.get_sampler()
+        self.sample_rate = getattr(settings, 'PROFILER_SAMPLE_RATE', 0.0)
+        self.slow_ms = getattr(settings, 'PROFILER_SLOW_MS', 1000)
+        self.views = set(getattr(settings, 'PROFILER_VIEWS', ()))
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        self.sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            samples = self.sampler.stop()
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        view = _view_label(request)
+        if view in _SKIPPED_VIEWS or (self.views and view not in self.views):
+            return response
+
+        if duration_ms >= self.slow_ms:
+            reason = 'slow'
+        elif self.sample_rate and random.random() < self.sample_rate:
+            reason = 'sampled'
+        else:
+            return response
+
+        self.profiler.save_profile(samples, view, duration_ms, reason, request.path)
+        return response
@@ -0,0 +1,84 @@
+# monitoring/mongo_listeners.py - Слушатели событий pymongo для метрик пула и команд
+#
+# Подключаются в MongoConnection._create_client() и AsyncMongoConnection
+# через event_listeners=[...]. Обработчики вызываются в потоке драйвера,
+# поэтому выполняют только обновление счетчиков в памяти.
+
+from pymongo import monitoring
+
+from . import command_capture
+from .instruments import (
+    MONGO_COMMAND_LATENCY,
+    MONGO_COMMANDS,
+    MONGO_POOL_CHECKOUT_FAILURES,
+    MONGO_POOL_CHECKOUT_WAIT,
+    MONGO_POOL_CLEARED,
+    MONGO_POOL_CONNECTIONS,
+)
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Размер пула, выданные соединения и ожидание свободного соединения"""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        MONGO_POOL_CLEARED.inc()
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.inc(state='open')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.dec(state='open')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.inc(reason=str(event.reason))
+        MONGO_POOL_CHECKOUT_WAIT.observe(event.duration)
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CONNECTIONS.inc(state='in_use')
+        MONGO_POOL_CHECKOUT_WAIT.observe(event.duration)
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CONNECTIONS.dec(state='in_use')
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Количество и время команд MongoDB (find, insert, update, aggregate...)"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMANDS.inc(command=event.command_name, outcome='ok')
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1_000_000, command=event.command_name)
+        if command_capture.is_active():
+            command_capture.record(event.command_name, event.duration_micros / 1_000_000, event.reply)
+
+    def failed(self, event):
+        MONGO_COMMANDS.inc(command=event.command_name, outcome='failed')
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1_000_000, command=event.command_name)
+        if command_capture.is_active():
+            command_capture.record(event.command_name, event.duration_micros / 1_000_000)
+
+
+def get_event_listeners():
+    """Слушатели для event_listeners MongoClient (пусто, если метрики выключены)"""
+    from django.conf import settings
+
+    if not getattr(settings, 'METRICS_ENABLED', True):
+        return []
+    return [PoolMetricsListener(), CommandMetricsListener()]
@@ -0,0 +1,269 @@
+# monitoring/profiler.py - Выборочный профилировщик запросов (sampling)
+#
+# Один фоновый поток раз в PROFILER_INTERVAL_MS читает стеки потоков,
+# которые сейчас обрабатывают запрос (sys._current_frames()), и считает
+# время одинаковых стеков. Код запроса не инструментируется, поэтому
+# накладные расходы почти не зависят от объема работы view. Вес сэмпла -
+# фактическое время с прошлого сэмпла (поток профилировщика ждет GIL, и
+# реальный интервал бывает больше номинального).
+#
+# ProfilerMiddleware (monitoring/middleware.py) регистрирует каждый запрос
+# и после ответа решает, сохранять ли профиль:
+#   - запрос попал в выборку PROFILER_SAMPLE_RATE;
+#   - или выполнялся дольше PROFILER_SLOW_MS.
+# Профили пишутся в PROFILER_DIR (по умолчанию var/profiles) в формате
+# speedscope (https://www.speedscope.app) или collapsed stacks
+# (flamegraph.pl, inferno); хранятся последние PROFILER_MAX_FILES файлов.
+# Список и скачивание - /monitoring/profiles (только администраторы).
+
+import datetime
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from loguru import logger
+
+FORMAT_SPEEDSCOPE = 'speedscope'
+FORMAT_COLLAPSED = 'collapsed'
+
+EXTENSIONS = {
+    FORMAT_SPEEDSCOPE: '.speedscope.json',
+    FORMAT_COLLAPSED: '.folded',
+}
+
+# Глубже стек не разворачиваем (рекурсия шаблонов и т.п.)
+MAX_STACK_DEPTH = 128
+
+_BASE_DIR = str(settings.BASE_DIR) + os.sep
+
+
+def get_profile_dir():
+    return str(getattr(settings, 'PROFILER_DIR', settings.BASE_DIR / 'var' / 'profiles'))
+
+
+# ==================== СЭМПЛЕР ====================
+
+class _Sampler:
+    """Фоновый поток, собирающий стеки зарегистрированных потоков"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active = {}
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._active = {}
+            self._thread = threading.Thread(target=self._loop, name='request-profiler', daemon=True)
+            self._thread.start()
+
+    def start(self):
+        """Начинает сбор стеков текущего потока; возвращает Counter {стек: мс}"""
+        self._ensure_thread()
+        samples = Counter()
+        with self._lock:
+            self._active[threading.get_ident()] = samples
+        return samples
+
+    def stop(self):
+        with self._lock:
+            return self._active.pop(threading.get_ident(), None)
+
+    def _loop(self):
+        last = time.perf_counter()
+        while self._pid == os.getpid():
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            elapsed_ms = (now - last) * 1000
+            last = now
+
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+
+            frames = sys._current_frames()
+            for thread_id, samples in active:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[_stack_of(frame)] += elapsed_ms
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(_BASE_DIR):
+        filename = filename[len(_BASE_DIR):]
+    else:
+        # site-packages/django/... -> django/...
+        marker = filename.rfind('site-packages' + os.sep)
+        if marker != -1:
+            filename = filename[marker + len('site-packages') + 1:]
+    return (code.co_name, filename, code.co_firstlineno)
+
+
+def _stack_of(frame):
+    """Стек от корня к листу: кортеж (функция, файл, строка)"""
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        stack.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = _Sampler(getattr(settings, 'PROFILER_INTERVAL_MS', 5) / 1000)
+    return _sampler
+
+
+# ==================== ФОРМАТЫ ====================
+
+def to_collapsed(samples):
+    """Формат collapsed stacks: 'a;b;c <мс>' на строку"""
+    lines = []
+    for stack, weight_ms in samples.most_common():
+        names = ';'.join(f"{name} ({filename}:{line})".replace(';', ',') for name, filename, line in stack)
+        lines.append(f"{names} {max(1, round(weight_ms))}")
+    return '\n'.join(lines) + '\n'
+
+
+def to_speedscope(samples, name):
+    """Файл speedscope: один профиль типа 'sampled'"""
+    frames = []
+    frame_index = {}
+    stacks = []
+    weights = []
+
+    for stack, weight_ms in samples.most_common():
+        indices = []
+        for frame in stack:
+            index = frame_index.get(frame)
+            if index is None:
+                index = frame_index[frame] = len(frames)
+                frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+            indices.append(index)
+        stacks.append(indices)
+        weights.append(round(weight_ms, 3))
+
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'WWS1 monitoring.profiler',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': round(sum(weights), 3),
+            'samples': stacks,
+            'weights': weights,
+        }],
+    }
+
+
+# ==================== ФАЙЛЫ ====================
+
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def save_profile(samples, view, duration_ms, reason, path=''):
+    """
+    Записывает профиль запроса; имя файла:
+    <время>_<view>_<длительность>ms_<причина>.<расширение>
+    """
+    if not samples:
+        return None
+
+    profile_dir = get_profile_dir()
+    profile_format = getattr(settings, 'PROFILER_FORMAT', FORMAT_SPEEDSCOPE)
+
+    view_name = _SAFE_NAME.sub('-', view.replace(':', '.')).strip('-') or 'unknown'
+    stamp = time.strftime('%Y%m%d-%H%M%S') + f"-{int(time.time() * 1000) % 1000:03d}-{os.getpid()}"
+    file_name = f"{stamp}_{view_name}_{int(duration_ms)}ms_{reason}{EXTENSIONS[profile_format]}"
+
+    try:
+        os.makedirs(profile_dir, exist_ok=True)
+        file_path = os.path.join(profile_dir, file_name)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            if profile_format == FORMAT_COLLAPSED:
+                f.write(to_collapsed(samples))
+            else:
+                json.dump(to_speedscope(samples, f"{view} {path} ({int(duration_ms)} ms)"), f)
+    except OSError as e:
+        logger.warning(f"🔬 Не удалось сохранить профиль {file_name}: {e}")
+        return None
+
+    logger.info(f"🔬 Профиль {view} ({int(duration_ms)} мс, {reason}) сохранен: {file_name}")
+    _rotate(profile_dir, getattr(settings, 'PROFILER_MAX_FILES', 200))
+    return file_path
+
+
+def _rotate(profile_dir, max_files):
+    """Удаляет самые старые профили сверх max_files"""
+    files = list_profiles(profile_dir)
+    for entry in files[max_files:]:
+        try:
+            os.remove(os.path.join(profile_dir, entry['name']))
+        except OSError:
+            pass
+
+
+def _parse_file_name(file_name):
+    for extension in EXTENSIONS.values():
+        if file_name.endswith(extension):
+            # Имя view может содержать '_', время/длительность/причина - нет
+            parts = file_name[:-len(extension)].split('_')
+            if len(parts) >= 4 and parts[-2].endswith('ms'):
+                return {'view': '_'.join(parts[1:-2]), 'duration_ms': int(parts[-2][:-2]), 'reason': parts[-1]}
+    return None
+
+
+def list_profiles(profile_dir=None):
+    """Профили, самые новые первыми"""
+    profile_dir = profile_dir or get_profile_dir()
+    if not os.path.isdir(profile_dir):
+        return []
+
+    profiles = []
+    for file_name in os.listdir(profile_dir):
+        info = _parse_file_name(file_name)
+        if info is None:
+            continue
+        try:
+            stat = os.stat(os.path.join(profile_dir, file_name))
+        except OSError:
+            continue  # удален ротацией другого воркера
+        info.update({'name': file_name, 'size': stat.st_size, 'created': datetime.datetime.fromtimestamp(stat.st_mtime)})
+        profiles.append(info)
+
+    profiles.sort(key=lambda entry: entry['name'], reverse=True)
+    return profiles
+
+
+def resolve_profile(file_name):
+    """Полный путь профиля по имени файла (None для чужих/несуществующих файлов)"""
+    if os.path.basename(file_name) != file_name or _parse_file_name(file_name) is None:
+        return None
+    file_path = os.path.join(get_profile_dir(), file_name)
+    return file_path if os.path.isfile(file_path) else None
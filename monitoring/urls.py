@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('metrics', views.metrics_view, name='metrics'),
+    path('monitoring/profiles/', views.profiles_list, name='monitoring_profiles'),
+    path('monitoring/profiles/<str:name>', views.profile_download, name='monitoring_profile_download'),
+    path('monitoring/memory/', views.memory_view, name='monitoring_memory'),
+]
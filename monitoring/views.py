@@ -0,0 +1,117 @@
+# monitoring/views.py - Эндпоинт /metrics для Prometheus и страницы диагностики
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.contrib import messages
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_GET, require_http_methods
+from loguru import logger
+
+from user_auth.decorators import admin_required
+
+from . import instruments  # noqa: F401 - регистрирует метрики приложения
+from . import metrics
+
+
+def _is_allowed(request):
+    """Доступ по IP (METRICS_ALLOWED_IPS) или по токену (Authorization: Bearer ...)"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') == f"Bearer {token}":
+        return True
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ())
+
+
+@require_GET
+def metrics_view(request):
+    if not getattr(settings, 'METRICS_ENABLED', True):
+        return HttpResponse("Metrics disabled", status=404, content_type='text/plain')
+
+    if not _is_allowed(request):
+        logger.warning(f"🚫 Запрос /metrics с {request.META.get('REMOTE_ADDR')} отклонен")
+        return HttpResponseForbidden("Forbidden")
+
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+# ==================== ПРОФИЛИ ЗАПРОСОВ ====================
+
+@require_GET
+@admin_required()
+def profiles_list(request):
+    """Список сохраненных профилей (monitoring/profiler.py)"""
+    from . import profiler
+
+    context = {
+        'profiles': profiler.list_profiles(),
+        'profiler_enabled': getattr(settings, 'PROFILER_ENABLED', False),
+        'sample_rate': getattr(settings, 'PROFILER_SAMPLE_RATE', 0.0),
+        'slow_ms': getattr(settings, 'PROFILER_SLOW_MS', 1000),
+        'profile_format': getattr(settings, 'PROFILER_FORMAT', profiler.FORMAT_SPEEDSCOPE),
+    }
+    return render(request, 'monitoring_profiles.html', context)
+
+
+@require_GET
+@admin_required()
+def profile_download(request, name):
+    from . import profiler
+
+    file_path = profiler.resolve_profile(name)
+    if file_path is None:
+        raise Http404("Profil nicht gefunden")
+
+    logger.info(f"🔬 Профиль {name} скачан пользователем {request.user_data.get('username')}")
+    return FileResponse(open(file_path, 'rb'), as_attachment=True, filename=name)
+
+
+# ==================== ПАМЯТЬ ====================
+
+@require_http_methods(['GET', 'POST'])
+@admin_required()
+def memory_view(request):
+    """
+    tracemalloc текущего воркера: включение/выключение, снимки, сравнение
+    двух снимков (?old=...&new=...) и количество объектов (?objects=1)
+    """
+    from . import memory
+
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        try:
+            if action == 'start':
+                memory.start()
+                messages.success(request, "Speicherverfolgung gestartet")
+            elif action == 'stop':
+                memory.stop()
+                messages.success(request, "Speicherverfolgung beendet")
+            elif action == 'snapshot':
+                file_name = memory.take_snapshot(request.POST.get('label', ''))
+                messages.success(request, f"Snapshot {file_name} gespeichert")
+            else:
+                messages.error(request, "Unbekannte Aktion")
+        except (RuntimeError, OSError) as e:
+            logger.error(f"🧠 Ошибка действия {action}: {e}")
+            messages.error(request, f"Aktion fehlgeschlagen: {e}")
+        return redirect('monitoring_memory')
+
+    key_type = request.GET.get('key', 'lineno')
+    context = {
+        'status': memory.get_status(),
+        'key_types': memory.KEY_TYPES,
+        'key_type': key_type,
+        'old': request.GET.get('old', ''),
+        'new': request.GET.get('new', ''),
+    }
+
+    if context['old'] and context['new']:
+        try:
+            context['diff'] = memory.diff(context['old'], context['new'], key_type)
+        except (ValueError, OSError) as e:
+            messages.error(request, f"Vergleich nicht möglich: {e}")
+    elif request.GET.get('top'):
+        context['top'] = memory.top_allocations(key_type)
+
+    if request.GET.get('objects'):
+        context['objects'] = memory.object_counts()
+
+    return render(request, 'monitoring_memory.html', context)
@@ -1,32 +1,36 @@
 # WWS1/auth/__init__.py - Централизованная система аутентификации
 
 
-from .authentication import (
-    authenticate_user,
-    is_user_authenticated,
-    clear_user_session,
-    should_show_login_modal,
-    get_user_display_name,
-    verify_user_permissions,
-)
-
-from .decorators import (
-    login_required,
-    admin_required,
-    anonymous_required,
-    permission_required,
-    rate_limit_user,
-)
-
-from .session import (
-    create_user_session,
-    update_user_session,
-    get_session_data,
-    extend_session,
-    is_session_expired,
-    refresh_session_activity,
-    get_session_info,
-)
+# Подмодули импортируются при первом обращении (PEP 562): authentication
+# тянет users.user_utils -> pymongo, а пакет импортируется уже при
+# django.setup() - management-командам и старту воркера это не нужно
+_EXPORTS = {
+    # Authentication
+    'authenticate_user': 'authentication',
+    'is_user_authenticated': 'authentication',
+    'clear_user_session': 'authentication',
+    'should_show_login_modal': 'authentication',
+    'get_user_display_name': 'authentication',
+    'verify_user_permissions': 'authentication',
+
+    # Decorators
+    'login_required': 'decorators',
+    'admin_required': 'decorators',
+    'anonymous_required': 'decorators',
+    'permission_required': 'decorators',
+    'rate_limit_user': 'decorators',
+
+    # Session Management
+    'create_user_session': 'session',
+    'update_user_session': 'session',
+    'get_session_data': 'session',
+    'extend_session': 'session',
+    'is_session_expired': 'session',
+    'refresh_session_activity': 'session',
+    'get_session_info': 'session',
+}
+
+_SUBMODULES = {'authentication', 'decorators', 'session'}
 
 __version__ = '1.0.0'
 __author__ = 'WWS1 Development Team'
@@ -57,7 +61,22 @@ __all__ = [
     'get_session_info',
 ]
 
-# Экспортируем также для удобного доступа
-from . import authentication
-from . import decorators
-from . import session
\ No newline at end of file
+
+
+def __getattr__(name):
+    import importlib
+
+    if name in _SUBMODULES:
+        return importlib.import_module(f'.{name}', __name__)
+
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS) + list(_SUBMODULES))
@@ -5,6 +5,8 @@ from loguru import logger
 from django.contrib.auth.hashers import check_password
 import datetime
 
+from mongodb import audit
+from monitoring.instruments import timed_password_check
 from users.user_utils import UserManager
 
 
@@ -17,16 +19,19 @@ def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
         user = user_manager.find_user_by_username(username)
 
         if not user:
+            audit.record(audit.LOGIN_FAILURE, target=username, actor=username, details={'reason': 'unknown_user'})
             logger.warning(f"❌ Пользователь '{username}' не найден")
             return None
 
         if not user.get('is_active', False):
+            audit.record(audit.LOGIN_FAILURE, target=username, actor=username, details={'reason': 'inactive'})
             logger.warning(f"❌ Пользователь '{username}' неактивен")
             return None
 
         # Проверяем временную блокировку
         locked_until = user.get('locked_until')
         if locked_until and locked_until > datetime.datetime.now():
+            audit.record(audit.LOGIN_FAILURE, target=username, actor=username, details={'reason': 'locked'})
             logger.warning(f"❌ Пользователь '{username}' заблокирован до {locked_until}")
             return None
 
@@ -36,12 +41,14 @@ def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
             logger.error(f"❌ У пользователя '{username}' отсутствует пароль")
             return None
 
-        if check_password(password, stored_password):
-            _update_login_success(username)
+        if timed_password_check(check_password, password, stored_password):
+            _update_login_success(user)
+            audit.record(audit.LOGIN_SUCCESS, target=username, actor=username)
             logger.success(f"✅ Пользователь '{username}' успешно авторизован")
             return user
         else:
             _update_login_failure(username)
+            audit.record(audit.LOGIN_FAILURE, target=username, actor=username, details={'reason': 'password'})
             logger.warning(f"❌ Неверный пароль для '{username}'")
             return None
 
@@ -165,27 +172,13 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
 
 # ==================== ПРИВАТНЫЕ ФУНКЦИИ ====================
 
-def _update_login_success(username: str) -> None:
-    """Обновляет данные успешного входа"""
+def _update_login_success(user: Dict[str, Any]) -> None:
+    """Обновляет данные успешного входа (см. UserManager._update_login_success)"""
     try:
-        user_manager = UserManager()
-        collection = user_manager.get_collection()
-
-        if collection is not None:
-            collection.update_one(
-                {'username': username},
-                {
-                    '$set': {
-                        'last_login': datetime.datetime.now(),
-                        'failed_login_attempts': 0,
-                        'locked_until': None
-                    }
-                }
-            )
-            logger.debug(f"✅ Обновлены данные успешного входа для '{username}'")
+        UserManager()._update_login_success(user)
 
     except Exception as e:
-        logger.error(f"❌ Ошибка обновления данных входа для '{username}': {e}")
+        logger.error(f"❌ Ошибка обновления данных входа для '{user.get('username')}': {e}")
 
 
 def _update_login_failure(username: str) -> None:
@@ -201,13 +194,15 @@ def _update_login_failure(username: str) -> None:
             )
 
             if result.modified_count > 0:
-                user = collection.find_one({'username': username})
+                user = collection.find_one({'username': username}, {'failed_login_attempts': 1})
                 if user and user.get('failed_login_attempts', 0) >= 5:
                     locked_until = datetime.datetime.now() + datetime.timedelta(minutes=15)
                     collection.update_one(
                         {'username': username},
                         {'$set': {'locked_until': locked_until}}
                     )
+                    audit.record(audit.USER_LOCKED, target=username,
+                                 details={'locked_until': locked_until})
                     logger.warning(f"⚠️ Пользователь '{username}' заблокирован до {locked_until}")
 
     except Exception as e:
@@ -3,14 +3,97 @@
 from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import HttpResponseForbidden
 from loguru import logger
+import threading
 import time
-from collections import defaultdict
-from datetime import datetime, timedelta
 
-# Хранилище для rate limiting
-_rate_limit_storage = defaultdict(list)
+from monitoring.instruments import RATE_LIMIT_DECISIONS
+from utils.json_response import MongoJsonResponse
+
+# Хранилище для rate limiting: ключ -> (окно, список time.monotonic() запросов).
+# Ограничено по размеру: ключи, все запросы которых вышли из окна,
+# удаляются. Ключи с активным окном не вытесняются никогда - иначе клиент,
+# перебирающий ключи (имена, IP), сбрасывал бы собственный лимит. Если
+# хранилище заполнено активными ключами, новые ключи отклоняются (fail closed).
+_RATE_LIMIT_MAX_KEYS = 10000
+_RATE_LIMIT_SWEEP_EVERY = 1000
+_RATE_LIMIT_FULL_SWEEP_INTERVAL = 1.0  # секунд между полными проходами при заполнении
+
+_rate_limit_storage = {}
+_rate_limit_lock = threading.Lock()
+_rate_limit_calls = 0
+_rate_limit_last_sweep = 0.0
+_rate_limit_full = False
+
+
+def _sweep_rate_limit_storage(now):
+    """Удаляет ключи, все запросы которых вышли из своего окна (под _rate_limit_lock)"""
+    global _rate_limit_last_sweep
+    _rate_limit_last_sweep = now
+    expired = [key for key, (window, timestamps) in _rate_limit_storage.items()
+               if not timestamps or timestamps[-1] <= now - window]
+    for key in expired:
+        del _rate_limit_storage[key]
+
+
+def _has_room(now):
+    """Есть ли место для нового ключа (под _rate_limit_lock)"""
+    global _rate_limit_full
+
+    if len(_rate_limit_storage) >= _RATE_LIMIT_MAX_KEYS \
+            and now - _rate_limit_last_sweep >= _RATE_LIMIT_FULL_SWEEP_INTERVAL:
+        _sweep_rate_limit_storage(now)
+
+    full = len(_rate_limit_storage) >= _RATE_LIMIT_MAX_KEYS
+    if full and not _rate_limit_full:
+        logger.warning(f"⚠️ Хранилище rate limiting заполнено ({_RATE_LIMIT_MAX_KEYS} активных ключей) - "
+                       f"новые клиенты отклоняются")
+    _rate_limit_full = full
+    return not full
+
+
+def _register_request(key, max_requests, time_window):
+    """
+    Учитывает запрос для ключа; False - лимит превышен (запрос не учитывается)
+    или хранилище заполнено активными ключами и новый ключ не помещается.
+    """
+    global _rate_limit_calls
+
+    now = time.monotonic()
+    cutoff = now - time_window
+
+    with _rate_limit_lock:
+        _rate_limit_calls += 1
+        if _rate_limit_calls % _RATE_LIMIT_SWEEP_EVERY == 0:
+            _sweep_rate_limit_storage(now)
+
+        entry = _rate_limit_storage.get(key)
+        if entry is None and not _has_room(now):
+            return False
+
+        timestamps = [timestamp for timestamp in entry[1] if timestamp > cutoff] if entry else []
+
+        allowed = len(timestamps) < max_requests
+        if allowed:
+            timestamps.append(now)
+
+        if timestamps:
+            _rate_limit_storage[key] = (time_window, timestamps)
+        else:
+            _rate_limit_storage.pop(key, None)
+
+    return allowed
+
+
+def get_rate_limit_stats():
+    """Размер хранилища rate limiting (для monitoring/memory.py)"""
+    with _rate_limit_lock:
+        return {
+            'keys': len(_rate_limit_storage),
+            'timestamps': sum(len(timestamps) for _window, timestamps in _rate_limit_storage.values()),
+            'max_keys': _RATE_LIMIT_MAX_KEYS,
+        }
 
 
 def login_required(redirect_url: str = 'users:login_page'):
@@ -27,7 +110,7 @@ def login_required(redirect_url: str = 'users:login_page'):
 
                 # Для AJAX запросов возвращаем JSON
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': False,
                         'message': 'Authentifizierung erforderlich',
                         'redirect_url': redirect_url
@@ -67,7 +150,7 @@ def admin_required(redirect_url: str = 'home'):
                 logger.warning(f"🚫 Неавторизованный доступ к админ-функции {view_func.__name__}")
 
                 if is_ajax or is_htmx:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': False,
                         'message': 'Administratorrechte erforderlich',
                         'redirect_url': '/users/login/'
@@ -81,7 +164,7 @@ def admin_required(redirect_url: str = 'home'):
                 logger.warning(f"🚫 Попытка доступа к админ-функции без прав: {user_data.get('username')}")
 
                 if is_ajax or is_htmx:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': False,
                         'message': 'Diese Funktion ist nur für Administratoren verfügbar',
                         'redirect_url': '/'
@@ -135,7 +218,7 @@ def permission_required(permission: str, redirect_url: str = 'home'):
                 logger.warning(f"🚫 Неавторизованный доступ к {view_func.__name__}")
 
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': False,
                         'message': 'Authentifizierung erforderlich'
                     }, status=401)
@@ -148,7 +231,7 @@ def permission_required(permission: str, redirect_url: str = 'home'):
                 logger.warning(f"🚫 Недостаточно прав для {view_func.__name__}: {user_data.get('username')}")
 
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': False,
                         'message': f'Berechtigung "{permission}" erforderlich'
                     }, status=403)
@@ -177,21 +260,13 @@ def rate_limit_user(max_requests: int = 5, time_window: int = 60):
             user_id = request.session.get('user_id') or request.META.get('REMOTE_ADDR', 'unknown')
             key = f"{view_func.__name__}:{user_id}"
 
-            now = datetime.now()
-            cutoff = now - timedelta(seconds=time_window)
-
-            # Очищаем старые записи
-            _rate_limit_storage[key] = [
-                timestamp for timestamp in _rate_limit_storage[key]
-                if timestamp > cutoff
-            ]
-
-            # Проверяем лимит
-            if len(_rate_limit_storage[key]) >= max_requests:
+            # Проверяем лимит (старые записи очищаются внутри)
+            if not _register_request(key, max_requests, time_window):
+                RATE_LIMIT_DECISIONS.inc(view=view_func.__name__, decision='blocked')
                 logger.warning(f"⚠️ Rate limit превышен для {user_id} в {view_func.__name__}")
 
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': False,
                         'message': 'Zu viele Anfragen. Bitte versuchen Sie es später erneut.'
                     }, status=429)
@@ -199,8 +274,7 @@ def rate_limit_user(max_requests: int = 5, time_window: int = 60):
                 messages.warning(request, "Zu viele Anfragen. Bitte warten Sie einen Moment.")
                 return HttpResponseForbidden("Rate limit exceeded")
 
-            # Добавляем текущий запрос
-            _rate_limit_storage[key].append(now)
+            RATE_LIMIT_DECISIONS.inc(view=view_func.__name__, decision='allowed')
 
             return view_func(request, *args, **kwargs)
 
@@ -222,7 +296,7 @@ def session_activity_required(max_inactive_seconds: int = 3600):
                 clear_user_session(request)
 
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': False,
                         'message': 'Sitzung abgelaufen. Bitte melden Sie sich erneut an.',
                         'redirect_url': 'users:login_page'
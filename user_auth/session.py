@@ -4,6 +4,8 @@ from typing import Dict, Any, Optional
 from loguru import logger
 import datetime
 
+from users import login_telemetry
+
 
 def create_user_session(request, user_data: Dict[str, Any], remember_me: bool = False) -> None:
 
@@ -130,9 +132,13 @@ def is_session_expired(request, max_inactive_seconds: int = 3600) -> bool:
 def refresh_session_activity(request) -> None:
 
     try:
-        request.session["last_activity"] = datetime.datetime.now().isoformat()
+        now = datetime.datetime.now()
+        request.session["last_activity"] = now.isoformat()
         request.session.modified = True
 
+        # В документ пользователя - через буфер отложенной записи
+        login_telemetry.record_activity(request.session.get('username'), now)
+
     except Exception as e:
         logger.error(f"❌ Ошибка обновления активности сессии: {e}")
 
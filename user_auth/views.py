@@ -2,12 +2,12 @@
 
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.http import JsonResponse
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.cache import never_cache
 from loguru import logger
 
+from utils.json_response import MongoJsonResponse
 from .authentication import authenticate_user, is_user_authenticated
 from .session import create_user_session, clear_user_session
 from .decorators import anonymous_required
@@ -41,7 +41,7 @@ def login_view(request):
             if not username:
                 error_message = "Benutzername ist erforderlich"
                 if is_ajax or is_htmx:
-                    return JsonResponse({'success': False, 'message': error_message, 'messages': [{'tags': 'error', 'text': error_message, 'delay': 5000}]})
+                    return MongoJsonResponse({'success': False, 'message': error_message, 'messages': [{'tags': 'error', 'text': error_message, 'delay': 5000}]})
                 else:
                     messages.error(request, error_message)
                     form = LoginForm(request.POST)
@@ -50,7 +50,7 @@ def login_view(request):
             if not password:
                 error_message = "Passwort ist erforderlich"
                 if is_ajax or is_htmx:
-                    return JsonResponse({'success': False, 'message': error_message, 'messages': [{'tags': 'error', 'text': error_message, 'delay': 5000}]})
+                    return MongoJsonResponse({'success': False, 'message': error_message, 'messages': [{'tags': 'error', 'text': error_message, 'delay': 5000}]})
                 else:
                     messages.error(request, error_message)
                     form = LoginForm(request.POST)
@@ -74,7 +74,7 @@ def login_view(request):
                 success_message = f"Willkommen, {display_name}!"
 
                 if is_ajax or is_htmx:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': True,
                         'message': success_message,
                         'messages': [{'tags': 'success', 'text': success_message, 'delay': 5000}],
@@ -89,7 +89,7 @@ def login_view(request):
                 logger.warning(f"❌ Неудачная попытка входа для '{username}'")
 
                 if is_ajax or is_htmx:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': False,
                         'message': error_message,
                         'messages': [{'tags': 'error', 'text': error_message, 'delay': 5000}]
@@ -123,7 +123,7 @@ def login_view(request):
         error_message = "Ein unerwarteter Fehler ist aufgetreten"
 
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return JsonResponse({'success': False, 'message': error_message})
+            return MongoJsonResponse({'success': False, 'message': error_message})
         else:
             messages.error(request, error_message)
             form = LoginForm()
@@ -209,7 +209,7 @@ def refresh_session_view(request):
         is_auth, user_data = is_user_authenticated(request)
 
         if not is_auth:
-            return JsonResponse({
+            return MongoJsonResponse({
                 'success': False,
                 'message': 'Sitzung abgelaufen'
             }, status=401)
@@ -217,14 +217,14 @@ def refresh_session_view(request):
         from .session import refresh_session_activity
         refresh_session_activity(request)
 
-        return JsonResponse({
+        return MongoJsonResponse({
             'success': True,
             'message': 'Sitzung aktualisiert'
         })
 
     except Exception as e:
         logger.error(f"❌ Ошибка обновления сессии: {e}")
-        return JsonResponse({
+        return MongoJsonResponse({
             'success': False,
             'message': 'Fehler beim Aktualisieren der Sitzung'
         }, status=500)
\ No newline at end of file
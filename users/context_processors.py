@@ -1,7 +1,11 @@
 # users/context_processors.py - ИСПРАВЛЕНО
 
+from django.utils.functional import SimpleLazyObject
 from loguru import logger
+from mongodb import audit
+from mongodb.cache_bus import company_cache
 from mongodb.mongodb_config import MongoConfig
+from mongodb.mongodb_utils import MongoConnection
 
 from user_auth import (
     is_user_authenticated,
@@ -59,8 +63,8 @@ def auth_context(request):
             'system_info': system_info,
             'system_version': '1.0.0',
 
-            # Статистика пользователей (для администраторов)
-            'user_stats': get_user_stats() if is_auth and user_data and user_data.get('is_admin') else None
+            # Статистика пользователей (для администраторов) - лениво, только если шаблон ее выводит
+            'user_stats': SimpleLazyObject(get_user_stats) if is_auth and user_data and user_data.get('is_admin') else None
         }
 
         logger.debug(f"Auth context: is_auth={is_auth}, show_login={show_login}, admin_count={admin_count}, admin_creation={is_admin_creation_page}")
@@ -85,6 +89,9 @@ def get_system_info(admin_count=None):
         # Проверяем MongoDB
         config = MongoConfig.read_config()
         mongodb_status = 'connected' if config.get('setup_completed') else 'disconnected'
+        circuit_state = MongoConnection.get_circuit_status()['state']
+        if circuit_state == 'open':
+            mongodb_status = 'unavailable'
 
         # Проверяем пользователей
         if admin_count is None:
@@ -98,11 +105,17 @@ def get_system_info(admin_count=None):
         else:
             user_status = 'ready' if admin_count > 0 else 'no_admins'
 
-        # Проверяем компанию
+        # Проверяем компанию (положительный ответ кешируется до записи компании)
         try:
-            from company.company_manager import CompanyManager
-            company_manager = CompanyManager()
-            company_status = 'registered' if company_manager.has_company() else 'not_registered'
+            if company_cache.get('has_company'):
+                company_status = 'registered'
+            else:
+                from company.company_manager import CompanyManager
+                company_manager = CompanyManager()
+                has_company = company_manager.has_company()
+                if has_company:
+                    company_cache.set('has_company', True)
+                company_status = 'registered' if has_company else 'not_registered'
         except Exception:
             company_status = 'error'
 
@@ -115,6 +128,7 @@ def get_system_info(admin_count=None):
             'mongodb': mongodb_status,
             'users': user_status,
             'company': company_status,
+            'mongodb_circuit': circuit_state,
             'admin_count': admin_count
         }
 
@@ -135,11 +149,19 @@ def get_user_stats():
         user_manager = UserManager()
         stats = user_manager.get_collection_stats()
 
+        # Входы - из счетчиков журнала (24 часовых и 7 дневных бакетов)
+        logins_24h = audit.counts((audit.LOGIN_SUCCESS, audit.LOGIN_FAILURE), hours=24)
+        logins_7d = audit.counts((audit.LOGIN_SUCCESS, audit.LOGIN_FAILURE), days=7)
+
         return {
             'total_users': stats.get('total_users', 0),
             'active_users': stats.get('active_users', 0),
             'admin_users': stats.get('admin_users', 0),
-            'locked_users': stats.get('locked_users', 0)
+            'locked_users': stats.get('locked_users', 0),
+            'logins_24h': logins_24h.get(audit.LOGIN_SUCCESS, 0),
+            'failed_logins_24h': logins_24h.get(audit.LOGIN_FAILURE, 0),
+            'logins_7d': logins_7d.get(audit.LOGIN_SUCCESS, 0),
+            'failed_logins_7d': logins_7d.get(audit.LOGIN_FAILURE, 0),
         }
 
     except Exception as e:
@@ -148,5 +170,9 @@ def get_user_stats():
             'total_users': 0,
             'active_users': 0,
             'admin_users': 0,
-            'locked_users': 0
+            'locked_users': 0,
+            'logins_24h': 0,
+            'failed_logins_24h': 0,
+            'logins_7d': 0,
+            'failed_logins_7d': 0,
         }
\ No newline at end of file
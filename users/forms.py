@@ -3,29 +3,35 @@ from django.core.validators import RegexValidator
 import re
 from mongodb.mongodb_utils import MongoConnection
 from mongodb.mongodb_config import MongoConfig
+from mongodb import stale_cache
+from mongodb.cache_bus import reference_cache
 from loguru import logger
 
 
 def get_salutations_from_mongodb():
     """Загружает салютации (Anrede) из MongoDB коллекции basic_salutations"""
+    cached = reference_cache.get('users.salutations')
+    if cached is not None:
+        return cached
+
     try:
         logger.info("Загружаем salutations из MongoDB")
         db = MongoConnection.get_database()
         if db is None:
             logger.error("База данных недоступна")
-            return get_default_salutation_choices()
+            return stale_cache.recall('users.salutations', get_default_salutation_choices())
 
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
         if not db_name:
             logger.error("Имя базы данных не найдено в конфигурации")
-            return get_default_salutation_choices()
+            return stale_cache.recall('users.salutations', get_default_salutation_choices())
 
         salutations_collection_name = f"{db_name}_basic_salutations"
         collections = db.list_collection_names()
         if salutations_collection_name not in collections:
             logger.warning(f"Коллекция '{salutations_collection_name}' не найдена")
-            return get_default_salutation_choices()
+            return stale_cache.recall('users.salutations', get_default_salutation_choices())
 
         salutations_collection = db[salutations_collection_name]
 
@@ -54,11 +60,11 @@ def get_salutations_from_mongodb():
                 count += 1
 
         logger.success(f"Успешно загружено {count} salutations из коллекции")
-        return choices
+        return reference_cache.set('users.salutations', stale_cache.remember('users.salutations', choices))
 
     except Exception as e:
         logger.error(f"Ошибка загрузки salutations из MongoDB: {e}")
-        return get_default_salutation_choices()
+        return stale_cache.recall('users.salutations', get_default_salutation_choices())
 
 
 def get_default_salutation_choices():
@@ -73,24 +79,28 @@ def get_default_salutation_choices():
 
 def get_titles_from_mongodb():
     """Загружает titles из MongoDB коллекции"""
+    cached = reference_cache.get('users.titles')
+    if cached is not None:
+        return cached
+
     try:
         logger.info("Загружаем titles из MongoDB")
         db = MongoConnection.get_database()
         if db is None:
             logger.error("База данных недоступна")
-            return get_default_title_choices()
+            return stale_cache.recall('users.titles', get_default_title_choices())
 
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
         if not db_name:
             logger.error("Имя базы данных не найдено в конфигурации")
-            return get_default_title_choices()
+            return stale_cache.recall('users.titles', get_default_title_choices())
 
         titles_collection_name = f"{db_name}_basic_titles"
         collections = db.list_collection_names()
         if titles_collection_name not in collections:
             logger.warning(f"Коллекция '{titles_collection_name}' не найдена")
-            return get_default_title_choices()
+            return stale_cache.recall('users.titles', get_default_title_choices())
 
         titles_collection = db[titles_collection_name]
         titles_cursor = titles_collection.find(
@@ -110,11 +120,11 @@ def get_titles_from_mongodb():
                 count += 1
 
         logger.success(f"Успешно загружено {count} titles из коллекции")
-        return choices
+        return reference_cache.set('users.titles', stale_cache.remember('users.titles', choices))
 
     except Exception as e:
         logger.error(f"Ошибка загрузки titles из MongoDB: {e}")
-        return get_default_title_choices()
+        return stale_cache.recall('users.titles', get_default_title_choices())
 
 
 def get_default_title_choices():
@@ -138,24 +148,28 @@ def get_default_title_choices():
 
 def get_communication_types_from_mongodb():
     """Загружает типы коммуникации из MongoDB коллекции basic_communications"""
+    cached = reference_cache.get('users.communication_types')
+    if cached is not None:
+        return cached
+
     try:
         logger.info("Загружаем типы коммуникации из MongoDB")
         db = MongoConnection.get_database()
         if db is None:
             logger.error("База данных недоступна")
-            return get_default_contact_type_choices()
+            return stale_cache.recall('users.communication_types', get_default_contact_type_choices())
 
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
         if not db_name:
             logger.error("Имя базы данных не найдено в конфигурации")
-            return get_default_contact_type_choices()
+            return stale_cache.recall('users.communication_types', get_default_contact_type_choices())
 
         communications_collection_name = f"{db_name}_basic_communications"
         collections = db.list_collection_names()
         if communications_collection_name not in collections:
             logger.warning(f"Коллекция '{communications_collection_name}' не найдена")
-            return get_default_contact_type_choices()
+            return stale_cache.recall('users.communication_types', get_default_contact_type_choices())
 
         communications_collection = db[communications_collection_name]
         communications_cursor = communications_collection.find(
@@ -200,11 +214,11 @@ def get_communication_types_from_mongodb():
                 logger.debug(f"Добавлен тип коммуникации: {key} -> {display_text}")
 
         logger.success(f"Успешно загружено {count} типов коммуникации из коллекции")
-        return choices
+        return reference_cache.set('users.communication_types', stale_cache.remember('users.communication_types', choices))
 
     except Exception as e:
         logger.error(f"Ошибка загрузки типов коммуникации из MongoDB: {e}")
-        return get_default_contact_type_choices()
+        return stale_cache.recall('users.communication_types', get_default_contact_type_choices())
 
 
 def get_default_contact_type_choices():
@@ -223,21 +237,25 @@ def get_default_contact_type_choices():
 
 def get_communication_config_from_mongodb():
     """Загружает полную конфигурацию типов коммуникации для JavaScript"""
+    cached = reference_cache.get('users.communication_config')
+    if cached is not None:
+        return cached
+
     try:
         logger.info("Загружаем конфигурацию коммуникации для JavaScript")
         db = MongoConnection.get_database()
         if db is None:
-            return get_default_communication_config()
+            return stale_cache.recall('users.communication_config', get_default_communication_config())
 
         config = MongoConfig.read_config()
         db_name = config.get('db_name')
         if not db_name:
-            return get_default_communication_config()
+            return stale_cache.recall('users.communication_config', get_default_communication_config())
 
         communications_collection_name = f"{db_name}_basic_communications"
         collections = db.list_collection_names()
         if communications_collection_name not in collections:
-            return get_default_communication_config()
+            return stale_cache.recall('users.communication_config', get_default_communication_config())
 
         communications_collection = db[communications_collection_name]
         communications_cursor = communications_collection.find(
@@ -282,11 +300,11 @@ def get_communication_config_from_mongodb():
                 }
 
         logger.success(f"Конфигурация загружена для {len(config_dict)} типов коммуникации")
-        return config_dict
+        return reference_cache.set('users.communication_config', stale_cache.remember('users.communication_config', config_dict))
 
     except Exception as e:
         logger.error(f"Ошибка загрузки конфигурации коммуникации: {e}")
-        return get_default_communication_config()
+        return stale_cache.recall('users.communication_config', get_default_communication_config())
 
 
 def get_default_communication_config():
@@ -616,3 +634,30 @@ class AdminPermissionsForm(forms.Form):
             'class': 'form-check-input'
         })
     )
+
+
+class UserImportForm(forms.Form):
+    """
+    Строка массового импорта (users/user_import.py): те же правила, что у
+    CreateAdminUserForm (username, пароль) и AdminProfileForm (профиль).
+    Варианты Anrede/Titel передаются готовыми - справочники загружаются
+    один раз на импорт, а не на каждую строку.
+    """
+
+    username = CreateAdminUserForm.base_fields['username']
+    password = CreateAdminUserForm.base_fields['password']
+    salutation = AdminProfileForm.base_fields['salutation']
+    title = AdminProfileForm.base_fields['title']
+    first_name = AdminProfileForm.base_fields['first_name']
+    last_name = AdminProfileForm.base_fields['last_name']
+    email = AdminProfileForm.base_fields['email']
+    phone = AdminProfileForm.base_fields['phone']
+    is_admin = forms.BooleanField(label="Administrator", required=False)
+    is_active = forms.BooleanField(label="Aktiv", required=False, initial=True)
+
+    clean_password = CreateAdminUserForm.clean_password
+
+    def __init__(self, *args, salutation_choices=None, title_choices=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['salutation'].choices = salutation_choices or get_salutations_from_mongodb()
+        self.fields['title'].choices = title_choices or get_titles_from_mongodb()
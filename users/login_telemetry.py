@@ -0,0 +1,268 @@
+# users/login_telemetry.py - Буфер отложенной записи телеметрии входа
+#
+# last_login (успешный вход) и last_activity (запрос авторизованного
+# пользователя) нужны для отображения и статистики, а не для безопасности.
+# Раньше каждый вход делал синхронный update_one. Теперь воркер копит эти
+# поля в памяти и записывает их одним bulk_write:
+#
+#     record_login('mmueller')        # last_login
+#     record_activity('mmueller')     # last_activity
+#
+# Несколько обновлений одного пользователя между записями сливаются в одно
+# (побеждает последнее значение). Запись выполняет фоновый поток - раз в
+# LOGIN_TELEMETRY_FLUSH_MS миллисекунд или сразу, как только набралось
+# LOGIN_TELEMETRY_FLUSH_ITEMS пользователей. При остановке воркера буфер
+# записывается хуком worker_exit (gunicorn.conf.py) и atexit.
+#
+# Поля блокировки (failed_login_attempts, locked_until) сюда НЕ попадают:
+# их UserManager пишет синхронно, а _record() их отбрасывает. Успешный вход
+# вызывает discard_lockout(): отложенная запись счетчика неудачных попыток
+# или блокировки не должна попасть в документ после сброса.
+#
+# Если MongoDB недоступна, обновления возвращаются в буфер (без перезаписи
+# более новых значений); сверх LOGIN_TELEMETRY_MAX_PENDING пользователей
+# новые обновления отбрасываются. С LOGIN_TELEMETRY_BUFFER=False каждое
+# обновление записывается сразу.
+
+import atexit
+import datetime
+import os
+import threading
+
+from loguru import logger
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from mongodb.circuit_breaker import mongo_breaker
+from monitoring.instruments import (
+    LOGIN_TELEMETRY_FLUSHES,
+    LOGIN_TELEMETRY_PENDING,
+    LOGIN_TELEMETRY_UPDATES,
+)
+
+_lock = threading.Lock()
+_pending = {}        # username -> {поле: значение}
+_wakeup = threading.Event()
+_flusher = None
+_flusher_pid = None
+
+LOCKOUT_FIELDS = ('failed_login_attempts', 'locked_until')
+_MISSING = object()
+
+
+def _setting(name, default):
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def _buffer_enabled():
+    return bool(_setting('LOGIN_TELEMETRY_BUFFER', True))
+
+
+def _flush_interval():
+    return float(_setting('LOGIN_TELEMETRY_FLUSH_MS', 500)) / 1000
+
+
+def _flush_items():
+    return int(_setting('LOGIN_TELEMETRY_FLUSH_ITEMS', 100))
+
+
+def _max_pending():
+    return int(_setting('LOGIN_TELEMETRY_MAX_PENDING', 10000))
+
+
+def get_collection():
+    """Коллекция пользователей или None, если MongoDB недоступна"""
+    from mongodb.mongodb_config import MongoConfig
+    from mongodb.mongodb_utils import MongoConnection
+
+    db_name = MongoConfig.read_config().get('db_name')
+    if not db_name or not mongo_breaker.allow_request():
+        return None
+
+    db = MongoConnection.get_database()
+    if db is None:
+        return None
+    return db[f"{db_name}_users"]
+
+
+# ==================== ЗАПИСЬ В БУФЕР ====================
+
+def record_login(username, when=None):
+    """Отложенная запись last_login"""
+    _record(username, {'last_login': when or datetime.datetime.now()})
+
+
+def record_activity(username, when=None):
+    """Отложенная запись last_activity"""
+    _record(username, {'last_activity': when or datetime.datetime.now()})
+
+
+def _record(username, fields):
+    if not username:
+        return
+
+    lockout = [name for name in fields if name in LOCKOUT_FIELDS]
+    if lockout:
+        logger.warning(f"⚠️  Поля блокировки {lockout} не пишутся через буфер телеметрии ('{username}')")
+        fields = {name: value for name, value in fields.items() if name not in LOCKOUT_FIELDS}
+        if not fields:
+            return
+
+    if not _buffer_enabled():
+        _write({username: fields})
+        return
+
+    _ensure_flusher()
+    with _lock:
+        entry = _pending.get(username)
+        if entry is not None:
+            entry.update(fields)
+            result = 'coalesced'
+        elif len(_pending) >= _max_pending():
+            result = 'dropped'
+        else:
+            _pending[username] = dict(fields)
+            result = 'buffered'
+        size = len(_pending)
+
+    LOGIN_TELEMETRY_UPDATES.inc(result=result)
+    LOGIN_TELEMETRY_PENDING.set(size)
+    if result == 'dropped':
+        logger.warning(f"⚠️  Буфер телеметрии входа переполнен ({size}), обновление '{username}' отброшено")
+    elif size >= _flush_items():
+        _wakeup.set()
+
+
+def discard_lockout(username):
+    """Успешный вход: убирает из буфера ожидающие поля блокировки пользователя"""
+    with _lock:
+        entry = _pending.get(username)
+        if entry is None:
+            return False
+        discarded = [name for name in LOCKOUT_FIELDS if entry.pop(name, _MISSING) is not _MISSING]
+        if not entry:
+            del _pending[username]
+        size = len(_pending)
+
+    LOGIN_TELEMETRY_PENDING.set(size)
+    if discarded:
+        logger.debug(f"🧹 Отменены отложенные поля блокировки {discarded} для '{username}'")
+    return bool(discarded)
+
+
+def pending_count():
+    with _lock:
+        return len(_pending)
+
+
+# ==================== ЗАПИСЬ В MONGODB ====================
+
+def flush():
+    """Записывает накопленные обновления одним bulk_write; возвращает число пользователей"""
+    global _pending
+    with _lock:
+        if not _pending:
+            return 0
+        batch, _pending = _pending, {}
+    LOGIN_TELEMETRY_PENDING.set(0)
+
+    if _write(batch):
+        return len(batch)
+
+    _requeue(batch)
+    return 0
+
+
+def _write(batch):
+    collection = get_collection()
+    if collection is None:
+        LOGIN_TELEMETRY_FLUSHES.inc(outcome='unavailable')
+        return False
+
+    requests = [UpdateOne({'username': username}, {'$set': fields})
+                for username, fields in batch.items()]
+    try:
+        collection.bulk_write(requests, ordered=False)
+    except PyMongoError as e:
+        LOGIN_TELEMETRY_FLUSHES.inc(outcome='error')
+        logger.error(f"❌ Ошибка записи телеметрии входа ({len(requests)} пользователей): {e}")
+        return False
+
+    LOGIN_TELEMETRY_FLUSHES.inc(outcome='ok')
+    logger.debug(f"✅ Телеметрия входа записана: {len(requests)} пользователей")
+    return True
+
+
+def _requeue(batch):
+    """Возвращает незаписанные обновления; более новые значения из буфера не перезаписываются"""
+    with _lock:
+        for username, fields in batch.items():
+            entry = _pending.get(username)
+            if entry is None:
+                if len(_pending) >= _max_pending():
+                    LOGIN_TELEMETRY_UPDATES.inc(result='dropped')
+                    continue
+                _pending[username] = fields
+            else:
+                for name, value in fields.items():
+                    entry.setdefault(name, value)
+        size = len(_pending)
+    LOGIN_TELEMETRY_PENDING.set(size)
+
+
+# ==================== ФОНОВЫЙ ПОТОК ====================
+
+def _flush_loop():
+    while True:
+        _wakeup.wait(_flush_interval())
+        _wakeup.clear()
+        if _flusher_pid != os.getpid():
+            return
+        try:
+            flush()
+        except Exception as e:
+            logger.error(f"❌ Ошибка потока телеметрии входа: {e}")
+
+
+def _ensure_flusher():
+    """Лениво запускает поток записи в текущем процессе"""
+    global _flusher, _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+        _flusher = threading.Thread(target=_flush_loop, name='login-telemetry', daemon=True)
+        _flusher.start()
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception as e:
+        logger.error(f"❌ Телеметрия входа не записана при остановке: {e}")
+
+
+atexit.register(_flush_at_exit)
+
+
+# ==================== FORK ====================
+
+def reset_after_fork():
+    """Буфер master-процесса не переходит в воркер; поток запустится заново"""
+    global _lock, _wakeup, _pending, _flusher, _flusher_pid
+    _lock = threading.Lock()
+    _wakeup = threading.Event()
+    _pending = {}
+    _flusher = None
+    _flusher_pid = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_after_fork)
@@ -0,0 +1,74 @@
+# users/management/commands/import_users.py - Массовый импорт пользователей из CSV / NDJSON
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.user_import import (
+    FORMATS,
+    IMPORT_BATCH_SIZE,
+    UserImporter,
+    UserImportError,
+    detect_format,
+    read_rows,
+    text_lines,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует пользователей из CSV или NDJSON (users/user_import.py): "
+        "проверка по правилам форм, хеширование паролей в пуле процессов, "
+        "insert_many пачками с отчетом о дубликатах по строкам."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл CSV/NDJSON или '-' (stdin, нужен --format)")
+        parser.add_argument('--format', choices=FORMATS, help='Формат (по умолчанию - по расширению файла)')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Строк в одном insert_many')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Процессов для хеширования паролей (0 - в текущем процессе)')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить строки, ничего не записывать')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            fmt = options['format'] or detect_format(path)
+        except UserImportError as e:
+            raise CommandError(f"{e} (--format angeben)")
+
+        importer = UserImporter(workers=options['workers'], batch_size=options['batch_size'],
+                                dry_run=options['dry_run'])
+        try:
+            if path == '-':
+                report = self._run(importer, read_rows(text_lines(sys.stdin.buffer), fmt))
+            else:
+                with open(path, 'rb') as stream:
+                    report = self._run(importer, read_rows(text_lines(stream), fmt))
+        except (OSError, UserImportError) as e:
+            raise CommandError(str(e))
+
+        for error in report.errors:
+            messages = '; '.join(f"{field}: {', '.join(errors)}" for field, errors in (error['errors'] or {}).items())
+            self.stdout.write(self.style.WARNING(
+                f"  Zeile {error['row']} ({error['username'] or '-'}): {error['kind']} - {messages}"
+            ))
+        if len(report.errors) < report.invalid + report.duplicates:
+            self.stdout.write(f"  ... weitere {report.invalid + report.duplicates - len(report.errors)} Fehler")
+
+        summary = (f"{report.rows} Zeilen, {report.valid} gültig, {report.created} angelegt, "
+                   f"{report.invalid} ungültig, {report.duplicates} doppelt ({report.elapsed:.1f} s)")
+        if report.dry_run:
+            summary = f"Probelauf: {summary}"
+        self.stdout.write(self.style.SUCCESS(f"✅ {summary}"))
+
+    def _run(self, importer, rows):
+        """Выполняет импорт, печатая прогресс после каждой пачки"""
+        report = None
+        for report in importer.run(rows):
+            if not report.finished_at:
+                self.stdout.write(
+                    f"  … {report.rows} Zeilen: {report.created} angelegt, "
+                    f"{report.invalid} ungültig, {report.duplicates} doppelt"
+                )
+        return report
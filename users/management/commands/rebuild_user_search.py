@@ -0,0 +1,51 @@
+# users/management/commands/rebuild_user_search.py - Ключи поиска для существующих пользователей
+
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import UpdateOne
+
+from mongodb import cache_bus
+from mongodb.mongodb_config import MongoConfig
+from mongodb.mongodb_utils import MongoConnection
+from mongodb.query_registry import collection_name, ensure_indexes
+from users.user_search import build_search_fields
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает поле search (users/user_search.py) у всех пользователей "
+        "и создает индексы поиска. Нужно один раз для пользователей, созданных "
+        "до появления поиска, и после изменения нормализации."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Обновлений в одном bulk_write')
+
+    def handle(self, *args, **options):
+        db = MongoConnection.get_database()
+        if db is None:
+            raise CommandError("База данных MongoDB недоступна")
+
+        db_name = MongoConfig.read_config().get('db_name')
+        if not db_name:
+            raise CommandError("Рабочая база не настроена")
+
+        created = ensure_indexes(db, db_name, 'users')
+        if created:
+            self.stdout.write(f"📊 Созданы индексы: {', '.join(created)}")
+
+        collection = db[collection_name(db_name, 'users')]
+        batch_size = max(1, options['batch_size'])
+        operations = []
+        updated = 0
+
+        for user in collection.find({}, {'username': 1, 'profile': 1}):
+            operations.append(UpdateOne({'_id': user['_id']}, {'$set': {'search': build_search_fields(user)}}))
+            if len(operations) >= batch_size:
+                updated += collection.bulk_write(operations, ordered=False).modified_count
+                operations = []
+        if operations:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+
+        if updated:
+            cache_bus.bump(cache_bus.USERS)
+        self.stdout.write(self.style.SUCCESS(f"✅ Ключи поиска обновлены у {updated} пользователей"))
@@ -0,0 +1,111 @@
+// ==================== ПОИСК В СПИСКЕ ПОЛЬЗОВАТЕЛЕЙ ====================
+// JSON-поиск users:user_search: по префиксу постранично (next_cursor),
+// если ничего не найдено - нечеткий поиск (fuzzy=1). Запрос короче
+// MIN_QUERY_LENGTH (как user_search.MIN_QUERY_LENGTH) возвращает исходный
+// список (страницы HTMX); truncated - совпадений слишком много.
+document.addEventListener('DOMContentLoaded', function () {
+    const input = document.getElementById('user-search');
+    const tbody = document.getElementById('user-list-rows');
+    if (!input || !tbody) return;
+
+    const MIN_QUERY_LENGTH = 2;
+    const searchUrl = input.dataset.url;
+    const initialRows = tbody.innerHTML;
+    let debounceTimer = null;
+    let requestId = 0;
+
+    function escapeHtml(value) {
+        const div = document.createElement('div');
+        div.textContent = value == null ? '' : String(value);
+        return div.innerHTML;
+    }
+
+    function renderRow(user) {
+        const status = user.is_active
+            ? '<span class="badge bg-success">Aktiv</span>'
+            : '<span class="badge bg-warning text-dark">Inaktiv</span>';
+        const admin = user.is_admin ? ' <span class="badge bg-primary">Admin</span>' : '';
+        const score = user.score !== undefined
+            ? ` <small class="text-muted">(${Math.round(user.score * 100)}%)</small>` : '';
+        return `<tr>
+            <td><i class="bi ${user.is_admin ? 'bi-person-gear' : 'bi-person'} me-2"></i><strong>${escapeHtml(user.username)}</strong>${score}</td>
+            <td>${escapeHtml(user.first_name)} ${escapeHtml(user.last_name)}</td>
+            <td>${escapeHtml(user.email) || '—'}</td>
+            <td>${status}${admin}</td>
+            <td>—</td>
+        </tr>`;
+    }
+
+    function renderMessage(text) {
+        return `<tr><td colspan="5" class="text-center text-muted py-4">${escapeHtml(text)}</td></tr>`;
+    }
+
+    function renderMore(cursor) {
+        return `<tr class="user-search-more"><td colspan="5" class="text-center py-2">
+            <button type="button" class="btn btn-sm btn-outline-secondary" data-cursor="${escapeHtml(cursor)}">Mehr laden</button>
+        </td></tr>`;
+    }
+
+    function fetchPage(query, params) {
+        const url = new URL(searchUrl, window.location.origin);
+        url.searchParams.set('q', query);
+        Object.entries(params || {}).forEach(([key, value]) => url.searchParams.set(key, value));
+        return fetch(url, {credentials: 'same-origin', headers: {'X-Requested-With': 'XMLHttpRequest'}})
+            .then(response => response.json());
+    }
+
+    function search(query, cursor) {
+        const currentRequest = ++requestId;
+        fetchPage(query, cursor ? {cursor} : {}).then(data => {
+            if (currentRequest !== requestId || !data.success) return;
+
+            if (data.truncated) {
+                tbody.innerHTML = renderMessage('Zu viele Treffer – bitte Suchbegriff verfeinern');
+                return;
+            }
+
+            if (!cursor && data.results.length === 0 && query.length >= 3) {
+                // По префиксу ничего - ищем похожие
+                return fetchPage(query, {fuzzy: '1'}).then(fuzzy => {
+                    if (currentRequest !== requestId) return;
+                    tbody.innerHTML = fuzzy.success && fuzzy.results.length
+                        ? renderMessage('Keine exakten Treffer. Ähnliche Benutzer:') + fuzzy.results.map(renderRow).join('')
+                        : renderMessage('Keine Benutzer gefunden');
+                });
+            }
+
+            const rows = data.results.map(renderRow).join('');
+            const more = data.next_cursor ? renderMore(data.next_cursor) : '';
+            if (cursor) {
+                const moreRow = tbody.querySelector('.user-search-more');
+                if (moreRow) moreRow.remove();
+                tbody.insertAdjacentHTML('beforeend', rows + more);
+            } else {
+                tbody.innerHTML = rows ? rows + more : renderMessage('Keine Benutzer gefunden');
+            }
+        }).catch(error => {
+            console.error('❌ Fehler bei der Benutzersuche:', error);
+        });
+    }
+
+    input.addEventListener('input', function () {
+        clearTimeout(debounceTimer);
+        const query = input.value.trim();
+        debounceTimer = setTimeout(() => {
+            if (query.length < MIN_QUERY_LENGTH) {
+                requestId++;
+                tbody.innerHTML = initialRows;
+                if (window.htmx) htmx.process(tbody);
+                return;
+            }
+            search(query);
+        }, 250);
+    });
+
+    tbody.addEventListener('click', function (event) {
+        const button = event.target.closest('.user-search-more button');
+        if (button) {
+            search(input.value.trim(), button.dataset.cursor);
+        }
+    });
+});
@@ -10,6 +10,9 @@ urlpatterns = [
     path('login-page/', views.login_page_view, name='login_page'), # Отдельная страница
     path('logout/', views.logout_view, name='logout'),
     path('list/', views.user_list_view, name='user_list'),    # Просмотр всех пользователей
+    path('list/page/', views.user_list_page, name='user_list_page'),  # Следующие страницы (HTMX)
+    path('search/', views.user_search, name='user_search'),   # Поиск (JSON)
+    path('import/', views.user_import, name='user_import'),   # Массовый импорт (NDJSON-прогресс)
     path('create-admin/step1/', views.create_admin_step1, name='create_admin_step1'),
     path('create-admin/step2/', views.create_admin_step2, name='create_admin_step2'),
     path('create-admin/step3/', views.create_admin_step3, name='create_admin_step3'),
@@ -0,0 +1,397 @@
+# users/user_import.py - Массовый импорт пользователей (CSV / NDJSON)
+#
+# UserManager.create_user рассчитан на одного пользователя: find_one на
+# дубликат, insert_one, две проверочные find_one и PBKDF2 в том же потоке.
+# Импорт тысяч строк делает иначе:
+#
+#   - вход читается потоком, пачками по batch_size строк (файл целиком в
+#     памяти не нужен);
+#   - каждая строка проверяется UserImportForm (правила users/forms.py),
+#     справочники Anrede/Titel загружаются один раз на импорт;
+#   - пароли хешируются в пуле процессов (make_password - CPU, GIL);
+#   - пачка вставляется одним insert_many(ordered=False): дубликаты
+#     отсекают уникальные индексы (idx_username_unique, idx_email_unique),
+#     остальные строки пачки вставляются; BulkWriteError.writeErrors
+#     сопоставляются со строками входа;
+#   - после каждой пачки run() отдает ImportReport - прогресс для
+#     management-команды и потокового ответа admin-эндпоинта.
+#
+#     python manage.py import_users users.csv --workers 4
+#     curl -F file=@users.ndjson .../users/import/   (администратор)
+#
+# CSV: первая строка - заголовок с именами полей (FIELDS), разделитель
+# ',' или ';'. NDJSON: один JSON-объект на строку.
+
+import codecs
+import csv
+import datetime
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from loguru import logger
+from pymongo.errors import BulkWriteError
+
+from mongodb import audit, cache_bus
+from mongodb.mongodb_config import MongoConfig
+from mongodb.mongodb_utils import MongoConnection
+from mongodb.query_registry import collection_name, ensure_indexes
+from users import user_search
+from users.forms import UserImportForm, get_salutations_from_mongodb, get_titles_from_mongodb
+
+IMPORT_BATCH_SIZE = 500
+
+# Сколько ошибок строк хранит отчет (счетчики считают все)
+MAX_REPORTED_ERRORS = 1000
+
+FIELDS = (
+    'username', 'password', 'salutation', 'title', 'first_name', 'last_name',
+    'email', 'phone', 'is_admin', 'is_active',
+)
+BOOLEAN_FIELDS = ('is_admin', 'is_active')
+TRUE_VALUES = {'1', 'true', 'yes', 'ja', 'y', 'x'}
+
+FORMATS = ('csv', 'ndjson')
+
+# Уникальный индекс (keyPattern из writeErrors) -> поле строки
+_DUPLICATE_FIELDS = {
+    'username': 'username',
+    'profile.email': 'email',
+}
+
+
+class UserImportError(Exception):
+    """Импорт невозможен (MongoDB недоступна, неизвестный формат)"""
+
+
+def default_workers():
+    from django.conf import settings
+    return int(getattr(settings, 'USER_IMPORT_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+# ==================== ЧТЕНИЕ ВХОДА ====================
+
+def detect_format(filename):
+    """Формат по расширению файла: .csv -> csv, .ndjson/.jsonl/.json -> ndjson"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.ndjson', '.jsonl', '.json'):
+        return 'ndjson'
+    raise UserImportError(f"Unbekanntes Dateiformat: {filename}")
+
+
+def text_lines(binary_stream, encoding='utf-8-sig'):
+    """Строки текста из бинарного потока (загрузка, файл) без чтения целиком"""
+    return codecs.getreader(encoding)(binary_stream)
+
+
+def read_rows(lines, fmt):
+    """
+    (номер строки, данные) для каждой записи входа. Данные - dict или
+    строка с описанием ошибки разбора.
+    """
+    if fmt == 'csv':
+        return _read_csv(lines)
+    if fmt == 'ndjson':
+        return _read_ndjson(lines)
+    raise UserImportError(f"Unbekanntes Format: {fmt}")
+
+
+def _read_csv(lines):
+    lines = iter(lines)
+    header = next(lines, None)
+    if header is None:
+        return
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    reader = csv.DictReader(itertools.chain([header], lines), delimiter=delimiter)
+    # Строка 1 - заголовок
+    for row_number, row in enumerate(reader, start=2):
+        if None in row:
+            yield row_number, "Zu viele Spalten"
+            continue
+        yield row_number, {key.strip(): (value or '').strip() for key, value in row.items() if key}
+
+
+def _read_ndjson(lines):
+    for row_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row_number, f"Ungültiges JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield row_number, "JSON-Objekt erwartet"
+            continue
+        yield row_number, data
+
+
+# ==================== ПРОВЕРКА СТРОК ====================
+
+def _form_data(data):
+    """Данные строки для UserImportForm (булевы поля - явно, CheckboxInput считает '0' истиной)"""
+    form_data = {field: data.get(field) for field in FIELDS if data.get(field) is not None}
+    for field in BOOLEAN_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str):
+            value = value.strip().lower() in TRUE_VALUES if value.strip() else None
+        form_data[field] = bool(value) if value is not None else field == 'is_active'
+    return form_data
+
+
+def validate_row(data, salutation_choices, title_choices):
+    """(cleaned_data, None) или (None, {поле: [ошибки]})"""
+    form = UserImportForm(_form_data(data), salutation_choices=salutation_choices, title_choices=title_choices)
+    if form.is_valid():
+        return form.cleaned_data, None
+    return None, {field: [str(error) for error in errors] for field, errors in form.errors.items()}
+
+
+def build_document(cleaned, password_hash, now):
+    """Документ пользователя - те же поля, что у create_user / create_admin_step3"""
+    profile = {
+        'salutation': cleaned['salutation'],
+        'title': cleaned.get('title') or '',
+        'first_name': cleaned['first_name'],
+        'last_name': cleaned['last_name'],
+        'email': cleaned['email'],
+        'phone': cleaned['phone'],
+    }
+    document = {
+        'username': cleaned['username'],
+        'password': password_hash,
+        'profile': profile,
+        'contacts': {
+            'system_email': profile['email'],
+            'system_phone': profile['phone'],
+            'additional_contacts': [],
+        },
+        'is_admin': cleaned['is_admin'],
+        'is_active': cleaned['is_active'],
+        'is_super_admin': False,
+        'created_at': now,
+        'modified_at': now,
+        'deleted': False,
+        'last_login': None,
+        'failed_login_attempts': 0,
+        'locked_until': None,
+        'password_changed_at': now,
+    }
+    document['search'] = user_search.build_search_fields(document)
+    return document
+
+
+# ==================== ХЕШИРОВАНИЕ ====================
+
+def _init_hash_worker():
+    """Процесс пула (spawn): Django нужен для PASSWORD_HASHERS"""
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WWS1.settings')
+    django.setup()
+
+
+def _hash_password(password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(password)
+
+
+def _create_pool(workers):
+    """
+    Пул хеширования. spawn, а не fork: процесс уже держит MongoClient
+    и потоки (cache_bus, метрики), которые fork() не переносит корректно
+    """
+    if workers <= 0:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_hash_worker,
+    )
+
+
+# ==================== ОТЧЕТ ====================
+
+class ImportReport:
+    """Счетчики импорта и ошибки строк (первые MAX_REPORTED_ERRORS)"""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.valid = 0
+        self.created = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.errors = []
+        self.started_at = datetime.datetime.now()
+        self.finished_at = None
+
+    def add_error(self, row_number, kind, username=None, errors=None):
+        if kind == 'duplicate':
+            self.duplicates += 1
+        else:
+            self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'kind': kind, 'username': username, 'errors': errors})
+
+    @property
+    def elapsed(self):
+        return ((self.finished_at or datetime.datetime.now()) - self.started_at).total_seconds()
+
+    def to_dict(self, include_errors=False):
+        data = {
+            'rows': self.rows,
+            'valid': self.valid,
+            'created': self.created,
+            'invalid': self.invalid,
+            'duplicates': self.duplicates,
+            'dry_run': self.dry_run,
+            'elapsed_seconds': round(self.elapsed, 2),
+            'finished': self.finished_at is not None,
+        }
+        if include_errors:
+            data['errors'] = self.errors
+        return data
+
+
+# ==================== ИМПОРТ ====================
+
+def get_users_collection():
+    """Коллекция пользователей с уникальными индексами (без них дубликаты не отсекаются)"""
+    db = MongoConnection.get_database()
+    if db is None:
+        raise UserImportError("Datenbank nicht verfügbar")
+
+    db_name = MongoConfig.read_config().get('db_name')
+    if not db_name:
+        raise UserImportError("Datenbank nicht konfiguriert")
+
+    ensure_indexes(db, db_name, 'users')
+    return db[collection_name(db_name, 'users')]
+
+
+class UserImporter:
+    """
+    Импорт строк read_rows(). run() - генератор: после каждой пачки отдает
+    ImportReport (тот же объект), последним - итоговый (finished_at задан).
+    """
+
+    def __init__(self, collection=None, workers=None, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+        self.collection = collection
+        self.workers = default_workers() if workers is None else workers
+        self.batch_size = max(1, batch_size)
+        self.dry_run = dry_run
+        self.report = ImportReport(dry_run=dry_run)
+        self._seen_usernames = set()
+        self._seen_emails = set()
+        self._salutation_choices = get_salutations_from_mongodb()
+        self._title_choices = get_titles_from_mongodb()
+
+    def run(self, rows):
+        if self.collection is None and not self.dry_run:
+            self.collection = get_users_collection()
+
+        pool = None if self.dry_run else _create_pool(self.workers)
+        completed = False
+        try:
+            rows = iter(rows)
+            while True:
+                batch = list(itertools.islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self._import_batch(batch, pool)
+                yield self.report
+            completed = True
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            # Также при обрыве потока (GeneratorExit) и ошибке: уже вставленные
+            # пользователи должны попасть в кэш и журнал
+            self.report.finished_at = datetime.datetime.now()
+            self._finish(completed)
+
+        yield self.report
+
+    def _validate(self, batch):
+        """[(номер строки, cleaned)] - строки, прошедшие проверку и без дубликатов внутри импорта"""
+        valid = []
+        for row_number, data in batch:
+            self.report.rows += 1
+            if isinstance(data, str):
+                self.report.add_error(row_number, 'invalid', errors={'__all__': [data]})
+                continue
+
+            cleaned, errors = validate_row(data, self._salutation_choices, self._title_choices)
+            if errors:
+                self.report.add_error(row_number, 'invalid', data.get('username'), errors)
+                continue
+
+            username, email = cleaned['username'], cleaned['email']
+            duplicate = [field for field, value, seen in (('username', username, self._seen_usernames),
+                                                          ('email', email, self._seen_emails))
+                         if value in seen]
+            if duplicate:
+                self.report.add_error(row_number, 'duplicate', username,
+                                      {field: ["Bereits in dieser Datei vorhanden"] for field in duplicate})
+                continue
+
+            self._seen_usernames.add(username)
+            self._seen_emails.add(email)
+            valid.append((row_number, cleaned))
+        self.report.valid += len(valid)
+        return valid
+
+    def _import_batch(self, batch, pool):
+        valid = self._validate(batch)
+        if not valid or self.dry_run:
+            return
+
+        passwords = [cleaned['password'] for _, cleaned in valid]
+        if pool is not None:
+            chunksize = max(1, len(passwords) // (self.workers * 4))
+            hashes = list(pool.map(_hash_password, passwords, chunksize=chunksize))
+        else:
+            hashes = [_hash_password(password) for password in passwords]
+
+        now = datetime.datetime.now()
+        documents = [build_document(cleaned, password_hash, now)
+                     for (_, cleaned), password_hash in zip(valid, hashes)]
+
+        try:
+            result = self.collection.insert_many(documents, ordered=False)
+            self.report.created += len(result.inserted_ids)
+        except BulkWriteError as e:
+            details = e.details
+            self.report.created += details.get('nInserted', 0)
+            for error in details.get('writeErrors', []):
+                row_number, cleaned = valid[error['index']]
+                if error.get('code') == 11000:
+                    fields = [_DUPLICATE_FIELDS.get(key, key) for key in error.get('keyPattern', {})] or ['username']
+                    self.report.add_error(row_number, 'duplicate', cleaned['username'],
+                                          {field: ["Existiert bereits"] for field in fields})
+                else:
+                    self.report.add_error(row_number, 'invalid', cleaned['username'],
+                                          {'__all__': [error.get('errmsg', 'Schreibfehler')]})
+
+    def _finish(self, completed=True):
+        report = self.report
+        message = (f"строк={report.rows}, создано={report.created}, ошибок={report.invalid}, "
+                   f"дубликатов={report.duplicates}, {report.elapsed:.1f} с")
+        if completed:
+            logger.info(f"📥 Импорт пользователей: {message}")
+        else:
+            logger.warning(f"⚠️ Импорт пользователей прерван: {message}")
+
+        if report.created and not self.dry_run:
+            try:
+                cache_bus.bump(cache_bus.USERS)
+                audit.record(audit.USERS_IMPORTED,
+                             details={**report.to_dict(), 'completed': completed})
+            except Exception as e:
+                # Вызывается из finally: не подменяем исходную ошибку импорта
+                logger.error(f"❌ Итог импорта не записан: {e}")
@@ -0,0 +1,188 @@
+# users/user_search.py - Поиск пользователей по индексированным ключам
+#
+# При записи пользователя (UserManager.create_user / update_user) в документ
+# кладется поле search:
+#
+#     'search': {
+#         'keys': ['mmueller', 'max', 'muller', 'mueller', 'max muller', ...],
+#         'trigrams': ['  m', ' mu', 'mul', ...],
+#     }
+#
+# keys - нормализованные (casefold, без диакритики; ä -> a и ä -> ae)
+# username, имя, фамилия, "имя фамилия", "фамилия имя", email и его
+# локальная часть. Поиск по префиксу - диапазон [q, q + '\uffff') по
+# мультиключевому индексу idx_search_keys, без $regex по коллекции.
+# Такой диапазон не отдает документы в порядке (username, _id), поэтому
+# запрос читает не больше SEARCH_MAX_MATCHES совпадений и сортирует их
+# сам; если совпадений больше - результат помечается truncated и запрос
+# нужно уточнить. Префикс короче MIN_QUERY_LENGTH не ищется вовсе.
+#
+# trigrams - триграммы слов (как в pg_trgm: слово дополняется двумя
+# пробелами слева и одним справа). Нечеткий поиск выбирает кандидатов
+# с хотя бы одной общей триграммой ($in по idx_search_trigrams) и
+# ранжирует их по доле совпавших триграмм запроса.
+#
+# Запросы выполняет UserManager.search_users; здесь только ключи и оценка.
+# Для существующих пользователей: python manage.py rebuild_user_search
+
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+SEARCH_PAGE_SIZE = 20
+MIN_QUERY_LENGTH = 2
+
+# Поиск по префиксу: сколько совпадений читать (limit формы users.search_prefix
+# в mongodb/query_registry.py - SEARCH_MAX_MATCHES + 1)
+SEARCH_MAX_MATCHES = 200
+MIN_FUZZY_QUERY_LENGTH = 3
+
+# Нечеткий поиск: сколько кандидатов читать и минимальная доля общих триграмм
+FUZZY_CANDIDATE_LIMIT = 500
+FUZZY_MIN_SIMILARITY = 0.3
+
+SEARCH_RESULT_FIELDS = {
+    'username': 1,
+    'profile.first_name': 1,
+    'profile.last_name': 1,
+    'profile.email': 1,
+    'is_admin': 1,
+    'is_active': 1,
+}
+
+# Поле search нужно только поиску: чтения полного документа пользователя
+# (вход, контекст авторизации, профиль) его исключают
+WITHOUT_SEARCH_FIELDS = {'search': 0}
+
+_TRANSLITERATION = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue'})
+_WORD_SPLIT_RE = re.compile(r'[^\w]+')
+_SPACES_RE = re.compile(r'\s+')
+
+
+# ==================== НОРМАЛИЗАЦИЯ ====================
+
+def _strip_accents(text):
+    return ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+
+def normalize(text: Optional[str]) -> str:
+    """Ключ поиска: casefold (ß -> ss), без диакритики, одинарные пробелы"""
+    if not text:
+        return ''
+    return _SPACES_RE.sub(' ', _strip_accents(str(text).casefold())).strip()
+
+
+def _variants(text):
+    """normalize() и, если отличается, вариант с ä -> ae, ö -> oe, ü -> ue"""
+    if not text:
+        return []
+    folded = str(text).casefold()
+    variants = [normalize(folded)]
+    transliterated = normalize(folded.translate(_TRANSLITERATION))
+    if transliterated not in variants:
+        variants.append(transliterated)
+    return [variant for variant in variants if variant]
+
+
+def trigrams(text: str) -> List[str]:
+    """Триграммы слов нормализованного текста (без повторов)"""
+    grams = []
+    for word in _WORD_SPLIT_RE.split(normalize(text)):
+        if not word:
+            continue
+        padded = f"  {word} "
+        for index in range(len(padded) - 2):
+            gram = padded[index:index + 3]
+            if gram not in grams:
+                grams.append(gram)
+    return grams
+
+
+def build_search_fields(user: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Поле search для документа пользователя"""
+    profile = user.get('profile') or {}
+    username = user.get('username') or ''
+    first_name = profile.get('first_name') or ''
+    last_name = profile.get('last_name') or ''
+    email = profile.get('email') or ''
+    email_local = email.split('@', 1)[0]
+
+    sources = [
+        username,
+        first_name,
+        last_name,
+        f"{first_name} {last_name}",
+        f"{last_name} {first_name}",
+        email,
+        email_local,
+    ]
+
+    keys = []
+    for source in sources:
+        for variant in _variants(source):
+            if variant not in keys:
+                keys.append(variant)
+
+    grams = []
+    for source in (username, first_name, last_name, email_local):
+        for variant in _variants(source):
+            for gram in trigrams(variant):
+                if gram not in grams:
+                    grams.append(gram)
+
+    return {'keys': keys, 'trigrams': grams}
+
+
+# ==================== ЗАПРОСЫ ====================
+
+def prefix_filter(query: str) -> Dict[str, Any]:
+    """Диапазон по idx_search_keys для нормализованного префикса"""
+    prefix = normalize(query)
+    return {'search.keys': {'$gte': prefix, '$lt': prefix + '\uffff'}}
+
+
+def fuzzy_filter(query: str) -> Optional[Dict[str, Any]]:
+    """Кандидаты нечеткого поиска ($in по idx_search_trigrams); None - запрос слишком короткий"""
+    query_grams = trigrams(query)
+    if len(normalize(query)) < MIN_FUZZY_QUERY_LENGTH or not query_grams:
+        return None
+    # Граничные триграммы ('  m', ' mu') есть у слишком многих пользователей -
+    # кандидатов выбирают по внутренним, оценка учитывает все
+    inner_grams = [gram for gram in query_grams if ' ' not in gram]
+    return {'search.trigrams': {'$in': inner_grams or query_grams}}
+
+
+def similarity(query_grams: Iterable[str], user_grams: Iterable[str]) -> float:
+    """Доля триграмм запроса, найденных у пользователя"""
+    query_grams = set(query_grams)
+    if not query_grams:
+        return 0.0
+    return len(query_grams & set(user_grams)) / len(query_grams)
+
+
+def rank_fuzzy(query: str, candidates: Iterable[Dict[str, Any]], limit: int = SEARCH_PAGE_SIZE):
+    """[(оценка, пользователь)] с оценкой не ниже FUZZY_MIN_SIMILARITY, лучшие первыми"""
+    query_grams = trigrams(query)
+    scored = []
+    for user in candidates:
+        score = similarity(query_grams, (user.get('search') or {}).get('trigrams', ()))
+        if score >= FUZZY_MIN_SIMILARITY:
+            scored.append((score, user))
+    scored.sort(key=lambda item: (-item[0], item[1].get('username', '')))
+    return scored[:limit]
+
+
+def search_result(user: Dict[str, Any], score: Optional[float] = None) -> Dict[str, Any]:
+    """Строка ответа JSON-поиска (без служебных полей)"""
+    profile = user.get('profile') or {}
+    result = {
+        'username': user.get('username', ''),
+        'first_name': profile.get('first_name', ''),
+        'last_name': profile.get('last_name', ''),
+        'email': profile.get('email', ''),
+        'is_admin': bool(user.get('is_admin')),
+        'is_active': bool(user.get('is_active')),
+    }
+    if score is not None:
+        result['score'] = round(score, 3)
+    return result
@@ -1,14 +1,87 @@
 # users/user_utils.py - ИСПРАВЛЕНО: убрано дублирование authenticate_user
 
+import base64
+import binascii
 import datetime
+import json
 from typing import Optional, Dict, Any, List
+from bson import ObjectId
+from bson.errors import InvalidId
 from loguru import logger
 from django.contrib.auth.hashers import make_password, check_password
 from mongodb.mongodb_config import MongoConfig
+from mongodb import audit, cache_bus
 from mongodb.mongodb_utils import MongoConnection
+from mongodb.query_registry import ensure_indexes
+from monitoring.instruments import timed_password_check, track_operation
+from users import login_telemetry, user_search
 from pymongo.errors import DuplicateKeyError, ConnectionFailure, OperationFailure
 
 
+# Список пользователей: постранично по (username, _id), только нужные поля
+USER_LIST_FIELDS = (
+    'username',
+    'profile.first_name',
+    'profile.last_name',
+    'profile.email',
+    'is_admin',
+    'is_active',
+    'deleted',
+    'locked_until',
+    'last_login',
+    'created_at',
+)
+USER_LIST_SORT = [('username', 1), ('_id', 1)]
+USER_LIST_PAGE_SIZE = 50
+USER_LIST_MAX_PAGE_SIZE = 200
+
+
+def encode_user_cursor(user: Dict[str, Any]) -> str:
+    """Курсор страницы: (username, _id) последнего пользователя"""
+    raw = json.dumps([user['username'], str(user['_id'])], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_user_cursor(cursor: str):
+    """(username, ObjectId) из курсора; ValueError для поврежденного курсора"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        username, object_id = json.loads(raw.decode('utf-8'))
+        return str(username), ObjectId(object_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError, InvalidId) as e:
+        raise ValueError(f"Ungültiger Cursor: {cursor!r}") from e
+
+
+def build_user_list_filter(active: Optional[bool] = None,
+                           admin: Optional[bool] = None,
+                           locked: Optional[bool] = None,
+                           deleted: Optional[bool] = False,
+                           after: Optional[str] = None,
+                           now: Optional[datetime.datetime] = None) -> Dict[str, Any]:
+    """
+    Фильтр списка пользователей. None - без условия по признаку; after -
+    курсор последней строки предыдущей страницы (keyset: следующие по
+    (username, _id), без skip).
+    """
+    query = {}
+    if deleted is not None:
+        query['deleted'] = True if deleted else {'$ne': True}
+    if active is not None:
+        query['is_active'] = True if active else {'$ne': True}
+    if admin is not None:
+        query['is_admin'] = True if admin else {'$ne': True}
+    if locked is not None:
+        now = now or datetime.datetime.now()
+        query['locked_until'] = {'$gt': now} if locked else {'$not': {'$gt': now}}
+    if after:
+        username, object_id = decode_user_cursor(after)
+        query['$or'] = [
+            {'username': {'$gt': username}},
+            {'username': username, '_id': {'$gt': object_id}},
+        ]
+    return query
+
+
 class UserManager:
     """Менеджер для работы с пользователями в MongoDB"""
 
@@ -55,13 +128,9 @@ class UserManager:
                 collection = self.db.create_collection(self.users_collection_name)
                 logger.info(f"✅ Коллекция '{self.users_collection_name}' создана")
 
-                # Создаем индексы
+                # Создаем индексы (описаны в mongodb/query_registry.py)
                 try:
-                    collection.create_index("username", unique=True, name="idx_username_unique")
-                    collection.create_index("profile.email", unique=True, sparse=True, name="idx_email_unique")
-                    collection.create_index([("is_active", 1), ("deleted", 1)], name="idx_active_not_deleted")
-                    collection.create_index([("is_admin", 1), ("deleted", 1)], name="idx_admin_not_deleted")
-                    collection.create_index("created_at", name="idx_created_at")
+                    ensure_indexes(self.db, self.db.name, 'users')
                     logger.success("✅ Индексы созданы")
                 except Exception as e:
                     logger.warning(f"⚠️  Ошибка создания индексов: {e}")
@@ -91,6 +160,7 @@ class UserManager:
             logger.error(f"❌ Неожиданная ошибка получения коллекции '{self.users_collection_name}': {e}")
             return None
 
+    @track_operation('users')
     def create_user(self, user_data: Dict[str, Any]) -> bool:
         """Создает нового пользователя с расширенной диагностикой"""
         try:
@@ -114,7 +184,7 @@ class UserManager:
             existing_user = collection.find_one({
                 'username': username,
                 'deleted': {'$ne': True}
-            })
+            }, {'_id': 1})
 
             if existing_user:
                 logger.error(f"❌ Пользователь '{username}' уже существует")
@@ -143,6 +213,7 @@ class UserManager:
                 insert_data['locked_until'] = None
             if 'password_changed_at' not in insert_data:
                 insert_data['password_changed_at'] = now
+            insert_data['search'] = user_search.build_search_fields(insert_data)
 
             logger.info(f"💾 Выполняем вставку в коллекцию: {collection.name}")
 
@@ -152,9 +223,13 @@ class UserManager:
             logger.info(f"📋 Результат вставки - inserted_id: {result.inserted_id}")
 
             if result.inserted_id:
+                cache_bus.bump(cache_bus.USERS)
+                audit.record(audit.USER_CREATED, target=username,
+                             details={'is_admin': bool(insert_data.get('is_admin'))})
+
                 # КРИТИЧЕСКАЯ ПРОВЕРКА №1: поиск по ID
                 logger.info(f"🔍 Проверяем сохранение по _id: {result.inserted_id}")
-                verification_by_id = collection.find_one({'_id': result.inserted_id})
+                verification_by_id = collection.find_one({'_id': result.inserted_id}, {'username': 1})
 
                 if verification_by_id:
                     logger.success(f"✅ НАЙДЕН по _id! Username: {verification_by_id.get('username')}")
@@ -164,7 +239,7 @@ class UserManager:
                     verification_by_name = collection.find_one({
                         'username': username,
                         'deleted': {'$ne': True}
-                    })
+                    }, {'_id': 1})
 
                     if verification_by_name:
                         logger.success(f"✅ НАЙДЕН по username! ID: {verification_by_name.get('_id')}")
@@ -203,6 +278,7 @@ class UserManager:
             logger.exception(f"💥 КРИТИЧЕСКАЯ ОШИБКА создания пользователя '{username}': {e}")
             return False
 
+    @track_operation('users')
     def find_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
         """Находит пользователя по имени с диагностикой"""
         try:
@@ -216,7 +292,7 @@ class UserManager:
             user = collection.find_one({
                 'username': username,
                 'deleted': {'$ne': True}
-            })
+            }, user_search.WITHOUT_SEARCH_FIELDS)
 
             if user:
                 logger.debug(f"✅ Пользователь '{username}' найден")
@@ -234,6 +310,7 @@ class UserManager:
             logger.error(f"❌ Ошибка поиска пользователя '{username}': {e}")
             return None
 
+    @track_operation('users')
     def find_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Находит пользователя по email в profile.email"""
         try:
@@ -244,13 +321,14 @@ class UserManager:
             user = collection.find_one({
                 'profile.email': email,  # ИСПРАВЛЕНО: поиск в profile.email
                 'deleted': {'$ne': True}
-            })
+            }, user_search.WITHOUT_SEARCH_FIELDS)
             return user
 
         except Exception as e:
             logger.error(f"Ошибка поиска пользователя по email '{email}': {e}")
             return None
 
+    @track_operation('users')
     def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
         """Аутентифицирует пользователя - ЕДИНСТВЕННАЯ ВЕРСИЯ"""
         try:
@@ -258,16 +336,19 @@ class UserManager:
 
             user = self.find_user_by_username(username)
             if not user:
+                audit.record(audit.LOGIN_FAILURE, target=username, actor=username, details={'reason': 'unknown_user'})
                 logger.warning(f"❌ Пользователь '{username}' не найден")
                 return None
 
             if not user.get('is_active', False):
+                audit.record(audit.LOGIN_FAILURE, target=username, actor=username, details={'reason': 'inactive'})
                 logger.warning(f"❌ Пользователь '{username}' заблокирован")
                 return None
 
             # Проверяем блокировку
             locked_until = user.get('locked_until')
             if locked_until and locked_until > datetime.datetime.now():
+                audit.record(audit.LOGIN_FAILURE, target=username, actor=username, details={'reason': 'locked'})
                 logger.warning(f"❌ Пользователь '{username}' временно заблокирован до {locked_until}")
                 return None
 
@@ -277,12 +358,14 @@ class UserManager:
                 logger.error(f"❌ У пользователя '{username}' отсутствует пароль")
                 return None
 
-            if check_password(password, stored_password):
-                self._update_login_success(username)
+            if timed_password_check(check_password, password, stored_password):
+                self._update_login_success(user)
+                audit.record(audit.LOGIN_SUCCESS, target=username, actor=username)
                 logger.success(f"✅ Пользователь '{username}' успешно авторизован")
                 return user
             else:
                 self._update_login_failure(username)
+                audit.record(audit.LOGIN_FAILURE, target=username, actor=username, details={'reason': 'password'})
                 logger.warning(f"❌ Неверный пароль для пользователя '{username}'")
                 return None
 
@@ -290,6 +373,7 @@ class UserManager:
             logger.error(f"❌ Ошибка аутентификации пользователя '{username}': {e}")
             return None
 
+    @track_operation('users')
     def update_user(self, username: str, update_data: Dict[str, Any]) -> bool:
         """Обновляет данные пользователя"""
         try:
@@ -305,6 +389,12 @@ class UserManager:
             )
 
             if result.modified_count > 0:
+                # Ключи поиска зависят от username и profile
+                if any(key == 'username' or key.split('.')[0] == 'profile' for key in update_data):
+                    self.refresh_search_fields(update_data.get('username', username))
+                cache_bus.bump(cache_bus.USERS)
+                audit.record(audit.USER_UPDATED, target=username,
+                             details={'fields': sorted(key for key in update_data if key != 'modified_at')})
                 logger.success(f"✅ Данные пользователя '{username}' обновлены")
                 return True
             return False
@@ -313,6 +403,19 @@ class UserManager:
             logger.error(f"❌ Ошибка обновления пользователя '{username}': {e}")
             return False
 
+    def refresh_search_fields(self, username: str) -> bool:
+        """Пересчитывает ключи поиска пользователя (users/user_search.py)"""
+        collection = self.get_collection()
+        if collection is None:
+            return False
+
+        user = collection.find_one({'username': username}, {'username': 1, 'profile': 1})
+        if user is None:
+            return False
+        collection.update_one({'_id': user['_id']}, {'$set': {'search': user_search.build_search_fields(user)}})
+        return True
+
+    @track_operation('users')
     def delete_user(self, username: str, soft_delete: bool = True) -> bool:
         """Удаляет пользователя"""
         try:
@@ -339,6 +442,8 @@ class UserManager:
                 action = "удален"
 
             if success:
+                cache_bus.bump(cache_bus.USERS)
+                audit.record(audit.USER_DELETED, target=username, details={'soft': soft_delete})
                 logger.success(f"✅ Пользователь '{username}' {action}")
                 return True
             return False
@@ -347,38 +452,126 @@ class UserManager:
             logger.error(f"❌ Ошибка удаления пользователя '{username}': {e}")
             return False
 
-    def list_users(self, include_deleted: bool = False,
-                   admin_only: bool = False,
-                   active_only: bool = True) -> List[Dict[str, Any]]:
-        """Получает список пользователей с фильтрацией"""
+    @track_operation('users')
+    def list_users(self, filters: Optional[Dict[str, Optional[bool]]] = None,
+                   after: Optional[str] = None,
+                   limit: int = USER_LIST_PAGE_SIZE,
+                   fields=USER_LIST_FIELDS) -> Dict[str, Any]:
+        """
+        Страница списка пользователей, отсортированного по (username, _id).
+
+        filters - active/admin/locked/deleted (см. build_user_list_filter,
+        по умолчанию только неудаленные); after - next_cursor предыдущей
+        страницы. Возвращает {'users': [...], 'next_cursor': str | None}.
+        Поврежденный курсор - ValueError.
+        """
+        page = {'users': [], 'next_cursor': None}
+        query = build_user_list_filter(after=after, **(filters or {}))
+        limit = max(1, min(int(limit), USER_LIST_MAX_PAGE_SIZE))
+
         try:
             collection = self.get_collection()
             if collection is None:
-                return []
-
-            # Формируем фильтр
-            query = {}
-            if not include_deleted:
-                query['deleted'] = {'$ne': True}
-            if admin_only:
-                query['is_admin'] = True
-            if active_only:
-                query['is_active'] = True
+                return page
 
+            # На одну запись больше: есть ли следующая страница
             users = list(collection.find(
                 query,
-                {'password': 0}  # Исключаем пароль
-            ).sort('username', 1))
+                {field: 1 for field in fields}
+            ).sort(USER_LIST_SORT).limit(limit + 1))
 
-            logger.debug(f"📊 Найдено пользователей: {len(users)}")
-            return users
+            if len(users) > limit:
+                users = users[:limit]
+                page['next_cursor'] = encode_user_cursor(users[-1])
+            page['users'] = users
+
+            logger.debug(f"📊 Страница пользователей: {len(users)}, дальше: {page['next_cursor'] is not None}")
+            return page
 
         except Exception as e:
             logger.error(f"❌ Ошибка получения списка пользователей: {e}")
-            return []
+            return page
+
+    @track_operation('users')
+    def search_users(self, query: str, after: Optional[str] = None,
+                     limit: int = user_search.SEARCH_PAGE_SIZE,
+                     fuzzy: bool = False,
+                     include_deleted: bool = False) -> Dict[str, Any]:
+        """
+        Поиск по username, имени, фамилии и email (users/user_search.py).
+
+        По префиксу - диапазон по idx_search_keys, постранично по
+        (username, _id) как list_users; больше SEARCH_MAX_MATCHES
+        совпадений - пустой результат с truncated=True. fuzzy=True - по
+        триграммам, лучшие limit совпадений с оценкой, без следующих страниц.
+        Возвращает {'results': [...], 'next_cursor': str | None,
+        'truncated': bool}; поврежденный курсор - ValueError.
+        """
+        page = {'results': [], 'next_cursor': None, 'truncated': False}
+        limit = max(1, min(int(limit), USER_LIST_MAX_PAGE_SIZE))
+        base_filter = build_user_list_filter(
+            deleted=None if include_deleted else False,
+            after=None if fuzzy else after,
+        )
+
+        if len(user_search.normalize(query)) < user_search.MIN_QUERY_LENGTH:
+            return page
+
+        try:
+            collection = self.get_collection()
+            if collection is None:
+                return page
+
+            if fuzzy:
+                candidates_filter = user_search.fuzzy_filter(query)
+                if candidates_filter is None:
+                    return page
+                candidates = collection.find(
+                    {**base_filter, **candidates_filter},
+                    dict(user_search.SEARCH_RESULT_FIELDS, **{'search.trigrams': 1})
+                ).limit(user_search.FUZZY_CANDIDATE_LIMIT)
+                page['results'] = [
+                    user_search.search_result(user, score)
+                    for score, user in user_search.rank_fuzzy(query, candidates, limit)
+                ]
+                return page
+
+            # Мультиключевой диапазон не дает порядок (username, _id): читаем
+            # не больше SEARCH_MAX_MATCHES + 1 совпадений и сортируем их здесь
+            matches = list(collection.find(
+                {**base_filter, **user_search.prefix_filter(query)},
+                user_search.SEARCH_RESULT_FIELDS
+            ).limit(user_search.SEARCH_MAX_MATCHES + 1))
+
+            if len(matches) > user_search.SEARCH_MAX_MATCHES:
+                logger.debug(f"🔍 Поиск '{query}': больше {user_search.SEARCH_MAX_MATCHES} совпадений")
+                page['truncated'] = True
+                return page
+
+            users = sorted(matches, key=lambda user: (user['username'], user['_id']))[:limit + 1]
+            if len(users) > limit:
+                users = users[:limit]
+                page['next_cursor'] = encode_user_cursor(users[-1])
+            page['results'] = [user_search.search_result(user) for user in users]
+            return page
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка поиска пользователей '{query}': {e}")
+            return page
+
+    def _update_login_success(self, user: Dict[str, Any]):
+        """
+        Данные успешного входа. Сброс блокировки (failed_login_attempts,
+        locked_until) - синхронно и только если было что сбрасывать;
+        last_login - через буфер users/login_telemetry.py. Ожидающие в
+        буфере поля блокировки этого пользователя отменяются в любом случае.
+        """
+        username = user.get('username')
+        login_telemetry.discard_lockout(username)
+        if not user.get('failed_login_attempts') and not user.get('locked_until'):
+            login_telemetry.record_login(username)
+            return
 
-    def _update_login_success(self, username: str):
-        """Обновляет данные успешного входа"""
         try:
             collection = self.get_collection()
             if collection is not None:
@@ -392,7 +585,7 @@ class UserManager:
                         }
                     }
                 )
-                logger.debug(f"✅ Обновлены данные успешного входа для '{username}'")
+                logger.debug(f"✅ Сброшена блокировка после успешного входа '{username}'")
         except Exception as e:
             logger.error(f"❌ Ошибка обновления данных входа для '{username}': {e}")
 
@@ -407,20 +600,27 @@ class UserManager:
                 )
 
                 if result.modified_count > 0:
-                    user = collection.find_one({'username': username})
+                    user = collection.find_one({'username': username}, {'failed_login_attempts': 1})
                     if user and user.get('failed_login_attempts', 0) >= 5:
                         locked_until = datetime.datetime.now() + datetime.timedelta(minutes=15)
                         collection.update_one(
                             {'username': username},
                             {'$set': {'locked_until': locked_until}}
                         )
+                        audit.record(audit.USER_LOCKED, target=username,
+                                     details={'locked_until': locked_until})
                         logger.warning(f"⚠️  Пользователь '{username}' заблокирован до {locked_until}")
 
         except Exception as e:
             logger.error(f"❌ Ошибка обновления данных неудачного входа для '{username}': {e}")
 
+    @track_operation('users')
     def get_admin_count(self) -> int:
-        """Возвращает количество администраторов с диагностикой"""
+        """Возвращает количество администраторов (кешируется до записи пользователей)"""
+        cached = cache_bus.users_cache.get('admin_count')
+        if cached is not None:
+            return cached
+
         try:
             logger.debug("📊 Подсчет администраторов...")
 
@@ -446,12 +646,13 @@ class UserManager:
 
             logger.debug(f"📈 Статистика: всего={total_count}, админов_всего={admin_all_count}, активных={active_count}")
 
-            return count
+            return cache_bus.users_cache.set('admin_count', count)
 
         except Exception as e:
             logger.error(f"❌ Ошибка подсчета администраторов: {e}")
             return 0
 
+    @track_operation('users')
     def get_collection_stats(self) -> Dict[str, int]:
         """Возвращает статистику коллекции"""
         try:
@@ -474,6 +675,7 @@ class UserManager:
             logger.error(f"❌ Ошибка получения статистики: {e}")
             return {}
 
+    @track_operation('users')
     def reset_failed_attempts(self, username: str) -> bool:
         """Сбрасывает неудачные попытки входа"""
         try:
@@ -492,6 +694,8 @@ class UserManager:
             )
 
             if result.modified_count > 0:
+                cache_bus.bump(cache_bus.USERS)
+                audit.record(audit.USER_UNLOCKED, target=username)
                 logger.success(f"✅ Неудачные попытки для '{username}' сброшены")
                 return True
             return False
@@ -500,6 +704,7 @@ class UserManager:
             logger.error(f"❌ Ошибка сброса неудачных попыток для '{username}': {e}")
             return False
 
+    @track_operation('users')
     def change_password(self, username: str, new_password: str) -> bool:
         """Изменяет пароль пользователя"""
         try:
@@ -520,6 +725,8 @@ class UserManager:
             )
 
             if result.modified_count > 0:
+                cache_bus.bump(cache_bus.USERS)
+                audit.record(audit.PASSWORD_CHANGED, target=username)
                 logger.success(f"✅ Пароль для '{username}' изменен")
                 return True
             return False
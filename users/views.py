@@ -1,8 +1,8 @@
 # users/views.py - ПОЛНОЕ ИСПРАВЛЕНИЕ с функциями создания администратора
 
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.http import JsonResponse
 from django.urls import reverse
 from django.contrib.auth.hashers import make_password, check_password
 from django.views.decorators.http import require_http_methods
@@ -11,6 +11,7 @@ from loguru import logger
 import datetime
 import json
 
+from utils.json_response import MongoJsonResponse, dumps
 from user_auth import is_user_authenticated, should_show_login_modal
 from user_auth.session import clear_user_session
 from user_auth.decorators import admin_required
@@ -24,6 +25,14 @@ from .forms import (  # Остальные формы из users/forms.py
     get_communication_config_from_mongodb
 )
 
+from .user_import import (
+    FORMATS as IMPORT_FORMATS,
+    UserImporter,
+    UserImportError,
+    detect_format,
+    read_rows,
+    text_lines,
+)
 from .user_utils import UserManager
 from . import language
 from django_ratelimit.decorators import ratelimit
@@ -83,7 +92,7 @@ def login_view(request):
             if not username:
                 error_message = "Benutzername ist erforderlich"
                 if is_ajax or is_htmx:
-                    return JsonResponse({'success': False, 'message': error_message, 'messages': [{'tags': 'error', 'text': error_message, 'delay': 5000}]})
+                    return MongoJsonResponse({'success': False, 'message': error_message, 'messages': [{'tags': 'error', 'text': error_message, 'delay': 5000}]})
                 else:
                     messages.error(request, error_message)
                     form = LoginForm(request.POST)
@@ -92,7 +101,7 @@ def login_view(request):
             if not password:
                 error_message = "Passwort ist erforderlich"
                 if is_ajax or is_htmx:
-                    return JsonResponse({'success': False, 'message': error_message, 'messages': [{'tags': 'error', 'text': error_message, 'delay': 5000}]})
+                    return MongoJsonResponse({'success': False, 'message': error_message, 'messages': [{'tags': 'error', 'text': error_message, 'delay': 5000}]})
                 else:
                     messages.error(request, error_message)
                     form = LoginForm(request.POST)
@@ -133,7 +142,7 @@ def login_view(request):
                 success_message = f"Willkommen, {display_name}!"
 
                 if is_ajax or is_htmx:
-                    return JsonResponse({
+                    return MongoJsonResponse({
                         'success': True,
                         'message': success_message,
                         'messages': [{'tags': 'success', 'text': success_message, 'delay': 5000}],
@@ -148,7 +157,7 @@ def login_view(request):
                 logger.warning(f"❌ Неудачная попытка входа для '{username}'")
 
                 if is_ajax or is_htmx:
-                    return JsonResponse({'success': False, 'message': error_message, 'messages': [{'tags': 'error', 'text': error_message, 'delay': 5000}]})
+                    return MongoJsonResponse({'success': False, 'message': error_message, 'messages': [{'tags': 'error', 'text': error_message, 'delay': 5000}]})
                 else:
                     messages.error(request, error_message)
                     form = LoginForm(request.POST)
@@ -180,7 +189,7 @@ def login_view(request):
         is_htmx = request.headers.get('HX-Request') == 'true'
 
         if is_ajax or is_htmx:
-            return JsonResponse({'success': False, 'message': error_message, 'messages': [{'tags': 'error', 'text': error_message, 'delay': 5000}]})
+            return MongoJsonResponse({'success': False, 'message': error_message, 'messages': [{'tags': 'error', 'text': error_message, 'delay': 5000}]})
         else:
             messages.error(request, error_message)
             form = LoginForm()
@@ -244,7 +253,7 @@ def render_with_messages(request, template_name, context, success_redirect=None)
                 'delay': 5000
             })
 
-        response = JsonResponse({'messages': messages_list})
+        response = MongoJsonResponse({'messages': messages_list})
         response['Content-Type'] = 'application/json'
 
         if success_redirect:
@@ -477,6 +486,50 @@ def create_admin_step2(request):
     return render(request, 'create_admin_step2.html', context)
 
 
+USER_LIST_FILTERS = ('active', 'admin', 'locked', 'deleted')
+
+
+def _get_user_list_filters(request, is_admin):
+    """
+    Фильтры списка из GET: '1' - да, '0' - нет, нет параметра - не важно.
+    Удаленные пользователи скрыты, пока администратор не запросит deleted.
+    """
+    filters = {}
+    for name in USER_LIST_FILTERS:
+        value = request.GET.get(name, '')
+        if value in ('1', '0'):
+            filters[name] = value == '1'
+    if not is_admin or 'deleted' not in filters:
+        filters['deleted'] = False
+    return filters
+
+
+def _get_user_list_page(request, user_data):
+    """Страница списка и query string для следующей (None - страниц больше нет)"""
+    is_admin = user_data.get('is_admin', False)
+    filters = _get_user_list_filters(request, is_admin)
+    page = UserManager().list_users(filters=filters, after=request.GET.get('cursor') or None)
+
+    now = datetime.datetime.now()
+    for user in page['users']:
+        locked_until = user.get('locked_until')
+        user['is_locked'] = bool(locked_until and locked_until > now)
+
+    next_query = None
+    if page['next_cursor']:
+        query = request.GET.copy()
+        query['cursor'] = page['next_cursor']
+        next_query = query.urlencode()
+
+    return {
+        'users': page['users'],
+        'next_query': next_query,
+        'filters': filters,
+        'is_admin': is_admin,
+        'current_username': user_data.get('username'),
+    }
+
+
 @require_http_methods(["GET"])
 def user_list_view(request):
     """Просмотр всех пользователей (доступно всем авторизованным)"""
@@ -488,28 +541,98 @@ def user_list_view(request):
             messages.warning(request, "Bitte melden Sie sich an, um Benutzer anzusehen")
             return redirect('users:login_page')
 
-        # Получаем список пользователей
-        user_manager = UserManager()
-        users = user_manager.list_users(include_deleted=False, active_only=False)
-
-        # Проверяем, является ли текущий пользователь администратором
-        is_admin = user_data.get('is_admin', False)
-
-        context = {
-            'users': users,
-            'total_users': len(users),
-            'is_admin': is_admin,
-            'current_username': user_data.get('username')
-        }
-
-        return render(request, 'users/user_list.html', context)
+        # Первая страница; следующие подгружает user_list_page (HTMX, infinite scroll)
+        context = _get_user_list_page(request, user_data)
+        return render(request, 'user_list.html', context)
 
+    except ValueError:
+        messages.warning(request, "Ungültige Seite der Benutzerliste")
+        return redirect('users:user_list')
     except Exception as e:
         logger.error(f"Ошибка в user_list_view: {e}")
         messages.error(request, "Ein Fehler ist beim Laden der Benutzerliste aufgetreten")
         return redirect('home')
 
 
+@require_http_methods(["GET"])
+def user_list_page(request):
+    """Следующая страница списка пользователей: строки таблицы для HTMX"""
+    is_auth, user_data = is_user_authenticated(request)
+    if not is_auth:
+        return HttpResponse(status=401)
+
+    try:
+        context = _get_user_list_page(request, user_data)
+    except ValueError:
+        return HttpResponseBadRequest("Ungültiger Cursor")
+
+    return render(request, 'user_list_rows.html', context)
+
+
+@require_http_methods(["GET"])
+def user_search(request):
+    """
+    Поиск пользователей для списка (JSON): ?q=префикс&cursor=...;
+    fuzzy=1 - нечеткий поиск по триграммам (лучшие совпадения, без страниц)
+    """
+    is_auth, user_data = is_user_authenticated(request)
+    if not is_auth:
+        return MongoJsonResponse({'success': False, 'error': 'Nicht angemeldet'}, status=401)
+
+    query = request.GET.get('q', '').strip()
+    is_admin = user_data.get('is_admin', False)
+    try:
+        page = UserManager().search_users(
+            query,
+            after=request.GET.get('cursor') or None,
+            limit=int(request.GET.get('limit', 20)),
+            fuzzy=request.GET.get('fuzzy') == '1',
+            include_deleted=is_admin and request.GET.get('deleted') == '1',
+        )
+    except ValueError:
+        return MongoJsonResponse({'success': False, 'error': 'Ungültige Anfrage'}, status=400)
+
+    return MongoJsonResponse({'success': True, 'query': query, **page})
+
+
+@admin_required()
+@require_http_methods(["POST"])
+def user_import(request):
+    """
+    Массовый импорт (users/user_import.py): файл CSV/NDJSON в поле file,
+    format - необязательно, dry_run=1 - только проверка. Ответ - поток
+    NDJSON: строка прогресса после каждой пачки и итог с ошибками строк.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return MongoJsonResponse({'success': False, 'error': 'Datei fehlt'}, status=400)
+
+    try:
+        fmt = request.POST.get('format') or detect_format(upload.name)
+        if fmt not in IMPORT_FORMATS:
+            raise UserImportError(f"Unbekanntes Format: {fmt}")
+        importer = UserImporter(dry_run=request.POST.get('dry_run') == '1')
+        rows = read_rows(text_lines(upload.file), fmt)
+    except UserImportError as e:
+        return MongoJsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    logger.info(f"📥 Импорт пользователей из '{upload.name}' ({upload.size} байт)")
+
+    def stream():
+        try:
+            for report in importer.run(rows):
+                finished = report.finished_at is not None
+                yield dumps({
+                    'type': 'done' if finished else 'progress',
+                    'success': True,
+                    **report.to_dict(include_errors=finished),
+                }) + b'\n'
+        except UserImportError as e:
+            yield dumps({'type': 'error', 'success': False, 'error': str(e)}) + b'\n'
+
+    return StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+
+
 @admin_required()
 @ratelimit(key='ip', rate='5/m', method='POST')
 def create_admin_step3(request):
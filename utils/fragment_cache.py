@@ -0,0 +1,111 @@
+# utils/fragment_cache.py - Кеш фрагментов шаблонов ({% cached_fragment %})
+#
+# Повторяющиеся блоки страниц (название компании в navbar, разделы
+# страницы компании) кешируются в CACHES['template_fragments'].
+# В ключ фрагмента входит версия cache_bus его namespace:
+#
+#     {% load fragment_cache %}
+#     {% cached_fragment fragment_cache_timeout 'navbar_brand' %}...{% endcached_fragment %}
+#
+# Ключ тот же, что у {% cache timeout navbar_brand version %}. В отличие от
+# {% cache %}, фрагмент не сохраняется, если данные запроса пришли из
+# запасного пути (MongoDB недоступна, компания не прочитана): код данных
+# вызывает mark_degraded(). Иначе страница "без данных" жила бы до таймаута -
+# после восстановления MongoDB версия cache_bus не меняется. Отметка
+# действует до конца запроса: ленивые данные читаются один раз, а
+# используются в нескольких фрагментах.
+#
+# Запись компании в любом воркере меняет версию COMPANY, и следующий рендер
+# берет новый ключ. Кроме того, CompanyManager перед bump явно удаляет
+# фрагменты текущей версии (invalidate_company_fragments) - при общем кеше
+# (Redis/Memcached) старая версия не дожидается таймаута.
+#
+# Данные фрагментов передаются в шаблон лениво (SimpleLazyObject): при
+# попадании в кеш MongoDB не запрашивается вовсе.
+
+import contextvars
+
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.signals import request_started
+from django.core.cache.utils import make_template_fragment_key
+from loguru import logger
+
+from mongodb import cache_bus
+
+# Фрагмент -> namespaces cache_bus, от которых зависит его содержимое
+FRAGMENTS = {
+    'navbar_brand': (cache_bus.COMPANY, cache_bus.CONFIG),
+    'company_info_sections': (cache_bus.COMPANY, cache_bus.REFERENCE, cache_bus.CONFIG),
+    'company_info_data': (cache_bus.COMPANY, cache_bus.CONFIG),
+}
+
+# Данные текущего запроса взяты из запасного пути - фрагменты не сохранять
+_degraded = contextvars.ContextVar('fragment_degraded', default=False)
+
+
+def _reset_degraded(**kwargs):
+    _degraded.set(False)
+
+
+request_started.connect(_reset_degraded, dispatch_uid='fragment_cache_reset_degraded')
+
+
+def get_fragment_cache():
+    """Кеш фрагментов: 'template_fragments', если задан, иначе 'default'"""
+    try:
+        return caches['template_fragments']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def fragment_version(name):
+    """Версия фрагмента name: 'company:3|config:1' (часть ключа фрагмента)"""
+    return '|'.join(f"{namespace}:{cache_bus.get_version(namespace)}" for namespace in FRAGMENTS[name])
+
+
+def fragment_key(name):
+    return make_template_fragment_key(name, [fragment_version(name)])
+
+
+def mark_degraded():
+    """Вызывается кодом данных фрагмента при запасном результате (сбой, пустые данные)"""
+    _degraded.set(True)
+
+
+def render_fragment(name, render, timeout=None):
+    """
+    Фрагмент name из кеша или render(). Результат сохраняется, только если
+    в этом запросе не было mark_degraded() и circuit breaker MongoDB закрыт.
+    """
+    from mongodb.mongodb_utils import MongoConnection
+
+    cache = get_fragment_cache()
+    key = fragment_key(name)
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    value = render()
+    if _degraded.get() or not MongoConnection.is_available():
+        logger.debug(f"🧩 Фрагмент '{name}' из запасных данных - не кешируем")
+        return value
+
+    cache.set(key, value, timeout)
+    return value
+
+
+def invalidate_fragments(namespace):
+    """Удаляет фрагменты текущей версии, зависящие от namespace (вызывать до bump)"""
+    names = [name for name, namespaces in FRAGMENTS.items() if namespace in namespaces]
+    keys = [fragment_key(name) for name in names]
+    try:
+        get_fragment_cache().delete_many(keys)
+    except Exception as e:
+        # Кеш недоступен - фрагменты все равно устареют со сменой версии
+        logger.warning(f"⚠️ Не удалось удалить фрагменты {', '.join(names)}: {e}")
+        return
+    logger.debug(f"🧩 Фрагменты сброшены: {', '.join(names)}")
+
+
+def invalidate_company_fragments():
+    invalidate_fragments(cache_bus.COMPANY)
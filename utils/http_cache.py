@@ -0,0 +1,116 @@
+# utils/http_cache.py - Условные GET-запросы (ETag) и Cache-Control
+#
+# ETag строится не из тела ответа, а из версий cache_bus (mongodb/cache_bus.py):
+# любая запись компании, пользователей или справочников увеличивает версию
+# своего namespace. Поэтому валидатор считается без чтения документа, и
+# при совпадении If-None-Match представление не выполняется вовсе - ответ
+# 304 Not Modified.
+#
+# Версии в воркере обновляются не реже CACHE_BUS_POLL_INTERVAL: в течение
+# этого интервала после записи другой воркер еще может ответить 304 - так
+# же, как его in-process кеши еще отдают старые данные.
+#
+# Заголовки ETag и Cache-Control ставятся только на 200 и 304: ошибки и
+# редиректы не должны кешироваться браузером или прокси.
+
+import hashlib
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from mongodb import cache_bus
+
+CACHEABLE_STATUSES = (200, 304)
+
+
+def version_etag(namespaces, *extra):
+    """
+    Слабый ETag из версий namespaces cache_bus, HTTP_CACHE_BUILD_ID и
+    дополнительных частей extra (пользователь, параметры и т.п.)
+    """
+    parts = [getattr(settings, 'HTTP_CACHE_BUILD_ID', '')]
+    parts.extend(f"{namespace}:{cache_bus.get_version(namespace)}" for namespace in namespaces)
+    parts.extend(str(part) for part in extra)
+    digest = hashlib.blake2b('|'.join(parts).encode('utf-8'), digest_size=10).hexdigest()
+    # Слабый: тело может отличаться байтами (CSRF-токен, дата экспорта)
+    return f'W/"{digest}"'
+
+
+def conditional_view(etag_func, **cache_control):
+    """
+    Декоратор представления: etag_func(request, *args, **kwargs) -> ETag
+    или None (без условной обработки). GET/HEAD с совпавшим If-None-Match
+    получает 304 без вызова представления; успешные ответы получают ETag
+    и Cache-Control с параметрами cache_control (как у patch_cache_control).
+    """
+
+    def pre_process(request, args, kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None, None
+        etag = etag_func(request, *args, **kwargs)
+        if etag is None:
+            return None, None
+        etag = quote_etag(etag)
+        return get_conditional_response(request, etag=etag), etag
+
+    def post_process(response, etag):
+        if etag is not None and response.status_code in CACHEABLE_STATUSES:
+            response.headers.setdefault('ETag', etag)
+            if cache_control:
+                patch_cache_control(response, **cache_control)
+        return response
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            # etag_func синхронный: версии cache_bus в памяти, запрос к MongoDB
+            # (опрос) - не чаще раза в CACHE_BUS_POLL_INTERVAL
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                response, etag = pre_process(request, args, kwargs)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return post_process(response, etag)
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                response, etag = pre_process(request, args, kwargs)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return post_process(response, etag)
+
+        return wrapper
+
+    return decorator
+
+
+# ==================== ГОТОВЫЕ ETAG ====================
+
+def company_data_etag(request, *args, **kwargs):
+    """Данные компании (JSON): меняются только с записью компании или конфигурации"""
+    return version_etag((cache_bus.COMPANY, cache_bus.CONFIG))
+
+
+def company_stats_etag(request, *args, **kwargs):
+    """
+    Статистика компании: еще и activity - скользящее окно дневных счетчиков
+    журнала, которое сдвигается с началом нового дня без записи компании
+    """
+    from mongodb import audit
+
+    today, _ = audit.window(audit.DAY, 1)
+    return version_etag((cache_bus.COMPANY, cache_bus.CONFIG), audit.bucket_id(today, audit.DAY))
+
+
+def company_status_etag(request, *args, **kwargs):
+    """Статус компании: в ответе еще и состояние circuit breaker MongoDB"""
+    from mongodb.mongodb_utils import MongoConnection
+
+    return version_etag((cache_bus.COMPANY, cache_bus.CONFIG), MongoConnection.get_circuit_status()['state'])
+
+
+def reference_data_etag(request, *args, **kwargs):
+    """Справочники (PLZ): меняются только с пересборкой справочников"""
+    return version_etag((cache_bus.REFERENCE, cache_bus.CONFIG))
@@ -0,0 +1,127 @@
+# utils/import_profile.py - Профиль времени импорта (python -X importtime)
+#
+# Каждый сценарий выполняется в отдельном интерпретаторе с -X importtime,
+# поэтому результат не зависит от уже загруженных модулей. Бюджеты
+# сценариев хранятся в import_budget.json в корне проекта и проверяются
+# командой manage.py check_import_time.
+#
+# Время берется медианой нескольких прогонов: лучший прогон занижал
+# бюджет, и проверка на другой машине (или под нагрузкой) падала.
+# Запас DEFAULT_HEADROOM покрывает разницу между машинами разработчиков и CI.
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BUDGET_FILE = BASE_DIR / 'import_budget.json'
+
+DEFAULT_RUNS = 5
+DEFAULT_HEADROOM = 1.75
+
+SCENARIOS = {
+    # Только настройки (загрузка .env)
+    'settings': "import WWS1.settings",
+    # django.setup(): импорт всех INSTALLED_APPS - платит каждая команда
+    'django_setup': "import django; django.setup()",
+    # Старт воркера gunicorn (WSGI-приложение без URLconf)
+    'wsgi': "import WWS1.wsgi",
+    # manage.py на уровне модуля (logger, ic)
+    'manage_py': "import manage",
+    # Весь код приложения: URLconf импортирует все views
+    'urlconf': "import django; django.setup(); import WWS1.urls",
+}
+
+
+def _parse_importtime(stderr):
+    """[(модуль, self_us, cumulative_us, уровень вложенности)]"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0])
+            cumulative_us = int(parts[1])
+        except ValueError:
+            continue  # строка заголовка
+        name = parts[2].rstrip()
+        stripped = name.lstrip(' ')
+        level = (len(name) - len(stripped) - 1) // 2
+        modules.append((stripped, self_us, cumulative_us, level))
+    return modules
+
+
+def _run(code):
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'WWS1.settings')
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else code)
+    return _parse_importtime(result.stderr)
+
+
+_startup_modules = None
+
+
+def _interpreter_startup_modules():
+    """Модули, которые интерпретатор загружает до выполнения кода (site, encodings...)"""
+    global _startup_modules
+    if _startup_modules is None:
+        _startup_modules = {module[0] for module in _run('pass')}
+    return _startup_modules
+
+
+def profile_scenario(code, runs=DEFAULT_RUNS):
+    """
+    Выполняет код в чистом интерпретаторе runs раз и возвращает медианный прогон:
+    {'total_ms': ..., 'top': [(модуль, cumulative_ms), ...]}
+    В top - модули первых двух уровней вложенности, самые тяжелые первыми.
+    """
+    startup = _interpreter_startup_modules()
+
+    results = []
+    for _ in range(max(1, runs)):
+        modules = [module for module in _run(code) if module[0] not in startup]
+        total_us = sum(module[2] for module in modules if module[3] == 0)
+        results.append((total_us, modules))
+
+    results.sort(key=lambda result: result[0])
+    total_us, modules = results[len(results) // 2]
+    top = sorted((module for module in modules if module[3] <= 1), key=lambda module: module[2], reverse=True)
+    return {
+        'total_ms': round(total_us / 1000, 1),
+        'top': [(name, round(cumulative_us / 1000, 1)) for name, _self, cumulative_us, _level in top],
+    }
+
+
+def load_budget():
+    if not BUDGET_FILE.exists():
+        return {}
+    with open(BUDGET_FILE, encoding='utf-8') as f:
+        return json.load(f).get('scenarios', {})
+
+
+def save_budget(scenarios, headroom):
+    """Записывает бюджеты: измеренное время * headroom"""
+    data = {
+        'headroom': headroom,
+        'scenarios': {
+            name: {'budget_ms': round(measured_ms * headroom), 'measured_ms': measured_ms}
+            for name, measured_ms in scenarios.items()
+        },
+    }
+    with open(BUDGET_FILE, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
@@ -0,0 +1,76 @@
+# utils/json_response.py - JSON-ответы с поддержкой типов BSON
+#
+# Один сериализатор для всех JSON-эндпоинтов: ObjectId, datetime/date,
+# Decimal128 и Decimal кодируются напрямую, поэтому документы MongoDB
+# передаются в ответ как есть - без ручного перебора и копирования полей.
+#
+# Если установлен orjson, он кодирует сразу в bytes (в разы быстрее
+# стандартного json); без него используется стандартный json с тем же
+# результатом по содержанию:
+#   - ObjectId, Decimal128, Decimal, UUID - строкой;
+#   - datetime/date - ISO 8601 (как datetime.isoformat());
+#   - set/frozenset - списком;
+#   - кириллица и умлауты не экранируются (UTF-8).
+
+import datetime
+import decimal
+import json
+import uuid
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from django.http import HttpResponse
+from django.utils.functional import Promise
+
+try:
+    import orjson
+except ImportError:  # необязательная зависимость - стандартный json
+    orjson = None
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+def _default(obj):
+    """Типы, которые не умеет кодировать сам энкодер"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID, Promise)):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_stdlib(data, indent=False):
+    """Кодирование стандартным json (без orjson и для сравнения в бенчмарках)"""
+    if indent:
+        text = json.dumps(data, default=_default, ensure_ascii=False, indent=2)
+    else:
+        text = json.dumps(data, default=_default, ensure_ascii=False, separators=(',', ':'))
+    return text.encode('utf-8')
+
+
+def dumps(data, indent=False):
+    """JSON в bytes (UTF-8); indent=True - отступ в 2 пробела"""
+    if orjson is None:
+        return dumps_stdlib(data, indent)
+    options = _ORJSON_OPTIONS | orjson.OPT_INDENT_2 if indent else _ORJSON_OPTIONS
+    return orjson.dumps(data, default=_default, option=options)
+
+
+class MongoJsonResponse(HttpResponse):
+    """
+    Замена JsonResponse: данные кодируются dumps(). Как и у JsonResponse,
+    по умолчанию (safe=True) разрешен только dict.
+    """
+
+    def __init__(self, data, safe=True, indent=False, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data, indent), **kwargs)
+
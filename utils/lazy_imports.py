@@ -0,0 +1,29 @@
+# utils/lazy_imports.py - Отложенный импорт тяжелых отладочных модулей
+
+import builtins
+import inspect
+
+
+def install_lazy_ic():
+    """
+    Делает ic() доступной во всех модулях, как icecream.install(), но сам
+    icecream (~90 мс на импорт) загружается только при первом вызове ic().
+    """
+    if hasattr(builtins, 'ic'):
+        return
+
+    def ic(*args):
+        from icecream import ic as debugger, install
+
+        install()  # дальше builtins.ic - настоящий icecream
+
+        # Первый вызов: icecream берет имена аргументов из кадра вызывающего,
+        # поэтому передаем ему кадр вызова ic(), а не этой обертки
+        if debugger.enabled:
+            debugger.outputFunction(debugger._format(inspect.currentframe().f_back, *args))
+
+        if not args:
+            return None
+        return args[0] if len(args) == 1 else args
+
+    builtins.ic = ic
@@ -1,3 +1,4 @@
+import os
 import sys
 import logging
 from datetime import timedelta
@@ -17,12 +18,17 @@ class InterceptHandler(logging.Handler):
 def setup_logger():
     logger.remove()
 
+    # diagnose=True строит repr переменных всех кадров стека для каждого
+    # трейсбека: большие временные строки в памяти воркера и данные сессий
+    # в логах. По умолчанию - только в режиме разработки (LOG_DIAGNOSE)
+    diagnose = os.environ.get('LOG_DIAGNOSE', os.environ.get('DEBUG', 'False')).lower() == 'true'
+
     # Консольный лог
     logger.add(
         sys.stdout,
         level="DEBUG",
         backtrace=True,
-        diagnose=True,
+        diagnose=diagnose,
         format="<green>{time:HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
     )
 